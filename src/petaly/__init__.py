@@ -1,3 +1,6 @@
 import sys
 
-sys.path.append("src")
\ No newline at end of file
+sys.path.append("src")
+from petaly.api import run, load_config
+from petaly.core.run_result import RunResult, ObjectResult
+from petaly.core.exceptions import PetalyError, ConfigError, PipelineNotFoundError, ConnectorError, ExtractError, LoadError, RunError
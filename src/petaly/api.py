@@ -0,0 +1,60 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+from petaly.sysconfig.main_config import MainConfig
+from petaly.core.main_ctl import MainCtl
+from petaly.core.exceptions import ConfigError, RunError
+
+
+def load_config(config_file_path=None):
+    """ Returns the MainConfig of the petaly.ini file. Without config_file_path, petaly.ini is taken from PETALY_CONFIG_DIR.
+    """
+    main_config = MainConfig()
+    main_config.set_main_config_fpath(config_file_path)
+    main_config.set_workspace_dpaths()
+    main_config.set_global_settings()
+    return main_config
+
+
+def run(pipeline_name, config=None, objects=None, run_endpoint=None, resume=False, raise_on_failure=True, configure_logging=False):
+    """ Run a pipeline in the calling process and return its RunResult, e.g.
+
+        result = petaly.run('my_pipeline', '/path_to_config_dir/petaly.ini', objects=['stocks'])
+
+    :param config: the path to petaly.ini or a MainConfig returned by load_config, which can be reused by several runs
+    :param objects: optional list of object names, by default all objects of the pipeline are processed
+    :param run_endpoint: optional source or target, to extract or load only
+    :param resume: continue an interrupted run, see run --resume
+    :param raise_on_failure: if True, a RunError is raised, if some objects failed. Otherwise, check result.status
+    :param configure_logging: if True, petaly sets up its console and file logging like the CLI
+    :raises PetalyError: ConfigError, ConnectorError, ExtractError, LoadError or RunError, with the RunResult in the attribute result
+    """
+    main_config = config if isinstance(config, MainConfig) else load_config(config)
+
+    if run_endpoint not in (None, 'source', 'target'):
+        raise ConfigError(f"The run_endpoint {run_endpoint} is not valid. Use source, target or None.")
+
+    if isinstance(objects, (list, tuple)):
+        objects = ','.join(objects)
+
+    main_ctl = MainCtl(main_config, configure_logging=configure_logging)
+    run_result = main_ctl.run_pipeline_with_result(pipeline_name, run_endpoint, objects, resume)
+
+    if raise_on_failure and run_result.status != 'completed':
+        raise RunError(f"Run of pipeline {pipeline_name} failed for objects: {', '.join(run_result.get_failed_objects())}", run_result)
+
+    return run_result
@@ -14,18 +14,25 @@
 
 import argparse
 import logging
+logger = logging.getLogger(__name__)
+
 import sys
 import os
 
 #from petaly.core.logger import setup_logging
 
 from rich.console import Console
+from rich.table import Table
 
 from petaly.cli.cli_initializer import CliInitializer
 from petaly.cli.cli_visualizer import CliVisualizer
 from petaly.cli.cli_cleanup import CliCleanup
+from petaly.cli.cli_server import CliServer
 from petaly.core.main_ctl import MainCtl
 from petaly.core.pipeline import Pipeline
+from petaly.core.object_assignment import ObjectAssignment
+from petaly.core.exceptions import PetalyError
+from petaly.core.micro_batch import MicroBatch
 from petaly.sysconfig.main_config import MainConfig
 
 
@@ -37,18 +44,25 @@ class Cli():
         self.m_conf = MainConfig() if main_config == None else main_config
         self.console = Console()
         self.top_level_argument_message = (
-                                f"Type one of the following top level positional arguments: show, init, run, cleanup; followed by options below."
+                                f"Type one of the following top level positional arguments: show, init, run, serve, explain, cleanup; followed by options below."
                                 f"\nUse -h for help"
         )
 
         self.parser = argparse.ArgumentParser()
-        self.parser.add_argument('top_level_argument', choices=['show', 'init', 'run', 'cleanup'], help=self.top_level_argument_message)
+        self.parser.add_argument('top_level_argument', choices=['show', 'init', 'run', 'serve', 'explain', 'cleanup'], help=self.top_level_argument_message)
         self.parser.add_argument('-w', '--workspace', action="store_true", help='Provide attribute --workspace for init. This is required once after installation to create the workspace.')
-        self.parser.add_argument('-p', '--pipeline_name', help='Provide pipeline name. Check exiting pipelines by show pipelines')
+        self.parser.add_argument('-p', '--pipeline_name', help='Provide pipeline name. Check exiting pipelines by show pipelines. To run several pipelines provide a comma-separated list without empty space.')
+        self.parser.add_argument('--all', action='store_true', help='Use this optional argument with run to run all pipelines from the pipeline directory. The number of pipelines running at the same time is set by max_parallel_pipelines in petaly.ini.')
         self.parser.add_argument('-o', '--object_name', help='Provide object name or a comma-separated list without empty space. The pipeline name should be specified with -p paramater too.')
         self.parser.add_argument('-c', '--config_file_path', nargs='?', type=str, help=self.m_conf.missing_main_config_file_message())
         self.parser.add_argument('-s', '--source_only', action='store_true', help='Use this optional argument only if you plan to extract data from the source without loading it to the target. This allows you to verify the data before loading.')
         self.parser.add_argument('-t', '--target_only', action='store_true', help='Use this optional argument only if you plan to load data from the output directory that was previously extracted using the -s argument. This allows you to load data into the target without extracting it again.')
+        self.parser.add_argument('--shard', help='Use this optional argument with run to share the objects of a pipeline with other machines. Provide i/N, e.g. 1/4 for the first of four machines. Each machine processes a fixed subset of objects.')
+        self.parser.add_argument('--work_stealing', metavar='RUN_ID', help='Use this optional argument with run to share the objects of a pipeline with other machines. Each machine claims the next free object with a lease file in the shared output directory. Provide the same run id to all machines, e.g. the date of the run.')
+        self.parser.add_argument('--resume', action='store_true', help='Use this optional argument with run to continue an interrupted run. Objects loaded by the previous run are skipped and objects with intact extracted files are loaded without extracting them again.')
+        self.parser.add_argument('--every', metavar='INTERVAL', help='Use this optional argument with run to sync a single pipeline again and again, e.g. --every 60s, 5m or 1h. The connections stay open between the iterations. Stop it with Ctrl-C.')
+        self.parser.add_argument('--port', type=int, default=8765, help='Use this optional argument with serve to set the local HTTP port, by default 8765. Runs are triggered by POST /run requests.')
+        self.parser.add_argument('--socket', help='Use this optional argument with serve to trigger runs over a Unix socket at the provided path instead of the local HTTP port.')
         self.parser.set_defaults(func=self.process_p)
 
 
@@ -61,6 +75,10 @@ class Cli():
             self.init_p(args)
         elif args.top_level_argument == 'run':
             self.run_p(args)
+        elif args.top_level_argument == 'serve':
+            self.serve_p(args)
+        elif args.top_level_argument == 'explain':
+            self.explain_p(args)
         elif args.top_level_argument == 'cleanup':
             self.cleanup_p(args)
         else:
@@ -114,48 +132,206 @@ class Cli():
         initialize = CliInitializer(self.m_conf)
         initialize.init_workspace(skip_message_if_exist=True)
 
-        if args.pipeline_name:
+        run_endpoint = None
+        if args.source_only:
+            run_endpoint = 'source'
+        elif args.target_only:
+            run_endpoint = 'target'
+
+        object_assignment = self.get_object_assignment(args, run_endpoint)
+
+        if args.resume and args.work_stealing:
+            self.console.print('The --resume argument can not be combined with --work_stealing. Run again with the same run id instead, the objects which are not loaded are claimed again once their leases are released or expired.')
+            sys.exit()
+
+        if args.every is not None:
+            self.run_every_p(args, run_endpoint, object_assignment)
+
+        elif args.all or (args.pipeline_name and ',' in args.pipeline_name):
+
+            if args.all:
+                pipeline_name_list = self.get_all_pipeline_names()
+            else:
+                pipeline_name_list = [pipeline_name for pipeline_name in args.pipeline_name.split(',') if pipeline_name != '']
+
+            if args.object_name:
+                self.console.print('The -o object name can be used with a single pipeline only.')
+                sys.exit()
+
+            if run_endpoint is not None:
+                self.console.print(f"Run {run_endpoint} only")
+
+            main_ctl = MainCtl(self.m_conf)
+            results = main_ctl.run_pipelines(pipeline_name_list, run_endpoint, object_assignment=object_assignment, resume=args.resume)
+            self.print_run_summary(results)
+
+            if len([result for result in results if result.get('status') != 'completed']) > 0:
+                sys.exit(1)
+
+        elif args.pipeline_name:
 
             main_ctl = MainCtl(self.m_conf)
             pipeline = Pipeline(args.pipeline_name, self.m_conf)
 
-            if self.are_endpoints_identical(pipeline):
+            if main_ctl.are_endpoints_identical(pipeline):
                 self.console.print(f"In the pipeline {args.pipeline_name} source_attributes and target_attributes are exactly the same. To avoid accidentally recreating the same tables, specify at least a different schema or database name.")
                 sys.exit()
 
             if pipeline:
-                run_endpoint = None
-                if args.source_only:
-                    run_endpoint = 'source'
-                    self.console.print(f"Run source only")
-                elif args.target_only:
-                    run_endpoint = 'target'
-                    self.console.print(f"Run target only")
-                main_ctl.run_pipeline(pipeline, run_endpoint, args.object_name)
+                if run_endpoint is not None:
+                    self.console.print(f"Run {run_endpoint} only")
+                main_ctl.run_pipeline(pipeline, run_endpoint, args.object_name, object_assignment, args.resume)
 
         else:
 
-            self.console.print('Provide -p pipeline name. Check exiting pipelines below')
+            self.console.print('Provide -p pipeline name or --all. Check exiting pipelines below')
             sys.exit()
 
-    def are_endpoints_identical(self, pipeline):
+    def run_every_p(self, args, run_endpoint, object_assignment):
+        """ Run a single pipeline in a micro-batch loop with run --every.
         """
+        interval_seconds = MicroBatch.parse_interval(args.every)
+
+        if interval_seconds is None:
+            self.console.print(f"The --every interval {args.every} is not valid. Provide a positive number of seconds, minutes or hours, e.g. 60s, 5m or 1h.")
+            sys.exit()
+
+        if args.all or not args.pipeline_name or ',' in args.pipeline_name:
+            self.console.print('The --every argument can be used with a single pipeline -p only.')
+            sys.exit()
+
+        if run_endpoint is not None or (object_assignment is not None and object_assignment.work_stealing):
+            self.console.print('The --every argument can not be combined with -s, -t or --work_stealing, as each iteration extracts and loads the objects.')
+            sys.exit()
+
+        main_ctl = MainCtl(self.m_conf)
+        pipeline = Pipeline(args.pipeline_name, self.m_conf)
+
+        if main_ctl.are_endpoints_identical(pipeline):
+            self.console.print(f"In the pipeline {args.pipeline_name} source_attributes and target_attributes are exactly the same. To avoid accidentally recreating the same tables, specify at least a different schema or database name.")
+            sys.exit()
+
+        main_ctl.run_micro_batches(args.pipeline_name, interval_seconds, args.object_name, object_assignment, args.resume)
+
+    def serve_p(self, args):
+        """ Keep the main config, pipelines and connections warm and run pipelines on request.
+        """
+        self.m_conf.set_main_config_fpath(args.config_file_path)
+        self.m_conf.set_workspace_dpaths()
+        self.m_conf.set_global_settings()
+
+        initialize = CliInitializer(self.m_conf)
+        initialize.init_workspace(skip_message_if_exist=True)
+
+        cli_server = CliServer(self.m_conf, self.get_all_pipeline_names)
+        cli_server.serve(port=args.port, socket_fpath=args.socket)
+
+    def explain_p(self, args):
+        """ Print the estimated rows, bytes, staging disk and duration of each object of a pipeline, nothing is extracted.
         """
-        identical_attributes = False
+        self.m_conf.set_main_config_fpath(args.config_file_path)
+        self.m_conf.set_workspace_dpaths()
+        self.m_conf.set_global_settings()
 
-        source_category = self.m_conf.get_connector_class_config(pipeline.source_attr.get('connector_type')).get('connector_category')
-        target_category = self.m_conf.get_connector_class_config(pipeline.target_attr.get('connector_type')).get('connector_category')
+        if not args.pipeline_name or ',' in args.pipeline_name:
+            self.console.print('Provide a single pipeline name with -p to explain the pipeline.')
+            sys.exit()
 
-        if source_category == 'database':
-            if source_category == target_category:
-                for key in pipeline.source_attr.keys():
-                    if key not in ('platform_type','database_password'):
-                        if str(pipeline.target_attr.get(key)) == str(pipeline.source_attr.get(key)):
-                            identical_attributes = True
-                        else:
-                            return False
+        main_ctl = MainCtl(self.m_conf)
+        plan = main_ctl.explain_pipeline(args.pipeline_name, args.object_name)
+        self.print_explain_plan(plan)
 
-        return identical_attributes
+    def print_explain_plan(self, plan):
+        """ Print one table with the estimate of each object in the order of extraction and the totals.
+        """
+        table = Table(title=f"Explain pipeline {plan.get('pipeline_name')}")
+        table.add_column("Object")
+        table.add_column("Estimated Rows", justify="right")
+        table.add_column("Estimated Size", justify="right")
+        table.add_column("Staging Disk", justify="right")
+        table.add_column("Expected Duration", justify="right")
+
+        for object_plan in plan.get('objects'):
+            expected_duration = object_plan.get('expected_duration')
+            table.add_row(object_plan.get('object_name'),
+                          self.format_value(object_plan.get('estimated_rows')),
+                          self.format_bytes(object_plan.get('estimated_bytes')),
+                          self.format_bytes(object_plan.get('staging_bytes')),
+                          f"{expected_duration}s" if expected_duration is not None else '-')
+
+        expected_duration = plan.get('expected_duration')
+        table.add_section()
+        table.add_row(f"Total: {len(plan.get('objects'))} objects",
+                      self.format_value(plan.get('estimated_rows')),
+                      self.format_bytes(plan.get('estimated_bytes')),
+                      self.format_bytes(plan.get('staging_bytes')),
+                      f"{expected_duration}s" if expected_duration is not None else '-')
+
+        self.console.print(table)
+        self.console.print(f"The expected duration assumes max_parallel_objects: {plan.get('max_parallel_objects')}. "
+                           f"It's based on the throughput of the previous run and isn't available before the first run.")
+
+    def format_value(self, value):
+        return f"{value:,}" if value is not None else '-'
+
+    def format_bytes(self, value):
+        if value is None:
+            return '-'
+
+        for unit in ('B', 'KB', 'MB', 'GB'):
+            if value < 1024:
+                return f"{round(value, 1)} {unit}"
+            value /= 1024
+
+        return f"{round(value, 1)} TB"
+
+    def get_object_assignment(self, args, run_endpoint):
+        """ Returns the ObjectAssignment for --shard or --work_stealing, or None if the pipeline runs on this machine only.
+        """
+        if args.shard and args.work_stealing:
+            self.console.print('Provide either --shard or --work_stealing, not both.')
+            sys.exit()
+
+        if args.shard:
+            return ObjectAssignment.from_shard_arg(args.shard)
+
+        if args.work_stealing:
+            if run_endpoint is not None:
+                self.console.print('The --work_stealing argument can not be combined with -s or -t, as a machine loads the objects it has extracted in the same run.')
+                sys.exit()
+
+            return ObjectAssignment.from_run_id(args.work_stealing)
+
+        return None
+
+    def get_all_pipeline_names(self):
+        """ Returns the names of all pipelines in the pipeline directory, which have a pipeline.yaml file.
+        """
+        pipeline_name_list = []
+        for pipeline_name in sorted(os.listdir(self.m_conf.pipeline_base_dpath)):
+            if os.path.isfile(os.path.join(self.m_conf.pipeline_base_dpath, pipeline_name, self.m_conf.pipeline_fname)):
+                pipeline_name_list.append(pipeline_name)
+
+        return pipeline_name_list
+
+    def print_run_summary(self, results):
+        """ Print one table with the result of each pipeline.
+        """
+        table = Table(title="Run Summary")
+        table.add_column("Pipeline")
+        table.add_column("Status")
+        table.add_column("Duration", justify="right")
+        table.add_column("Error")
+
+        for result in results:
+            status = result.get('status')
+            status_style = 'green' if status == 'completed' else 'red'
+            table.add_row(result.get('object_name'),
+                          f"[{status_style}]{status}[/{status_style}]",
+                          f"{result.get('duration')}s",
+                          result.get('error') or '')
+
+        self.console.print(table)
 
     def cleanup_p(self, args):
         """
@@ -187,6 +363,9 @@ class Cli():
         try:
             args = self.parser.parse_args()
             args.func(args)
+        except PetalyError as err:
+            logger.error(err)
+            sys.exit(1)
         except:
 
             if 'args' not in locals():
@@ -197,3 +376,5 @@ class Cli():
                     "----------------------------------------------------------------------------------------")
                 sys.exit(0)
 
+            # keep the exit code of the run, e.g. 1 if one of several pipelines failed
+            raise
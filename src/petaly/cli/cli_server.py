@@ -0,0 +1,176 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from petaly.core.main_ctl import MainCtl
+from petaly.core.connection_pool import ConnectionPool
+
+
+class CliServer():
+    """ CliServer keeps the main config, the parsed pipelines and the database connections warm between runs.
+    Runs are triggered by HTTP requests on a local port or a Unix socket, e.g.
+
+        curl -X POST localhost:8765/run -d '{"pipeline_name": "my_pipeline"}'
+    """
+
+    def __init__(self, main_config, get_pipeline_names):
+        self.m_conf = main_config
+        self.main_ctl = MainCtl(main_config)
+        # returns the names of all pipelines, so pipelines created after the start of serve can be run too
+        self.get_pipeline_names = get_pipeline_names
+        self.started_at = time.time()
+        self.run_count = 0
+        self.running_pipelines = set()
+        self.lock = threading.Lock()
+
+        ConnectionPool.enable()
+
+    def serve(self, port=None, socket_fpath=None):
+        """ Serve runs until the process is stopped. A Unix socket is used if socket_fpath is provided, otherwise localhost:port.
+        """
+        if socket_fpath is not None:
+            if os.path.exists(socket_fpath):
+                os.remove(socket_fpath)
+            http_server = UnixHTTPServer(socket_fpath, self.compose_request_handler())
+            os.chmod(socket_fpath, 0o600)
+            logger.info(f"Petaly serves runs on the Unix socket {socket_fpath}")
+        else:
+            http_server = ThreadingHTTPServer(('127.0.0.1', port), self.compose_request_handler())
+            logger.info(f"Petaly serves runs on http://127.0.0.1:{port}")
+
+        # stop on SIGTERM like on Ctrl-C. The server is shut down from another thread, as serve_forever blocks this one
+        signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=http_server.shutdown).start())
+
+        try:
+            http_server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Petaly serve stopped")
+        finally:
+            http_server.server_close()
+            ConnectionPool.close_all()
+            if socket_fpath is not None and os.path.exists(socket_fpath):
+                os.remove(socket_fpath)
+
+    def compose_request_handler(self):
+        cli_server = self
+
+        class RequestHandler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self.send_json(200, cli_server.get_health())
+                elif self.path == '/pipelines':
+                    self.send_json(200, {'pipelines': cli_server.get_pipeline_names()})
+                else:
+                    self.send_json(404, {'error': f"Unknown path {self.path}. Use GET /health, GET /pipelines or POST /run"})
+
+            def do_POST(self):
+                if self.path != '/run':
+                    self.send_json(404, {'error': f"Unknown path {self.path}. Use POST /run"})
+                    return
+
+                try:
+                    content_length = int(self.headers.get('Content-Length') or 0)
+                    run_request = json.loads(self.rfile.read(content_length) or b'{}')
+                except ValueError as err:
+                    self.send_json(400, {'error': f"The request body is not valid JSON: {err}"})
+                    return
+
+                self.send_json(*cli_server.run(run_request))
+
+            def send_json(self, status_code, body):
+                response = json.dumps(body, indent=2).encode('utf-8')
+                self.send_response(status_code)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(response)))
+                self.end_headers()
+                self.wfile.write(response)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return RequestHandler
+
+    def get_health(self):
+        with self.lock:
+            return {'status': 'ok',
+                    'uptime': round(time.time() - self.started_at),
+                    'runs': self.run_count,
+                    'running_pipelines': sorted(self.running_pipelines)}
+
+    def run(self, run_request):
+        """ Run the pipelines of the request and return the HTTP status code and the run results.
+        A pipeline that is still running from a previous request isn't started again.
+        """
+        pipeline_names = run_request.get('pipeline_name')
+        if not pipeline_names:
+            return 400, {'error': 'Provide pipeline_name, a pipeline name or a list of pipeline names'}
+
+        pipeline_name_list = pipeline_names if isinstance(pipeline_names, list) else [pipeline_name for pipeline_name in str(pipeline_names).split(',') if pipeline_name != '']
+
+        unknown_pipelines = [pipeline_name for pipeline_name in pipeline_name_list if pipeline_name not in self.get_pipeline_names()]
+        if len(unknown_pipelines) > 0:
+            return 404, {'error': f"Unknown pipelines: {', '.join(unknown_pipelines)}"}
+
+        run_endpoint = run_request.get('run_endpoint')
+        if run_endpoint not in (None, 'source', 'target'):
+            return 400, {'error': 'The run_endpoint supports source or target only'}
+
+        object_names = run_request.get('object_name')
+        if isinstance(object_names, list):
+            object_names = ','.join(object_names)
+
+        if object_names is not None and len(pipeline_name_list) > 1:
+            return 400, {'error': 'The object_name can be used with a single pipeline only'}
+
+        with self.lock:
+            busy_pipelines = [pipeline_name for pipeline_name in pipeline_name_list if pipeline_name in self.running_pipelines]
+            if len(busy_pipelines) > 0:
+                return 409, {'error': f"Pipelines are still running: {', '.join(busy_pipelines)}"}
+            self.running_pipelines.update(pipeline_name_list)
+            self.run_count += 1
+
+        try:
+            results = self.main_ctl.run_pipelines(pipeline_name_list, run_endpoint, object_names, resume=run_request.get('resume') is True)
+        finally:
+            with self.lock:
+                self.running_pipelines.difference_update(pipeline_name_list)
+
+        run_results = [{'pipeline_name': result.get('object_name'),
+                        'status': result.get('status'),
+                        'duration': result.get('duration'),
+                        'error': result.get('error')} for result in results]
+
+        status_code = 200 if all(result.get('status') == 'completed' for result in results) else 500
+        return status_code, {'results': run_results}
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ HTTP server on a Unix socket, which handles each request in its own thread like ThreadingHTTPServer. """
+    daemon_threads = True
+
+    def get_request(self):
+        request, client_address = super().get_request()
+        # BaseHTTPRequestHandler expects a (host, port) client address
+        return request, ('local', 0)
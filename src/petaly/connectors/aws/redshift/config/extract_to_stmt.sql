@@ -1,4 +1,4 @@
-UNLOAD ('SELECT {column_list} FROM {schema_name}.{table_name}')
+UNLOAD ('SELECT {column_list} FROM {schema_name}.{table_name} {where_clause}')
 TO '{extract_to_fpath}'
 IAM_ROLE '{iam_role}'
 FORMAT AS CSV
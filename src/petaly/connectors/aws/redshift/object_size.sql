@@ -0,0 +1,11 @@
+SELECT tb.table_name as source_object_name,
+       tb.estimated_rows as estimated_rows,
+       tb.estimated_bytes as estimated_bytes
+FROM (SELECT "schema" as table_schema,
+             "table" as table_name,
+             tbl_rows as estimated_rows,
+             size * 1024 * 1024 as estimated_bytes
+        FROM svv_table_info) tb
+WHERE tb.table_schema in ('{schema}')
+{table_statement_list}
+       ;
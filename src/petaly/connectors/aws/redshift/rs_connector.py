@@ -16,7 +16,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 import time
 
 import boto3
@@ -24,6 +23,8 @@ from botocore.config import Config
 from botocore.exceptions import ClientError
 
 from petaly.utils.file_handler import FileHandler
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import ConnectorError
 
 class RSConnectorIAM():
 
@@ -50,8 +51,7 @@ class RSConnectorIAM():
             return session
 
         except ClientError as e:
-            logger.error(e)
-            sys.exit()
+            raise ConnectorError(str(e)) from e
 
     def execute_sql(self, sql, sleep_sec=1):
         try:
@@ -80,8 +80,7 @@ class RSConnectorIAM():
                 request_id = request_metadata.get('Id')
                 logger.debug(f"Query with Id: {request_id} was executed:\n{sql}")
             else:
-                logger.error(f"Unexpected Error during the execution:\n{sql}")
-                sys.exit()
+                raise ConnectorError(f"Unexpected Error during the execution:\n{sql}")
 
             last_query_status = ""
             result = False
@@ -103,8 +102,8 @@ class RSConnectorIAM():
                     result = statement_description.get('HasResultSet')
 
                 elif query_status == "FAILED":
-                    finished = True
-                    logger.error(f"Query {query_status}: {statement_description.get('Error')}")
+                    logger.debug(sql)
+                    raise ConnectorError(f"Query {query_status}: {statement_description.get('Error')}")
 
                 else:
                     if query_status != last_query_status:
@@ -112,7 +111,8 @@ class RSConnectorIAM():
                         logger.debug(f"The last query status is: {last_query_status}")
 
             if not finished:
-                logger.debug(f"The query statement_timeout of {self.statement_timeout} sec is expired.")
+                logger.debug(sql)
+                raise ConnectorError(f"The query statement_timeout of {self.statement_timeout} sec is expired.")
 
             if result:
                 result_data = rs_client.get_statement_result(Id=request_id)
@@ -121,7 +121,8 @@ class RSConnectorIAM():
             return result_data, request_id
 
         except ClientError as e:
-            logger.error(e)
+            logger.debug(sql)
+            raise ConnectorError(str(e)) from e
 
     def get_metaquery_result(self, sql):
         """
@@ -132,6 +133,25 @@ class RSConnectorIAM():
         mapped_result = self.map_result_to_metaquery(result_records)
         return mapped_result
 
+    def get_query_result(self, sql):
+        """ Returns the query result as a list of dicts, keys are the column names of the query.
+        """
+        result_data, request_id = self.execute_sql(sql, sleep_sec=1)
+
+        column_names = [column.get('name') for column in result_data.get("ColumnMetadata")]
+        rec_array = []
+        for rec in result_data.get("Records"):
+            new_rec = {}
+            for idx in range(len(rec)):
+                value = None
+                for k, v in rec[idx].items():
+                    if k != 'isNull':
+                        value = v
+                new_rec.update({column_names[idx]: value})
+            rec_array.append(new_rec)
+
+        return rec_array
+
     def map_result_to_metaquery(self, result_records):
         """
         """
@@ -164,12 +184,23 @@ class RSConnectorIAM():
         result_data, request_id = self.execute_sql(load_from_stmt, sleep_sec=5)
         return result_data
 
+    def merge_from(self, merge_stmt):
+        """ Merge the staging table into the destination table.
+        """
+        result_data, request_id = self.execute_sql(merge_stmt, sleep_sec=5)
+        return result_data
+
     def drop_table(self, schema_table_name):
 
         sql = f"DROP TABLE IF EXISTS {schema_table_name}"
         result_data, request_id = self.execute_sql(sql, sleep_sec=1)
         return result_data
 
+    def close(self):
+        """ The Redshift Data API doesn't keep an open connection, nothing to close.
+        """
+        pass
+
 ### --------------------------------------------------------------- ###
 
 import redshift_connector
@@ -181,7 +212,8 @@ class RSConnectorTCP():
         """
         self.connector_id = 'redshift'
         self.metaquery_quote = '"'
-        self.conn = self.get_connection(endpoint_attr)
+        self.endpoint_attr = endpoint_attr
+        self.conn = ConnectionPool.acquire(endpoint_attr, lambda: self.get_connection(endpoint_attr), self.is_connection_alive)
         self.f_handler = FileHandler()
 
     def compose_connection_params(self, endpoint_attr):
@@ -205,8 +237,7 @@ class RSConnectorTCP():
 
         except (Exception, redshift_connector.DatabaseError) as error:
             logger.debug(connection_params)
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
         return conn
 
@@ -229,8 +260,7 @@ class RSConnectorTCP():
 
         except (Exception, redshift_connector.DatabaseError) as error:
             logger.debug(sql)
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
     def extract_to(self, extract_to_stmt):
         """
@@ -241,8 +271,7 @@ class RSConnectorTCP():
 
         except (Exception, redshift_connector.DatabaseError) as error:
             logger.debug(extract_to_stmt)
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
     def load_from(self, load_from_stmt):
         """
@@ -252,10 +281,19 @@ class RSConnectorTCP():
                 cur.execute(load_from_stmt)
         except (Exception, redshift_connector.DatabaseError) as error:
             logger.debug('\n'+load_from_stmt)
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
 
+    def merge_from(self, merge_stmt):
+        """ Merge the staging table into the destination table.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute(merge_stmt)
+        except (Exception, redshift_connector.DatabaseError) as error:
+            logger.debug('\n'+merge_stmt)
+            raise ConnectorError(f"Merge failed: {error}") from error
+
     def drop_table(self, schema_table_name):
         try:
             sql = f"DROP TABLE IF EXISTS {schema_table_name}"
@@ -275,4 +313,14 @@ class RSConnectorTCP():
             logger.debug(sql)
             logger.error(error)
 
+    def is_connection_alive(self, conn):
+        """ Check an idle connection of the serve mode before it's reused.
+        """
+        with conn.cursor() as cur:
+            cur.execute("SELECT 1")
+        return True
 
+    def close(self):
+        """ Close the database connection, or return it to the ConnectionPool in serve mode.
+        """
+        ConnectionPool.release(self.endpoint_attr, self.conn, lambda conn: conn.close())
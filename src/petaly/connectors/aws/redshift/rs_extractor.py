@@ -15,12 +15,12 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import sys
 from petaly.core.db_extractor import DBExtractor
 from petaly.utils.utils import FormatDict
 
 from petaly.connectors.aws.redshift.rs_connector import RSConnectorIAM, RSConnectorTCP
 from petaly.connectors.aws.s3.s3_connector import S3Connector
+from petaly.core.exceptions import ConfigError
 
 
 class RSExtractor(DBExtractor):
@@ -34,20 +34,22 @@ class RSExtractor(DBExtractor):
             self.db_connector = RSConnectorTCP(pipeline.source_attr)
             self.s3_connector = S3Connector(pipeline.source_attr, aws_session=None)
         else:
-            logger.error(f"The connection_method: {pipeline.source_attr.get('connection_method')} is not supported for AWS extraction.")
-            sys.exit()
+            raise ConfigError(f"The connection_method: {pipeline.source_attr.get('connection_method')} is not supported for AWS extraction.")
 
         super().__init__(pipeline)
         self.cloud_bucket_name = self.pipeline.source_attr.get('aws_bucket_name')
         self.cloud_bucket_path = self.s3_connector.bucket_prefix + self.cloud_bucket_name
         self.aws_iam_role = self.pipeline.source_attr.get('aws_iam_role')
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
 
     def get_query_result(self, meta_query):
         return self.db_connector.get_metaquery_result(meta_query)
 
+    def get_object_size_result(self, object_size_query):
+        return self.db_connector.get_query_result(object_size_query)
+
     def extract_to(self, extractor_obj_conf):
         object_name = extractor_obj_conf.get('object_name')
         extract_to_stmt = extractor_obj_conf.get('extract_to_stmt')
@@ -80,6 +82,7 @@ class RSExtractor(DBExtractor):
         					FormatDict( column_list=extractor_obj_conf.get('column_list'),
                                         schema_name=extractor_obj_conf.get('source_schema_name'),
                                         table_name=extractor_obj_conf.get('source_object_name'),
+                                        where_clause=extractor_obj_conf.get('where_clause'),
                                         extract_to_fpath = extract_to_fpath,
                                         extract_to_options=extract_data_options,
                                         iam_role=self.aws_iam_role
@@ -87,6 +90,16 @@ class RSExtractor(DBExtractor):
 
         return extract_to_stmt
 
+    def compose_source_name_column(self, source_name, column_name):
+        """ The extract query is a string in the UNLOAD statement, so the quotes of the source name are doubled.
+        """
+        return f"''{source_name}'' AS {self.db_connector.metaquery_quote}{column_name}{self.db_connector.metaquery_quote}"
+
+    def compose_where_clause(self, conditions):
+        """ The extract query is a string in the UNLOAD statement, so the quotes of the high-water marks are doubled.
+        """
+        return super().compose_where_clause(conditions).replace("'", "''")
+
     def compose_extract_options(self, extractor_obj_conf):
         """ CSV
             DELIMITER AS ','
@@ -15,13 +15,13 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import sys
-
 from petaly.utils.utils import FormatDict
 from petaly.core.db_loader import DBLoader
+from petaly.core.data_object import DataObject
 
 from petaly.connectors.aws.redshift.rs_connector import RSConnectorIAM, RSConnectorTCP
 from petaly.connectors.aws.s3.s3_connector import S3Connector
+from petaly.core.exceptions import ConfigError
 
 
 class RSLoader(DBLoader):
@@ -36,8 +36,7 @@ class RSLoader(DBLoader):
             self.db_connector = RSConnectorTCP(pipeline.target_attr)
             self.s3_connector = S3Connector(pipeline.source_attr, aws_session=None)
         else:
-            logger.error(f"The connection_method: {pipeline.source_attr.get('connection_method')} is not supported for AWS load.")
-            sys.exit()
+            raise ConfigError(f"The connection_method: {pipeline.source_attr.get('connection_method')} is not supported for AWS load.")
 
         super().__init__(pipeline)
 
@@ -48,6 +47,12 @@ class RSLoader(DBLoader):
     def load_data(self):
         super().load_data()
 
+    def compose_delete_stmt(self, destination_table, staging_table, primary_key_columns):
+        """ Delete the rows whose primary key is staged with petaly_op D. The DELETE of Redshift has no alias for the destination table. """
+        return (f"DELETE FROM {destination_table}\n"
+                f"USING {staging_table} AS s\n"
+                f"WHERE s.{DataObject.change_op_column} = 'D' AND {' AND '.join(f'{destination_table}.{column} = s.{column}' for column in primary_key_columns)};")
+
     def drop_table(self, loader_obj_conf: dict):
 
         table_ddl_dict = loader_obj_conf.get('table_ddl_dict')
@@ -66,31 +71,36 @@ class RSLoader(DBLoader):
 
         object_name = loader_obj_conf.get('object_name')
         blob_prefix = loader_obj_conf.get('blob_prefix')
+        # the files uploaded by the interrupted run are loaded without uploading them again
+        is_uploaded = self.pipeline.resume and self.pipeline.run_manifest.is_uploaded(object_name, self.pipeline.target_name)
+
         # 1. cleanup object from bucket
-        self.s3_connector.delete_object_in_bucket(self.cloud_bucket_name, blob_prefix)
+        if not is_uploaded:
+            self.s3_connector.delete_object_in_bucket(self.cloud_bucket_name, blob_prefix)
 
         # 2. drop and recreate table
-        if loader_obj_conf.get('recreate_destination_object') == True:
-            self.drop_table(loader_obj_conf)
-
-        self.create_table(loader_obj_conf)
+        self.prepare_destination_object(loader_obj_conf)
         output_data_object_dir = loader_obj_conf.get('output_data_object_dir')
 
-        self.f_handler.gzip_csv_files(output_data_object_dir, cleanup_file=True)
+        if not is_uploaded:
+            self.f_handler.gzip_csv_files(output_data_object_dir, cleanup_file=True)
 
-        file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.csv*')
+            file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.csv*')
 
-        self.s3_connector.upload_files_to_bucket(self.cloud_bucket_name, blob_prefix, file_list)
+            self.s3_connector.upload_files_to_bucket(self.cloud_bucket_name, blob_prefix, file_list)
+            self.pipeline.run_manifest.set_phase(object_name, 'uploaded', target_name=self.pipeline.target_name)
 
         s3_file_list = self.s3_connector.get_bucket_file_list(self.cloud_bucket_name, blob_prefix)
         load_from_stmt = loader_obj_conf.get('load_from_stmt')
 
-        for data_fpath in s3_file_list:
+        def load_file(data_fpath):
             path_to_data_file = self.cloud_bucket_path + '/' + data_fpath
-            load_from_stmt = load_from_stmt.format_map(
+            load_from_stmt_formated = load_from_stmt.format_map(
                 FormatDict(path_to_data_file=path_to_data_file))
 
-            self.db_connector.load_from(load_from_stmt)
+            self.db_connector.load_from(load_from_stmt_formated)
+
+        self.load_batches(object_name, s3_file_list, load_file)
 
     def compose_create_table_stmt(self, loader_obj_conf):
 
@@ -16,12 +16,13 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 import boto3
 from boto3.s3.transfer import S3UploadFailedError
-from botocore.exceptions import ClientError
+from botocore.exceptions import BotoCoreError, ClientError
 
 from petaly.utils.file_handler import FileHandler
+from petaly.core.exceptions import ConnectorError
+from petaly.core.retry_policy import RetryPolicy
 
 class S3Connector():
     def __init__(self, endpoint_attr, aws_session=None):
@@ -30,6 +31,7 @@ class S3Connector():
         self.bucket_prefix = 's3://'
         self.bucket_path_delimiter = '/'
         self.endpoint_attr = endpoint_attr
+        self.retry_policy = RetryPolicy.from_attributes(endpoint_attr)
 
         if aws_session is None:
             self.aws_session = self.get_aws_session()
@@ -50,8 +52,7 @@ class S3Connector():
             return session
 
         except ClientError as e:
-            logger.error(e)
-            sys.exit()
+            raise ConnectorError(str(e)) from e
 
     def get_s3_client(self):
         return self.aws_session.client(service_name='s3')
@@ -85,7 +86,10 @@ class S3Connector():
             object_fname = object_fpath.split(self.bucket_path_delimiter)[-1]
             target_fpath = os.path.join(destination_dpath, object_fname)
 
-            s3_client.download_file(bucket_name, object_fpath, target_fpath)
+            try:
+                s3_client.download_file(bucket_name, object_fpath, target_fpath)
+            except (ClientError, BotoCoreError) as error:
+                raise ConnectorError(f"Download failed for: s3://{bucket_name}/{object_fpath}: {error}") from error
             is_gzipped, target_fpath = self.f_handler.check_gzip_modify_path(target_fpath)
 
             downloaded_file_list.append(target_fpath)
@@ -106,20 +110,51 @@ class S3Connector():
 
             return object_list
 
-        except (Exception) as error:
-            logger.debug(bucket_name, blob_prefix)
-            logger.error(error)
+        except (ClientError, BotoCoreError) as error:
+            raise ConnectorError(f"The files of s3://{bucket_name}/{blob_prefix} can't be listed: {error}") from error
+
+    def get_bucket_file_size(self, bucket_name, blob_prefix, file_names=None):
+        """ Returns the size in bytes of all files under the blob_prefix, or only of the given file_names.
+        """
+        s3_resource = boto3.resource('s3')
+        bucket = s3_resource.Bucket(bucket_name)
+
+        file_size = 0
+        for object_summary in bucket.objects.filter(Prefix=blob_prefix):
+            object_fname = object_summary.key.split(self.bucket_path_delimiter)[-1]
+            if file_names is None or object_fname in file_names:
+                file_size += object_summary.size
+
+        return file_size
+
+    def get_bucket_file_etags(self, bucket_name, blob_prefix, file_names=None):
+        """ Returns the ETag of all files under the blob_prefix, or only of the given file_names.
+        """
+        s3_resource = boto3.resource('s3')
+        bucket = s3_resource.Bucket(bucket_name)
+
+        file_etags = {}
+        for object_summary in bucket.objects.filter(Prefix=blob_prefix):
+            object_fname = object_summary.key.split(self.bucket_path_delimiter)[-1]
+            if file_names is None or object_fname in file_names:
+                file_etags.update({object_summary.key: object_summary.e_tag})
+
+        return file_etags
 
     def upload_files_to_bucket(self, bucket_name, blob_prefix, object_file_list):
+        """ Upload the files one after another. A failed upload is repeated for the failed file only, see RetryPolicy.
+        """
+        s3_client = boto3.client('s3')
 
-        try:
-            s3_client = boto3.client('s3')
-            for object_fpath in object_file_list:
-                bucket_fpath = blob_prefix + self.bucket_path_delimiter + os.path.basename(object_fpath)
+        for object_fpath in object_file_list:
+            bucket_fpath = blob_prefix + self.bucket_path_delimiter + os.path.basename(object_fpath)
+
+            try:
+                self.retry_policy.run(lambda: s3_client.upload_file(object_fpath, bucket_name, bucket_fpath),
+                                      f"Upload of file {object_fpath} to s3://{bucket_name}/{bucket_fpath}",
+                                      retry_on=(ClientError, S3UploadFailedError, BotoCoreError))
 
-                s3_client.upload_file(object_fpath, bucket_name, bucket_fpath)
-                logger.debug(f"Upload file {object_fpath} to destination s3://{bucket_name}/{bucket_fpath}")
+            except (ClientError, S3UploadFailedError, BotoCoreError) as error:
+                raise ConnectorError(f"Upload failed for: s3://{bucket_name}/{bucket_fpath}: {error}") from error
 
-        except (Exception, s3_client.exceptions, S3UploadFailedError) as error:
-            logger.debug(f"Upload failed for: s3://{bucket_name}/{bucket_fpath} ; object_files", object_file_list)
-            logger.error(error)
+            logger.debug(f"Upload file {object_fpath} to destination s3://{bucket_name}/{bucket_fpath}")
@@ -26,11 +26,12 @@ class S3Loader(FLoader):
         self.f_handler = FileHandler()
 
         super().__init__(pipeline)
+        self.file_to_gzip = True
         self.cloud_bucket_name = self.pipeline.target_attr.get('aws_bucket_name')
         self.cloud_bucket_path = self.s3_connector.bucket_prefix + self.cloud_bucket_name + '/'
 
     def load_data(self):
-        super().load_data(file_to_gzip=True)
+        super().load_data()
 
     def load_from(self, loader_obj_conf):
         """ Load files to bucket
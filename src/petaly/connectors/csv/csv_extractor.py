@@ -13,12 +13,12 @@
 # limitations under the License.
 
 import logging
-import sys
 
 logger = logging.getLogger(__name__)
 
 import os
 from petaly.core.f_extractor import FExtractor
+from petaly.core.exceptions import ExtractError
 
 class CsvExtractor(FExtractor):
 
@@ -26,8 +26,43 @@ class CsvExtractor(FExtractor):
         self.file_format = 'csv'
         super().__init__(pipeline)
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
+
+    def get_source_size(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the size in bytes of the csv files in the object_source_dir.
+        """
+        if object_source_dir is None:
+            return None
+
+        if file_names is None:
+            file_names = self.f_handler.get_file_names_with_extensions(object_source_dir, self.file_format)
+
+        source_size = 0
+        for file_name in file_names:
+            file_source_fpath = os.path.join(object_source_dir, file_name)
+            if self.f_handler.is_file(file_source_fpath):
+                source_size += os.path.getsize(file_source_fpath)
+
+        return source_size
+
+    def get_source_fingerprint(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the modification time and size of each csv file in the object_source_dir.
+        """
+        if object_source_dir is None:
+            return None
+
+        if file_names is None:
+            file_names = self.f_handler.get_file_names_with_extensions(object_source_dir, self.file_format)
+
+        source_fingerprint = {}
+        for file_name in file_names:
+            file_source_fpath = os.path.join(object_source_dir, file_name)
+            if self.f_handler.is_file(file_source_fpath):
+                file_stat = os.stat(file_source_fpath)
+                source_fingerprint.update({file_name: f"{file_stat.st_mtime_ns}:{file_stat.st_size}"})
+
+        return source_fingerprint
 
     def extract_to(self, extractor_obj_conf):
         """
@@ -45,8 +80,7 @@ class CsvExtractor(FExtractor):
             if self.f_handler.is_file(file_source_fpath):
                 self.f_handler.cp_file(file_source_fpath, extractor_obj_conf.get('output_data_object_dir'))
             else:
-                logger.error(f"The file: {file_source_fpath} wasn't found. Check the source and pipeline.yaml configuration.")
-                sys.exit()
+                raise ExtractError(f"The file: {file_source_fpath} wasn't found. Check the source and pipeline.yaml configuration.")
 
             prepared_file_list.append(file_source_fpath)
 
@@ -17,8 +17,8 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 from petaly.core.f_loader import FLoader
+from petaly.core.exceptions import ConfigError
 
 
 class CsvLoader(FLoader):
@@ -39,8 +39,7 @@ class CsvLoader(FLoader):
 
         dest_file_dir = self.pipeline.target_attr.get("destination_dir")
         if dest_file_dir is None:
-            logger.warning(f"The pipeline->target_attribute->destination_dir in pipeline.yaml is not specified.")
-            sys.exit()
+            raise ConfigError(f"The pipeline->target_attribute->destination_dir in pipeline.yaml is not specified.")
 
         dest_object_name = object_name
         if data_object.destination_object_name is not None:
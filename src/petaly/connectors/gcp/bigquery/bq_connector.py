@@ -16,22 +16,30 @@ import logging
 logger = logging.getLogger(__name__)
 
 from google.cloud import exceptions, bigquery
+from petaly.core.exceptions import ConnectorError
+from petaly.core.retry_policy import RetryPolicy
 
 
 class BQConnector():
 
-    def __init__(self):
+    def __init__(self, endpoint_attr=None):
+        """ The optional endpoint_attr sets the retries of a failed load job, see RetryPolicy.
+        """
         self.connector_id = 'bigquery'
         self.metaquery_quote = ''
         self.bq_source_format = 'bigquery.SourceFormat.CSV'
+        self.retry_policy = RetryPolicy.from_attributes(endpoint_attr or {})
 
-    def extract_to(self, table_ref, destination_uri, region):
-
+    def extract_to(self, table_ref, destination_uri, region, extract_options):
+        """ Export a whole table with an extract job, extract_options sets the header and the delimiter of the files.
+        """
         logger.debug(f"Extract table {table_ref} to {destination_uri} started")
         try:
             bq_client = bigquery.Client()
             job_config = bigquery.job.ExtractJobConfig()
             job_config.compression = bigquery.Compression.GZIP
+            job_config.print_header = extract_options.get('header')
+            job_config.field_delimiter = extract_options.get('delimiter')
 
             extract_job = bq_client.extract_table(
                 table_ref,
@@ -44,7 +52,43 @@ class BQConnector():
             logger.debug(f"Table {table_ref} was loaded to {destination_uri}. Result: {result}")
 
         except exceptions.GoogleCloudError as err:
-            logger.error(err)
+            raise ConnectorError(f"Extract of table {table_ref} to {destination_uri} failed: {err}") from err
+
+    def export_query(self, query, destination_uri, region, extract_options):
+        """ Export the result of a query, the extract job exports whole tables only. The files have the same options as of extract_to.
+        """
+        header = 'true' if extract_options.get('header') else 'false'
+        field_delimiter = self.compose_string_literal(extract_options.get('delimiter'))
+        export_stmt = (f"EXPORT DATA OPTIONS(uri='{destination_uri}', format='CSV', overwrite=true, header={header}, "
+                       f"field_delimiter={field_delimiter}, compression='GZIP') AS {query}")
+
+        logger.debug(f"Export query to {destination_uri} started")
+        try:
+            bq_client = bigquery.Client()
+            export_job = bq_client.query(export_stmt, location=region)
+            result = export_job.result()  # Waits for job to complete.
+            logger.debug(f"Query was exported to {destination_uri}. Result: {result}")
+
+        except exceptions.GoogleCloudError as err:
+            logger.debug(export_stmt)
+            raise ConnectorError(f"Export of query to {destination_uri} failed: {err}") from err
+
+    @classmethod
+    def compose_string_literal(cls, value):
+        """ Returns the value as a quoted string literal of GoogleSQL. """
+        return "'" + value.replace('\\', '\\\\').replace("'", "\\'").replace('\t', '\\t') + "'"
+
+    def merge_from(self, merge_stmt):
+        """ Merge the staging table into the destination table, a MERGE statement is atomic.
+        """
+        try:
+            bq_client = bigquery.Client()
+            job = bq_client.query(merge_stmt)
+            job.result()  # Waits for the query to finish.
+            logger.debug(f"Merge affected {job.num_dml_affected_rows} rows.")
+        except exceptions.GoogleCloudError as err:
+            logger.debug(merge_stmt)
+            raise ConnectorError(f"Merge failed: {err}") from err
 
     def execute_sql(self, query):
         """
@@ -73,8 +117,7 @@ class BQConnector():
             return result_arr
         except exceptions.GoogleCloudError as err:
             logger.debug(metadata_query)
-            logger.error(err)
-            pass
+            raise ConnectorError(f"Meta query failed: {err}") from err
 
     def create_table_from_json_schema(self, table_schema_fpath, table_id):
         """ ToDo this function potentially for bq_connector
@@ -99,31 +142,37 @@ class BQConnector():
 
         logger.debug(f"Load data from the file {data_fpath}")
 
+        # a load job is atomic, so only the job of the failed file is repeated
         try:
-            bq_client = bigquery.Client()
-            job_config = bigquery.LoadJobConfig(**bq_job_config)
-            rows_start = bq_client.get_table(table_id).num_rows  # Make an API request.
-
-            if load_from_bucket:
-                job = bq_client.load_table_from_uri(data_fpath,
-                                                    table_id,
-                                                    job_config=job_config,
-                                                    location=region)
-            else:
-                with open(data_fpath, "rb") as source_file:
-                    job = bq_client.load_table_from_file(source_file,
-                                                         table_id,
-                                                         job_config=job_config,
-                                                         location=region)
-
-            job.result()  # Waits for the job to complete.
-            table = bq_client.get_table(table_id)  # Make an API request.
-            rows_end = table.num_rows
-            rows_loaded = rows_end - rows_start
-            logger.debug(f"Loaded {rows_loaded} rows and {len(table.schema)} columns to {table_id} from file {data_fpath}")
-
-        except exceptions.GoogleCloudError as err:
-            logger.error(err)
+            self.retry_policy.run(lambda: self.run_load_job(bq_job_config, data_fpath, table_id, load_from_bucket, region),
+                                  f"Load job of file {data_fpath}",
+                                  retry_on=(exceptions.GoogleCloudError, ConnectionError))
+
+        except (exceptions.GoogleCloudError, ConnectionError) as err:
+            raise ConnectorError(f"Load job of file {data_fpath} into {table_id} failed: {err}") from err
+
+    def run_load_job(self, bq_job_config, data_fpath, table_id, load_from_bucket, region):
+        bq_client = bigquery.Client()
+        job_config = bigquery.LoadJobConfig(**bq_job_config)
+        rows_start = bq_client.get_table(table_id).num_rows  # Make an API request.
+
+        if load_from_bucket:
+            job = bq_client.load_table_from_uri(data_fpath,
+                                                table_id,
+                                                job_config=job_config,
+                                                location=region)
+        else:
+            with open(data_fpath, "rb") as source_file:
+                job = bq_client.load_table_from_file(source_file,
+                                                     table_id,
+                                                     job_config=job_config,
+                                                     location=region)
+
+        job.result()  # Waits for the job to complete.
+        table = bq_client.get_table(table_id)  # Make an API request.
+        rows_end = table.num_rows
+        rows_loaded = rows_end - rows_start
+        logger.debug(f"Loaded {rows_loaded} rows and {len(table.schema)} columns to {table_id} from file {data_fpath}")
 
     def drop_table(self, table_id):
         """ Function drop BigQuery table
@@ -136,3 +185,8 @@ class BQConnector():
         except exceptions.GoogleCloudError as err:
             logger.error(err)
             pass
+
+    def close(self):
+        """ A BigQuery client is created for each request, nothing to close.
+        """
+        pass
@@ -22,6 +22,9 @@ from petaly.utils.utils import FormatDict
 
 
 class BQExtractor(DBExtractor):
+    # the tables are exported without an extract query
+    supports_source_name_column = False
+
     def __init__(self, pipeline):
         self.db_connector = BQConnector()
         self.gs_connector = GSConnector()
@@ -32,8 +35,8 @@ class BQExtractor(DBExtractor):
         self.cloud_region = self.pipeline.source_attr.get('gcp_region')
         #self.cloud_service_account = self.pipeline.source_attr.get('gcp_service_account')
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
 
     def get_query_result(self, meta_query):
         query_result = self.db_connector.get_metadata_result(meta_query)
@@ -54,8 +57,13 @@ class BQExtractor(DBExtractor):
         # cleanup object from GCS bucket
         self.gs_connector.delete_object_in_bucket(self.cloud_bucket_name, blob_prefix)
 
-        # extract data into GCS bucket
-        self.db_connector.extract_to(table_ref, destination_uri, self.cloud_region)
+        # extract data into GCS bucket, an incremental object exports the rows of its where_clause
+        extract_options = self.compose_extract_options(extractor_obj_conf)
+        where_clause = extractor_obj_conf.get('where_clause')
+        if where_clause:
+            self.db_connector.export_query(f"SELECT * FROM `{table_ref}` {where_clause}", destination_uri, self.cloud_region, extract_options)
+        else:
+            self.db_connector.extract_to(table_ref, destination_uri, self.cloud_region, extract_options)
         # download files from bucket into local folder
         downloaded_file_list = self.gs_connector.download_files_from_bucket(
                                                     bucket_name=self.cloud_bucket_name,
@@ -65,6 +73,16 @@ class BQExtractor(DBExtractor):
 
         logger.debug(f"Following file list were downloaded from bucket:\n{downloaded_file_list}")
 
+    def compose_extract_options(self, extractor_obj_conf) -> dict:
+        """ Returns the header and the delimiter of the exported files from the object_settings of the pipeline. """
+        object_settings = extractor_obj_conf.get('object_settings')
+
+        return {'header': object_settings.get('header') is True,
+                'delimiter': object_settings.get('columns_delimiter') or ','}
+
+    def compose_source_table_ref(self, extractor_obj_conf):
+        return f"`{self.cloud_project_id}.{extractor_obj_conf.get('source_schema_name')}.{extractor_obj_conf.get('source_object_name')}`"
+
     def compose_extract_to_stmt(self, extract_to_stmt, extractor_obj_conf) -> dict:
         """ Its save copy statement into file
         """
@@ -17,6 +17,7 @@ logger = logging.getLogger(__name__)
 
 from petaly.utils.file_handler import FileHandler
 from petaly.core.db_loader import DBLoader
+from petaly.core.data_object import DataObject
 from petaly.utils.utils import FormatDict
 from petaly.connectors.gcp.bigquery.bq_connector import BQConnector
 from petaly.connectors.gcp.gs.gs_connector import GSConnector
@@ -24,8 +25,8 @@ from petaly.connectors.gcp.gs.gs_connector import GSConnector
 
 class BQLoader(DBLoader):
     def __init__(self, pipeline):
-        self.db_connector = BQConnector()
-        self.gs_connector = GSConnector()
+        self.db_connector = BQConnector(pipeline.target_attr)
+        self.gs_connector = GSConnector(pipeline.target_attr)
         self.f_handler = FileHandler()
         super().__init__(pipeline)
         self.cloud_bucket_name = self.pipeline.target_attr.get('gcp_bucket_name')
@@ -50,16 +51,20 @@ class BQLoader(DBLoader):
         table_id = self.get_table_id(loader_obj_conf.get('table_ddl_dict'))
         output_data_object_dir = loader_obj_conf.get('output_data_object_dir')
 
-        if loader_obj_conf.get('recreate_destination_object') == True:
-            self.drop_table(loader_obj_conf)
-        self.create_table(loader_obj_conf)
+        self.prepare_destination_object(loader_obj_conf)
 
         self.f_handler.gzip_csv_files(output_data_object_dir, cleanup_file=True)
         file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.csv*')
         if self.load_from_bucket == True:
             blob_prefix = loader_obj_conf.get('blob_prefix')
-            self.gs_connector.delete_object_in_bucket(self.cloud_bucket_name, blob_prefix)
-            bucket_file_list = self.gs_connector.upload_files_to_bucket(self.cloud_bucket_name, blob_prefix, file_list)
+
+            # the files uploaded by the interrupted run are loaded without uploading them again
+            if self.pipeline.resume and self.pipeline.run_manifest.is_uploaded(object_name, self.pipeline.target_name):
+                bucket_file_list = [self.gs_connector.compose_full_blob_path(self.cloud_bucket_name, blob_prefix, file_local_fpath) for file_local_fpath in file_list]
+            else:
+                self.gs_connector.delete_object_in_bucket(self.cloud_bucket_name, blob_prefix)
+                bucket_file_list = self.gs_connector.upload_files_to_bucket(self.cloud_bucket_name, blob_prefix, file_list)
+                self.pipeline.run_manifest.set_phase(object_name, 'uploaded', target_name=self.pipeline.target_name)
 
             if len(bucket_file_list) > 0:
                 file_list = bucket_file_list
@@ -68,8 +73,8 @@ class BQLoader(DBLoader):
 
         bq_job_config_dict = loader_obj_conf.get('load_from_stmt')
 
-        for path_to_data_file in file_list:
-            self.db_connector.load_from(bq_job_config_dict, path_to_data_file, table_id, self.load_from_bucket, self.cloud_region)
+        self.load_batches(object_name, file_list,
+                          lambda path_to_data_file: self.db_connector.load_from(bq_job_config_dict, path_to_data_file, table_id, self.load_from_bucket, self.cloud_region))
 
 
     def compose_create_table_stmt(self, loader_obj_conf):
@@ -91,6 +96,13 @@ class BQLoader(DBLoader):
                 f"{table_ddl_dict.get('schema_name')}."
                 f"{table_ddl_dict.get('table_name')}")
 
+    def compose_primary_key_constraint(self, primary_key_columns):
+        """ BigQuery doesn't enforce primary keys, the MERGE matches the rows on it. """
+        return f"PRIMARY KEY ({', '.join(primary_key_columns)}) NOT ENFORCED"
+
+    def compose_change_op_column(self):
+        return f"{DataObject.change_op_column} STRING"
+
     def drop_table(self, loader_obj_conf: dict):
 
         table_id = self.get_table_id(loader_obj_conf.get('table_ddl_dict'))
@@ -0,0 +1,8 @@
+SELECT tb.table_name as source_object_name,
+       tb.last_modified_time as last_modified_time
+FROM (SELECT dataset_id as table_schema,
+             table_id as table_name,
+             last_modified_time
+        FROM {schema}.__TABLES__) as tb
+WHERE tb.table_schema in ('{schema}')
+{table_statement_list}
@@ -0,0 +1,10 @@
+SELECT tb.table_name as source_object_name,
+       tb.row_count as estimated_rows,
+       tb.size_bytes as estimated_bytes
+FROM (SELECT dataset_id as table_schema,
+             table_id as table_name,
+             row_count,
+             size_bytes
+        FROM {schema}.__TABLES__) as tb
+WHERE tb.table_schema in ('{schema}')
+{table_statement_list}
\ No newline at end of file
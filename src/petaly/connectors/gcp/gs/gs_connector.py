@@ -20,16 +20,20 @@ import time
 import logging
 from google.cloud import storage, exceptions
 from petaly.utils.file_handler import FileHandler
+from petaly.core.exceptions import ConnectorError
+from petaly.core.retry_policy import RetryPolicy
 
 
 class GSConnector():
 
-    def __init__(self):
+    def __init__(self, endpoint_attr=None):
+        """ The optional endpoint_attr sets the retries of a failed upload, see RetryPolicy.
+        """
         self.connector_id = 'gs'
         self.bucket_prefix = 'gs://'
         self.f_handler = FileHandler()
         self.bucket_path_delimiter = '/'
-        pass
+        self.retry_policy = RetryPolicy.from_attributes(endpoint_attr or {})
 
     def rename_blob(self, bucket_name, blob_file_name, new_blob_name = None):
         """ Function renamed blob by giving time sequence suffix in millisecond.
@@ -65,8 +69,8 @@ class GSConnector():
             bucket.delete_blobs(blobs_list)
             logger.debug(f"Folder deleted: {bucket_name}/{blob_prefix}")
         except exceptions.GoogleCloudError as err:
-            logger.error(err)
-            pass
+            # the files left by a previous extraction would be downloaded with the new ones
+            raise ConnectorError(f"The folder {self.bucket_prefix}{bucket_name}/{blob_prefix} can't be deleted: {err}") from err
 
     def delete_gs_blob(self, bucket_name, blob_name):
         """ Function drop a blob in specific bucket
@@ -118,7 +122,7 @@ class GSConnector():
             return downloaded_file_list
 
         except exceptions.GoogleCloudError as err:
-            logger.error(err)
+            raise ConnectorError(f"Download failed for: {self.bucket_prefix}{bucket_name}/{blob_prefix}: {err}") from err
 
     def get_bucket_file_list(self, bucket_name, blob_prefix):
         try:
@@ -132,9 +136,38 @@ class GSConnector():
 
             return object_list
 
-        except (Exception) as error:
-            logger.debug(bucket_name, blob_prefix)
-            logger.error(error)
+        except exceptions.GoogleCloudError as err:
+            raise ConnectorError(f"The files of {self.bucket_prefix}{bucket_name}/{blob_prefix} can't be listed: {err}") from err
+
+    def get_bucket_file_size(self, bucket_name, blob_prefix, file_names=None):
+        """ Returns the size in bytes of all files under the blob_prefix, or only of the given file_names.
+        """
+        storage_client = storage.Client()
+        bucket = storage_client.get_bucket(bucket_name)
+
+        file_size = 0
+        blobs = bucket.list_blobs(prefix=blob_prefix + self.bucket_path_delimiter, delimiter=self.bucket_path_delimiter)
+        for blob in blobs:
+            blob_fname = blob.name.split(self.bucket_path_delimiter)[-1]
+            if file_names is None or blob_fname in file_names:
+                file_size += blob.size or 0
+
+        return file_size
+
+    def get_bucket_file_generations(self, bucket_name, blob_prefix, file_names=None):
+        """ Returns the generation of all files under the blob_prefix, or only of the given file_names.
+        """
+        storage_client = storage.Client()
+        bucket = storage_client.get_bucket(bucket_name)
+
+        file_generations = {}
+        blobs = bucket.list_blobs(prefix=blob_prefix + self.bucket_path_delimiter, delimiter=self.bucket_path_delimiter)
+        for blob in blobs:
+            blob_fname = blob.name.split(self.bucket_path_delimiter)[-1]
+            if file_names is None or blob_fname in file_names:
+                file_generations.update({blob.name: blob.generation})
+
+        return file_generations
 
     def upload_blob(self, full_fpath, bucket_name, destination_blob_name):
         """Function uploads a file to the GS bucket.
@@ -142,14 +175,19 @@ class GSConnector():
         logger.debug(
             f"Load data from the local path {full_fpath} to the backet: {bucket_name} with destination path {destination_blob_name}; ")
 
-        try:
+        def upload():
             st_client = storage.Client()
             bucket = st_client.bucket(bucket_name)
             blob = bucket.blob(destination_blob_name)
             blob.upload_from_filename(full_fpath)
-        except exceptions.GoogleCloudError as err:
-            logger.error(err)
-            pass
+
+        try:
+            self.retry_policy.run(upload,
+                                  f"Upload of file {full_fpath} to {self.bucket_prefix}{bucket_name}/{destination_blob_name}",
+                                  retry_on=(exceptions.GoogleCloudError, ConnectionError))
+
+        except (exceptions.GoogleCloudError, ConnectionError) as err:
+            raise ConnectorError(f"Upload failed for: {self.bucket_prefix}{bucket_name}/{destination_blob_name}: {err}") from err
 
     def upload_files_to_bucket(self, bucket_name, blob_prefix, local_file_list):
         """ upload file to GS bucket
@@ -161,9 +199,15 @@ class GSConnector():
             blob_path = blob_prefix  + self.bucket_path_delimiter + os.path.basename(file_name)
             self.upload_blob(file_local_fpath, bucket_name, blob_path)
 
-            full_blob_path = self.bucket_prefix + bucket_name + self.bucket_path_delimiter + blob_path
+            full_blob_path = self.compose_full_blob_path(bucket_name, blob_prefix, file_local_fpath)
             bucket_file_list.append(full_blob_path)
 
             logger.debug(f"Upload file {file_local_fpath} to destination {full_blob_path}")
 
         return bucket_file_list
+
+    def compose_full_blob_path(self, bucket_name, blob_prefix, file_local_fpath):
+        """ Returns the full bucket path of a local file uploaded by upload_files_to_bucket.
+        """
+        blob_path = blob_prefix + self.bucket_path_delimiter + os.path.basename(file_local_fpath)
+        return self.bucket_prefix + bucket_name + self.bucket_path_delimiter + blob_path
@@ -31,8 +31,18 @@ class GSExtractor(FExtractor):
         self.file_format = 'csv'
         self.f_handler = FileHandler()
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
+
+    def get_source_size(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the size in bytes of the files in the bucket.
+        """
+        return self.gs_connector.get_bucket_file_size(self.cloud_bucket_name, blob_prefix, file_names)
+
+    def get_source_fingerprint(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the generation of each file in the bucket, which changes with each upload.
+        """
+        return self.gs_connector.get_bucket_file_generations(self.cloud_bucket_name, blob_prefix, file_names)
 
     def extract_to(self, extractor_obj_conf):
         """ Download export from bucket into local folder
@@ -22,10 +22,11 @@ from petaly.connectors.gcp.gs.gs_connector import GSConnector
 
 class GSLoader(FLoader):
     def __init__(self, pipeline):
-        self.gs_connector = GSConnector()
+        self.gs_connector = GSConnector(pipeline.target_attr)
         self.f_handler = FileHandler()
 
         super().__init__(pipeline)
+        self.file_to_gzip = True
         self.cloud_bucket_name = self.pipeline.target_attr.get('gcp_bucket_name')
         self.cloud_bucket_path = self.gs_connector.bucket_prefix + self.cloud_bucket_name + '/'
         self.load_from_bucket = False if self.cloud_bucket_name is None else True
@@ -33,7 +34,7 @@ class GSLoader(FLoader):
         self.cloud_project_id = self.pipeline.target_attr.get('gcp_project_id')
 
     def load_data(self):
-        super().load_data(file_to_gzip=True)
+        super().load_data()
 
     def load_from(self, loader_obj_conf):
         """ Load files to bucket
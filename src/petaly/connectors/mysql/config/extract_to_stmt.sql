@@ -1,2 +1,2 @@
 SELECT {column_list}
-FROM {table_name};
+FROM {table_name} {where_clause};
@@ -0,0 +1,83 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import zlib
+
+from pymysqlreplication import BinLogStreamReader
+from pymysqlreplication.row_event import WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent
+
+from petaly.connectors.mysql.mysql_connector import MysqlConnector
+from petaly.core.exceptions import ConnectorError
+
+
+class MysqlBinlogReader():
+    """ MysqlBinlogReader reads the row events of the binary log with the optional package mysql-replication, used by the objects with load_mode: cdc.
+    It connects as a replica with its own server id, the server requires log_bin and binlog_format=ROW.
+    The position in the binary log is file:position, e.g. binlog.000042:1337.
+    """
+
+    def __init__(self, endpoint_attr, pipeline_name):
+        self.endpoint_attr = endpoint_attr
+        self.server_id = self.get_server_id(endpoint_attr, pipeline_name)
+
+    @classmethod
+    def get_server_id(cls, endpoint_attr, pipeline_name):
+        """ Returns replication_server_id of the source, or a server id derived from the pipeline name. It has to differ from the ids of the other replicas. """
+        if endpoint_attr.get('replication_server_id') is not None:
+            return int(endpoint_attr.get('replication_server_id'))
+
+        return 1000000000 + zlib.crc32(pipeline_name.encode('utf-8')) % 1000000000
+
+    def read_changes(self, start_position, end_position, schema_name, table_names):
+        """ Yields the row changes of the tables between start_position and end_position.
+        The events of a transaction are written to the binary log at its commit, so the position of each change follows the order of the commits.
+        """
+        log_file, log_pos = str(start_position).rsplit(':', 1)
+        end_key = MysqlConnector.parse_binlog_position(end_position)
+
+        stream = BinLogStreamReader(connection_settings={'host': self.endpoint_attr.get('database_host'),
+                                                         'port': int(self.endpoint_attr.get('database_port') or 3306),
+                                                         'user': self.endpoint_attr.get('database_user'),
+                                                         'passwd': self.endpoint_attr.get('database_password')},
+                                    server_id=self.server_id,
+                                    log_file=log_file,
+                                    log_pos=int(log_pos),
+                                    resume_stream=True,
+                                    blocking=False,
+                                    only_events=[WriteRowsEvent, UpdateRowsEvent, DeleteRowsEvent],
+                                    only_schemas=[schema_name],
+                                    only_tables=table_names)
+
+        try:
+            for event in stream:
+                position = f"{stream.log_file}:{stream.log_pos}"
+                if MysqlConnector.parse_binlog_position(position) > end_key:
+                    break
+
+                for row in event.rows:
+                    if isinstance(event, WriteRowsEvent):
+                        yield {'table': event.table, 'op': 'I', 'position': position, 'row': row.get('values'), 'old_row': {}}
+                    elif isinstance(event, UpdateRowsEvent):
+                        yield {'table': event.table, 'op': 'U', 'position': position, 'row': row.get('after_values'), 'old_row': row.get('before_values')}
+                    elif isinstance(event, DeleteRowsEvent):
+                        yield {'table': event.table, 'op': 'D', 'position': position, 'row': {}, 'old_row': row.get('values')}
+
+        except Exception as error:
+            raise ConnectorError(f"The binary log can't be read from position {start_position}, it may be purged already. "
+                                 f"Remove the stored positions of the objects with load_mode: cdc to extract them in full again: {error}") from error
+        finally:
+            stream.close()
@@ -16,11 +16,14 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 import csv
 import mysql.connector
 
-from petaly.utils.utils import measure_time
+from petaly.utils.utils import measure_time, compose_batch_fpath
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import ConnectorError
+from petaly.core.rate_limiter import RateLimiter
+from petaly.core.retry_policy import RetryPolicy
 
 
 class MysqlConnector():
@@ -30,7 +33,10 @@ class MysqlConnector():
         self.connector_id = "mysql"
         self.metaquery_quote = ""
 
-        self.conn = self.get_connection(endpoint_attr)
+        self.endpoint_attr = endpoint_attr
+        self.retry_policy = RetryPolicy.from_attributes(endpoint_attr)
+        self.rate_limiter = RateLimiter.get_limiter(endpoint_attr)
+        self.conn = ConnectionPool.acquire(endpoint_attr, lambda: self.get_connection(endpoint_attr), lambda conn: conn.is_connected())
         self.database = endpoint_attr.get('database_name')
 
 
@@ -56,8 +62,7 @@ class MysqlConnector():
             return conn
 
         except (mysql.connector.Error, IOError) as error:
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
     def get_cursor(self):
         return self.conn.cursor(dictionary=True, buffered=False)
@@ -75,8 +80,28 @@ class MysqlConnector():
                 return rows
 
         except (mysql.connector.Error, IOError) as error:
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
+
+    def get_binlog_position(self):
+        """ Returns the current position of the binary log as file:position. MySQL 8.4 replaced SHOW MASTER STATUS by SHOW BINARY LOG STATUS.
+        """
+        for status_stmt in ("SHOW BINARY LOG STATUS", "SHOW MASTER STATUS"):
+            try:
+                status_result = self.get_query_result(status_stmt)
+            except ConnectorError as error:
+                logger.debug(f"{status_stmt} failed: {error}")
+                continue
+
+            if status_result:
+                return f"{status_result[0].get('File')}:{status_result[0].get('Position')}"
+
+        raise ConnectorError("The position of the binary log can't be read. The load_mode: cdc requires log_bin, binlog_format=ROW and the privilege REPLICATION CLIENT.")
+
+    @classmethod
+    def parse_binlog_position(cls, position):
+        """ Returns the position file:position as (file number, position), which can be compared. """
+        log_file, log_pos = str(position).rsplit(':', 1)
+        return int(log_file.rsplit('.', 1)[-1]), int(log_pos)
 
     def extract_to(self, extract_to_stmt, data_fpath, extract_options):
 
@@ -99,40 +124,74 @@ class MysqlConnector():
 
 
     def extract_to_fetchone(self, extract_to_stmt, data_fpath, extract_options):
-        """  """
+        """ If max_rows_per_second or max_mb_per_second is specified, the rows and bytes written are passed to the rate limiter in batches.
+        With load_batch_size, the rows are split into files of load_batch_size rows, see compose_batch_fpath.
+        """
         try:
             cur = self.get_cursor()
             cur.execute(extract_to_stmt)
-            with (open(data_fpath, 'w') as file):
 
-                row = cur.fetchone()
+            row = cur.fetchone()
+            fieldnames = list(row) if row is not None else None
 
-                csvwriter = csv.DictWriter(file,
-                                           fieldnames=row,
-                                           delimiter=extract_options.get("delimiter"),
-                                           quotechar=extract_options.get("quotechar"),
-                                           escapechar=extract_options.get("escapechar"),
-                                           quoting=extract_options.get("quoting"),
-                                           lineterminator=extract_options.get("lineterminator"),
-                                          )
+            load_batch_size = extract_options.get("load_batch_size")
+            batch_number = 1
+            batch_fpath = compose_batch_fpath(data_fpath, batch_number) if load_batch_size is not None else data_fpath
+            file, csvwriter = self.open_extract_file(batch_fpath, fieldnames, extract_options)
 
-                if row is not None and extract_options.get("header"):
-                    csvwriter.writeheader()
+            batch_rows = self.rate_limiter.get_batch_rows() if self.rate_limiter is not None else None
+            pending_rows, batch_row_count, closed_bytes = 0, 0, 0
+            consumed_bytes = file.tell()
 
+            try:
                 while row is not None:
 
+                    if load_batch_size is not None and batch_row_count >= load_batch_size:
+                        closed_bytes += file.tell()
+                        file.close()
+                        batch_number += 1
+                        file, csvwriter = self.open_extract_file(compose_batch_fpath(data_fpath, batch_number), fieldnames, extract_options)
+                        closed_bytes -= file.tell()
+                        batch_row_count = 0
+
                     if extract_options.get("cleanup_linebreak_in_fields"):
                         self.cleanup_linebreak_in_fields(row)
                     csvwriter.writerow(row)
+                    batch_row_count += 1
                     row = cur.fetchone()
 
+                    if batch_rows is not None:
+                        pending_rows += 1
+                        if pending_rows >= batch_rows or row is None:
+                            written_bytes = closed_bytes + file.tell()
+                            self.rate_limiter.consume(rows=pending_rows, nbytes=written_bytes - consumed_bytes)
+                            pending_rows, consumed_bytes = 0, written_bytes
+            finally:
                 file.close()
 
             cur.close()
 
         except (mysql.connector.Error, IOError) as error:
+            # a partial extraction must not be recorded as extracted, the object fails or is retried, see RetryPolicy
             logger.debug(extract_to_stmt)
-            logger.error(error)
+            raise ConnectorError(str(error)) from error
+
+    def open_extract_file(self, data_fpath, fieldnames, extract_options):
+        """ Open a file of the extraction and write the header, if the result has rows and the header is enabled. """
+        file = open(data_fpath, 'w')
+        csvwriter = csv.DictWriter(file,
+                                   fieldnames=fieldnames,
+                                   delimiter=extract_options.get("delimiter"),
+                                   quotechar=extract_options.get("quotechar"),
+                                   escapechar=extract_options.get("escapechar"),
+                                   quoting=extract_options.get("quoting"),
+                                   lineterminator=extract_options.get("lineterminator"),
+                                  )
+
+        if fieldnames is not None and extract_options.get("header"):
+            csvwriter.writeheader()
+
+        return file, csvwriter
 
     def describe_table(self, table_name):
         show_table_query = f"DESCRIBE {table_name}"
@@ -173,7 +232,7 @@ class MysqlConnector():
 
         except (mysql.connector.Error, IOError) as error:
             logger.debug(extract_to_stmt)
-            logger.error(error)
+            raise ConnectorError(str(error)) from error
 
     @measure_time
     def extract_to_fetchall(self, extract_to_stmt, data_fpath, extract_options):
@@ -204,18 +263,49 @@ class MysqlConnector():
 
         except (mysql.connector.Error, IOError) as error:
             logger.debug(extract_to_stmt)
-            logger.error(error)
+            raise ConnectorError(str(error)) from error
 
     def load_from(self, load_from_stmt):
-        """  """
+        """ Load a single file with LOAD DATA. If the connection drops, only the load of this file is repeated, see RetryPolicy.
+        """
+        try:
+            self.retry_policy.run(lambda: self.execute_load_stmt(load_from_stmt),
+                                  "LOAD DATA of a file",
+                                  retry_on=(mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError),
+                                  on_retry=self.reconnect)
+
+        except (mysql.connector.Error, IOError) as error:
+            logger.debug(load_from_stmt)
+            raise ConnectorError(str(error)) from error
+
+    def execute_load_stmt(self, load_from_stmt):
         try:
             cur = self.get_cursor()
             cur.execute(f"USE {self.database};")
             cur.execute(load_from_stmt)
             self.conn.commit()
+        except (mysql.connector.Error, IOError):
+            # the file is committed as a whole, a failed load leaves nothing behind
+            if self.conn.is_connected():
+                self.conn.rollback()
+            raise
+
+    def merge_from(self, merge_stmt):
+        """ Merge the staging table into the destination table, the merge is committed as a whole.
+        """
+        try:
+            self.execute_load_stmt(merge_stmt)
         except (mysql.connector.Error, IOError) as error:
-            logger.debug(load_from_stmt)
-            logger.error(error)
+            logger.debug(merge_stmt)
+            raise ConnectorError(f"Merge failed: {error}") from error
+
+    def reconnect(self):
+        """ Replace a dropped connection, or roll back the failed transaction of a connection, which is still alive.
+        """
+        if self.conn.is_connected():
+            self.conn.rollback()
+        else:
+            self.conn.reconnect()
 
     def drop_table(self, table_name):
         try:
@@ -242,5 +332,14 @@ class MysqlConnector():
             logger.debug(sql_stmt)
             logger.error(error)
 
+    def close(self):
+        """ Close the database connection, or return it to the ConnectionPool in serve mode.
+        """
+        ConnectionPool.release(self.endpoint_attr, self.conn, self.close_connection, reset=lambda conn: conn.rollback())
+
+    def close_connection(self, conn):
+        if conn.is_connected():
+            conn.close()
+
 if __name__ == "__main__":
       pass
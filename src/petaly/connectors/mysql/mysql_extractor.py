@@ -16,9 +16,11 @@ import logging
 logger = logging.getLogger(__name__)
 
 import csv
+import json
 
 from petaly.connectors.mysql.mysql_connector import MysqlConnector
 from petaly.core.db_extractor import DBExtractor
+from petaly.core.exceptions import ConfigError
 from petaly.utils.utils import FormatDict
 
 
@@ -27,12 +29,74 @@ class MysqlExtractor(DBExtractor):
         self.db_connector = MysqlConnector(pipeline.source_attr)
         super().__init__(pipeline)
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
 
     def get_query_result(self, meta_query):
         return self.db_connector.get_query_result(meta_query)
 
+    def get_object_fingerprint_dict(self):
+        """ InnoDB doesn't always keep update_time, e.g. after a restart. For such tables CHECKSUM TABLE is used, which reads the whole table.
+        """
+        object_fingerprint_dict = super().get_object_fingerprint_dict()
+        schema_name = self.pipeline.source_attr.get('database_schema') or self.pipeline.source_attr.get('database_name')
+
+        for object_name, signals in object_fingerprint_dict.items():
+            if signals.get('update_time') is not None:
+                continue
+
+            try:
+                checksum_result = self.get_query_result(f"CHECKSUM TABLE `{schema_name}`.`{object_name}`")
+                object_fingerprint_dict.update({object_name: {'create_time': signals.get('create_time'), 'checksum': checksum_result[0].get('Checksum')}})
+            except Exception as err:
+                logger.debug(f"The checksum of object {object_name} is not available, it's extracted: {err}")
+
+        return object_fingerprint_dict
+
+    def get_change_position(self):
+        return self.db_connector.get_binlog_position()
+
+    def read_changes(self, start_position, end_position, table_names):
+        """ The binary log is read with the optional package mysql-replication, which is imported only by the objects with load_mode: cdc. """
+        try:
+            from petaly.connectors.mysql.mysql_binlog_reader import MysqlBinlogReader
+        except ImportError as error:
+            raise ConfigError("The load_mode: cdc of a MySQL source requires the package mysql-replication. Install it with: pip install petaly[mysql_cdc]") from error
+
+        binlog_reader = MysqlBinlogReader(self.pipeline.source_attr, self.pipeline.pipeline_name)
+        return binlog_reader.read_changes(start_position, end_position, self.pipeline.source_attr.get('database_name'), table_names)
+
+    def parse_change_position(self, position):
+        return MysqlConnector.parse_binlog_position(position)
+
+    def write_change_file(self, data_fpath, header, rows, extractor_obj_conf):
+        """ Write the captured changes in the CSV format of the extraction. """
+        extract_options = self.compose_extract_options(extractor_obj_conf)
+
+        with open(data_fpath, 'w') as file:
+            csvwriter = csv.writer(file,
+                                   delimiter=extract_options.get("delimiter"),
+                                   quotechar=extract_options.get("quotechar"),
+                                   escapechar=extract_options.get("escapechar"),
+                                   quoting=extract_options.get("quoting"),
+                                   lineterminator=extract_options.get("lineterminator"))
+            if header is not None:
+                csvwriter.writerow(header)
+
+            for row in rows:
+                csvwriter.writerow([self.format_change_value(value) for value in row])
+
+    def format_change_value(self, value):
+        """ The binary log returns SET columns as set, JSON columns as dict or list and binary columns as bytes. """
+        if isinstance(value, set):
+            return ','.join(sorted(value))
+        if isinstance(value, (dict, list)):
+            return json.dumps(value)
+        if isinstance(value, bytes):
+            return value.decode('utf-8', errors='replace')
+
+        return value
+
     def compose_extract_options(self, extractor_obj_conf) -> dict:
         """
         """
@@ -60,6 +124,8 @@ class MysqlExtractor(DBExtractor):
         cleanup_linebreak_in_fields = object_settings.get("cleanup_linebreak_in_fields")
         extract_options.update({"cleanup_linebreak_in_fields": cleanup_linebreak_in_fields})
 
+        extract_options.update({"load_batch_size": extractor_obj_conf.get('load_batch_size')})
+
         return extract_options
 
     def extract_to(self, extractor_obj_conf):
@@ -81,6 +147,6 @@ class MysqlExtractor(DBExtractor):
         table_name = extractor_obj_conf.get("source_object_name")
 
         extract_to_stmt = extract_to_stmt.format_map(
-        					FormatDict(column_list=column_list, schema_name=schema_name, table_name=table_name, null_as=''))
+        					FormatDict(column_list=column_list, schema_name=schema_name, table_name=table_name, where_clause=extractor_obj_conf.get('where_clause'), null_as=''))
 
         return extract_to_stmt
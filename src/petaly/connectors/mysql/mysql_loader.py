@@ -17,6 +17,7 @@ logger = logging.getLogger(__name__)
 
 from petaly.connectors.mysql.mysql_connector import MysqlConnector
 from petaly.core.db_loader import DBLoader
+from petaly.core.data_object import DataObject
 from petaly.utils.utils import FormatDict
 
 
@@ -45,19 +46,18 @@ class MysqlLoader(DBLoader):
         file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.csv')
 
         # 2. drop and recreate table
-        if loader_obj_conf.get('recreate_destination_object') == True:
-            self.drop_table(loader_obj_conf)
-
-        self.create_table(loader_obj_conf)
+        self.prepare_destination_object(loader_obj_conf)
 
         #logger.debug(f"Load data to table: {object_name}")
 
-        for path_to_data_file in file_list:
+        def load_file(path_to_data_file):
 
             load_from_stmt_formated = load_from_stmt.format_map(FormatDict(path_to_data_file=path_to_data_file))
             logger.debug(f"Statement to execute:\n{load_from_stmt_formated}")
             self.db_connector.load_from(load_from_stmt_formated)
 
+        self.load_batches(object_name, file_list, load_file)
+
     def compose_create_table_stmt(self, object_load_conf):
 
         table_ddl_dict = object_load_conf.get('table_ddl_dict')
@@ -115,6 +115,23 @@ class MysqlLoader(DBLoader):
         self.f_handler.save_file(load_from_file_fpath, load_from_stmt)
         return load_from_stmt
 
+    def get_schema_table_name(self, table_ddl_dict):
+        return table_ddl_dict.get('table_name')
+
+    def compose_merge_stmt(self, destination_table, staging_table, column_names, primary_key_columns):
+        """ Upsert the staged rows with INSERT ... ON DUPLICATE KEY UPDATE on the primary key of the destination table. """
+        update_columns = self.get_merge_update_columns(column_names, primary_key_columns)
+
+        return (f"INSERT INTO {destination_table} ({', '.join(column_names)})\n"
+                f"SELECT {', '.join(column_names)} FROM {staging_table} AS s\n"
+                f"ON DUPLICATE KEY UPDATE {', '.join(f'{column} = s.{column}' for column in update_columns)};")
+
+    def compose_delete_stmt(self, destination_table, staging_table, primary_key_columns):
+        """ Delete the rows whose primary key is staged with petaly_op D, with the multiple-table syntax of MySQL. """
+        return (f"DELETE t FROM {destination_table} AS t\n"
+                f"JOIN {staging_table} AS s ON {' AND '.join(f't.{column} = s.{column}' for column in primary_key_columns)}\n"
+                f"WHERE s.{DataObject.change_op_column} = 'D';")
+
     def drop_table(self, loader_obj_conf: dict):
 
         table_ddl_dict = loader_obj_conf.get('table_ddl_dict')
@@ -0,0 +1,7 @@
+SELECT tb.table_name as source_object_name,
+       tb.create_time as create_time,
+       tb.update_time as update_time
+    FROM information_schema.tables tb
+    WHERE tb.table_type = 'BASE TABLE'
+        AND tb.table_schema in ('{schema}')
+        {table_statement_list}
\ No newline at end of file
@@ -0,0 +1,7 @@
+SELECT tb.table_name as source_object_name,
+       tb.table_rows as estimated_rows,
+       tb.data_length as estimated_bytes
+    FROM information_schema.tables tb
+    WHERE tb.table_type IN ('BASE TABLE', 'VIEW')
+        AND tb.table_schema in ('{schema}')
+        {table_statement_list}
\ No newline at end of file
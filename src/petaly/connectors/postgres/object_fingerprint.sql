@@ -0,0 +1,15 @@
+SELECT tb.table_name as source_object_name,
+       tb.n_tup_ins as n_tup_ins,
+       tb.n_tup_upd as n_tup_upd,
+       tb.n_tup_del as n_tup_del,
+       tb.relfilenode as relfilenode
+FROM (SELECT st.schemaname as table_schema,
+             st.relname as table_name,
+             st.n_tup_ins,
+             st.n_tup_upd,
+             st.n_tup_del,
+             c.relfilenode
+        FROM pg_stat_user_tables st
+        INNER JOIN pg_class c ON (c.oid = st.relid)) tb
+WHERE tb.table_schema in ('{schema}')
+{table_statement_list}
@@ -0,0 +1,9 @@
+SELECT tb.table_name as source_object_name,
+       GREATEST(c.reltuples, 0)::bigint as estimated_rows,
+       c.relpages::bigint * current_setting('block_size')::bigint as estimated_bytes
+FROM information_schema.tables tb
+INNER JOIN pg_namespace n ON (n.nspname = tb.table_schema)
+INNER JOIN pg_class c ON (c.relnamespace = n.oid AND c.relname = tb.table_name)
+WHERE tb.table_type in ('BASE TABLE', 'VIEW')
+    AND tb.table_schema in ('{schema}')
+{table_statement_list}
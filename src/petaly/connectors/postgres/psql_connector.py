@@ -16,8 +16,14 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os, sys
+import json
 import psycopg
 from psycopg.rows import dict_row
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import ConnectorError
+from petaly.core.rate_limiter import RateLimiter
+from petaly.core.retry_policy import RetryPolicy
+from petaly.utils.utils import compose_batch_fpath
 
 
 class PsqlConnector():
@@ -27,7 +33,10 @@ class PsqlConnector():
         """
         self.connector_id = 'postgres'
         self.metaquery_quote = '"'
-        self.conn = self.get_connection(endpoint_attr)
+        self.endpoint_attr = endpoint_attr
+        self.retry_policy = RetryPolicy.from_attributes(endpoint_attr)
+        self.rate_limiter = RateLimiter.get_limiter(endpoint_attr)
+        self.conn = ConnectionPool.acquire(endpoint_attr, lambda: self.get_connection(endpoint_attr), self.is_connection_alive)
 
     def get_connection_dsn(selfg):
         """
@@ -45,8 +54,7 @@ class PsqlConnector():
             conn = psycopg.connect(connection_string, row_factory=dict_row)
 
         except (Exception, psycopg.DatabaseError) as error:
-            logger.error(error)
-            sys.exit()
+            raise ConnectorError(str(error)) from error
 
         return conn
 
@@ -77,21 +85,169 @@ class PsqlConnector():
 
         except (Exception, psycopg.DatabaseError) as error:
             logger.debug(sql)
-            logger.error(error)
-            sys.exit()
+            # leave the connection usable for the next statements
+            self.conn.rollback()
+            raise ConnectorError(str(error)) from error
 
-    def extract_to(self, extract_to_stmt, data_fpath):
+    def extract_to(self, extract_to_stmt, data_fpath, load_batch_size=None, header=False):
+        """ COPY yields the data row by row. If max_rows_per_second or max_mb_per_second is specified,
+        the rows and bytes are passed to the rate limiter in batches.
+        With load_batch_size, the rows are split into files of load_batch_size rows and the header is repeated in each file.
         """
-        """
-        with open(data_fpath, "wb") as f:
+        batch_rows = self.rate_limiter.get_batch_rows() if self.rate_limiter is not None else None
+        pending_rows, pending_bytes = 0, 0
+        batch_number, batch_row_count, header_data = 1, 0, None
+
+        f = open(compose_batch_fpath(data_fpath, batch_number) if load_batch_size is not None else data_fpath, "wb")
+        try:
             with self.conn.cursor() as cur:
                 with cur.copy(extract_to_stmt) as copy:
                     for data in copy:
+                        if header and header_data is None:
+                            # the first row of COPY with HEADER true is the header
+                            header_data = bytes(data)
+                            f.write(data)
+                            continue
+
+                        if load_batch_size is not None and batch_row_count >= load_batch_size:
+                            f.close()
+                            batch_number += 1
+                            f = open(compose_batch_fpath(data_fpath, batch_number), "wb")
+                            if header_data is not None:
+                                f.write(header_data)
+                            batch_row_count = 0
+
                         f.write(data)
+                        batch_row_count += 1
 
-    def load_from(self, load_from_stmt, data_fpath):
+                        if batch_rows is not None:
+                            pending_rows += 1
+                            pending_bytes += len(data)
+                            if pending_rows >= batch_rows:
+                                self.rate_limiter.consume(rows=pending_rows, nbytes=pending_bytes)
+                                pending_rows, pending_bytes = 0, 0
+        except psycopg.Error as error:
+            logger.debug(extract_to_stmt)
+            if not self.conn.broken:
+                self.conn.rollback()
+            raise ConnectorError(str(error)) from error
+        finally:
+            f.close()
+
+        if pending_rows > 0:
+            self.rate_limiter.consume(rows=pending_rows, nbytes=pending_bytes)
+
+    def get_change_position(self, slot_name):
+        """ Returns the current WAL position. The logical replication slot with the output plugin wal2json is created first, if it doesn't exist,
+        so the slot keeps the changes after this position for the next run.
+        """
+        try:
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT slot_name FROM pg_replication_slots WHERE slot_name = %s", (slot_name,))
+                slot_exists = cur.fetchone() is not None
+            self.conn.commit()
+
+            if not slot_exists:
+                self.conn.execute("SELECT pg_create_logical_replication_slot(%s, 'wal2json')", (slot_name,))
+                self.conn.commit()
+                logger.info(f"Replication slot {slot_name} created with the output plugin wal2json")
+
+            with self.conn.cursor() as cur:
+                cur.execute("SELECT pg_current_wal_lsn()::text AS lsn")
+                lsn = cur.fetchone().get('lsn')
+            self.conn.commit()
+            return lsn
+
+        except (Exception, psycopg.DatabaseError) as error:
+            if not self.conn.broken:
+                self.conn.rollback()
+            raise ConnectorError(f"The position of replication slot {slot_name} can't be read: {error}") from error
+
+    def read_changes(self, slot_name, start_lsn, end_lsn, schema_name, table_names):
+        """ Yields the row changes of the tables from the replication slot, which are committed before end_lsn, decoded by wal2json.
+        The slot is moved to start_lsn first, so the server can release the older WAL. The changes are peeked and not consumed,
+        so a failed run reads them again. The position of each change is the LSN of its commit.
         """
+        try:
+            self.advance_replication_slot(slot_name, start_lsn)
+
+            add_tables = ','.join(f"{self.escape_wal2json_name(schema_name)}.{self.escape_wal2json_name(table_name)}" for table_name in table_names)
+            transaction_changes = []
+
+            # a server-side cursor streams the changes instead of fetching all at once
+            with self.conn.cursor(name=f"{slot_name}_changes") as cur:
+                cur.execute("SELECT lsn::text AS lsn, data FROM pg_logical_slot_peek_changes(%s, %s::pg_lsn, NULL, "
+                            "'format-version', '2', 'include-transaction', 'true', 'add-tables', %s)",
+                            (slot_name, end_lsn, add_tables))
+
+                for record in cur:
+                    # numeric values are kept as text to keep their precision
+                    change = json.loads(record.get('data'), parse_float=str)
+                    action = change.get('action')
+
+                    if action == 'B':
+                        transaction_changes = []
+
+                    elif action == 'C':
+                        for transaction_change in transaction_changes:
+                            transaction_change.update({'position': record.get('lsn')})
+                            yield transaction_change
+                        transaction_changes = []
+
+                    elif action in ('I', 'U', 'D'):
+                        transaction_changes.append({'table': change.get('table'),
+                                                    'op': action,
+                                                    'row': {column.get('name'): column.get('value') for column in change.get('columns', [])},
+                                                    'old_row': {column.get('name'): column.get('value') for column in change.get('identity', [])}})
+
+                    elif action == 'T':
+                        logger.warning(f"The table {change.get('schema')}.{change.get('table')} was truncated. A truncate isn't applied to the destination, reload the object in full.")
+
+            self.conn.commit()
+
+        except (Exception, psycopg.DatabaseError) as error:
+            if not self.conn.broken:
+                self.conn.rollback()
+            raise ConnectorError(f"The changes of replication slot {slot_name} can't be read: {error}") from error
+
+    def advance_replication_slot(self, slot_name, lsn):
+        """ Move the replication slot forward to the LSN, the slot can't be moved backwards. """
+        with self.conn.cursor() as cur:
+            cur.execute("SELECT confirmed_flush_lsn::text AS lsn FROM pg_replication_slots WHERE slot_name = %s", (slot_name,))
+            slot = cur.fetchone()
+            if slot is None:
+                raise ConnectorError(f"The replication slot {slot_name} doesn't exist. Remove the stored positions of the objects with load_mode: cdc to extract them in full again.")
+
+            if slot.get('lsn') is not None and self.parse_lsn(lsn) > self.parse_lsn(slot.get('lsn')):
+                cur.execute("SELECT pg_replication_slot_advance(%s, %s::pg_lsn)", (slot_name, lsn))
+                logger.debug(f"Replication slot {slot_name} moved to {lsn}")
+        self.conn.commit()
+
+    @classmethod
+    def parse_lsn(cls, lsn):
+        """ Returns the WAL position X/Y as a number, which can be compared. """
+        high, low = str(lsn).split('/')
+        return (int(high, 16) << 32) + int(low, 16)
+
+    @classmethod
+    def escape_wal2json_name(cls, name):
+        """ The names in the add-tables option of wal2json escape the characters , . and * """
+        return ''.join('\\' + char if char in ',.*' else char for char in name)
+
+    def load_from(self, load_from_stmt, data_fpath):
+        """ Load a single file with COPY. If the connection drops, only the COPY of this file is repeated, see RetryPolicy.
         """
+        try:
+            self.retry_policy.run(lambda: self.copy_from_file(load_from_stmt, data_fpath),
+                                  f"COPY of file {data_fpath}",
+                                  retry_on=(psycopg.OperationalError,),
+                                  on_retry=self.reconnect)
+
+        except (Exception, psycopg.DatabaseError) as error:
+            logger.debug(load_from_stmt)
+            raise ConnectorError(f"COPY of file {data_fpath} failed: {error}") from error
+
+    def copy_from_file(self, load_from_stmt, data_fpath):
         BLOCK_SIZE = 8192
 
         with open(data_fpath, "r") as f:
@@ -101,8 +257,32 @@ class PsqlConnector():
                         while data := f.read(BLOCK_SIZE):
                             copy.write(data)
                     self.conn.commit()
-            except (Exception, psycopg.DatabaseError) as error:
-                logger.error(error)
+            except (Exception, psycopg.DatabaseError):
+                # the file is committed as a whole, a failed COPY leaves nothing behind
+                if not self.conn.broken:
+                    self.conn.rollback()
+                raise
+
+    def merge_from(self, merge_stmt):
+        """ Merge the staging table into the destination table, the merge is committed as a whole.
+        """
+        try:
+            self.conn.execute(merge_stmt)
+            self.conn.commit()
+        except (Exception, psycopg.DatabaseError) as error:
+            logger.debug(merge_stmt)
+            if not self.conn.broken:
+                self.conn.rollback()
+            raise ConnectorError(f"Merge failed: {error}") from error
+
+    def reconnect(self):
+        """ Replace a dropped connection, or roll back the failed transaction of a connection, which is still alive.
+        """
+        if self.conn.closed or self.conn.broken:
+            self.close_connection(self.conn)
+            self.conn = self.get_connection(self.endpoint_attr)
+        else:
+            self.conn.rollback()
 
     def drop_table(self, schema_table_name):
         try:
@@ -122,4 +302,22 @@ class PsqlConnector():
 
         except (Exception, psycopg.DatabaseError) as error:
             logger.debug(sql)
-            logger.error(error)
\ No newline at end of file
+            logger.error(error)
+
+    def is_connection_alive(self, conn):
+        """ Check an idle connection of the serve mode before it's reused.
+        """
+        if conn.closed or conn.broken:
+            return False
+        conn.execute("SELECT 1")
+        conn.rollback()
+        return True
+
+    def close(self):
+        """ Close the database connection, or return it to the ConnectionPool in serve mode.
+        """
+        ConnectionPool.release(self.endpoint_attr, self.conn, self.close_connection, reset=lambda conn: conn.rollback())
+
+    def close_connection(self, conn):
+        if not conn.closed:
+            conn.close()
\ No newline at end of file
@@ -15,6 +15,8 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import re
+
 from petaly.connectors.postgres.psql_connector import PsqlConnector
 from petaly.core.db_extractor import DBExtractor
 from petaly.utils.utils import FormatDict
@@ -25,8 +27,8 @@ class PsqlExtractor(DBExtractor):
         self.db_connector = PsqlConnector(pipeline.source_attr)
         super().__init__(pipeline)
 
-    def extract_data(self):
-        super().extract_data()
+    def extract_data(self, on_object_extracted=None):
+        super().extract_data(on_object_extracted)
 
     def get_query_result(self, meta_query):
         return self.db_connector.get_query_result(meta_query)
@@ -37,7 +39,45 @@ class PsqlExtractor(DBExtractor):
         logger.debug(f"Output file: {output_object_fpath}")
         logger.debug(f"Statement to execute:\n{extract_to_stmt}")
 
-        self.db_connector.extract_to(extract_to_stmt, output_object_fpath)
+        self.db_connector.extract_to(extract_to_stmt, output_object_fpath,
+                                     load_batch_size=extractor_obj_conf.get('load_batch_size'),
+                                     header=extractor_obj_conf.get('object_settings').get('header') is True)
+
+    def get_replication_slot_name(self):
+        """ Returns replication_slot_name of the source, or petaly_ with the pipeline name. Slot names contain lower case letters, numbers and underscores. """
+        slot_name = self.pipeline.source_attr.get('replication_slot_name') or f"petaly_{self.pipeline.pipeline_name}"
+        return re.sub('[^a-z0-9_]', '_', slot_name.lower())[:63]
+
+    def get_change_position(self):
+        return self.db_connector.get_change_position(self.get_replication_slot_name())
+
+    def read_changes(self, start_position, end_position, table_names):
+        source_schema = self.pipeline.source_attr.get('database_schema')
+        return self.db_connector.read_changes(self.get_replication_slot_name(), start_position, end_position, source_schema, table_names)
+
+    def parse_change_position(self, position):
+        return PsqlConnector.parse_lsn(position)
+
+    def write_change_file(self, data_fpath, header, rows, extractor_obj_conf):
+        """ Write the captured changes in the CSV format of COPY, NULL isn't quoted and booleans are written as t and f. """
+        object_settings = extractor_obj_conf.get('object_settings')
+        delimiter = object_settings.get('columns_delimiter')
+        quotechar = "'" if object_settings.get('columns_quote') == 'single' else '"'
+
+        with open(data_fpath, 'w', encoding='utf-8') as f:
+            if header is not None:
+                f.write(delimiter.join(header) + '\n')
+
+            for row in rows:
+                f.write(delimiter.join(self.format_change_value(value, quotechar) for value in row) + '\n')
+
+    def format_change_value(self, value, quotechar):
+        if value is None:
+            return ''
+        if isinstance(value, bool):
+            return 't' if value else 'f'
+
+        return quotechar + str(value).replace(quotechar, quotechar + quotechar) + quotechar
 
     def compose_extract_options(self, extractor_obj_conf):
         "WITH (FORMAT CSV, DELIMITER ',', HEADER true, FORCE_QUOTE *, ENCODING 'UTF-8');"
@@ -65,6 +105,7 @@ class PsqlExtractor(DBExtractor):
         table_name = extractor_obj_conf.get('source_object_name')
         copy_to_options = self.compose_extract_options(extractor_obj_conf)
         extract_to_stmt = extract_to_stmt.format_map(
-        					FormatDict(column_list=column_list, schema_name=schema_name, table_name=table_name, copy_to_options=copy_to_options))
+        					FormatDict(column_list=column_list, schema_name=schema_name, table_name=table_name, where_clause=extractor_obj_conf.get('where_clause'),
+        					           copy_to_options=copy_to_options))
 
         return extract_to_stmt
@@ -42,20 +42,19 @@ class PsqlLoader(DBLoader):
         self.f_handler.gunzip_csv_files(output_data_object_dir)
 
         # 2. drop and recreate table
-        if loader_obj_conf.get('recreate_destination_object') == True:
-            self.drop_table(loader_obj_conf)
-
-        self.create_table(loader_obj_conf)
+        self.prepare_destination_object(loader_obj_conf)
 
         # collect all csv file
         file_list = self.f_handler.get_specific_files(output_data_object_dir,'*.csv')
 
-        for path_to_data_file in file_list:
+        def load_file(path_to_data_file):
             logger.debug(f"Source file: {path_to_data_file}")
             logger.debug(f"Statement to execute:\n{load_from_stmt}")
 
             self.db_connector.load_from(load_from_stmt, path_to_data_file)
 
+        self.load_batches(loader_obj_conf.get('object_name'), file_list, load_file)
+
     def compose_create_table_stmt(self, loader_obj_conf):
 
         table_ddl_dict = loader_obj_conf.get('table_ddl_dict')
@@ -110,6 +109,15 @@ class PsqlLoader(DBLoader):
         self.f_handler.save_file(load_from_file_fpath, load_from_stmt)
         return load_from_stmt
 
+    def compose_merge_stmt(self, destination_table, staging_table, column_names, primary_key_columns):
+        """ Upsert the staged rows with INSERT ... ON CONFLICT on the primary key of the destination table. """
+        update_columns = self.get_merge_update_columns(column_names, primary_key_columns)
+
+        return (f"INSERT INTO {destination_table} ({', '.join(column_names)})\n"
+                f"SELECT {', '.join(column_names)} FROM {staging_table}\n"
+                f"ON CONFLICT ({', '.join(primary_key_columns)})\n"
+                f"DO UPDATE SET {', '.join(f'{column} = EXCLUDED.{column}' for column in update_columns)};")
+
     def drop_table(self, loader_obj_conf: dict):
 
         table_ddl_dict = loader_obj_conf.get('table_ddl_dict')
@@ -0,0 +1,163 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+from petaly.core.data_object import DataObject
+from petaly.core.exceptions import ConfigError, ExtractError
+from petaly.core.watermark_store import WatermarkStore
+from petaly.utils.utils import compose_batch_fpath
+
+
+class ChangeCapture():
+    """ ChangeCapture reads the row changes of the objects with load_mode: cdc from the change stream of the source, e.g. the replication slot of Postgres or the binary log of MySQL.
+    The changes are read once for all objects and collapsed to the last change of each primary key. They are staged as rows with the column petaly_op,
+    I and U rows are merged into the destination table and the rows of D are deleted, see DBLoader.merge_staged_object.
+    The position of the stream is recorded as high-water mark of each object and stored once the object is loaded into all targets, see WatermarkStore,
+    so a failed run reads the same changes again. An object without a stored position is extracted in full as initial snapshot.
+    The extractor of the source implements get_change_position, read_changes, parse_change_position and write_change_file.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.change_windows = {}
+        self.object_changes = {}
+
+    def capture(self, extractor, object_list):
+        """ Read the changes of the objects with load_mode: cdc since their stored positions up to the current position of the source. """
+        self.change_windows, self.object_changes = {}, {}
+
+        cdc_list = [object_name for object_name in object_list if extractor.get_data_object(object_name).load_mode == 'cdc']
+        if len(cdc_list) == 0:
+            return
+
+        if self.pipeline.source_name is not None:
+            raise ConfigError(f"The load_mode: cdc isn't supported with several sources in {self.pipeline.pipeline_fpath}.")
+
+        high_position = extractor.get_change_position()
+        read_positions = {}
+
+        for object_name in cdc_list:
+            low_watermark = self.pipeline.watermark_store.get_watermark(object_name)
+            low_watermark = {'value': low_watermark.get('value'), 'is_number': low_watermark.get('is_number')} if low_watermark is not None else None
+            self.change_windows.update({object_name: {'low': low_watermark, 'high': WatermarkStore.compose_watermark(high_position)}})
+
+            if low_watermark is None:
+                logger.info(f"Object {object_name} has no change position yet, all rows are extracted as initial snapshot")
+            else:
+                read_positions.update({object_name: low_watermark.get('value')})
+
+        if len(read_positions) == 0:
+            return
+
+        # the stream is read from the oldest stored position, the changes each object has already loaded are skipped
+        start_position = min(read_positions.values(), key=extractor.parse_change_position)
+        table_objects = {}
+        for object_name in read_positions.keys():
+            table_metadata = self.get_table_metadata(extractor, object_name)
+            table_objects.update({table_metadata.get('source_object_name'): object_name})
+            self.object_changes.update({object_name: {'columns': [column.get('column_name') for column in table_metadata.get('columns')],
+                                                      'key_columns': [column.get('column_name') for column in table_metadata.get('columns') if column.get('primary_key') is not None],
+                                                      'rows': {}}})
+
+            if len(self.object_changes.get(object_name).get('key_columns')) == 0:
+                raise ConfigError(f"The object {object_name} has load_mode: cdc, but its source has no primary key.")
+
+        logger.info(f"Read the changes of {len(read_positions)} objects from position {start_position} up to {high_position}")
+
+        change_count = 0
+        for change in extractor.read_changes(start_position, high_position, list(table_objects.keys())):
+            object_name = table_objects.get(change.get('table'))
+            if object_name is None:
+                continue
+
+            if extractor.parse_change_position(change.get('position')) <= extractor.parse_change_position(read_positions.get(object_name)):
+                continue
+
+            self.add_change(object_name, change)
+            change_count += 1
+
+        logger.info(f"Captured {change_count} changes of {len(read_positions)} objects")
+
+    def add_change(self, object_name, change):
+        """ Keep the last change of each primary key. An update of the key deletes the row with the old key. """
+        object_changes = self.object_changes.get(object_name)
+        columns = object_changes.get('columns')
+        key_columns = object_changes.get('key_columns')
+        rows = object_changes.get('rows')
+
+        op = change.get('op')
+        row = change.get('row') or {}
+        old_row = change.get('old_row') or {}
+
+        if op == 'D':
+            key_row = old_row or row
+            rows.update({self.compose_key(object_name, key_columns, key_row): ('D', [key_row.get(column) if column in key_columns else None for column in columns])})
+            return
+
+        # a column which isn't part of the change, e.g. an unchanged TOAST value, can't be staged
+        missing_columns = [column for column in columns if column not in row and column not in old_row]
+        if len(missing_columns) > 0:
+            raise ExtractError(f"The change of object {object_name} doesn't contain the columns {', '.join(missing_columns)}. "
+                               f"Set the replica identity of the source table to full, so each change contains all columns.")
+
+        key = self.compose_key(object_name, key_columns, row)
+        if op == 'U' and len(old_row) > 0:
+            old_key = self.compose_key(object_name, key_columns, old_row)
+            if old_key != key:
+                rows.update({old_key: ('D', [old_row.get(column) if column in key_columns else None for column in columns])})
+
+        rows.update({key: (op, [row.get(column) if column in row else old_row.get(column) for column in columns])})
+
+    def compose_key(self, object_name, key_columns, row):
+        """ Returns the primary key of a changed row. """
+        if any(column not in row for column in key_columns):
+            raise ExtractError(f"The change of object {object_name} doesn't contain its primary key {', '.join(key_columns)}.")
+
+        return tuple(str(row.get(column)) for column in key_columns)
+
+    def get_table_metadata(self, extractor, object_name):
+        table_metadata = extractor.object_meta_dict.get(object_name)
+        if table_metadata is None:
+            table_metadata = extractor.f_handler.load_file_as_dict(self.pipeline.output_object_metadata_fpath.format(object_name=object_name), 'json')
+
+        return table_metadata
+
+    def get_change_window(self, object_name):
+        """ Returns the low and high position of the captured changes, or None if the object doesn't use load_mode: cdc. """
+        return self.change_windows.get(object_name)
+
+    def has_changes(self, object_name):
+        """ Returns True if the changes of the object were captured, False if it's extracted in full. """
+        return object_name in self.object_changes
+
+    def write_changes(self, extractor, extractor_obj_conf):
+        """ Stage the captured changes of the object as rows with petaly_op, split into files of load_batch_size rows. """
+        object_name = extractor_obj_conf.get('object_name')
+        object_changes = self.object_changes.get(object_name)
+        output_object_fpath = extractor_obj_conf.get('output_object_fpath')
+        load_batch_size = extractor_obj_conf.get('load_batch_size')
+
+        header = object_changes.get('columns') + [DataObject.change_op_column] if extractor_obj_conf.get('object_settings').get('header') is True else None
+        rows = [values + [op] for op, values in object_changes.get('rows').values()]
+
+        if load_batch_size is None:
+            extractor.write_change_file(output_object_fpath, header, rows, extractor_obj_conf)
+        else:
+            for batch_number, batch_start in enumerate(range(0, max(len(rows), 1), load_batch_size), start=1):
+                extractor.write_change_file(compose_batch_fpath(output_object_fpath, batch_number), header, rows[batch_start:batch_start + load_batch_size], extractor_obj_conf)
+
+        deleted_rows = len([row for row in rows if row[-1] == 'D'])
+        logger.info(f"Object {object_name}: {len(rows) - deleted_rows} inserted or updated and {deleted_rows} deleted rows staged")
@@ -0,0 +1,111 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import time
+
+
+class ChangeDetector():
+    """ ChangeDetector skips the objects whose source is unchanged since the last successful run, set by skip_unchanged_objects in data_attributes.
+    The extractor returns a fingerprint of each source object, e.g. the row counters of Postgres or the modification time of the files.
+    The fingerprint recorded at extraction is stored in object_fingerprint.json next to object_meta.json, once the object is loaded into all targets.
+    An unchanged object is neither extracted nor loaded, the destination keeps the rows of the last run.
+    Objects without a fingerprint, e.g. views or connectors without change signals, are always extracted.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.stored_fingerprints = {}
+        self.source_fingerprints = {}
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """ Returns the detector of the pipeline, or None if skip_unchanged_objects isn't set. """
+        if str(pipeline.data_attributes.get('skip_unchanged_objects')).lower() != 'true':
+            return None
+
+        # the objects of several sources are combined, so an unchanged source can't be skipped alone
+        if len(pipeline.source_attr_list) > 1:
+            logger.warning(f"The parameter skip_unchanged_objects in {pipeline.pipeline_fpath} isn't supported with several sources. All objects are extracted.")
+            return None
+
+        return ChangeDetector(pipeline)
+
+    @classmethod
+    def compose_fingerprint(cls, signals):
+        """ Returns the change signals of an object as fingerprint, or None if a signal isn't available. """
+        if not signals or any(value is None for value in signals.values()):
+            return None
+
+        return {str(key): str(value) for key, value in signals.items()}
+
+    def get_fingerprint_fpath(self, object_name):
+        return os.path.join(self.pipeline.output_object_metadata_dpath.format(object_name=object_name), self.pipeline.object_fingerprint_fname)
+
+    def read_stored_fingerprints(self):
+        """ Read the fingerprints of the last successful run. Called before the output directory is cleaned up. """
+        self.stored_fingerprints = {}
+        if not os.path.isdir(self.pipeline.output_pipeline_dpath):
+            return
+
+        for object_name in self.pipeline.f_handler.get_all_dir_names(self.pipeline.output_pipeline_dpath):
+            fingerprint_fpath = self.get_fingerprint_fpath(object_name)
+            if not self.pipeline.f_handler.is_file(fingerprint_fpath):
+                continue
+
+            try:
+                self.stored_fingerprints.update({object_name: self.pipeline.f_handler.load_json(fingerprint_fpath).get('fingerprint')})
+            except (OSError, ValueError, AttributeError) as err:
+                logger.warning(f"The fingerprint {fingerprint_fpath} can't be read, the object {object_name} is extracted: {err}")
+
+    def set_source_fingerprints(self, fingerprint_dict):
+        """ Set the current fingerprints of the source objects, as {object_name: {signal: value}}. """
+        self.source_fingerprints = {object_name: self.compose_fingerprint(signals) for object_name, signals in (fingerprint_dict or {}).items()}
+
+    def get_source_fingerprint(self, object_name):
+        return self.source_fingerprints.get(object_name)
+
+    def skip_unchanged_object(self, object_name):
+        """ Returns True if the object is unchanged since the last successful run. The staged data of the last run is removed,
+        so the object isn't loaded, and the fingerprint is kept for the next run.
+        """
+        source_fingerprint = self.get_source_fingerprint(object_name)
+        if source_fingerprint is None or source_fingerprint != self.stored_fingerprints.get(object_name):
+            return False
+
+        self.pipeline.f_handler.remove_dir(self.pipeline.output_object_data_dpath.format(object_name=object_name))
+        self.save_fingerprint(object_name, source_fingerprint)
+        logger.info(f"Object {object_name} is unchanged since the last run and skipped")
+        return True
+
+    def commit_loaded_object(self, object_name):
+        """ Store the fingerprint recorded at extraction, once the object is loaded into all targets. """
+        if not self.pipeline.run_manifest.is_loaded(object_name):
+            return
+
+        fingerprint = self.pipeline.run_manifest.get_object_entry(object_name).get('fingerprint')
+        if fingerprint is not None:
+            self.save_fingerprint(object_name, fingerprint)
+
+    def save_fingerprint(self, object_name, fingerprint):
+        fingerprint_fpath = self.get_fingerprint_fpath(object_name)
+
+        try:
+            self.pipeline.f_handler.make_dirs(os.path.dirname(fingerprint_fpath))
+            self.pipeline.f_handler.save_dict_to_json(fingerprint_fpath, {'fingerprint': fingerprint, 'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')})
+        except OSError as err:
+            logger.warning(f"The fingerprint of object {object_name} can't be recorded in {fingerprint_fpath}, the next run extracts it again: {err}")
@@ -36,7 +36,14 @@ class Composer():
 		""" This function check if object defined in the second list pipeline_data_objects in pipeline.yaml -> data_objects_spec corresponds
 				with the first list data_objects which is usually a folder structure in output directory.
 		"""
-		object_dir_list = self.f_handler.get_all_dir_names(pipeline.output_pipeline_dpath)
+		# hidden entries, e.g. the lease directory, aren't objects
+		object_dir_list = [dir_name for dir_name in self.f_handler.get_all_dir_names(pipeline.output_pipeline_dpath) if not dir_name.startswith('.')]
+
+		# an object of a pipeline with several sources has a data directory, once it's extracted from all sources
+		# with delete_staged_data, the data directory of a loaded object is deleted, an unchanged object skipped by the ChangeDetector has none
+		if (len(pipeline.source_attr_list) > 1 or pipeline.change_detector is not None
+				or (pipeline.staging_budget is not None and pipeline.staging_budget.delete_staged_data)):
+			object_dir_list = [dir_name for dir_name in object_dir_list if self.f_handler.is_dir(pipeline.extracted_object_data_dpath.format(object_name=dir_name))]
 		pipeline_object_list = pipeline.data_objects
 
 		if pipeline.data_objects_spec_mode in ("ignore","prefer"):
@@ -44,6 +51,10 @@ class Composer():
 		else:
 			return_list = self.get_data_objects_intersection(object_dir_list, pipeline_object_list)
 
+		# if the pipeline runs on several nodes, load only the objects of this node
+		if pipeline.object_assignment is not None:
+			return_list = pipeline.object_assignment.filter_processed_objects(pipeline, return_list)
+
 		return return_list
 	def get_data_objects_intersection(self, first_list, second_list):
 		"""
@@ -0,0 +1,171 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import threading
+import time
+
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.utils.utils import lock_file
+
+
+class ConcurrencyTuner():
+    """ ConcurrencyTuner adapts the number of objects processed at the same time to one endpoint, if max_parallel_objects is auto.
+    The throughput (bytes/sec and rows/sec of all workers) and the response time (seconds per MB of an object) are evaluated
+    each time as many objects completed as workers are allowed. While the throughput improves, one more worker is allowed.
+    If it stops improving, the previous setting is kept, and if the response time degrades, a worker is removed.
+    The setting is recorded per endpoint in the output directory, so the next run starts from it.
+    """
+    state_fname = '.concurrency_tuner.json'
+    state_lock = threading.Lock()
+    # the throughput has to improve by 10% to allow one more worker
+    improvement_ratio = 1.1
+    # a worker is removed if the response time is 50% above the response time of the first evaluation
+    degradation_ratio = 1.5
+
+    def __init__(self, pipeline, phase, endpoint_attr, max_workers):
+        """
+        :param phase: extract or load, the same endpoint can be a source and a target
+        :param max_workers: the upper limit of workers
+        """
+        self.pipeline = pipeline
+        self.phase = phase
+        self.max_workers = max(1, int(max_workers))
+        self.state_key = f"{phase}:{ConnectionBudget.compose_endpoint_key(endpoint_attr)}"
+        self.state_fpath = os.path.join(pipeline.m_conf.output_base_dpath, self.state_fname)
+        self.lock = threading.Lock()
+
+        recorded_state = self.read_state().get(self.state_key) or {}
+        self.limit = min(self.max_workers, max(1, int(recorded_state.get('max_parallel_objects') or 1)))
+        self.best_throughput = None
+        self.baseline_response_time = None
+        self.settled = False
+        self.start_window()
+
+        logger.info(f"{self.phase.capitalize()} starts with {self.limit} of up to {self.max_workers} parallel objects, adapted to the throughput")
+
+    def get_limit(self):
+        with self.lock:
+            return self.limit
+
+    def start_window(self):
+        self.window_start_time = time.time()
+        self.window_bytes = 0
+        self.window_rows = 0
+        self.window_duration = 0
+        self.window_objects = 0
+
+    def add_result(self, result):
+        """ Add a completed object and adapt the limit, once as many objects completed in the window as workers are allowed.
+        """
+        object_name = result.get('object_name')
+        # the staged data of a loaded object can be deleted already, see StagingBudget, the manifest keeps its size
+        object_entry = self.pipeline.run_manifest.get_object_entry(object_name) or {}
+        object_bytes = object_entry.get('bytes')
+        if object_bytes is None:
+            object_bytes = self.pipeline.f_handler.get_dir_size(self.pipeline.extracted_object_data_dpath.format(object_name=object_name))
+        object_rows = object_entry.get('rows') or 0
+
+        with self.lock:
+            self.window_bytes += object_bytes
+            self.window_rows += object_rows
+            self.window_duration += result.get('duration')
+            self.window_objects += 1
+
+            if self.window_objects >= self.limit:
+                self.adapt_limit()
+
+    def adapt_limit(self):
+        window_time = time.time() - self.window_start_time
+        if window_time <= 0 or self.window_bytes == 0:
+            self.start_window()
+            return
+
+        throughput = self.window_bytes / window_time
+        rows_per_second = self.window_rows / window_time
+        response_time = self.window_duration / (self.window_bytes / 1024 / 1024)
+        previous_limit = self.limit
+
+        if self.baseline_response_time is None:
+            self.baseline_response_time = response_time
+
+        if self.limit > 1 and response_time > self.baseline_response_time * self.degradation_ratio:
+            # the endpoint is overloaded, back off
+            self.limit -= 1
+            self.settled = True
+            reason = 'response time degraded'
+
+        elif self.settled:
+            reason = 'settled'
+
+        elif self.best_throughput is None or throughput > self.best_throughput * self.improvement_ratio:
+            self.best_throughput = throughput
+            self.limit = min(self.max_workers, self.limit + 1)
+            self.settled = self.limit == previous_limit
+            reason = 'throughput improved'
+
+        else:
+            # more workers didn't help, keep the previous setting
+            self.limit = max(1, self.limit - 1)
+            self.settled = True
+            reason = 'throughput stopped improving'
+
+        message = (f"{self.phase.capitalize()} throughput: {round(throughput / 1024 / 1024, 2)} MB/s, {round(rows_per_second)} rows/s"
+                   f" | response time: {round(response_time, 2)}s/MB | parallel objects: {previous_limit} -> {self.limit} ({reason})")
+
+        if self.limit != previous_limit:
+            logger.info(message)
+        else:
+            logger.debug(message)
+
+        self.start_window()
+
+    def finish(self):
+        """ Record the setting of the endpoint for the next run.
+        The state file is read again and updated under a file lock, so the settings recorded by other processes at the same time are kept.
+        """
+        with self.lock:
+            limit = self.limit
+            best_throughput = self.best_throughput
+
+        try:
+            with self.state_lock, lock_file(self.state_fpath):
+                state = self.read_state()
+                state.update({self.state_key: {'max_parallel_objects': limit,
+                                               'bytes_per_second': round(best_throughput) if best_throughput is not None else None,
+                                               'updated_at': time.strftime('%Y-%m-%d %H:%M:%S')}})
+
+                tmp_fpath = f"{self.state_fpath}.{os.getpid()}.tmp"
+                with open(tmp_fpath, 'w', encoding='utf-8') as state_file:
+                    json.dump(state, state_file, indent=2)
+                os.replace(tmp_fpath, self.state_fpath)
+        except OSError as err:
+            logger.warning(f"The concurrency setting can't be recorded in {self.state_fpath}: {err}")
+
+        logger.info(f"{self.phase.capitalize()} recorded {limit} parallel objects for the next run")
+
+    def read_state(self):
+        if not os.path.isfile(self.state_fpath):
+            return {}
+
+        try:
+            with open(self.state_fpath, 'r', encoding='utf-8') as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as err:
+            logger.warning(f"The concurrency settings {self.state_fpath} can't be read and are ignored: {err}")
+            return {}
@@ -0,0 +1,100 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+from collections import deque
+
+
+class ConnectionBudget():
+    """ ConnectionBudget limits the number of open connections to one endpoint, set by max_connections in source_attributes or target_attributes.
+    A budget is shared by all pipelines in the process that use the same endpoint. Waiting workers get a slot in the order they asked for it.
+    """
+    endpoint_key_attributes = ['connector_type', 'database_host', 'database_port', 'cluster_identifier', 'workgroup_name', 'database_name']
+
+    budgets = {}
+    budgets_lock = threading.Lock()
+
+    def __init__(self, endpoint_key, max_connections):
+        self.endpoint_key = endpoint_key
+        self.max_connections = max_connections
+        self.connections_in_use = 0
+        self.waiting_queue = deque()
+        self.condition = threading.Condition()
+
+    @classmethod
+    def get_budget(cls, endpoint_attr):
+        """ Returns the budget of the endpoint, or None if max_connections isn't specified.
+        """
+        max_connections = endpoint_attr.get('max_connections')
+
+        if max_connections is None or str(max_connections).strip() == '':
+            return None
+
+        try:
+            max_connections = int(max_connections)
+        except ValueError:
+            logger.warning(f"The parameter max_connections: {max_connections} of {endpoint_attr.get('connector_type')} is not an integer. The number of connections is not limited.")
+            return None
+
+        max_connections = max(1, max_connections)
+        endpoint_key = cls.compose_endpoint_key(endpoint_attr)
+
+        with cls.budgets_lock:
+            budget = cls.budgets.get(endpoint_key)
+
+            if budget is None:
+                budget = ConnectionBudget(endpoint_key, max_connections)
+                cls.budgets.update({endpoint_key: budget})
+
+            elif max_connections < budget.max_connections:
+                # pipelines with the same endpoint may specify different limits, the lowest one is used
+                with budget.condition:
+                    budget.max_connections = max_connections
+
+        return budget
+
+    @classmethod
+    def compose_endpoint_key(cls, endpoint_attr):
+        return '/'.join(str(endpoint_attr.get(key)) for key in cls.endpoint_key_attributes if endpoint_attr.get(key) is not None)
+
+    def acquire(self, abort=None, poll_interval=0.1):
+        """ Wait for a free connection slot.
+        :param abort: optional function, the waiting stops if it returns True, e.g. if an idle worker is available
+        :return: True if a slot was acquired, False if the waiting was aborted
+        """
+        ticket = object()
+
+        with self.condition:
+            self.waiting_queue.append(ticket)
+            try:
+                while True:
+                    if self.waiting_queue[0] is ticket and self.connections_in_use < self.max_connections:
+                        self.connections_in_use += 1
+                        return True
+
+                    if abort is not None and abort():
+                        return False
+
+                    self.condition.wait(poll_interval)
+            finally:
+                self.waiting_queue.remove(ticket)
+                self.condition.notify_all()
+
+    def release(self):
+        with self.condition:
+            self.connections_in_use = max(0, self.connections_in_use - 1)
+            self.condition.notify_all()
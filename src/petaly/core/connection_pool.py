@@ -0,0 +1,120 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import time
+
+from petaly.core.connection_budget import ConnectionBudget
+
+
+class ConnectionPool():
+    """ ConnectionPool keeps the database connections of closed connectors open, so the next run of the serve mode reuses them.
+    The pool is enabled by serve only. Otherwise a connector opens a new connection and closes it at the end, as before.
+    """
+    enabled = False
+    # idle connections older than max_idle_seconds are closed instead of reused
+    max_idle_seconds = 300
+
+    idle_connections = {}
+    pool_lock = threading.Lock()
+
+    @classmethod
+    def enable(cls, max_idle_seconds=None):
+        cls.enabled = True
+        if max_idle_seconds is not None:
+            cls.max_idle_seconds = max_idle_seconds
+
+    @classmethod
+    def compose_pool_key(cls, endpoint_attr):
+        return ConnectionBudget.compose_endpoint_key(endpoint_attr) + f"/{endpoint_attr.get('database_user')}"
+
+    @classmethod
+    def acquire(cls, endpoint_attr, connect, is_alive):
+        """ Returns an idle connection of the endpoint, or a new connection.
+        :param connect: function, which opens a new connection
+        :param is_alive: function, which returns True if an idle connection can still be used
+        """
+        if not cls.enabled:
+            return connect()
+
+        pool_key = cls.compose_pool_key(endpoint_attr)
+
+        while True:
+            with cls.pool_lock:
+                idle_list = cls.idle_connections.get(pool_key, [])
+                if len(idle_list) == 0:
+                    break
+                conn, released_at = idle_list.pop()
+
+            if time.time() - released_at <= cls.max_idle_seconds and cls.check_alive(conn, is_alive):
+                logger.debug(f"Reuse idle connection of endpoint {pool_key}")
+                return conn
+
+            cls.close_connection(conn)
+
+        return connect()
+
+    @classmethod
+    def release(cls, endpoint_attr, conn, close, reset=None):
+        """ Keep the connection open for the next connector of the endpoint, or close it if the pool isn't enabled.
+        :param close: function, which closes the connection
+        :param reset: optional function, which rolls back an open transaction before the connection is reused
+        """
+        if conn is None:
+            return
+
+        if not cls.enabled:
+            close(conn)
+            return
+
+        try:
+            if reset is not None:
+                reset(conn)
+        except Exception as err:
+            logger.debug(f"The connection can't be reset and is closed: {err}")
+            cls.close_connection(conn, close)
+            return
+
+        with cls.pool_lock:
+            cls.idle_connections.setdefault(cls.compose_pool_key(endpoint_attr), []).append((conn, time.time()))
+
+    @classmethod
+    def check_alive(cls, conn, is_alive):
+        try:
+            return is_alive(conn)
+        except Exception:
+            return False
+
+    @classmethod
+    def close_connection(cls, conn, close=None):
+        try:
+            if close is not None:
+                close(conn)
+            else:
+                conn.close()
+        except Exception as err:
+            logger.debug(f"Closing an idle connection failed: {err}")
+
+    @classmethod
+    def close_all(cls):
+        """ Close all idle connections, e.g. when serve stops. """
+        with cls.pool_lock:
+            idle_connections = [conn for idle_list in cls.idle_connections.values() for conn, released_at in idle_list]
+            cls.idle_connections = {}
+
+        for conn in idle_connections:
+            cls.close_connection(conn)
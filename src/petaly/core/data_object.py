@@ -12,11 +12,20 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import sys
 import logging
 logger = logging.getLogger(__name__)
 
+from petaly.core.exceptions import ConfigError
+
 class DataObject:
+    # full reloads the object with each run, incremental extracts only the rows above the high-water mark of column_for_incremental_load,
+    # merge upserts the extracted rows on the primary key of the source, cdc applies the changes captured from the change stream of the source
+    load_modes = ('full', 'incremental', 'merge', 'cdc')
+    # the source connectors, which read the changes of load_mode: cdc from their change stream
+    change_capture_connectors = ('postgres', 'mysql')
+    # the staged rows of load_mode: cdc have this additional column with the operation I, U or D, see ChangeCapture
+    change_op_column = 'petaly_op'
+
     def __init__(self, pipeline, object_name):
 
         data_objects = pipeline.data_objects_spec
@@ -30,19 +39,16 @@ class DataObject:
         if data_object_spec == {}:
 
             if self.data_objects_spec_mode == 'only':
-                logger.info(
+                raise ConfigError(
                     f"For {pipeline.source_connector_id} extract the parameters data_objects_spec_mode=only and specification in the data_objects_spec[] are required. Use python -m petaly init -p {pipeline.pipeline_name} --object_name table1,table2 -c your_config_dir/petaly.ini")
-                sys.exit()
 
             elif self.data_objects_spec_mode in ('ignore', 'prefer'):
                 if pipeline.source_connector_id in ('csv'):
-                    logger.info(
+                    raise ConfigError(
                         f"In case your source is csv, the parameters data_objects_spec_mode should be set to only and require the specification in the data_objects_spec[]."
                         f"\ndata_objects_spec_mode=only"
                         f"\nCheck pipeline under: {pipeline.pipeline_fpath}")
 
-                    sys.exit()
-
             return self.set_default_object_spec(pipeline, object_name)
 
         self.object_name = data_object_spec.get('object_spec').get('object_name')
@@ -54,6 +60,28 @@ class DataObject:
         cleanup_linebreak_in_fields = data_object_spec.get('object_spec').get('cleanup_linebreak_in_fields')
         self.object_settings.update({'cleanup_linebreak_in_fields': cleanup_linebreak_in_fields})
 
+        self.load_mode = str(data_object_spec.get('object_spec').get('load_mode') or 'full').strip().lower()
+        self.column_for_incremental_load = data_object_spec.get('object_spec').get('column_for_incremental_load')
+
+        if self.load_mode not in self.load_modes:
+            raise ConfigError(f"The load_mode: {self.load_mode} of object {self.object_name} in {pipeline.pipeline_fpath} isn't supported. Choose between {', '.join(self.load_modes)}.")
+
+        if self.load_mode == 'cdc' and pipeline.source_connector_id not in self.change_capture_connectors:
+            raise ConfigError(f"The object {self.object_name} in {pipeline.pipeline_fpath} has load_mode: cdc, which isn't supported by the source connector {pipeline.source_connector_id}. Choose between {', '.join(self.change_capture_connectors)}.")
+
+        if self.load_mode == 'incremental' and not self.column_for_incremental_load:
+            raise ConfigError(f"The object {self.object_name} in {pipeline.pipeline_fpath} has load_mode: incremental, which requires column_for_incremental_load.")
+
+        self.load_batch_size = self.format_load_batch_size(pipeline, data_object_spec.get('object_spec').get('load_batch_size'))
+
+    def has_incremental_extract(self):
+        """ Returns True if the rows above the high-water mark are extracted, with merge only if column_for_incremental_load is set. """
+        return self.load_mode == 'incremental' or (self.load_mode == 'merge' and bool(self.column_for_incremental_load))
+
+    def has_merge_load(self):
+        """ Returns True if the rows are loaded into a staging table and merged into the destination table on the primary key. """
+        return self.load_mode in ('merge', 'cdc')
+
     def to_dict(self) -> dict:
         return {key: value for key, value in self.__dict__.items()}
 
@@ -74,6 +102,24 @@ class DataObject:
         self.exclude_columns = [None]
         self.object_source_dir = None
         self.file_names = [None]
+        self.load_mode = 'full'
+        self.column_for_incremental_load = None
+        self.load_batch_size = None
+
+    def format_load_batch_size(self, pipeline, load_batch_size):
+        """ Returns the number of rows per staged file, or None to extract the object into a single file. """
+        if load_batch_size is None or load_batch_size == '':
+            return None
+
+        try:
+            load_batch_size = int(load_batch_size)
+        except (TypeError, ValueError):
+            load_batch_size = 0
+
+        if load_batch_size <= 0:
+            raise ConfigError(f"The load_batch_size of object {self.object_name} in {pipeline.pipeline_fpath} should be a positive number of rows.")
+
+        return load_batch_size
 
     def format_object_default_settings(self, object_default_settings):
         """
@@ -16,7 +16,6 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 import time
 from abc import ABC, abstractmethod
 from petaly.core.composer import Composer
@@ -25,9 +24,17 @@ from petaly.utils.file_handler import FileHandler
 from petaly.core.object_metadata import ObjectMetadata
 from petaly.core.type_mapping import TypeMapping
 from petaly.core.data_object import DataObject
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.object_scheduler import ObjectScheduler
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.watermark_store import WatermarkStore
+from petaly.core.change_capture import ChangeCapture
+from petaly.core.exceptions import ConfigError, ExtractError
 
 
 class DBExtractor(ABC):
+	# the source name of a pipeline with several sources can be added as a column to the extract query
+	supports_source_name_column = True
 
 	def __init__(self, pipeline):
 		super().__init__()
@@ -38,11 +45,25 @@ class DBExtractor(ABC):
 		self.m_conf = self.pipeline.m_conf
 		self.type_mapping = TypeMapping(pipeline)
 		self.object_metadata = ObjectMetadata(pipeline)
+		self.object_scheduler = ObjectScheduler(pipeline)
+		# metadata of the objects, saved when an object is claimed, if the objects are shared with other nodes
+		self.object_meta_dict = {}
+		self.change_capture = ChangeCapture(pipeline)
 
-		if self.m_conf.set_extractor_paths(self.pipeline.source_connector_id):
-			self.connector_extract_to_stmt_fpath = self.m_conf.connector_extract_to_stmt_fpath
-			self.connector_metadata_sql_fpath = self.m_conf.connector_metadata_sql_fpath
-			self.query_origin = self.f_handler.load_file(self.connector_metadata_sql_fpath)
+		self.connector_metadata_sql_fpath, self.connector_extract_to_stmt_fpath = self.m_conf.get_extractor_paths(self.pipeline.source_connector_id)
+		self.query_origin = self.f_handler.load_file(self.connector_metadata_sql_fpath)
+
+		# the object size query is optional, it's used to start the largest objects first
+		self.connector_object_size_sql_fpath = self.m_conf.get_object_size_sql_fpath(self.pipeline.source_connector_id)
+		self.object_size_query_origin = None
+		if self.f_handler.is_file(self.connector_object_size_sql_fpath):
+			self.object_size_query_origin = self.f_handler.load_file(self.connector_object_size_sql_fpath)
+
+		# optional query of the change signals of each object, see ChangeDetector
+		self.connector_object_fingerprint_sql_fpath = self.m_conf.get_object_fingerprint_sql_fpath(self.pipeline.source_connector_id)
+		self.object_fingerprint_query_origin = None
+		if self.f_handler.is_file(self.connector_object_fingerprint_sql_fpath):
+			self.object_fingerprint_query_origin = self.f_handler.load_file(self.connector_object_fingerprint_sql_fpath)
 
 
 	@abstractmethod
@@ -58,14 +79,22 @@ class DBExtractor(ABC):
 		pass
 
 	@measure_time
-	def extract_data(self):
+	def extract_data(self, on_object_extracted=None):
 		""" Its export data as csv into pipeline output directory.
+		The optional on_object_extracted function is called with the object_name as soon as an object is extracted.
 		"""
 
 		logger.info(f"[--- Extract from {self.pipeline.source_connector_id} ---]")
 		start_total_time = time.time()
-		# 1. Start with cleanup
-		self.f_handler.cleanup_dir(self.pipeline.output_pipeline_dpath)
+		# 1. Start with cleanup. If the objects are shared with other nodes or the run is resumed, only the output of extracted objects is removed.
+		# If the pipeline has several sources, the output directory is cleaned up once before all sources start
+		object_assignment = self.pipeline.object_assignment
+		change_detector = self.pipeline.change_detector
+		if change_detector is not None:
+			change_detector.read_stored_fingerprints()
+
+		if object_assignment is None and not self.pipeline.resume and self.pipeline.source_name is None:
+			self.f_handler.cleanup_dir(self.pipeline.output_pipeline_dpath)
 
 		# 2. compose_extract_scripts
 		meta_query = self.compose_meta_query()
@@ -73,27 +102,108 @@ class DBExtractor(ABC):
 		# 3. get meta query result, expected as a dict
 		meta_query_result = self.execute_meta_query(meta_query)
 
-		# 4. save metadata and export scripts
-		object_list = self.object_metadata.process_metadata(meta_query_result)
+		# 4. get estimated object sizes, a micro-batch loop reuses the sizes of its first iteration
+		object_size_dict = self.get_object_size_dict()
 
-		# 5. run loop for each object
-		for object_name in object_list:
+		# the fingerprints are taken before the extraction, so changes made during the run are extracted by the next run
+		if change_detector is not None:
+			change_detector.set_source_fingerprints(self.get_object_fingerprint_dict())
 
-			logger.info(f"Extract object: {object_name} started...")
-			start_time = time.time()
+		# 5. save metadata and export scripts, start with the largest objects
+		if object_assignment is None:
+			object_list = self.object_metadata.process_metadata(meta_query_result, object_size_dict)
+		else:
+			self.object_meta_dict = self.object_metadata.compose_object_meta_dict(meta_query_result, object_size_dict)
+			object_list = object_assignment.filter_objects(self.pipeline, list(self.object_meta_dict.keys()))
 
-			# 5. get all export scripts and store data into output directory
-			extractor_obj_conf = self.get_extractor_obj_conf(object_name)
+		object_list = self.object_scheduler.order_by_size(object_list, object_size_dict)
+		object_list = self.pipeline.run_manifest.prepare_extract(object_list, self.pipeline.resume, on_object_extracted)
 
-			# 6. run export data
-			self.extract_to(extractor_obj_conf)
+		# the changes of the objects with load_mode: cdc are read once for all objects
+		self.change_capture.capture(self, object_list)
 
-			end_time = time.time()
-			logger.info(f"Extract object: {object_name} completed | time: {round(end_time - start_time, 2)}s")
+		# 6. run extraction for each object, in parallel if max_parallel_objects > 1
+		executor = ObjectExecutor(phase='extract',
+								  object_func=lambda extractor, object_name: extractor.extract_object(object_name),
+								  max_workers=self.pipeline.max_parallel_objects,
+								  create_worker=self.create_worker,
+								  connection_budget=ConnectionBudget.get_budget(self.pipeline.source_attr),
+								  result_collector=self.pipeline.get_result_collector(),
+								  concurrency_tuner=self.pipeline.get_concurrency_tuner('extract', self.pipeline.source_attr),
+								  retry_policy=self.pipeline.object_retry_policy)
+
+		results = executor.run(object_list, main_worker=self, on_completed=on_object_extracted)
+
+		# 7. remove output of failed objects, so it won't be loaded into the target
+		for object_name in executor.get_failed_objects(results):
+			self.f_handler.remove_dir(self.pipeline.output_object_dpath.format(object_name=object_name))
 
 		end_total_time = time.time()
+		executor.log_summary(results, end_total_time - start_total_time)
 		logger.info(f"Extract completed, duration: {round(end_total_time - start_total_time, 2)}s")
 
+		failed_objects = executor.get_failed_objects(results)
+		if len(failed_objects) > 0:
+			raise ExtractError(f"Extract of pipeline {self.pipeline.pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects)
+
+	def extract_object(self, object_name):
+		""" Extract a single object into the pipeline output directory.
+		"""
+		start_time = time.time()
+
+		if self.pipeline.object_assignment is not None:
+			if not self.pipeline.object_assignment.claim(self.pipeline, object_name):
+				return ObjectExecutor.SKIPPED
+
+			# replace only the output of this object, the other objects may belong to other nodes
+			self.f_handler.remove_dir(self.pipeline.output_object_dpath.format(object_name=object_name))
+			self.object_metadata.save_table_metadata(self.object_meta_dict.get(object_name))
+
+		elif self.pipeline.resume:
+			# remove staged files left by the interrupted run
+			self.f_handler.remove_dir(self.pipeline.output_object_data_dpath.format(object_name=object_name))
+
+		# an unchanged object is neither extracted nor loaded
+		if self.pipeline.change_detector is not None and self.pipeline.change_detector.skip_unchanged_object(object_name):
+			return ObjectExecutor.SKIPPED
+
+		# pause while the staged data exceeds max_staging_mb
+		if self.pipeline.staging_budget is not None:
+			self.pipeline.staging_budget.wait_for_space(object_name)
+
+		# 1. get all export scripts and store data into output directory
+		extractor_obj_conf = self.get_extractor_obj_conf(object_name)
+
+		# 2. run export data, or stage the captured changes of an object with load_mode: cdc
+		if self.change_capture.has_changes(object_name):
+			self.change_capture.write_changes(self, extractor_obj_conf)
+		else:
+			self.extract_to(extractor_obj_conf)
+
+		# 3. record the extracted object with the signatures of its staged files
+		self.pipeline.run_manifest.set_phase(object_name, 'extracted', extractor_obj_conf.get('output_data_object_dir'), duration=round(time.time() - start_time, 3),
+											 watermark=extractor_obj_conf.get('watermark'), fingerprint=self.get_source_fingerprint(object_name))
+
+		if self.pipeline.staging_budget is not None:
+			self.pipeline.staging_budget.add_object(object_name)
+
+	def create_worker(self):
+		""" Create an extractor of the same connector type with its own connection, used by parallel extraction.
+		"""
+		worker = self.__class__(self.pipeline)
+		worker.object_meta_dict = self.object_meta_dict
+		worker.change_capture = self.change_capture
+		return worker
+
+	def close_connection(self):
+		self.db_connector.close()
+
+	def reset_connection(self):
+		""" Called before a failed object is extracted again, the connector reconnects if the error dropped its connection. """
+		reconnect = getattr(self.db_connector, 'reconnect', None)
+		if reconnect is not None:
+			reconnect()
+
 	def execute_meta_query(self, meta_query):
 		""" compose and execute meta query and store result in json file """
 		logger.debug("Execute meta-query and create extract scripts")
@@ -107,6 +217,68 @@ class DBExtractor(ABC):
 			query_result = None
 		return query_result
 
+	def execute_object_size_query(self):
+		""" Execute the object size query and return estimated rows and bytes of each object.
+		The estimates are optional. If the connector has no object size query or it fails, the objects keep their order.
+		"""
+		if self.object_size_query_origin is None:
+			return None
+
+		object_size_query = self.compose_meta_query(self.object_size_query_origin)
+
+		try:
+			return self.get_object_size_result(object_size_query)
+		except (Exception, SystemExit) as err:
+			logger.warning(f"The estimated object sizes are not available for pipeline {self.pipeline.pipeline_name}: {err}")
+			return None
+
+	def get_object_size_dict(self):
+		micro_batch = self.pipeline.micro_batch
+		object_size_dict = micro_batch.get_object_size_dict(self.pipeline.source_name) if micro_batch is not None else None
+
+		if object_size_dict is None:
+			object_size_dict = self.object_metadata.compose_object_size_dict(self.execute_object_size_query())
+			if micro_batch is not None:
+				micro_batch.set_object_size_dict(self.pipeline.source_name, object_size_dict)
+
+		return object_size_dict
+
+	def explain_objects(self):
+		""" Run only the meta query and the object size query, nothing is extracted or saved.
+		Returns the objects in the order of extraction and their estimated sizes, used by explain.
+		"""
+		meta_query_result = self.execute_meta_query(self.compose_meta_query())
+		object_size_dict = self.object_metadata.compose_object_size_dict(self.execute_object_size_query())
+		object_meta_dict = self.object_metadata.compose_object_meta_dict(meta_query_result, object_size_dict)
+		object_list = self.object_scheduler.order_by_size(list(object_meta_dict.keys()), object_size_dict)
+
+		return object_list, object_size_dict
+
+	def get_object_fingerprint_dict(self):
+		""" Returns the change signals of each object as {object_name: {signal: value}}, used by the ChangeDetector.
+		If the connector has no object fingerprint query or it fails, all objects are extracted.
+		"""
+		if self.object_fingerprint_query_origin is None:
+			logger.info(f"The connector {self.pipeline.source_connector_id} has no change signals, all objects are extracted")
+			return {}
+
+		object_fingerprint_query = self.compose_meta_query(self.object_fingerprint_query_origin)
+
+		try:
+			query_result = self.get_object_size_result(object_fingerprint_query) or []
+		except (Exception, SystemExit) as err:
+			logger.warning(f"The change signals are not available for pipeline {self.pipeline.pipeline_name}, all objects are extracted: {err}")
+			return {}
+
+		return {row.get('source_object_name'): {key: value for key, value in row.items() if key != 'source_object_name'} for row in query_result}
+
+	def get_source_fingerprint(self, object_name):
+		change_detector = self.pipeline.change_detector
+		return change_detector.get_source_fingerprint(object_name) if change_detector is not None else None
+
+	def get_object_size_result(self, object_size_query):
+		return self.get_query_result(object_size_query)
+
 	def get_extractor_obj_conf(self, object_name) ->dict:
 
 		extractor_obj_conf = {'object_name': object_name}
@@ -126,11 +298,22 @@ class DBExtractor(ABC):
 		data_object = self.get_data_object(object_name)
 		logger.debug(f"The object settings combined with default settings: {data_object.object_settings}")
 		extractor_obj_conf.update({'object_settings': data_object.object_settings})
+		extractor_obj_conf.update({'load_batch_size': data_object.load_batch_size})
+
+		# an incremental object extracts only the rows above its high-water mark
+		extractor_obj_conf.update(self.compose_incremental_window(data_object, extractor_obj_conf))
+
+		# an object with load_mode: cdc stages the column petaly_op and records the position of the change stream, its initial snapshot inserts all rows
+		if data_object.load_mode == 'cdc':
+			extractor_obj_conf.update({'column_list': extractor_obj_conf.get('column_list') + ", " + self.compose_change_op_column('I')})
+			extractor_obj_conf.update({'watermark': self.change_capture.get_change_window(object_name)})
 
 		# blob-prefix, used for storage in cloud services (e.g. Redshift (s3), Bigquery (GCS))
+		# if the pipeline has several sources, each source uses its own path
+		bucket_object_name = object_name if self.pipeline.source_name is None else f"{object_name}/{self.pipeline.source_name}"
 		blob_prefix = self.composer.compose_bucket_object_path(self.pipeline.source_attr.get('bucket_pipeline_prefix'),
 																self.pipeline.pipeline_name,
-																object_name)
+																bucket_object_name)
 		extractor_obj_conf.update({'blob_prefix': blob_prefix})
 
 		# 4. load stmt_extract_to.txt and transform it in later stage
@@ -155,8 +338,61 @@ class DBExtractor(ABC):
 		logger.debug(f"Config for data extract: {extractor_obj_conf}")
 		return extractor_obj_conf
 
-	def compose_meta_query(self):
+	def compose_incremental_window(self, data_object, extractor_obj_conf) -> dict:
+		""" Returns the where_clause of the extract query and the low and high mark of the extracted rows.
+		The rows above the stored mark up to the current maximum of column_for_incremental_load are extracted,
+		so rows added during the extraction are left for the next run. Without a stored mark, all rows up to the maximum are extracted.
+		"""
+		if not data_object.has_incremental_extract():
+			return {'where_clause': '', 'watermark': None}
+
+		object_name = extractor_obj_conf.get('object_name')
+		column_name = self.db_connector.metaquery_quote + data_object.column_for_incremental_load + self.db_connector.metaquery_quote
+
+		low_watermark = self.pipeline.watermark_store.get_watermark(object_name, self.pipeline.source_name)
+		if low_watermark is not None:
+			low_watermark = {'value': low_watermark.get('value'), 'is_number': low_watermark.get('is_number')}
+
+		high_watermark = WatermarkStore.compose_watermark(self.get_high_watermark(column_name, extractor_obj_conf))
+
+		conditions = []
+		if low_watermark is not None:
+			conditions.append(f"{column_name} > {WatermarkStore.compose_literal(low_watermark)}")
+		if high_watermark is not None:
+			conditions.append(f"{column_name} <= {WatermarkStore.compose_literal(high_watermark)}")
+
+		if low_watermark is None:
+			logger.info(f"Object {object_name} has no high-water mark yet, all rows are extracted")
+		else:
+			logger.info(f"Object {object_name} extracts the rows with {data_object.column_for_incremental_load} above {low_watermark.get('value')}")
+
+		# an empty table keeps the previous mark
+		if high_watermark is None:
+			high_watermark = low_watermark
+
+		return {'where_clause': self.compose_where_clause(conditions), 'watermark': {'low': low_watermark, 'high': high_watermark}}
+
+	def compose_where_clause(self, conditions):
+		return 'WHERE ' + ' AND '.join(conditions) if len(conditions) > 0 else ''
+
+	def get_high_watermark(self, column_name, extractor_obj_conf):
+		""" Returns the current maximum of column_for_incremental_load, or None if the table is empty. """
+		watermark_query = f"SELECT MAX({column_name}) AS high_watermark FROM {self.compose_source_table_ref(extractor_obj_conf)}"
+		logger.debug(f"High-water mark query: {watermark_query}")
+
+		# like the object sizes, the mark is read with a plain query of the source
+		query_result = self.get_object_size_result(watermark_query)
+		if not query_result:
+			return None
+
+		return query_result[0].get('high_watermark')
+
+	def compose_source_table_ref(self, extractor_obj_conf):
+		return f"{extractor_obj_conf.get('source_schema_name')}.{extractor_obj_conf.get('source_object_name')}"
+
+	def compose_meta_query(self, query_origin=None):
 		""" Its compose a meta query by using a meta query file and adding schema, tables and column definitions
+		The optional query_origin is used instead of the meta query file, e.g. for the object size query.
 
 		:return:
 		"""
@@ -167,8 +403,7 @@ class DBExtractor(ABC):
 		else:
 
 			if len(self.pipeline.data_objects)==0:
-				logger.warning(f"Pipeline {self.pipeline.pipeline_name} in {self.pipeline.pipeline_fpath} wasn't specified properly. If data_objects_spec_mode is set to \"only\" the data_objects_spec: [] should has at least one object specification")
-				sys.exit()
+				raise ConfigError(f"Pipeline {self.pipeline.pipeline_name} in {self.pipeline.pipeline_fpath} wasn't specified properly. If data_objects_spec_mode is set to \"only\" the data_objects_spec: [] should has at least one object specification")
 
 			table_stmt = 'AND tb.table_name IN ({tbl_list})'
 			table_string = ''
@@ -183,12 +418,14 @@ class DBExtractor(ABC):
 
 		if source_schema is None:
 			if self.f_handler.check_dict_key_exist(self.pipeline.source_attr, 'database_schema'):
-				logger.warning(f"A source database schema wasn't specified. To continue, specify database_schema in pypeline.yaml ")
-				sys.exit()
+				raise ConfigError(f"A source database schema wasn't specified. To continue, specify database_schema in pypeline.yaml ")
 
 			source_schema = self.pipeline.source_attr.get('database_name')
 
-		meta_query = self.query_origin.format(schema=source_schema, table_statement_list=table_stmt)
+		if query_origin is None:
+			query_origin = self.query_origin
+
+		meta_query = query_origin.format(schema=source_schema, table_statement_list=table_stmt)
 
 		logger.debug(f"Meta Query:\n {meta_query}")
 
@@ -218,6 +455,10 @@ class DBExtractor(ABC):
 
 			column_list = column_list.rstrip(',')
 
+			# if the pipeline has several sources, the optional source_name_column records the source of each row
+			if self.pipeline.source_name is not None and self.pipeline.source_name_column is not None:
+				column_list += ", " + self.compose_source_name_column(self.pipeline.source_name, self.pipeline.source_name_column)
+
 			extract_obj_conf.update({
 								 'source_schema_name':dict_obj['source_schema_name'],
 								 'source_object_name':dict_obj['source_object_name'],
@@ -225,5 +466,15 @@ class DBExtractor(ABC):
 
 			return extract_obj_conf
 
+	def compose_source_name_column(self, source_name, column_name):
+		""" Returns the source name as a constant column of the extract query.
+		"""
+		return f"'{source_name}' AS {self.db_connector.metaquery_quote}{column_name}{self.db_connector.metaquery_quote}"
+
+	def compose_change_op_column(self, op):
+		""" Returns the operation of load_mode: cdc as a constant column of the extract query.
+		"""
+		return self.compose_source_name_column(op, DataObject.change_op_column)
+
 	def get_data_object(self, object_name):
 		return DataObject(self.pipeline, object_name)
@@ -15,6 +15,7 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import os
 import time
 from abc import ABC, abstractmethod
 from petaly.core.composer import Composer
@@ -23,9 +24,15 @@ from petaly.utils.file_handler import FileHandler
 from petaly.core.type_mapping import TypeMapping
 from petaly.core.object_metadata import ObjectMetadata
 from petaly.core.data_object import DataObject
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.object_scheduler import ObjectScheduler
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.exceptions import ConfigError, LoadError
 
 
 class DBLoader(ABC):
+    # the staging table of load_mode: merge and cdc is created next to the destination table and dropped after the merge
+    merge_staging_suffix = '_petaly_staging'
 
     def __init__(self, pipeline):
         self.pipeline = pipeline
@@ -34,9 +41,8 @@ class DBLoader(ABC):
         self.m_conf = pipeline.m_conf
         self.object_metadata = ObjectMetadata(pipeline)
         self.type_mapping = TypeMapping(self.pipeline)
-        if self.m_conf.set_loader_paths(self.pipeline.target_connector_id):
-            self.connector_load_from_stmt_fpath = self.m_conf.connector_load_from_stmt_fpath
-            self.connector_create_table_stmt_fpath = self.m_conf.connector_create_table_stmt_fpath
+        self.object_scheduler = ObjectScheduler(pipeline)
+        self.connector_load_from_stmt_fpath, self.connector_create_table_stmt_fpath = self.m_conf.get_loader_paths(self.pipeline.target_connector_id)
 
     @abstractmethod
     def load_from(self, object_load_conf):
@@ -54,27 +60,84 @@ class DBLoader(ABC):
     def load_data(self):
         """  Load data into Database. Recreate table if parameter recreate_table=True. """
 
-        logger.info(f"[--- Load into {self.pipeline.target_connector_id} ---]")
+        target_name = f" as {self.pipeline.target_name}" if self.pipeline.target_name is not None else ''
+        logger.info(f"[--- Load into {self.pipeline.target_connector_id}{target_name} ---]")
         start_total_time = time.time()
-        # 1. get and run all objects
+        # 1. get all objects
         object_list = self.composer.get_object_list_from_output_dir(self.pipeline)
+        if self.pipeline.resume:
+            object_list = self.pipeline.run_manifest.filter_unloaded_objects(object_list, self.pipeline.target_name)
+        object_list = self.object_scheduler.order_by_staged_size(object_list)
 
-        for object_name in object_list:
+        # 2. run load for each object, in parallel if max_parallel_objects > 1
+        executor = self.get_load_executor()
 
-            logger.info(f"Load object: {object_name} started...")
-            start_time = time.time()
+        results = executor.run(object_list, main_worker=self)
 
-            # 1. compose loader_obj_conf
-            loader_obj_conf = self.get_loader_obj_conf(object_name)
+        end_total_time = time.time()
+        executor.log_summary(results, end_total_time - start_total_time)
+        logger.info(f"Load completed, duration: {round(end_total_time - start_total_time, 2)}s")
 
-            # 2. load data into table
-            self.load_from(loader_obj_conf)
+        failed_objects = executor.get_failed_objects(results)
+        if len(failed_objects) > 0:
+            raise LoadError(f"Load of pipeline {self.pipeline.pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects)
 
-            end_time = time.time()
-            logger.info(f"Load object: {object_name} completed | time: {round(end_time - start_time, 2)}s")
+    def get_load_executor(self):
+        """ Returns the executor that runs load_object for each object. """
+        return ObjectExecutor(phase='load',
+                              object_func=lambda loader, object_name: loader.load_object(object_name),
+                              max_workers=self.pipeline.max_parallel_objects,
+                              create_worker=self.create_worker,
+                              connection_budget=ConnectionBudget.get_budget(self.pipeline.target_attr),
+                              result_collector=self.pipeline.get_result_collector(),
+                              concurrency_tuner=self.pipeline.get_concurrency_tuner('load', self.pipeline.target_attr),
+                              retry_policy=self.pipeline.object_retry_policy,
+                              priority_key=self.object_scheduler.get_priority_key)
 
-        end_total_time = time.time()
-        logger.info(f"Load completed, duration: {round(end_total_time - start_total_time, 2)}s")
+    def load_object(self, object_name):
+        """ Compose the load config for a single object, run DDL and load the data into the target table. """
+        start_time = time.time()
+        self.pipeline.prepare_target_data(object_name)
+
+        # 1. compose loader_obj_conf
+        loader_obj_conf = self.get_loader_obj_conf(object_name)
+
+        # 2. load data into table
+        self.load_from(loader_obj_conf)
+
+        # with load_mode: merge or cdc the data was loaded into the staging table, which is merged into the destination table
+        if loader_obj_conf.get('destination_ddl_dict') is not None:
+            self.merge_staged_object(loader_obj_conf)
+
+        if self.pipeline.micro_batch is not None:
+            self.pipeline.micro_batch.record_destination_schema(self.pipeline, object_name, loader_obj_conf.get('table_ddl_dict'))
+
+        # 3. record the loaded object, so a resumed run skips it
+        self.pipeline.run_manifest.set_phase(object_name, 'loaded', target_name=self.pipeline.target_name, duration=round(time.time() - start_time, 3))
+
+        # the high-water mark of an incremental object moves once it's loaded into all targets
+        self.pipeline.watermark_store.commit_loaded_object(object_name)
+
+        # the fingerprint of the source is stored once the object is loaded into all targets
+        if self.pipeline.change_detector is not None:
+            self.pipeline.change_detector.commit_loaded_object(object_name)
+
+        # with delete_staged_data, the staged data is deleted once the object is loaded into all targets
+        if self.pipeline.staging_budget is not None:
+            self.pipeline.staging_budget.release_object(object_name)
+
+    def create_worker(self):
+        """ Create a loader of the same connector type with its own connection, used by parallel load. """
+        return self.__class__(self.pipeline)
+
+    def close_connection(self):
+        self.db_connector.close()
+
+    def reset_connection(self):
+        """ Called before a failed object is loaded again, the connector reconnects if the error dropped its connection. """
+        reconnect = getattr(self.db_connector, 'reconnect', None)
+        if reconnect is not None:
+            reconnect()
 
     def get_loader_obj_conf(self, object_name) ->dict:
         loader_obj_conf = {}
@@ -95,13 +158,27 @@ class DBLoader(ABC):
         table_ddl_dict = self.compose_table_ddl(data_object, table_metadata)
         loader_obj_conf.update({'table_ddl_dict': table_ddl_dict})
 
+        # a merge loads into a staging table with the columns of the destination table
+        if data_object.has_merge_load():
+            loader_obj_conf.update(self.compose_merge_ddl(data_object, table_ddl_dict, table_metadata))
+
         # 4. object_spec and default_settings
         logger.debug(f"The object settings combined with default settings: {data_object.object_settings}")
         loader_obj_conf.update({'object_settings': data_object.object_settings})
 
-        if data_object.recreate_destination_object == True:
+        # the files loaded by a failed attempt are kept, the load continues with the failed file, see load_batches
+        resume_batches = len(self.pipeline.run_manifest.get_loaded_batches(object_name, self.pipeline.target_name)) > 0
+        loader_obj_conf.update({'resume_batches': resume_batches})
+
+        # an incremental or merged object keeps the rows of the previous runs, only its initial load recreates the table
+        if data_object.recreate_destination_object == True and not resume_batches and not self.keeps_destination_object(data_object, object_name):
             loader_obj_conf.update({'recreate_destination_object': True})
 
+        # a micro-batch loop doesn't create a table again, which it created in the previous iteration with the same columns
+        elif (not data_object.has_merge_load() and self.pipeline.micro_batch is not None
+              and self.pipeline.micro_batch.take_destination_schema(self.pipeline, object_name, table_ddl_dict)):
+            loader_obj_conf.update({'reuse_destination_object': True})
+
         # 5. compose statement load_from
         output_load_from_stmt_fpath = self.pipeline.output_load_from_stmt_fpath.format(object_name=object_name)
         loader_obj_conf.update({'load_from_stmt_fpath': output_load_from_stmt_fpath})
@@ -116,11 +193,157 @@ class DBLoader(ABC):
 
         return loader_obj_conf
 
+    def keeps_destination_object(self, data_object, object_name):
+        """ Returns True if the rows of the previous runs have to be kept: always for a merge of all rows,
+        and for an incremental extraction, once each source extracted the rows above a stored high-water mark.
+        """
+        if data_object.load_mode == 'full':
+            return False
+
+        if not data_object.has_incremental_extract() and data_object.load_mode != 'cdc':
+            return True
+
+        for source_pipeline in self.pipeline.get_source_pipelines():
+            extract_window = source_pipeline.run_manifest.get_object_entry(object_name).get('watermark') or {}
+            if extract_window.get('low') is None:
+                return False
+
+        return True
+
+    def prepare_destination_object(self, loader_obj_conf):
+        """ Drop the table if recreate_destination_object is set and create it, unless it's reused from the previous micro-batch iteration. """
+        destination_ddl_dict = loader_obj_conf.get('destination_ddl_dict')
+        if destination_ddl_dict is not None:
+            # a merge creates the destination table with its primary key and loads into an empty staging table
+            destination_obj_conf = dict(loader_obj_conf, table_ddl_dict=destination_ddl_dict)
+            if loader_obj_conf.get('recreate_destination_object') == True:
+                self.drop_table(destination_obj_conf)
+            self.create_table(destination_obj_conf)
+
+            if loader_obj_conf.get('resume_batches') != True:
+                self.drop_table(loader_obj_conf)
+            self.create_table(loader_obj_conf)
+            return
+
+        if loader_obj_conf.get('recreate_destination_object') == True:
+            self.drop_table(loader_obj_conf)
+
+        elif loader_obj_conf.get('reuse_destination_object') == True:
+            logger.debug(f"The table of object {loader_obj_conf.get('object_name')} is reused from the previous iteration")
+            return
+
+        self.create_table(loader_obj_conf)
+
+    def load_batches(self, object_name, file_list, load_file):
+        """ Load the files of the object one by one with load_file, each of them committed on its own, see load_batch_size.
+        Each loaded file is recorded in the run manifest, so a retried or resumed load continues with the failed file.
+        """
+        loaded_batches = self.pipeline.run_manifest.get_loaded_batches(object_name, self.pipeline.target_name)
+        file_list = sorted(file_list)
+
+        skipped_files = [data_fpath for data_fpath in file_list if os.path.basename(data_fpath) in loaded_batches]
+        if len(skipped_files) > 0:
+            logger.info(f"Object {object_name}: {len(skipped_files)} of {len(file_list)} files were already loaded and are skipped")
+
+        for data_fpath in file_list:
+            batch_name = os.path.basename(data_fpath)
+            if batch_name in loaded_batches:
+                continue
+
+            load_file(data_fpath)
+            self.pipeline.run_manifest.add_loaded_batch(object_name, batch_name, self.pipeline.target_name)
+
+    def compose_merge_ddl(self, data_object, table_ddl_dict, table_metadata) -> dict:
+        """ Returns the DDL of the destination table with the primary key of the source as destination_ddl_dict,
+        and the DDL of the staging table as table_ddl_dict, into which the files are loaded.
+        """
+        primary_key_columns = table_ddl_dict.get('primary_key_columns')
+        if len(primary_key_columns) == 0:
+            raise ConfigError(f"The object {data_object.object_name} has load_mode: {data_object.load_mode}, but its source has no primary key.")
+
+        destination_ddl_dict = dict(table_ddl_dict)
+        destination_ddl_dict.update({'column_datatype_list': table_ddl_dict.get('column_datatype_list') + ",\n" + self.compose_primary_key_constraint(primary_key_columns)})
+
+        create_table_stmt_fpath = table_ddl_dict.get('create_table_stmt_fpath')
+        staging_ddl_dict = dict(table_ddl_dict)
+        staging_ddl_dict.update({'table_name': f"{table_ddl_dict.get('table_name')}{self.merge_staging_suffix}",
+                                 'create_table_stmt_fpath': create_table_stmt_fpath.replace(self.m_conf.create_table_stmt_fname, 'create_staging_table_stmt.sql'),
+                                 'merge_stmt_fpath': create_table_stmt_fpath.replace(self.m_conf.create_table_stmt_fname, 'merge_stmt.sql')})
+
+        # the staged changes of load_mode: cdc have the column petaly_op, the deleted rows have only the values of the primary key,
+        # so all columns of the staging table are nullable
+        if data_object.load_mode == 'cdc':
+            nullable_ddl_dict = self.compose_table_ddl(data_object, table_metadata, nullable_columns=True)
+            staging_ddl_dict.update({'column_datatype_list': nullable_ddl_dict.get('column_datatype_list') + ",\n" + self.compose_change_op_column(),
+                                     'column_list': table_ddl_dict.get('column_list') + ",\n" + DataObject.change_op_column,
+                                     'apply_deletes': True})
+
+        return {'destination_ddl_dict': destination_ddl_dict, 'table_ddl_dict': staging_ddl_dict}
+
+    def compose_change_op_column(self):
+        return f"{DataObject.change_op_column} VARCHAR(1)"
+
+    def compose_primary_key_constraint(self, primary_key_columns):
+        return f"PRIMARY KEY ({', '.join(primary_key_columns)})"
+
+    def merge_staged_object(self, loader_obj_conf):
+        """ Merge the staging table into the destination table in one statement and drop the staging table.
+        With load_mode: cdc, the deleted rows are removed first.
+        """
+        staging_ddl_dict = loader_obj_conf.get('table_ddl_dict')
+        destination_ddl_dict = loader_obj_conf.get('destination_ddl_dict')
+
+        merge_stmt = self.compose_merge_stmt(self.get_schema_table_name(destination_ddl_dict),
+                                             self.get_schema_table_name(staging_ddl_dict),
+                                             destination_ddl_dict.get('column_names'),
+                                             destination_ddl_dict.get('primary_key_columns'))
+
+        # with load_mode: cdc the deleted rows are removed from the destination table and the staging table before the merge
+        delete_stmt_list = []
+        if staging_ddl_dict.get('apply_deletes') == True:
+            delete_stmt_list.append(self.compose_delete_stmt(self.get_schema_table_name(destination_ddl_dict),
+                                                             self.get_schema_table_name(staging_ddl_dict),
+                                                             destination_ddl_dict.get('primary_key_columns')))
+            delete_stmt_list.append(f"DELETE FROM {self.get_schema_table_name(staging_ddl_dict)} WHERE {DataObject.change_op_column} = 'D';")
+
+        self.f_handler.save_file(staging_ddl_dict.get('merge_stmt_fpath'), "\n\n".join(delete_stmt_list + [merge_stmt]))
+
+        for stmt in delete_stmt_list + [merge_stmt]:
+            logger.debug(f"Statement to execute:\n{stmt}")
+            self.db_connector.merge_from(stmt)
+        self.drop_table(loader_obj_conf)
+
+    def compose_merge_stmt(self, destination_table, staging_table, column_names, primary_key_columns):
+        """ Returns a MERGE statement, which updates the rows with a matching primary key and inserts the others. """
+        update_columns = self.get_merge_update_columns(column_names, primary_key_columns)
+
+        return (f"MERGE INTO {destination_table} AS t\n"
+                f"USING {staging_table} AS s\n"
+                f"ON {' AND '.join(f't.{column} = s.{column}' for column in primary_key_columns)}\n"
+                f"WHEN MATCHED THEN UPDATE SET {', '.join(f'{column} = s.{column}' for column in update_columns)}\n"
+                f"WHEN NOT MATCHED THEN INSERT ({', '.join(column_names)}) VALUES ({', '.join(f's.{column}' for column in column_names)});")
+
+    def compose_delete_stmt(self, destination_table, staging_table, primary_key_columns):
+        """ Returns a DELETE statement, which deletes the rows whose primary key is staged with petaly_op D. """
+        return (f"DELETE FROM {destination_table} AS t\n"
+                f"WHERE EXISTS (SELECT 1 FROM {staging_table} AS s\n"
+                f"WHERE s.{DataObject.change_op_column} = 'D' AND {' AND '.join(f't.{column} = s.{column}' for column in primary_key_columns)});")
+
+    def get_merge_update_columns(self, column_names, primary_key_columns):
+        """ Returns the columns updated on a matching primary key. A table of key columns only sets the key again. """
+        update_columns = [column for column in column_names if column not in primary_key_columns]
+        return update_columns if len(update_columns) > 0 else primary_key_columns
+
+    def get_schema_table_name(self, table_ddl_dict):
+        return f"{table_ddl_dict.get('schema_name')}.{table_ddl_dict.get('table_name')}"
+
     def get_data_object(self, object_name):
         return DataObject(self.pipeline, object_name)
 
-    def compose_table_ddl(self, data_object, table_metadata: dict) -> (dict):
-        """ Its composes statement for create table command by using table_metadata dictionary. """
+    def compose_table_ddl(self, data_object, table_metadata: dict, nullable_columns=False) -> (dict):
+        """ Its composes statement for create table command by using table_metadata dictionary.
+        With nullable_columns, the columns are created without NOT NULL, e.g. for the staging table of load_mode: cdc.
+        """
 
         object_name = data_object.object_name
         table_name = data_object.destination_object_name
@@ -147,13 +370,16 @@ class DBLoader(ABC):
         type_mapping = self.type_mapping.get_type_mapping()
         column_list = ""
         column_datatype_list = ""
+        column_names = []
         primary_key = ''
+        primary_key_columns = []
 
         # loop each line
         for i, column_meta in enumerate(columns_meta_arr):
 
             column_name = self.db_connector.metaquery_quote + self.composer.normalise_column_name(column_meta.get('column_name')) + self.db_connector.metaquery_quote
             column_list += column_name
+            column_names.append(column_name)
 
             column_datatype_list += column_name
             column_type = type_mapping.get(column_meta.get('data_type'))
@@ -165,11 +391,12 @@ class DBLoader(ABC):
                               )
 
             column_datatype_list += " " + column_type
-            mode = ' NOT NULL' if column_meta.get('is_nullable') == 'NO' else ''
+            mode = ' NOT NULL' if column_meta.get('is_nullable') == 'NO' and not nullable_columns else ''
             column_datatype_list += mode
 
             if column_meta.get('primary_key') != None:
                 primary_key += column_meta.get('primary_key') + ','
+                primary_key_columns.append(column_name)
 
             column_datatype_list += ",\n"
             column_list  += ",\n"
@@ -185,6 +412,7 @@ class DBLoader(ABC):
 
         create_table_stmt_fpath = self.pipeline.output_create_table_stmt_fpath.format(object_name=object_name)
         table_ddl_dict.update({'column_datatype_list':column_datatype_list, 'primary_key':primary_key, 'column_list':column_list})
+        table_ddl_dict.update({'column_names': column_names, 'primary_key_columns': primary_key_columns})
         table_ddl_dict.update({'create_table_stmt_fpath': create_table_stmt_fpath, 'create_table_stmt': connector_create_table_stmt_fpath})
 
         logger.debug(f"The DDL for table: {schema_table_name} was composed")
@@ -0,0 +1,132 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import time
+
+from petaly.core.object_scheduler import ObjectScheduler
+
+
+class DeadlineMonitor():
+    """ DeadlineMonitor warns early, if an object with a deadline in its object_spec is projected to land after it.
+    Each time an object is extracted or loaded, the remaining work of the objects scheduled before and with the object is projected
+    with the throughput observed so far in this run. The work of an object is its bytes once for the extraction and once for each target.
+    Objects that aren't extracted yet count with the average bytes of the extracted objects.
+    """
+
+    def __init__(self, pipeline, object_scheduler):
+        self.pipeline = pipeline
+        self.object_scheduler = object_scheduler
+        self.start_time = time.time()
+        self.processed_bytes = 0
+        self.warned_objects = set()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """ Returns the monitor of the pipeline, or None if no object has a deadline. """
+        object_scheduler = ObjectScheduler(pipeline)
+
+        if len([object_name for object_name in object_scheduler.object_schedule if object_scheduler.get_deadline(object_name) is not None]) == 0:
+            return None
+
+        return DeadlineMonitor(pipeline, object_scheduler)
+
+    def start(self):
+        """ Called as the run starts. Warn immediately for the objects, whose deadline passed already,
+        e.g. a deadline 06:00 of a run started at 07:00. An object loaded by the resumed run isn't missed.
+        """
+        with self.lock:
+            self.start_time = time.time()
+
+            for object_name in self.pipeline.data_objects:
+                deadline = self.object_scheduler.get_deadline(object_name)
+                if deadline is None or deadline >= self.start_time:
+                    continue
+
+                if self.pipeline.resume and self.pipeline.run_manifest.is_loaded(object_name):
+                    continue
+
+                self.warn_missed_deadline(object_name, deadline)
+
+    def warn_missed_deadline(self, object_name, deadline):
+        deadline_text = time.strftime('%Y-%m-%d %H:%M', time.localtime(deadline))
+        logger.warning(f"Object {object_name} missed its deadline {deadline_text}")
+        self.warned_objects.add(object_name)
+
+    def add_result(self, result):
+        """ Result collector of the executors. Add the bytes of a processed object to the throughput and check the deadlines.
+        """
+        if result.get('phase') not in ('extract', 'load') or result.get('status') != 'completed':
+            return
+
+        object_bytes = self.get_object_bytes(result.get('object_name'))
+
+        with self.lock:
+            self.processed_bytes += object_bytes or 0
+            self.check_deadlines()
+
+    def get_object_bytes(self, object_name):
+        """ Returns the bytes recorded in the run manifest at extraction, or None if the object isn't extracted yet. """
+        return self.pipeline.run_manifest.get_object_entry(object_name).get('bytes')
+
+    def get_remaining_bytes(self, object_name, average_bytes):
+        """ Returns the bytes the object still has to be extracted and loaded. """
+        run_manifest = self.pipeline.run_manifest
+        object_bytes = self.get_object_bytes(object_name)
+        object_bytes = object_bytes if object_bytes is not None else average_bytes
+
+        remaining_bytes = 0 if run_manifest.has_reached(object_name, 'extracted') else object_bytes
+        for target_name in self.pipeline.get_target_names():
+            if not run_manifest.is_loaded(object_name, target_name):
+                remaining_bytes += object_bytes
+
+        return remaining_bytes
+
+    def check_deadlines(self):
+        """ Warn once per object, if its deadline passed or is projected to be missed. """
+        now = time.time()
+        elapsed_time = now - self.start_time
+        if self.processed_bytes == 0 or elapsed_time <= 0:
+            return
+
+        throughput = self.processed_bytes / elapsed_time
+        object_list = self.pipeline.data_objects
+        extracted_bytes = [self.get_object_bytes(object_name) for object_name in object_list if self.get_object_bytes(object_name) is not None]
+        average_bytes = sum(extracted_bytes) / len(extracted_bytes) if len(extracted_bytes) > 0 else 0
+        remaining_bytes = {object_name: self.get_remaining_bytes(object_name, average_bytes) for object_name in object_list}
+
+        for object_name in object_list:
+            deadline = self.object_scheduler.get_deadline(object_name)
+            if deadline is None or object_name in self.warned_objects or remaining_bytes.get(object_name) == 0:
+                continue
+
+            if now > deadline:
+                self.warn_missed_deadline(object_name, deadline)
+                continue
+
+            # the objects scheduled before and with the object have to be processed first
+            priority_key = self.object_scheduler.get_priority_key(object_name)
+            scheduled_bytes = sum(remaining_bytes.get(name) for name in object_list if self.object_scheduler.get_priority_key(name) <= priority_key)
+            projected_time = now + scheduled_bytes / throughput
+
+            if projected_time > deadline:
+                deadline_text = time.strftime('%Y-%m-%d %H:%M', time.localtime(deadline))
+                projected_text = time.strftime('%Y-%m-%d %H:%M', time.localtime(projected_time))
+                logger.warning(f"Object {object_name} is projected to miss its deadline {deadline_text}, it's expected to land at {projected_text}"
+                               f" with the current throughput of {round(throughput / 1024 / 1024, 2)} MB/s")
+                self.warned_objects.add(object_name)
@@ -0,0 +1,48 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+class PetalyError(Exception):
+    """ Base class of the errors raised by Petaly. The CLI logs the message and exits with code 1.
+    An error raised by petaly.run carries the RunResult of the failed run in the attribute result.
+    If only some objects failed, failed_objects lists them, the other objects were processed.
+    """
+    def __init__(self, message, result=None, failed_objects=None):
+        super().__init__(message)
+        self.result = result
+        self.failed_objects = failed_objects
+
+
+class ConfigError(PetalyError):
+    """ The petaly.ini, a pipeline.yaml or a run argument is not valid. """
+
+
+class PipelineNotFoundError(ConfigError):
+    """ The pipeline doesn't exist in the pipeline directory. """
+
+
+class ConnectorError(PetalyError):
+    """ A connector can't connect to its endpoint or a statement on the endpoint failed. """
+
+
+class ExtractError(PetalyError):
+    """ The extraction of an object or a source failed. """
+
+
+class LoadError(PetalyError):
+    """ The load of an object or a target failed. """
+
+
+class RunError(PetalyError):
+    """ The run completed, but some objects failed. The failed objects are listed in result. """
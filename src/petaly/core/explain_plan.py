@@ -0,0 +1,167 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+from petaly.core.db_extractor import DBExtractor
+from petaly.core.exceptions import ConfigError
+
+
+class ExplainPlan():
+    """ ExplainPlan estimates a run of a pipeline without extracting anything, used by explain.
+    Only the meta query and the object size query run on the source. The expected duration is based on the throughput
+    measured by the previous run and recorded in the run manifest, without a previous run it isn't available.
+    """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.m_conf = pipeline.m_conf
+
+    def compose_plan(self):
+        """ Returns the estimated rows, bytes, staging disk and duration of each object in the order of extraction, and their totals.
+        """
+        object_list = None
+        object_size_dict = {}
+        source_pipelines = self.pipeline.get_source_pipelines()
+
+        for source_pipeline in source_pipelines:
+            source_object_list, source_size_dict = self.explain_source(source_pipeline)
+
+            # several sources with the same schema are combined, so their sizes add up
+            if object_list is None:
+                object_list = source_object_list
+
+            for object_name, object_size in source_size_dict.items():
+                combined_size = object_size_dict.setdefault(object_name, {'estimated_rows': None, 'estimated_bytes': None})
+                for key in combined_size.keys():
+                    value = self.to_estimate(object_size.get(key))
+                    if value is not None:
+                        combined_size.update({key: (combined_size.get(key) or 0) + value})
+
+        measured_dict = self.get_measured_dict(source_pipelines)
+        avg_rows_per_second, avg_bytes_per_row = self.compose_average_throughput(measured_dict.values())
+
+        object_plan_list = []
+        for object_name in object_list:
+            object_size = object_size_dict.get(object_name) or {}
+            measured = measured_dict.get(object_name)
+            rows_per_second, bytes_per_row = self.compose_average_throughput([measured] if measured is not None else [])
+
+            object_plan_list.append(self.compose_object_plan(object_name,
+                                                             object_size.get('estimated_rows'),
+                                                             object_size.get('estimated_bytes'),
+                                                             measured,
+                                                             rows_per_second or avg_rows_per_second,
+                                                             bytes_per_row or avg_bytes_per_row))
+
+        return {'pipeline_name': self.pipeline.pipeline_name,
+                'max_parallel_objects': self.pipeline.max_parallel_objects,
+                'objects': object_plan_list,
+                'estimated_rows': self.sum_known(object_plan.get('estimated_rows') for object_plan in object_plan_list),
+                'estimated_bytes': self.sum_known(object_plan.get('estimated_bytes') for object_plan in object_plan_list),
+                'staging_bytes': self.sum_known(object_plan.get('staging_bytes') for object_plan in object_plan_list),
+                'expected_duration': self.compose_expected_duration([object_plan.get('expected_duration') for object_plan in object_plan_list])}
+
+    def explain_source(self, source_pipeline):
+        """ Run the meta query and the object size query of a source. Only database sources have these queries.
+        """
+        extractor_class_obj = self.m_conf.get_extractor_class(source_pipeline.source_connector_id)
+
+        if extractor_class_obj is None or not issubclass(extractor_class_obj, DBExtractor):
+            raise ConfigError(f"Explain is supported for database sources only, the pipeline {self.pipeline.pipeline_name} extracts from {source_pipeline.source_connector_id}.")
+
+        extractor = extractor_class_obj(source_pipeline)
+        try:
+            return extractor.explain_objects()
+        finally:
+            extractor.close_connection()
+
+    def get_measured_dict(self, source_pipelines):
+        """ Returns the rows, bytes and durations of the objects extracted and loaded by the previous run.
+        The sources of a pipeline extract at the same time, so the longest source and the longest target count.
+        """
+        measured_dict = {}
+        target_entries = (self.pipeline.run_manifest.manifest or {}).get('objects', {})
+
+        for source_pipeline in source_pipelines:
+            for object_name, object_entry in ((source_pipeline.run_manifest.manifest or {}).get('objects', {})).items():
+                if object_entry.get('duration') is None or object_entry.get('rows') is None:
+                    continue
+
+                measured = measured_dict.setdefault(object_name, {'rows': 0, 'bytes': 0, 'extract_duration': 0, 'load_duration': 0})
+                measured.update({'rows': measured.get('rows') + object_entry.get('rows'),
+                                 'bytes': measured.get('bytes') + (object_entry.get('bytes') or 0),
+                                 'extract_duration': max(measured.get('extract_duration'), object_entry.get('duration'))})
+
+        for object_name, measured in measured_dict.items():
+            load_durations = (target_entries.get(object_name) or {}).get('load_durations') or {}
+            measured.update({'load_duration': max(load_durations.values(), default=0)})
+
+        return measured_dict
+
+    def compose_average_throughput(self, measured_list):
+        """ Returns the rows per second and bytes per row of the measured objects, or None if nothing was measured.
+        """
+        rows = sum(measured.get('rows') for measured in measured_list)
+        bytes_ = sum(measured.get('bytes') for measured in measured_list)
+        duration = sum(measured.get('extract_duration') + measured.get('load_duration') for measured in measured_list)
+
+        rows_per_second = rows / duration if rows > 0 and duration > 0 else None
+        bytes_per_row = bytes_ / rows if rows > 0 else None
+        return rows_per_second, bytes_per_row
+
+    def compose_object_plan(self, object_name, estimated_rows, estimated_bytes, measured, rows_per_second, bytes_per_row):
+        # the staged csv files are usually smaller than the table on the source, so the measured bytes per row are preferred
+        staging_bytes = estimated_bytes
+        if estimated_rows is not None and bytes_per_row is not None:
+            staging_bytes = round(estimated_rows * bytes_per_row)
+
+        expected_duration = None
+        if estimated_rows is not None and rows_per_second is not None:
+            expected_duration = round(estimated_rows / rows_per_second, 2)
+        elif measured is not None:
+            expected_duration = round(measured.get('extract_duration') + measured.get('load_duration'), 2)
+
+        return {'object_name': object_name,
+                'estimated_rows': estimated_rows,
+                'estimated_bytes': estimated_bytes,
+                'staging_bytes': staging_bytes,
+                'expected_duration': expected_duration,
+                'measured': measured is not None}
+
+    def compose_expected_duration(self, duration_list):
+        """ Returns the expected duration of the run, if up to max_parallel_objects run at the same time.
+        Each object starts on the first free worker in the order of extraction, like ObjectExecutor does.
+        """
+        known_durations = [duration for duration in duration_list if duration is not None]
+        if len(known_durations) == 0:
+            return None
+
+        worker_durations = [0] * max(1, self.pipeline.max_parallel_objects)
+        for duration in known_durations:
+            worker_index = worker_durations.index(min(worker_durations))
+            worker_durations[worker_index] += duration
+
+        return round(max(worker_durations), 2)
+
+    def to_estimate(self, value):
+        # some databases return a negative estimate for tables, which were never analyzed
+        if value is None or value < 0:
+            return None
+        return value
+
+    def sum_known(self, values):
+        known_values = [value for value in values if value is not None]
+        return sum(known_values) if len(known_values) > 0 else None
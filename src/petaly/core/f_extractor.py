@@ -18,7 +18,6 @@ logger = logging.getLogger(__name__)
 from abc import ABC, abstractmethod
 
 import os
-import sys
 import time
 from pyarrow import csv, parquet, lib as pyarrow_lib
 
@@ -26,15 +25,22 @@ from petaly.core.composer import Composer
 from petaly.utils.file_handler import FileHandler
 from petaly.core.object_metadata import ObjectMetadata
 from petaly.core.data_object import DataObject
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.object_scheduler import ObjectScheduler
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.exceptions import ConfigError, ExtractError
 
 
 class FExtractor(ABC):
+    # the files are extracted as they are, without an additional column for the source name
+    supports_source_name_column = False
 
     def __init__(self, pipeline):
         self.pipeline = pipeline
         self.composer = Composer()
         self.f_handler = FileHandler()
         self.object_metadata = ObjectMetadata(pipeline)
+        self.object_scheduler = ObjectScheduler(pipeline)
         self.object_default_settings = pipeline.data_attributes.get("object_default_settings")
         pass
 
@@ -42,38 +48,157 @@ class FExtractor(ABC):
     def extract_to(self, extractor_obj_conf):
         pass
 
-    def extract_data(self):
+    def extract_data(self, on_object_extracted=None):
         """ Its export data as csv into pipeline output directory.
+        The optional on_object_extracted function is called with the object_name as soon as an object is extracted.
         """
 
         logger.info(f"[--- Extract from {self.pipeline.source_connector_id} ---]")
         start_total_time = time.time()
 
-        # 1. save metadata and export scripts
+        # 1. get objects, start with the largest source files
         object_list = self.pipeline.data_objects
+        if self.pipeline.object_assignment is not None:
+            object_list = self.pipeline.object_assignment.filter_objects(self.pipeline, object_list)
 
-        # 2. run loop for each object
-        for object_name in object_list:
-            logger.info(f"Extract object: {object_name} started...")
-            start_time = time.time()
+        object_list = self.object_scheduler.order_by_size(object_list, self.get_object_size_dict(object_list))
 
-            extractor_obj_conf = self.get_extractor_obj_conf(object_name)
+        # the fingerprints are taken before the extraction, so changes made during the run are extracted by the next run
+        change_detector = self.pipeline.change_detector
+        if change_detector is not None:
+            change_detector.read_stored_fingerprints()
+            change_detector.set_source_fingerprints(self.get_object_fingerprint_dict(object_list))
 
-            # 3. cleanup pipeline directory before run
-            self.f_handler.cleanup_dir(extractor_obj_conf.get('output_data_object_dir'))
+        object_list = self.pipeline.run_manifest.prepare_extract(object_list, self.pipeline.resume, on_object_extracted)
 
-            file_list = self.extract_to(extractor_obj_conf)
+        # 2. run extraction for each object, in parallel if max_parallel_objects > 1
+        executor = ObjectExecutor(phase='extract',
+                                  object_func=lambda extractor, object_name: extractor.extract_object(object_name),
+                                  max_workers=self.pipeline.max_parallel_objects,
+                                  create_worker=self.create_worker,
+                                  connection_budget=ConnectionBudget.get_budget(self.pipeline.source_attr),
+                                  result_collector=self.pipeline.get_result_collector(),
+                                  concurrency_tuner=self.pipeline.get_concurrency_tuner('extract', self.pipeline.source_attr),
+                                  retry_policy=self.pipeline.object_retry_policy)
 
-            connector_category = self.pipeline.m_conf.get_connector_category(self.pipeline.target_connector_id)
-            if connector_category in ('database'):
-                self.extract_metadata_from_file(file_list[0], object_name, self.file_format)
+        results = executor.run(object_list, main_worker=self, on_completed=on_object_extracted)
 
-            end_time = time.time()
-            logger.info(f"Extract object: {object_name} completed | time: {round(end_time - start_time, 2)}s")
+        # 3. remove output of failed objects, so it won't be loaded into the target
+        for object_name in executor.get_failed_objects(results):
+            self.f_handler.remove_dir(self.pipeline.output_object_dpath.format(object_name=object_name))
 
         end_total_time = time.time()
+        executor.log_summary(results, end_total_time - start_total_time)
         logger.info(f"Extract completed, duration: {round(end_total_time - start_total_time, 2)}s")
 
+        failed_objects = executor.get_failed_objects(results)
+        if len(failed_objects) > 0:
+            raise ExtractError(f"Extract of pipeline {self.pipeline.pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects)
+
+    def get_object_size_dict(self, object_list):
+        """ Returns the size of the source files of each object, used to start the largest objects first.
+        """
+        object_size_dict = {}
+
+        for object_name in object_list:
+            data_object = self.get_data_object(object_name)
+            file_names = data_object.file_names
+            if not file_names or file_names[0] is None:
+                file_names = None
+
+            try:
+                source_size = self.get_source_size(data_object.object_source_dir, self.compose_blob_prefix(data_object), file_names)
+            except Exception as err:
+                logger.debug(f"The source size of object {object_name} is not available: {err}")
+                source_size = None
+
+            object_size_dict.update({object_name: {'estimated_bytes': source_size}})
+
+        return object_size_dict
+
+    def get_object_fingerprint_dict(self, object_list):
+        """ Returns the change signals of the source files of each object, used by the ChangeDetector.
+        """
+        object_fingerprint_dict = {}
+
+        for object_name in object_list:
+            data_object = self.get_data_object(object_name)
+            file_names = data_object.file_names
+            if not file_names or file_names[0] is None:
+                file_names = None
+
+            try:
+                source_fingerprint = self.get_source_fingerprint(data_object.object_source_dir, self.compose_blob_prefix(data_object), file_names)
+            except Exception as err:
+                logger.debug(f"The change signals of object {object_name} are not available, it's extracted: {err}")
+                source_fingerprint = None
+
+            object_fingerprint_dict.update({object_name: source_fingerprint})
+
+        return object_fingerprint_dict
+
+    def get_source_fingerprint(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the change signals of the source files as {file_name: signal}. Connectors without change signals return None.
+        """
+        return None
+
+    def get_source_size(self, object_source_dir, blob_prefix, file_names):
+        """ Returns the size in bytes of the source files. Connectors without size information return None.
+        """
+        return None
+
+    def compose_blob_prefix(self, data_object):
+        blob_prefix = str(self.pipeline.source_attr.get('bucket_pipeline_prefix') or '').strip('/')
+        blob_prefix = blob_prefix + '/' + str(data_object.object_source_dir or '').strip('/')
+        return blob_prefix.strip('/')
+
+    def extract_object(self, object_name):
+        """ Extract files of a single object into the pipeline output directory.
+        """
+        start_time = time.time()
+
+        if self.pipeline.object_assignment is not None:
+            if not self.pipeline.object_assignment.claim(self.pipeline, object_name):
+                return ObjectExecutor.SKIPPED
+
+            self.f_handler.remove_dir(self.pipeline.output_object_dpath.format(object_name=object_name))
+
+        # an unchanged object is neither extracted nor loaded
+        if self.pipeline.change_detector is not None and self.pipeline.change_detector.skip_unchanged_object(object_name):
+            return ObjectExecutor.SKIPPED
+
+        # pause while the staged data exceeds max_staging_mb
+        if self.pipeline.staging_budget is not None:
+            self.pipeline.staging_budget.wait_for_space(object_name)
+
+        extractor_obj_conf = self.get_extractor_obj_conf(object_name)
+
+        # cleanup pipeline directory before run
+        self.f_handler.cleanup_dir(extractor_obj_conf.get('output_data_object_dir'))
+
+        file_list = self.extract_to(extractor_obj_conf)
+
+        target_categories = [self.pipeline.m_conf.get_connector_category(target_attr.get('connector_type')) for target_attr in self.pipeline.target_attr_list]
+        if 'database' in target_categories:
+            self.extract_metadata_from_file(file_list[0], object_name, self.file_format)
+
+        # record the extracted object with the signatures of its staged files
+        source_fingerprint = self.pipeline.change_detector.get_source_fingerprint(object_name) if self.pipeline.change_detector is not None else None
+        self.pipeline.run_manifest.set_phase(object_name, 'extracted', extractor_obj_conf.get('output_data_object_dir'), duration=round(time.time() - start_time, 3),
+                                             fingerprint=source_fingerprint)
+
+        if self.pipeline.staging_budget is not None:
+            self.pipeline.staging_budget.add_object(object_name)
+
+    def create_worker(self):
+        """ Create an extractor of the same connector type with its own client, used by parallel extraction.
+        """
+        return self.__class__(self.pipeline)
+
+    def close_connection(self):
+        """ File and bucket extractors don't keep an open connection. """
+        pass
+
     def extract_metadata_from_file(self, first_file_fpath, object_name, file_format):
         """
         """
@@ -114,26 +239,22 @@ class FExtractor(ABC):
 
         if data_object.object_source_dir is None:
             if self.pipeline.source_attr.get('connector_type') in ('csv'):
-                logger.error(f"Incorrect object specification in file: {self.pipeline.pipeline_fpath} "
+                raise ConfigError(f"Incorrect object specification in file: {self.pipeline.pipeline_fpath} "
                                f"\ndata_objects_spec: "
                                f"\n- object_spec:"
                                f"\n    object_name: {object_name}"
                                f"\n    object_source_dir: IS EMPTY")
-                sys.exit()
             elif self.pipeline.source_attr.get('connector_type') in ('s3', 'gcs'):
                 if self.pipeline.source_attr.get('bucket_pipeline_prefix') is None:
-                    logger.error(f"Incorrect source or object specification in file: {self.pipeline.pipeline_fpath} "
+                    raise ConfigError(f"Incorrect source or object specification in file: {self.pipeline.pipeline_fpath} "
                              f"\nEither bucket_pipeline_prefix in source_attributes or object_source_dir in object_spec, "
                                  f"or both, must be specified and cannot be empty. "
                                  f"\nThe object_source_dir is complementary to the bucket_pipeline_prefix. "
                                  f"E.g. for bucket path: bucket_name/bucket_pipeline_prefix/object_source_dir")
-                    sys.exit()
 
         extractor_obj_conf.update({'object_source_dir': data_object.object_source_dir})
 
-        blob_prefix = str(self.pipeline.source_attr.get('bucket_pipeline_prefix') or '').strip('/')
-        blob_prefix = blob_prefix + '/' + str(data_object.object_source_dir or '').strip('/')
-        extractor_obj_conf.update({'blob_prefix': blob_prefix.strip('/')})
+        extractor_obj_conf.update({'blob_prefix': self.compose_blob_prefix(data_object)})
 
         file_names = data_object.file_names
         if len(file_names) == 0 or file_names[0] is None:
@@ -221,8 +342,7 @@ class FExtractor(ABC):
         pq_columns_metadata_arr = self.extract_metadata_from_parquet_file(parquet_fpath)
 
         if len(pq_columns_metadata_arr) == 0:
-            logger.warning("The process has failed to extract the metadata from the file, the column definition is empty.")
-            sys.exit()
+            raise ExtractError("The process has failed to extract the metadata from the file, the column definition is empty.")
         meta_table = self.object_metadata.compose_object_meta_from_file(object_name, pq_columns_metadata_arr)
         return meta_table
 
@@ -237,8 +357,7 @@ class FExtractor(ABC):
 
         # exit if array is empty
         if len(pq_columns_metadata_arr) == 0:
-            logger.warning("pq_columns_metadata_arr is empty.")
-            sys.exit()
+            raise ExtractError("pq_columns_metadata_arr is empty.")
 
         # create the header line
         for key in pq_columns_metadata_arr[0]:
@@ -262,12 +381,10 @@ class FExtractor(ABC):
 
         is_file = self.f_handler.is_file(output_source_file)
         if is_file == False:
-            logger.error(f"Output source file {output_source_file} doesn't exists")
-            sys.exit()
+            raise ExtractError(f"Output source file {output_source_file} doesn't exists")
 
         if  self.f_handler.check_file_extension(output_source_file, file_format_extension) == False:
-            logger.error(f"File format doesn't match")
-            sys.exit()
+            raise ExtractError(f"File format doesn't match")
 
         # transform csv to parquet
         parse_options = csv.ParseOptions(delimiter=self.object_default_settings.get("columns_delimiter"))
@@ -276,9 +393,7 @@ class FExtractor(ABC):
             logger.debug(f"Start reading the csv file: {output_source_file}")
             file_data = csv.read_csv(output_source_file, parse_options=parse_options)
         except pyarrow_lib.ArrowInvalid as err:
-            logger.error(f"Error {err}")
-            logger.info(f"Check that the {output_source_file} file matches the parsing options: {self.object_default_settings}")
-            sys.exit()
+            raise ExtractError(f"Error {err}. Check that the {output_source_file} file matches the parsing options: {self.object_default_settings}") from err
 
         pq_file_name = self.f_handler.replace_file_extension(output_source_file, '.parquet')
         parquet_fpath = os.path.join(self.pipeline.output_object_data_dpath.format(object_name=object_name), pq_file_name)
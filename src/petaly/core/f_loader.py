@@ -22,6 +22,10 @@ from petaly.core.composer import Composer
 from petaly.utils.file_handler import FileHandler
 
 from petaly.core.data_object import DataObject
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.object_scheduler import ObjectScheduler
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.exceptions import LoadError
 
 class FLoader(ABC):
 
@@ -29,15 +33,18 @@ class FLoader(ABC):
         self.pipeline = pipeline
         self.composer = Composer()
         self.f_handler = FileHandler()
-        pass
+        self.object_scheduler = ObjectScheduler(pipeline)
+        # bucket loaders set file_to_gzip to True to upload compressed files
+        self.file_to_gzip = False
 
     @abstractmethod
     def load_from(self, loader_obj_conf):
         pass
 
-    def load_data(self, file_to_gzip=False):
+    def load_data(self):
 
-        logger.info(f"[--- Load into {self.pipeline.target_connector_id} ---]")
+        target_name = f" as {self.pipeline.target_name}" if self.pipeline.target_name is not None else ''
+        logger.info(f"[--- Load into {self.pipeline.target_connector_id}{target_name} ---]")
         start_total_time = time.time()
 
         if self.pipeline.data_attributes.get("data_objects_spec_mode") == 'only':
@@ -46,40 +53,93 @@ class FLoader(ABC):
             #object_list = self.f_handler.get_all_dir_names(self.pipeline.output_pipeline_dpath)
             object_list = self.composer.get_object_list_from_output_dir(self.pipeline)
 
-        for object_name in object_list:
+        # with delete_staged_data, the data directory of a loaded object is deleted, an unchanged object skipped by the ChangeDetector has none
+        if self.pipeline.change_detector is not None or (self.pipeline.staging_budget is not None and self.pipeline.staging_budget.delete_staged_data):
+            object_list = [object_name for object_name in object_list if self.f_handler.is_dir(self.pipeline.extracted_object_data_dpath.format(object_name=object_name))]
 
-            logger.info(f"Load object: {object_name} started...")
-            start_time = time.time()
+        if self.pipeline.object_assignment is not None:
+            object_list = self.pipeline.object_assignment.filter_processed_objects(self.pipeline, object_list)
 
-            loader_obj_conf = {}
-            loader_obj_conf.update({'object_name': object_name})
-            output_metadata_object_dir = self.pipeline.output_object_metadata_dpath.format(object_name=object_name)
-            loader_obj_conf.update({'output_metadata_object_dir': output_metadata_object_dir})
+        if self.pipeline.resume:
+            object_list = self.pipeline.run_manifest.filter_unloaded_objects(object_list, self.pipeline.target_name)
 
-            output_data_object_dir = self.pipeline.output_object_data_dpath.format(object_name=object_name)
-            loader_obj_conf.update({'output_data_object_dir': output_data_object_dir})
+        # start with the largest extracted objects
+        object_list = self.object_scheduler.order_by_staged_size(object_list)
 
-            output_load_from_stmt_fpath = self.pipeline.output_load_from_stmt_fpath.format(object_name=object_name)
-            loader_obj_conf.update({'load_from_stmt_fpath': output_load_from_stmt_fpath})
+        # run load for each object, in parallel if max_parallel_objects > 1
+        executor = self.get_load_executor()
 
-            if file_to_gzip:
-                self.f_handler.gzip_csv_files(output_data_object_dir, cleanup_file=True)
+        results = executor.run(object_list, main_worker=self)
 
-            file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.*')
-            loader_obj_conf.update({'file_list': file_list})
+        end_total_time = time.time()
+        executor.log_summary(results, end_total_time - start_total_time)
+        logger.info(f"Load completed, duration: {round(end_total_time - start_total_time, 2)}s")
 
-            blob_prefix = self.composer.compose_bucket_object_path(self.pipeline.target_attr.get('bucket_pipeline_prefix'),
-                                                                    self.pipeline.pipeline_name,
-                                                                    object_name)
-            loader_obj_conf.update({'blob_prefix': blob_prefix})
+        failed_objects = executor.get_failed_objects(results)
+        if len(failed_objects) > 0:
+            raise LoadError(f"Load of pipeline {self.pipeline.pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects)
 
-            self.load_from(loader_obj_conf)
+    def get_load_executor(self):
+        """ Returns the executor that runs load_object for each object. """
+        return ObjectExecutor(phase='load',
+                              object_func=lambda loader, object_name: loader.load_object(object_name),
+                              max_workers=self.pipeline.max_parallel_objects,
+                              create_worker=self.create_worker,
+                              connection_budget=ConnectionBudget.get_budget(self.pipeline.target_attr),
+                              result_collector=self.pipeline.get_result_collector(),
+                              concurrency_tuner=self.pipeline.get_concurrency_tuner('load', self.pipeline.target_attr),
+                              retry_policy=self.pipeline.object_retry_policy,
+                              priority_key=self.object_scheduler.get_priority_key)
 
-            end_time = time.time()
-            logger.info(f"Load object: {object_name} completed | time: {round(end_time - start_time, 2)}s")
+    def load_object(self, object_name):
+        """ Compose the load config for a single object and load its files into the target. """
+        start_time = time.time()
+        self.pipeline.prepare_target_data(object_name)
 
-        end_total_time = time.time()
-        logger.info(f"Load completed, duration: {round(end_total_time - start_total_time, 2)}s")
+        loader_obj_conf = {}
+        loader_obj_conf.update({'object_name': object_name})
+        output_metadata_object_dir = self.pipeline.output_object_metadata_dpath.format(object_name=object_name)
+        loader_obj_conf.update({'output_metadata_object_dir': output_metadata_object_dir})
+
+        output_data_object_dir = self.pipeline.output_object_data_dpath.format(object_name=object_name)
+        loader_obj_conf.update({'output_data_object_dir': output_data_object_dir})
+
+        output_load_from_stmt_fpath = self.pipeline.output_load_from_stmt_fpath.format(object_name=object_name)
+        loader_obj_conf.update({'load_from_stmt_fpath': output_load_from_stmt_fpath})
+
+        if self.file_to_gzip:
+            self.f_handler.gzip_csv_files(output_data_object_dir, cleanup_file=True)
+
+        file_list = self.f_handler.get_specific_files(output_data_object_dir, '*.*')
+        loader_obj_conf.update({'file_list': file_list})
+
+        blob_prefix = self.composer.compose_bucket_object_path(self.pipeline.target_attr.get('bucket_pipeline_prefix'),
+                                                                self.pipeline.pipeline_name,
+                                                                object_name)
+        loader_obj_conf.update({'blob_prefix': blob_prefix})
+
+        self.load_from(loader_obj_conf)
+
+        self.pipeline.run_manifest.set_phase(object_name, 'loaded', target_name=self.pipeline.target_name, duration=round(time.time() - start_time, 3))
+
+        # the high-water mark of an incremental object moves once it's loaded into all targets
+        self.pipeline.watermark_store.commit_loaded_object(object_name)
+
+        # the fingerprint of the source is stored once the object is loaded into all targets
+        if self.pipeline.change_detector is not None:
+            self.pipeline.change_detector.commit_loaded_object(object_name)
+
+        # with delete_staged_data, the staged data is deleted once the object is loaded into all targets
+        if self.pipeline.staging_budget is not None:
+            self.pipeline.staging_budget.release_object(object_name)
+
+    def create_worker(self):
+        """ Create a loader of the same connector type with its own client, used by parallel load. """
+        return self.__class__(self.pipeline)
+
+    def close_connection(self):
+        """ File and bucket loaders don't keep an open connection. """
+        pass
 
     def get_data_object(self, object_name):
         return DataObject(self.pipeline, object_name)
@@ -15,17 +15,133 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import threading
+import time
 from petaly.sysconfig.logger import setup_logging
+from petaly.core.pipeline import Pipeline
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.run_manifest import RunManifest
+from petaly.core.micro_batch import MicroBatch
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import PetalyError, ConfigError, ExtractError, LoadError, RunError
+from petaly.core.run_result import RunResult
+from petaly.core.explain_plan import ExplainPlan
 
 
 class MainCtl():
-    def __init__(self, main_config):
+    def __init__(self, main_config, configure_logging=True):
+        """ With configure_logging=False the logging of the calling application is kept, e.g. by petaly.run.
+        """
         self.m_conf = main_config
-        logging_mode = self.m_conf.global_settings.get('logging_mode')
-        setup_logging(self.m_conf.logging_config_fpath, self.m_conf.logs_base_dpath, logging_mode)
+        if configure_logging:
+            logging_mode = self.m_conf.global_settings.get('logging_mode')
+            setup_logging(self.m_conf.logging_config_fpath, self.m_conf.logs_base_dpath, logging_mode)
+
+    def run_pipelines(self, pipeline_name_list, run_endpoint=None, object_name_list=None, object_assignment=None, resume=False):
+        """ Call this function to run several pipelines in one process.
+        Up to max_parallel_pipelines from global_settings run at the same time, a failed pipeline doesn't stop the others.
+        A pipeline is failed, if it raised an error or one of its objects failed to extract or load.
+        Returns a list of results with pipeline name, status, duration and error.
+        """
+        max_parallel_pipelines = self.m_conf.global_settings.get('max_parallel_pipelines')
+        start_total_time = time.time()
+
+        executor = ObjectExecutor(phase='run',
+                                  object_func=lambda worker, pipeline_name: self.run_pipeline_by_name(pipeline_name, run_endpoint, object_name_list, object_assignment, resume),
+                                  max_workers=max_parallel_pipelines,
+                                  object_type='pipeline',
+                                  isolate_failures=True)
+
+        results = executor.run(pipeline_name_list)
+
+        executor.log_summary(results, time.time() - start_total_time)
+        return results
+
+    def run_pipeline_by_name(self, pipeline_name, run_endpoint=None, object_name_list=None, object_assignment=None, resume=False):
+        """ Load the pipeline config and run the pipeline.
+        """
+        pipeline = Pipeline(pipeline_name, self.m_conf)
+
+        if self.are_endpoints_identical(pipeline):
+            raise ConfigError(f"In the pipeline {pipeline_name} source_attributes and target_attributes are exactly the same. To avoid accidentally recreating the same tables, specify at least a different schema or database name.")
+
+        self.run_pipeline(pipeline, run_endpoint, object_name_list, object_assignment, resume)
+
+    def run_pipeline_with_result(self, pipeline_name, run_endpoint=None, object_name_list=None, resume=False):
+        """ Run the pipeline and return a RunResult with the status, rows, bytes and durations of each object.
+        Every error is raised as a PetalyError, which carries the RunResult in the attribute result.
+        """
+        run_result = RunResult(pipeline_name)
+
+        try:
+            pipeline = Pipeline(pipeline_name, self.m_conf)
+            pipeline.run_result = run_result
+
+            if self.are_endpoints_identical(pipeline):
+                raise ConfigError(f"In the pipeline {pipeline_name} source_attributes and target_attributes are exactly the same. To avoid accidentally recreating the same tables, specify at least a different schema or database name.")
+
+            self.run_pipeline(pipeline, run_endpoint, object_name_list, resume=resume)
+
+        except PetalyError as err:
+            # the failed objects are listed in the run_result, the caller decides with raise_on_failure
+            if err.failed_objects is not None:
+                run_result.finish()
+                return run_result
+
+            run_result.finish(err)
+            err.result = run_result
+            raise
+
+        except (Exception, SystemExit) as err:
+            run_result.finish(err)
+            raise RunError(f"Run of pipeline {pipeline_name} failed: {run_result.error}", run_result) from err
+
+        run_result.finish()
+        return run_result
+
+    def explain_pipeline(self, pipeline_name, object_name_list=None):
+        """ Returns the plan of a pipeline run with the estimated size and duration of each object, nothing is extracted.
+        """
+        pipeline = Pipeline(pipeline_name, self.m_conf)
+
+        if object_name_list is not None:
+            pipeline.data_objects = object_name_list.split(',')
+
+        return ExplainPlan(pipeline).compose_plan()
+
+    def are_endpoints_identical(self, pipeline):
+        """ Returns True if source_attributes and one of the target_attributes are the same endpoint.
+        """
+        for target_attr in pipeline.target_attr_list:
+            if self.are_attributes_identical(pipeline.source_attr, target_attr):
+                return True
+
+        return False
+
+    def are_attributes_identical(self, source_attr, target_attr):
+        """
+        """
+        identical_attributes = False
+
+        source_category = self.m_conf.get_connector_class_config(source_attr.get('connector_type')).get('connector_category')
+        target_category = self.m_conf.get_connector_class_config(target_attr.get('connector_type')).get('connector_category')
+
+        if source_category == 'database':
+            if source_category == target_category:
+                for key in source_attr.keys():
+                    if key not in ('platform_type','database_password'):
+                        if str(target_attr.get(key)) == str(source_attr.get(key)):
+                            identical_attributes = True
+                        else:
+                            return False
 
-    def run_pipeline(self, pipeline, run_endpoint, object_name_list):
+        return identical_attributes
+
+    def run_pipeline(self, pipeline, run_endpoint, object_name_list, object_assignment=None, resume=False):
         """ Call this function to run pipeline source and target
+        The optional object_assignment shares the objects of the pipeline with other nodes, see ObjectAssignment.
+        With resume, the run continues from the run manifest of the previous run, see RunManifest.
         """
         pipeline_name = pipeline.pipeline_name
 
@@ -35,45 +151,379 @@ class MainCtl():
             if object_name_list is not None:
                 pipeline.data_objects = object_name_list.split(',')
 
-            if run_endpoint is None or run_endpoint == 'source':
-                self.run_source(pipeline)
+            pipeline.object_assignment = object_assignment
+            pipeline.run_manifest = RunManifest(pipeline)
+            pipeline.resume = resume
 
-            if run_endpoint is None or run_endpoint == 'target':
-                self.run_target(pipeline)
+            if resume is True and not pipeline.run_manifest.exists():
+                logger.info(f"No run manifest found for pipeline {pipeline_name}, the run starts from the beginning.")
+                pipeline.resume = False
+
+            # the deadlines passed before the start are missed already, see DeadlineMonitor
+            if pipeline.deadline_monitor is not None:
+                pipeline.deadline_monitor.start()
+
+            if object_assignment is not None and object_assignment.work_stealing and len(pipeline.source_attr_list) > 1:
+                raise ConfigError(f"The pipeline {pipeline_name} has several sources, which can't be shared with work-stealing. Use --shard instead.")
+
+            try:
+                self.run_endpoints(pipeline, run_endpoint)
+            finally:
+                # the leases of the claimed objects are marked as done or released, see ObjectAssignment
+                if object_assignment is not None and object_assignment.work_stealing:
+                    object_assignment.release_objects(pipeline)
 
             logger.info(f"[End] Pipeline {pipeline_name}")
         else:
             logger.info(f"The pipeline {pipeline_name} is disabled. Check the parameter is_enabled in pipeline.yaml file")
 
+    def run_endpoints(self, pipeline, run_endpoint):
+        """ Extract and load the objects of the pipeline, or only one of them with run_endpoint source or target.
+        The objects extracted successfully are loaded, even if other objects failed. The failed objects are raised at the end.
+        """
+        pipeline_name = pipeline.pipeline_name
+
+        if run_endpoint is None and pipeline.overlap_extract_load is True and self.can_overlap_extract_load(pipeline):
+            self.run_source_and_target(pipeline)
+
+        else:
+            extract_error = None
+            if run_endpoint is None or run_endpoint == 'source':
+                try:
+                    self.run_source(pipeline)
+                except ExtractError as err:
+                    # the output of the failed objects was removed, the other objects are still loaded
+                    if err.failed_objects is None or run_endpoint == 'source':
+                        raise
+                    extract_error = err
+
+            if run_endpoint is None or run_endpoint == 'target':
+                try:
+                    self.run_target(pipeline)
+                except LoadError as err:
+                    if extract_error is None or err.failed_objects is None:
+                        raise
+                    failed_objects = sorted(set(extract_error.failed_objects).union(err.failed_objects))
+                    raise RunError(f"Run of pipeline {pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects) from err
+
+            if extract_error is not None:
+                raise extract_error
+
+    def run_micro_batches(self, pipeline_name, interval_seconds, object_name_list=None, object_assignment=None, resume=False):
+        """ Run the pipeline every interval_seconds until the process is stopped, e.g. by Ctrl-C.
+        The connections stay open between the iterations, see ConnectionPool, and the pipeline state is kept by MicroBatch.
+        A failed iteration is logged and the next one starts as scheduled. With resume, only the first iteration is resumed.
+        """
+        ConnectionPool.enable()
+        micro_batch = MicroBatch(pipeline_name, interval_seconds)
+        scheduled_start_time = time.time()
+
+        try:
+            while True:
+                micro_batch.start_iteration(scheduled_start_time)
+                pipeline = None
+                error = None
+
+                try:
+                    # the pipeline.yaml is parsed again only if it changed, see Pipeline.get_pipeline_entire_config
+                    pipeline = Pipeline(pipeline_name, self.m_conf)
+                    pipeline.micro_batch = micro_batch
+                    self.run_pipeline(pipeline, None, object_name_list, object_assignment, resume and micro_batch.iteration == 1)
+                except (Exception, SystemExit) as err:
+                    error = str(err) if str(err) != '' else err.__class__.__name__
+
+                micro_batch.end_iteration(pipeline, error)
+
+                scheduled_start_time += interval_seconds
+                wait_time = scheduled_start_time - time.time()
+                if wait_time < 0:
+                    logger.warning(f"Iteration {micro_batch.iteration} of pipeline {pipeline_name} took longer than the interval of {interval_seconds}s, the next iteration starts now")
+                    scheduled_start_time = time.time()
+                else:
+                    time.sleep(wait_time)
+
+        except KeyboardInterrupt:
+            logger.info(f"The micro-batch run of pipeline {pipeline_name} was stopped")
+
+        finally:
+            ConnectionPool.close_all()
+            micro_batch.log_summary()
+
     ####################### run source ####################################
 
-    def run_source(self, pipe):
-        """ Call this function to run pipeline source part
+    def run_source(self, pipe, on_object_extracted=None):
+        """ Call this function to run pipeline source part.
+        If the pipeline has several sources, all sources are extracted at the same time.
+        The optional on_object_extracted function is called with the object_name as soon as an object is extracted.
+        """
+        if len(pipe.source_attr_list) == 1:
+            self.run_single_source(pipe, on_object_extracted)
+            return
+
+        extractor_class_obj = self.m_conf.get_extractor_class(pipe.source_connector_id)
+        if pipe.source_name_column is not None and not extractor_class_obj.supports_source_name_column:
+            logger.warning(f"The source_name_column isn't supported by the extractor with connector-id: {pipe.source_connector_id}. The sources are combined without it.")
+            pipe.source_name_column = None
+
+        self.run_sources(pipe, pipe.get_source_pipelines(), on_object_extracted)
+
+    def run_single_source(self, pipe, on_object_extracted=None):
+        """ Run the extractor of a single source.
         """
         logger.debug("Load source config")
 
         class_obj = self.m_conf.get_extractor_class(pipe.source_connector_id)
         # run extraction
         if class_obj is not None:
-            extractor = class_obj(pipe)
-            logger.debug(f"Extract connector-id: {pipe.source_connector_id}")
-            extractor.extract_data()
+            source_budget = self.acquire_connection_slot(pipe.source_attr)
+            extractor = None
+            try:
+                extractor = class_obj(pipe)
+                logger.debug(f"Extract connector-id: {pipe.source_connector_id}")
+                extractor.extract_data(on_object_extracted=on_object_extracted)
+            finally:
+                self.close_main_worker(extractor, source_budget)
         else:
             logger.error(f"Extractor with connector-id: {pipe.source_connector_id} can't initialized.")
 
+    def run_sources(self, pipe, source_pipelines, on_object_extracted=None):
+        """ Extract several sources with the same schema at the same time.
+        An object is combined into one staged object directory as soon as it's extracted from all sources.
+        """
+        if pipe.object_assignment is None and not pipe.resume:
+            pipe.f_handler.cleanup_dir(pipe.output_pipeline_dpath)
+
+        if not pipe.resume:
+            pipe.run_manifest.start()
+
+        source_pipeline_dict = {source_pipeline.source_name: source_pipeline for source_pipeline in source_pipelines}
+        extracted_sources = {}
+        lock = threading.Lock()
+
+        def on_source_object_extracted(source_name, object_name):
+            with lock:
+                extracted_sources.setdefault(object_name, set()).add(source_name)
+                if len(extracted_sources.get(object_name)) < len(source_pipelines):
+                    return
+
+            # on resume, an object loaded into all targets isn't combined again
+            if pipe.resume and pipe.run_manifest.is_loaded(object_name):
+                return
+
+            pipe.combine_sources_data(object_name, source_pipelines)
+            logger.info(f"Object {object_name} extracted from {len(source_pipelines)} sources")
+
+            if on_object_extracted is not None:
+                on_object_extracted(object_name)
+
+        failed_objects = set()
+
+        def extract_source(source_name):
+            try:
+                self.run_single_source(source_pipeline_dict.get(source_name), lambda object_name: on_source_object_extracted(source_name, object_name))
+            except ExtractError as err:
+                # a source with failed objects has extracted the other objects
+                if err.failed_objects is None:
+                    raise
+                with lock:
+                    failed_objects.update(err.failed_objects)
+
+        start_total_time = time.time()
+        executor = ObjectExecutor(phase='extract',
+                                  object_func=lambda worker, source_name: extract_source(source_name),
+                                  max_workers=len(source_pipelines),
+                                  object_type='source',
+                                  isolate_failures=True)
+
+        results = executor.run(list(source_pipeline_dict.keys()))
+        executor.log_summary(results, time.time() - start_total_time)
+
+        incomplete_objects = [object_name for object_name, source_names in extracted_sources.items() if len(source_names) < len(source_pipelines)]
+        if len(incomplete_objects) > 0:
+            logger.error(f"The following objects weren't extracted from all sources and aren't loaded: {', '.join(incomplete_objects)}")
+
+        if len(executor.get_failed_objects(results)) > 0:
+            raise ExtractError(f"Extract from sources of pipeline {pipe.pipeline_name} failed: {', '.join(executor.get_failed_objects(results))}")
+
+        failed_objects = sorted(failed_objects.union(incomplete_objects))
+        if len(failed_objects) > 0:
+            raise ExtractError(f"Extract of pipeline {pipe.pipeline_name} failed for objects: {', '.join(failed_objects)}", failed_objects=failed_objects)
+
     ####################### run targets ####################################
 
     def run_target(self, pipe):
-        """ Call this function to run pipeline target part
+        """ Call this function to run pipeline target part.
+        If the pipeline has several targets, the extracted data is loaded into all targets at the same time.
+        """
+        target_pipelines = pipe.get_target_pipelines()
+
+        if len(target_pipelines) == 1:
+            self.run_single_target(pipe)
+            return
+
+        target_pipeline_dict = {target_pipeline.target_name: target_pipeline for target_pipeline in target_pipelines}
+        failed_objects = set()
+        lock = threading.Lock()
+
+        def load_target(target_name):
+            try:
+                self.run_single_target(target_pipeline_dict.get(target_name))
+            except LoadError as err:
+                # a target with failed objects has loaded the other objects
+                if err.failed_objects is None:
+                    raise
+                with lock:
+                    failed_objects.update(err.failed_objects)
+
+        start_total_time = time.time()
+
+        executor = ObjectExecutor(phase='load',
+                                  object_func=lambda worker, target_name: load_target(target_name),
+                                  max_workers=len(target_pipelines),
+                                  object_type='target',
+                                  isolate_failures=True)
+
+        results = executor.run(list(target_pipeline_dict.keys()))
+        executor.log_summary(results, time.time() - start_total_time)
+
+        if len(executor.get_failed_objects(results)) > 0:
+            raise LoadError(f"Load into targets of pipeline {pipe.pipeline_name} failed: {', '.join(executor.get_failed_objects(results))}")
+
+        if len(failed_objects) > 0:
+            raise LoadError(f"Load of pipeline {pipe.pipeline_name} failed for objects: {', '.join(sorted(failed_objects))}", failed_objects=sorted(failed_objects))
+
+    def run_single_target(self, pipe):
+        """ Run the loader of a single target.
         """
         logger.debug("Load target config")
         class_obj = self.m_conf.get_loader_class(pipe.target_connector_id)
         logger.debug(f"Load class: {class_obj}")
         # run loader
         if class_obj is not None:
-            loader = class_obj(pipe)
-            logger.debug(f"Load target connector id: {pipe.target_connector_id}")
-            loader.load_data()
+            target_budget = self.acquire_connection_slot(pipe.target_attr)
+            loader = None
+            try:
+                loader = class_obj(pipe)
+                logger.debug(f"Load target connector id: {pipe.target_connector_id}")
+                loader.load_data()
+            finally:
+                self.close_main_worker(loader, target_budget)
 
         else:
-            logger.error(f"Loader with connector-id: {pipe.target_connector_id} can't initialized.")
\ No newline at end of file
+            logger.error(f"Loader with connector-id: {pipe.target_connector_id} can't initialized.")
+
+    ####################### run source and target overlapped ###############
+
+    def run_source_and_target(self, pipe):
+        """ Call this function to run pipeline source and target at the same time.
+        Each object is loaded as soon as its extraction has completed, while the next objects are still extracting.
+        If the pipeline has several targets, each extracted object is loaded into all targets.
+        """
+        target_pipelines = pipe.get_target_pipelines()
+
+        for target_pipeline in target_pipelines:
+            if self.m_conf.get_loader_class(target_pipeline.target_connector_id) is None:
+                logger.error(f"Loader with connector-id: {target_pipeline.target_connector_id} can't initialized.")
+                return
+
+        # the main loader of each target with its connection budget
+        loaders = []
+        try:
+            for target_pipeline in target_pipelines:
+                target_budget = self.acquire_connection_slot(target_pipeline.target_attr)
+                loader = None
+                try:
+                    loader = self.m_conf.get_loader_class(target_pipeline.target_connector_id)(target_pipeline)
+                except (Exception, SystemExit):
+                    self.close_main_worker(loader, target_budget)
+                    raise
+                loaders.append((target_pipeline, loader, target_budget))
+        except (Exception, SystemExit):
+            for target_pipeline, loader, target_budget in loaders:
+                self.close_main_worker(loader, target_budget)
+            raise
+
+        # loaded objects free staged space while the next objects are extracting, see StagingBudget
+        if pipe.staging_budget is not None:
+            pipe.staging_budget.overlapped = True
+
+        target_connector_ids = ', '.join([target_pipeline.target_connector_id for target_pipeline in target_pipelines])
+        logger.info(f"[--- Extract from {pipe.source_connector_id} and load into {target_connector_ids} overlapped ---]")
+        start_total_time = time.time()
+
+        load_executors = []
+        for target_pipeline, loader, target_budget in loaders:
+            load_executor = loader.get_load_executor()
+            load_executor.start(main_worker=loader)
+            load_executors.append(load_executor)
+
+        def submit_to_targets(object_name):
+            for (target_pipeline, loader, target_budget), load_executor in zip(loaders, load_executors):
+                # on resume, an object can be loaded into some of the targets already
+                if target_pipeline.resume and target_pipeline.run_manifest.is_loaded(object_name, target_pipeline.target_name):
+                    continue
+                load_executor.submit(object_name)
+
+        failed_objects = set()
+        try:
+            self.run_source(pipe, on_object_extracted=submit_to_targets)
+        finally:
+            # objects extracted so far are still loaded, even if the extraction stopped
+            for (target_pipeline, loader, target_budget), load_executor in zip(loaders, load_executors):
+                results = load_executor.finish()
+                self.close_main_worker(loader, target_budget)
+
+                end_total_time = time.time()
+                load_executor.log_summary(results, end_total_time - start_total_time)
+                failed_objects.update(load_executor.get_failed_objects(results))
+
+            logger.info(f"Extract and load completed, duration: {round(time.time() - start_total_time, 2)}s")
+
+        if len(failed_objects) > 0:
+            raise LoadError(f"Load of pipeline {pipe.pipeline_name} failed for objects: {', '.join(sorted(failed_objects))}", failed_objects=sorted(failed_objects))
+
+    def can_overlap_extract_load(self, pipe):
+        """ Overlapped extract and load keeps a connection for the extractor and for each target open at the same time.
+        If they share the same endpoint, its max_connections has to allow all of them.
+        """
+        main_worker_count = {}
+        for endpoint_attr in pipe.source_attr_list + pipe.target_attr_list:
+            connection_budget = ConnectionBudget.get_budget(endpoint_attr)
+            if connection_budget is not None:
+                main_worker_count.update({connection_budget: main_worker_count.get(connection_budget, 0) + 1})
+
+        for connection_budget, worker_count in main_worker_count.items():
+            if worker_count > 1 and connection_budget.max_connections < worker_count:
+                logger.warning(f"Source and target share the endpoint {connection_budget.endpoint_key} with max_connections: {connection_budget.max_connections}. Extract and load run one after another.")
+                return False
+
+        return True
+
+    ####################### connection budget ##############################
+
+    def acquire_connection_slot(self, endpoint_attr):
+        """ Wait for a connection slot for the main extractor or loader, if max_connections is specified for the endpoint.
+        Returns the budget to release the slot after the run, or None.
+        """
+        connection_budget = ConnectionBudget.get_budget(endpoint_attr)
+
+        if connection_budget is not None:
+            start_wait_time = time.time()
+            connection_budget.acquire()
+            wait_time = round(time.time() - start_wait_time, 2)
+            if wait_time > 0:
+                logger.info(f"Waited {wait_time}s for a connection to {connection_budget.endpoint_key}")
+
+        return connection_budget
+
+    def close_main_worker(self, worker, connection_budget):
+        """ Close the connection of the main extractor or loader and release its connection slot.
+        """
+        try:
+            if worker is not None:
+                worker.close_connection()
+        except Exception as err:
+            logger.debug(f"Closing of the connection failed: {err}")
+        finally:
+            if connection_budget is not None:
+                connection_budget.release()
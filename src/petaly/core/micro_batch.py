@@ -0,0 +1,139 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import re
+import threading
+import time
+
+from petaly.core.composer import Composer
+
+
+class MicroBatch():
+    """ MicroBatch keeps the state of a pipeline, which runs again and again with run --every, between the iterations.
+    The object sizes of the first iteration are reused and a destination table, which was created by a previous iteration
+    with the same columns, isn't created again. It also reports the lag and throughput of each iteration.
+    """
+    interval_units = {'s': 1, 'm': 60, 'h': 3600}
+
+    def __init__(self, pipeline_name, interval_seconds):
+        self.pipeline_name = pipeline_name
+        self.interval_seconds = interval_seconds
+        self.iteration = 0
+        self.iteration_results = []
+        self.scheduled_start_time = None
+        self.start_time = None
+        # estimated object sizes of each source, keyed by source name
+        self.object_size_dicts = {}
+        # the DDL of each destination table created by a previous iteration, keyed by target and object name
+        self.destination_schemas = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def parse_interval(cls, interval):
+        """ Returns the interval in seconds, e.g. 60s, 5m, 1h or 60. Returns None if the interval isn't valid.
+        """
+        match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([smh]?)\s*', str(interval))
+
+        if match is None or float(match.group(1)) <= 0:
+            return None
+
+        return float(match.group(1)) * cls.interval_units.get(match.group(2) or 's')
+
+    def get_object_size_dict(self, source_name):
+        with self.lock:
+            return self.object_size_dicts.get(source_name)
+
+    def set_object_size_dict(self, source_name, object_size_dict):
+        with self.lock:
+            self.object_size_dicts.update({source_name: object_size_dict})
+
+    def compose_destination_key(self, pipeline, object_name):
+        return (pipeline.target_name, object_name)
+
+    def compose_destination_schema(self, table_ddl_dict):
+        return tuple(table_ddl_dict.get(key) for key in ('schema_name', 'table_name', 'column_datatype_list', 'primary_key'))
+
+    def take_destination_schema(self, pipeline, object_name, table_ddl_dict):
+        """ Returns True if the destination table was created by the previous iteration with the same DDL.
+        The table is recorded again by record_destination_schema only after a successful load, so a failed load creates it again.
+        """
+        with self.lock:
+            previous_schema = self.destination_schemas.pop(self.compose_destination_key(pipeline, object_name), None)
+
+        if previous_schema is None:
+            return False
+
+        if previous_schema != self.compose_destination_schema(table_ddl_dict):
+            logger.info(f"The schema of object {object_name} changed since the previous iteration, the destination table is created again")
+            return False
+
+        return True
+
+    def record_destination_schema(self, pipeline, object_name, table_ddl_dict):
+        with self.lock:
+            self.destination_schemas.update({self.compose_destination_key(pipeline, object_name): self.compose_destination_schema(table_ddl_dict)})
+
+    def start_iteration(self, scheduled_start_time):
+        self.iteration += 1
+        self.scheduled_start_time = scheduled_start_time
+        self.start_time = time.time()
+        logger.info(f"[Start] Iteration {self.iteration} of pipeline {self.pipeline_name}")
+
+    def end_iteration(self, pipeline, error=None):
+        """ Log the result of the iteration.
+        The lag is the time from the scheduled start of the iteration until its data is loaded, the throughput refers to the staged bytes.
+        """
+        end_time = time.time()
+        duration = end_time - self.start_time
+        object_list = []
+        staged_bytes = 0
+
+        # the pipeline is None, if its config couldn't be loaded
+        if pipeline is not None:
+            object_list = Composer().get_object_list_from_output_dir(pipeline)
+            staged_bytes = sum(pipeline.f_handler.get_dir_size(pipeline.extracted_object_data_dpath.format(object_name=object_name)) for object_name in object_list)
+
+        iteration_result = {'iteration': self.iteration,
+                            'status': 'completed' if error is None else 'failed',
+                            'duration': round(duration, 2),
+                            'lag': round(end_time - self.scheduled_start_time, 2),
+                            'objects': len(object_list),
+                            'staged_bytes': staged_bytes,
+                            'throughput': round(staged_bytes / 1024 / 1024 / duration, 2) if duration > 0 else 0,
+                            'error': error}
+        self.iteration_results.append(iteration_result)
+
+        message = (f"Iteration {self.iteration} of pipeline {self.pipeline_name} {iteration_result.get('status')} | lag: {iteration_result.get('lag')}s"
+                   f" | duration: {iteration_result.get('duration')}s | objects: {iteration_result.get('objects')}"
+                   f" | throughput: {iteration_result.get('throughput')} MB/s ({staged_bytes} bytes)")
+
+        if error is None:
+            logger.info(message)
+        else:
+            logger.error(f"{message} | error: {error}")
+
+        return iteration_result
+
+    def log_summary(self):
+        if len(self.iteration_results) == 0:
+            return
+
+        failed_count = len([result for result in self.iteration_results if result.get('status') != 'completed'])
+        max_lag = max(result.get('lag') for result in self.iteration_results)
+        avg_duration = sum(result.get('duration') for result in self.iteration_results) / len(self.iteration_results)
+        logger.info(f"Micro-batch summary of pipeline {self.pipeline_name}: {len(self.iteration_results)} iterations, {failed_count} failed"
+                    f" | max lag: {max_lag}s | average duration: {round(avg_duration, 2)}s")
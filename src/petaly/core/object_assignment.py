@@ -0,0 +1,227 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import socket
+import threading
+import time
+import zlib
+from petaly.core.exceptions import ConfigError
+
+
+class ObjectAssignment():
+    """ ObjectAssignment decides which objects of a pipeline are processed by this node, if a pipeline runs on several machines.
+    In shard mode, each of shard_count nodes gets a fixed subset of objects by a stable hash of the object name.
+    In work-stealing mode, nodes claim objects one by one with lease files in the shared output directory, so fast nodes process more objects.
+    A node renews its leases every lease_heartbeat_seconds until the objects are loaded. The lease of a node that stopped expires after lease_timeout_seconds,
+    and another node, or the same node started again with the same run id, takes the object over.
+    """
+    lease_dname = '.leases'
+    lease_timeout_seconds = 300
+    lease_heartbeat_seconds = 60
+
+    def __init__(self, shard_index=None, shard_count=None, run_id=None):
+        """
+        :param shard_index: 1-based index of this node, used in shard mode
+        :param shard_count: number of nodes, used in shard mode
+        :param run_id: identifies the run shared by all nodes, used in work-stealing mode
+        """
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.run_id = run_id
+        self.work_stealing = run_id is not None
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+        self.lock = threading.Lock()
+        self.claimed_objects = set()
+        # the lease files of the claimed objects which aren't loaded yet, renewed by the heartbeat
+        self.active_leases = {}
+        self.heartbeat_thread = None
+
+    @classmethod
+    def from_shard_arg(cls, shard_arg):
+        """ Parse the shard argument in the format i/N, e.g. 2/4 for the second of four nodes.
+        """
+        try:
+            shard_index, shard_count = [int(value) for value in shard_arg.split('/')]
+        except ValueError:
+            raise ConfigError(f"The shard {shard_arg} is not valid. Use the format i/N, e.g. --shard 1/4 for the first of four nodes.")
+
+        if shard_count < 1 or shard_index < 1 or shard_index > shard_count:
+            raise ConfigError(f"The shard {shard_arg} is not valid. The index i has to be between 1 and N.")
+
+        return cls(shard_index=shard_index, shard_count=shard_count)
+
+    @classmethod
+    def from_run_id(cls, run_id):
+        if run_id is None or run_id.strip() == '' or os.sep in run_id:
+            raise ConfigError(f"The run id {run_id} for work-stealing is not valid. Provide the same id to all nodes, e.g. the date of the run.")
+
+        return cls(run_id=run_id)
+
+    def is_in_shard(self, object_name):
+        """ The object is assigned to the shard by a stable hash, so every node computes the same assignment. """
+        return zlib.crc32(str(object_name).encode('utf-8')) % self.shard_count == self.shard_index - 1
+
+    def filter_objects(self, pipeline, object_list):
+        """ Returns the objects to extract. In shard mode only the objects of this shard.
+        In work-stealing mode all objects, as they are claimed one by one during extraction.
+        """
+        if self.work_stealing:
+            return list(object_list)
+
+        assigned_list = [object_name for object_name in object_list if self.is_in_shard(object_name)]
+        logger.info(f"Shard {self.shard_index}/{self.shard_count} of pipeline {pipeline.pipeline_name}: {len(assigned_list)} of {len(object_list)} objects assigned")
+        return assigned_list
+
+    def filter_processed_objects(self, pipeline, object_list):
+        """ Returns the objects to load. In shard mode the objects of this shard, in work-stealing mode the objects claimed by this node.
+        """
+        if self.work_stealing:
+            with self.lock:
+                return [object_name for object_name in object_list if (pipeline.pipeline_name, object_name) in self.claimed_objects]
+
+        return [object_name for object_name in object_list if self.is_in_shard(object_name)]
+
+    def claim(self, pipeline, object_name):
+        """ Claim the object for this node. In work-stealing mode a lease file is created exclusively,
+        so only one node gets the object. Returns False if another node holds a valid lease or has loaded the object.
+        An expired or released lease is taken over with a lease of the next generation, which is created exclusively as well.
+        """
+        if not self.work_stealing:
+            return True
+
+        # a retry of an object claimed by this node
+        with self.lock:
+            if (pipeline.pipeline_name, object_name) in self.claimed_objects:
+                return True
+
+        lease_dpath = os.path.join(pipeline.output_pipeline_dpath, self.lease_dname, self.run_id)
+        os.makedirs(lease_dpath, exist_ok=True)
+
+        generation = 0
+        latest_generation, latest_lease_fpath = self.get_latest_lease(lease_dpath, object_name)
+        if latest_lease_fpath is not None:
+            lease = self.read_lease(latest_lease_fpath)
+            if not self.is_lease_expired(latest_lease_fpath, lease):
+                logger.debug(f"Object {object_name} is already claimed by another node: {latest_lease_fpath}")
+                return False
+
+            generation = latest_generation + 1
+
+        lease_fpath = os.path.join(lease_dpath, f"{object_name}.{generation}.lease")
+
+        try:
+            lease_fd = os.open(lease_fpath, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            logger.debug(f"Object {object_name} is already claimed by another node: {lease_fpath}")
+            return False
+
+        with os.fdopen(lease_fd, 'w') as lease_file:
+            json.dump({'owner': self.owner, 'status': 'claimed', 'claimed_at': time.strftime('%Y-%m-%d %H:%M:%S')}, lease_file)
+
+        if latest_lease_fpath is not None:
+            logger.info(f"Object {object_name} taken over from the {lease.get('status')} lease of {lease.get('owner')}")
+
+        with self.lock:
+            self.claimed_objects.add((pipeline.pipeline_name, object_name))
+            self.active_leases.update({(pipeline.pipeline_name, object_name): lease_fpath})
+            self.start_heartbeat()
+
+        logger.debug(f"Object {object_name} claimed by {self.owner}")
+        return True
+
+    def get_latest_lease(self, lease_dpath, object_name):
+        """ Returns the generation and path of the latest lease file of the object, or (None, None) if it was never claimed. """
+        latest_generation, latest_lease_fpath = None, None
+
+        for fname in os.listdir(lease_dpath):
+            name_parts = fname.rsplit('.', 2)
+            if len(name_parts) != 3 or name_parts[0] != object_name or name_parts[2] != 'lease' or not name_parts[1].isdigit():
+                continue
+
+            if latest_generation is None or int(name_parts[1]) > latest_generation:
+                latest_generation, latest_lease_fpath = int(name_parts[1]), os.path.join(lease_dpath, fname)
+
+        return latest_generation, latest_lease_fpath
+
+    def read_lease(self, lease_fpath):
+        try:
+            with open(lease_fpath, 'r') as lease_file:
+                return json.load(lease_file)
+        except (OSError, ValueError):
+            # a lease which is being written by its node
+            return {}
+
+    def is_lease_expired(self, lease_fpath, lease):
+        """ A released lease can be taken over right away, a claimed lease once its node hasn't renewed it for lease_timeout_seconds.
+        The lease of a loaded object is never taken over.
+        """
+        if lease.get('status') == 'done':
+            return False
+
+        if lease.get('status') == 'released':
+            return True
+
+        try:
+            return time.time() - os.path.getmtime(lease_fpath) > self.lease_timeout_seconds
+        except OSError:
+            return False
+
+    def start_heartbeat(self):
+        """ Start the thread that renews the active leases, called with self.lock held. """
+        if self.heartbeat_thread is not None and self.heartbeat_thread.is_alive():
+            return
+
+        def heartbeat_loop():
+            while True:
+                time.sleep(self.lease_heartbeat_seconds)
+
+                with self.lock:
+                    if len(self.active_leases) == 0:
+                        self.heartbeat_thread = None
+                        return
+                    lease_fpaths = list(self.active_leases.values())
+
+                for lease_fpath in lease_fpaths:
+                    try:
+                        os.utime(lease_fpath)
+                    except OSError as err:
+                        logger.warning(f"The lease {lease_fpath} can't be renewed: {err}")
+
+        self.heartbeat_thread = threading.Thread(target=heartbeat_loop, name='lease-heartbeat', daemon=True)
+        self.heartbeat_thread.start()
+
+    def release_objects(self, pipeline):
+        """ Called at the end of a pipeline run. The leases of the loaded objects are marked as done, so they are never processed again with this run id.
+        The leases of the other objects are released, so another node, or this node started again, can claim them right away.
+        """
+        with self.lock:
+            pipeline_leases = {object_name: lease_fpath for (pipeline_name, object_name), lease_fpath in self.active_leases.items() if pipeline_name == pipeline.pipeline_name}
+            for object_name in pipeline_leases.keys():
+                self.active_leases.pop((pipeline.pipeline_name, object_name))
+
+        for object_name, lease_fpath in pipeline_leases.items():
+            status = 'done' if pipeline.run_manifest.is_loaded(object_name) else 'released'
+            tmp_fpath = f"{lease_fpath}.{os.getpid()}.tmp"
+
+            with open(tmp_fpath, 'w') as lease_file:
+                json.dump({'owner': self.owner, 'status': status, 'released_at': time.strftime('%Y-%m-%d %H:%M:%S')}, lease_file)
+
+            os.replace(tmp_fpath, lease_fpath)
+            logger.debug(f"Lease of object {object_name} {status}: {lease_fpath}")
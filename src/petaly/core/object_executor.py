@@ -0,0 +1,347 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import queue
+import threading
+import time
+
+from petaly.core.rate_limiter import RateLimiter
+from petaly.core.retry_policy import RetryPolicy
+
+
+class ObjectExecutor():
+    """ ObjectExecutor runs an object function for each data object, either one after another or in a pool of worker threads.
+    Each thread borrows a worker (e.g. an extractor with its own connector connection) for the time it processes an object,
+    so two objects never share the same connection.
+    """
+    # object_func returns SKIPPED, if the object isn't processed by this run, e.g. claimed by another node
+    SKIPPED = 'skipped'
+
+    def __init__(self, phase, object_func, max_workers=1, create_worker=None, object_type='object', isolate_failures=None, connection_budget=None, result_collector=None, concurrency_tuner=None, retry_policy=None, priority_key=None):
+        """
+        :param phase: used in log messages, e.g. extract or load
+        :param object_func: function(worker, object_name) called for each object
+        :param max_workers: number of objects processed at the same time
+        :param create_worker: function returning a new worker. If None, object_func gets the main_worker or None
+        :param object_type: used in log messages, e.g. object or pipeline
+        :param isolate_failures: if True, a failed object doesn't stop the other objects
+        :param connection_budget: optional ConnectionBudget, each created worker holds a slot until it's closed
+        :param result_collector: optional function called with the result of each object, e.g. to collect the RunResult of petaly.run
+        :param concurrency_tuner: optional ConcurrencyTuner, which adapts how many of the max_workers process objects at the same time
+        :param retry_policy: optional RetryPolicy, a failed object is processed again up to its max_retries
+        :param priority_key: optional function(object_name) returning a sort key. A started executor takes the submitted object with the lowest key next
+        """
+        self.phase = phase
+        self.object_func = object_func
+        self.max_workers = max(1, int(max_workers))
+        self.create_worker = create_worker
+        self.object_type = object_type
+        self.connection_budget = connection_budget
+        self.result_collector = result_collector
+        self.concurrency_tuner = concurrency_tuner
+        self.retry_policy = retry_policy
+        self.priority_key = priority_key
+        self.finishing = False
+
+        # With a single worker, an error stops the run as before. In a pool, a failed object doesn't stop the other objects.
+        self.isolate_failures = self.max_workers > 1 if isolate_failures is None else isolate_failures
+
+        self.lock = threading.Lock()
+        self.idle_workers = []
+        self.created_workers = []
+
+    def run(self, object_list, main_worker=None, on_completed=None):
+        """ Process all objects and return a list of results in the order of object_list.
+        The main_worker is used as the first worker and is never closed by the executor.
+        The on_completed function is called with the object_name of each successfully processed object.
+        """
+        object_queue = list(object_list)
+        results = {}
+
+        if main_worker is not None:
+            self.idle_workers.append(main_worker)
+
+        def worker_loop(worker_index=0):
+            while True:
+                with self.lock:
+                    if len(object_queue) == 0:
+                        return
+                    object_name = object_queue.pop(0) if self.is_worker_allowed(worker_index) else None
+
+                if object_name is None:
+                    time.sleep(0.1)
+                    continue
+
+                result = self.run_object(object_name)
+
+                with self.lock:
+                    results.update({object_name: result})
+
+                if on_completed is not None and result.get('status') == 'completed':
+                    on_completed(object_name)
+
+        num_threads = min(self.max_workers, len(object_queue))
+
+        if num_threads <= 1:
+            worker_loop()
+        else:
+            logger.info(f"{self.phase.capitalize()} {len(object_queue)} {self.object_type}s with {self.compose_workers_message(num_threads)}")
+            threads = []
+            for i in range(num_threads):
+                thread = threading.Thread(target=worker_loop, args=(i,), name=f"{self.phase}-worker-{i+1}")
+                threads.append(thread)
+                thread.start()
+
+            for thread in threads:
+                thread.join()
+
+        self.close_workers()
+
+        if self.concurrency_tuner is not None:
+            self.concurrency_tuner.finish()
+
+        return [results.get(object_name) for object_name in object_list if object_name in results]
+
+    def is_worker_allowed(self, worker_index):
+        """ Returns True if the worker may start the next object. With a concurrency tuner, only the first workers up to its limit start objects. """
+        return self.concurrency_tuner is None or worker_index < self.concurrency_tuner.get_limit()
+
+    def compose_workers_message(self, num_workers):
+        if self.concurrency_tuner is None:
+            return f"{num_workers} parallel workers"
+        return f"up to {num_workers} parallel workers, adapted to the throughput"
+
+    def start(self, main_worker=None):
+        """ Start the workers in background threads. Objects are processed as soon as they are passed with submit().
+        As the caller keeps running in its own thread, a failed object never stops the other objects.
+        """
+        self.isolate_failures = True
+        # with a priority_key, a free worker takes the most urgent submitted object, otherwise the objects are taken in submit order
+        self.object_queue = queue.PriorityQueue()
+        self.submitted_objects = []
+        self.results = {}
+
+        if main_worker is not None:
+            self.idle_workers.append(main_worker)
+
+        def worker_loop(worker_index):
+            while True:
+                # a worker above the limit of the concurrency tuner waits, the workers below it take the remaining objects
+                while not self.is_worker_allowed(worker_index):
+                    if self.finishing:
+                        return
+                    time.sleep(0.1)
+
+                priority, submit_index, object_name = self.object_queue.get()
+                if object_name is None:
+                    return
+
+                result = self.run_object(object_name)
+
+                with self.lock:
+                    self.results.update({object_name: result})
+
+        logger.info(f"{self.phase.capitalize()} {self.object_type}s as soon as they are submitted with {self.compose_workers_message(self.max_workers)}")
+        self.threads = []
+        for i in range(self.max_workers):
+            thread = threading.Thread(target=worker_loop, args=(i,), name=f"{self.phase}-worker-{i+1}")
+            self.threads.append(thread)
+            thread.start()
+
+    def submit(self, object_name):
+        """ Queue an object for a started executor. It's safe to call it from other threads. """
+        priority = self.priority_key(object_name) if self.priority_key is not None else ()
+
+        with self.lock:
+            submit_index = len(self.submitted_objects)
+            self.submitted_objects.append(object_name)
+            self.object_queue.put((priority, submit_index, object_name))
+
+    def finish(self):
+        """ Wait until all submitted objects are processed, stop the workers and return a list of results in submit order. """
+        self.finishing = True
+        # the stop entries sort after all submitted objects
+        with self.lock:
+            for i, thread in enumerate(self.threads):
+                self.object_queue.put(((float('inf'),), len(self.submitted_objects) + i, None))
+
+        for thread in self.threads:
+            thread.join()
+
+        self.close_workers()
+
+        if self.concurrency_tuner is not None:
+            self.concurrency_tuner.finish()
+
+        return [self.results.get(object_name) for object_name in self.submitted_objects if object_name in self.results]
+
+    def run_object(self, object_name):
+        """ Process a single object and measure it. """
+        result = {'object_name': object_name, 'phase': self.phase, 'status': 'failed', 'duration': 0, 'wait_time': 0, 'retries': 0, 'retry_time': 0, 'throttle_time': 0, 'error': None}
+
+        logger.info(f"{self.phase.capitalize()} {self.object_type}: {object_name} started...")
+        start_time = time.time()
+        worker = None
+        previous_retry_stats = RetryPolicy.start_stats()
+        previous_throttle_stats = RateLimiter.start_stats()
+
+        try:
+            worker, wait_time = self.acquire_worker()
+            result.update({'wait_time': round(wait_time, 2)})
+            object_status = self.run_object_func(worker, object_name)
+            result.update({'status': self.SKIPPED if object_status == self.SKIPPED else 'completed'})
+
+        except (Exception, SystemExit) as err:
+            error_message = str(err) if str(err) != '' else err.__class__.__name__
+            result.update({'error': error_message})
+
+            if not self.isolate_failures:
+                raise
+
+            logger.error(f"{self.phase.capitalize()} {self.object_type}: {object_name} failed: {error_message}")
+
+        finally:
+            if worker is not None:
+                self.release_worker(worker)
+            retry_stats = RetryPolicy.stop_stats(previous_retry_stats)
+            throttle_time = RateLimiter.stop_stats(previous_throttle_stats)
+            result.update({'duration': round(time.time() - start_time, 2),
+                           'retries': retry_stats.get('retries'),
+                           'retry_time': round(retry_stats.get('retry_time'), 2),
+                           'throttle_time': round(throttle_time, 2)})
+
+            if self.result_collector is not None:
+                self.result_collector(result)
+
+        if result.get('status') == 'completed':
+            wait_message = f" | waited for connection: {result.get('wait_time')}s" if result.get('wait_time') > 0 else ''
+            retry_message = f" | retries: {result.get('retries')}, wasted: {result.get('retry_time')}s" if result.get('retries') > 0 else ''
+            throttle_message = f" | throttled: {result.get('throttle_time')}s" if result.get('throttle_time') > 0 else ''
+            logger.info(f"{self.phase.capitalize()} {self.object_type}: {object_name} completed | time: {result.get('duration')}s{wait_message}{retry_message}{throttle_message}")
+        elif result.get('status') == self.SKIPPED:
+            logger.info(f"{self.phase.capitalize()} {self.object_type}: {object_name} skipped")
+
+        if self.concurrency_tuner is not None and result.get('status') == 'completed':
+            self.concurrency_tuner.add_result(result)
+
+        return result
+
+    def run_object_func(self, worker, object_name):
+        """ Call the object function, again after an error if the executor has a retry policy.
+        Before a retry, the worker resets its connection, in case the error dropped it.
+        """
+        if self.retry_policy is None or self.retry_policy.max_retries == 0:
+            return self.object_func(worker, object_name)
+
+        reset_connection = getattr(worker, 'reset_connection', None)
+        return self.retry_policy.run(lambda: self.object_func(worker, object_name),
+                                     f"{self.phase.capitalize()} {self.object_type}: {object_name}",
+                                     on_retry=reset_connection)
+
+    def acquire_worker(self):
+        """ Returns an idle worker or creates a new one, and the time waited for a connection slot.
+        With a connection budget, it waits until either a slot is free or another worker becomes idle.
+        """
+        wait_time = 0
+
+        while True:
+            with self.lock:
+                if len(self.idle_workers) > 0:
+                    return self.idle_workers.pop(), wait_time
+
+            if self.create_worker is None:
+                return None, wait_time
+
+            if self.connection_budget is not None:
+                start_wait_time = time.time()
+                slot_acquired = self.connection_budget.acquire(abort=self.has_idle_worker)
+                wait_time += time.time() - start_wait_time
+
+                if not slot_acquired:
+                    continue
+
+            try:
+                worker = self.create_worker()
+            except (Exception, SystemExit):
+                if self.connection_budget is not None:
+                    self.connection_budget.release()
+                raise
+
+            with self.lock:
+                self.created_workers.append(worker)
+
+            return worker, wait_time
+
+    def has_idle_worker(self):
+        with self.lock:
+            return len(self.idle_workers) > 0
+
+    def release_worker(self, worker):
+        with self.lock:
+            self.idle_workers.append(worker)
+
+    def close_workers(self):
+        """ Close connections of all workers created by the executor. """
+        for worker in self.created_workers:
+            try:
+                worker.close_connection()
+            except Exception as err:
+                logger.debug(f"Closing of {self.phase} worker failed: {err}")
+            finally:
+                if self.connection_budget is not None:
+                    self.connection_budget.release()
+
+        self.created_workers = []
+        self.idle_workers = []
+
+    def get_failed_objects(self, results):
+        return [result.get('object_name') for result in results if result.get('status') == 'failed']
+
+    def log_summary(self, results, total_duration):
+        """ Log one summary line for all processed objects. """
+        failed_objects = self.get_failed_objects(results)
+        completed = len([result for result in results if result.get('status') == 'completed'])
+        skipped = len([result for result in results if result.get('status') == self.SKIPPED])
+        object_time = round(sum(result.get('duration') for result in results), 2)
+        wait_time = round(sum(result.get('wait_time') for result in results), 2)
+        retries = sum(result.get('retries') for result in results)
+        retry_time = round(sum(result.get('retry_time') for result in results), 2)
+        throttle_time = round(sum(result.get('throttle_time') for result in results), 2)
+
+        summary = (f"{self.phase.capitalize()} summary: {completed} of {len(results)} {self.object_type}s completed"
+                   f" | duration: {round(total_duration, 2)}s | sum of {self.object_type} times: {object_time}s")
+
+        if skipped > 0:
+            summary += f" | skipped: {skipped}"
+
+        if wait_time > 0:
+            summary += f" | waited for connections: {wait_time}s"
+
+        if retries > 0:
+            summary += f" | retries: {retries}, wasted: {retry_time}s"
+
+        if throttle_time > 0:
+            summary += f" | throttled: {throttle_time}s"
+
+        if len(results) > 0:
+            slowest = max(results, key=lambda result: result.get('duration'))
+            summary += f" | slowest: {slowest.get('object_name')} {slowest.get('duration')}s"
+
+        logger.info(summary)
+
+        if len(failed_objects) > 0:
+            logger.error(f"{self.phase.capitalize()} failed for {self.object_type}s: {', '.join(failed_objects)}")
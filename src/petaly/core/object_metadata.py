@@ -15,10 +15,10 @@
 import logging
 logger = logging.getLogger(__name__)
 
-import sys
-
 from petaly.core.data_object import DataObject
 from petaly.utils.file_handler import FileHandler
+from petaly.core.type_mapping import TypeMapping
+from petaly.core.exceptions import ExtractError
 
 
 class ObjectMetadata():
@@ -30,6 +30,8 @@ class ObjectMetadata():
                                 "source_object_name": None,
                                 "source_connector_type": None,
                                 "output_file_format": None,
+                                "estimated_rows": None,
+                                "estimated_bytes": None,
                                 "object_settings": {},
                                 "columns":[]
                                 }
@@ -126,18 +128,81 @@ class ObjectMetadata():
         self.object_metadata_dict.update({'columns': columns_arr})
         return self.object_metadata_dict
 
-    def process_metadata(self, meta_query_result):
-        object_list = []
+    def process_metadata(self, meta_query_result, object_size_dict=None):
+        object_meta_dict = self.compose_object_meta_dict(meta_query_result, object_size_dict)
+
+        for meta_table in object_meta_dict.values():
+            self.save_table_metadata(meta_table)
+
+        return list(object_meta_dict.keys())
+
+    def compose_object_meta_dict(self, meta_query_result, object_size_dict=None):
+        """ Returns the metadata of each object without saving it, as {object_name: meta_table}
+        """
+        object_meta_dict = {}
+        object_size_dict = {} if object_size_dict is None else object_size_dict
         if meta_query_result is not None:
             for meta_table in self.compose_objects_meta_from_query(meta_query_result):
                 object_name = meta_table.get('source_object_name')
-                object_list.append(object_name)
-                self.save_table_metadata(meta_table)
+                meta_table.update(object_size_dict.get(object_name, {}))
+                object_meta_dict.update({object_name: meta_table})
 
         else:
-            logger.error(f"Meta Query for piepline {self.pipeline.pipeline_name} is empty. Review your configuration.")
-            sys.exit()
-        return object_list
+            raise ExtractError(f"Meta Query for piepline {self.pipeline.pipeline_name} is empty. Review your configuration.")
+        return object_meta_dict
+
+    def compose_object_size_dict(self, object_size_result):
+        """ Its format the result of the object size query
+        Given format:
+        [{'source_object_name': table_name_1, 'estimated_rows': 1000, 'estimated_bytes': 65536}]
+        Result format:
+        {table_name_1: {'estimated_rows': 1000, 'estimated_bytes': 65536}}
+        """
+        object_size_dict = {}
+
+        if object_size_result is None:
+            return object_size_dict
+
+        for value in object_size_result:
+            object_size_dict.update({value.get('source_object_name'): {
+                                        'estimated_rows': self.__to_int_or_none(value.get('estimated_rows')),
+                                        'estimated_bytes': self.__to_int_or_none(value.get('estimated_bytes'))}})
+
+        return object_size_dict
+
+    def combine_sources_metadata(self, object_name, source_pipelines):
+        """ Save the metadata of the first source as metadata of the object, if the pipeline has several sources with the same schema.
+        With source_name_column, the metadata gets an additional text column for the source name.
+        """
+        source_metadata_fpath = source_pipelines[0].output_object_metadata_fpath.format(object_name=object_name)
+        if not self.f_handler.is_file(source_metadata_fpath):
+            return
+
+        meta_table = self.f_handler.load_file_as_dict(source_metadata_fpath, 'json')
+
+        if self.pipeline.source_name_column is not None:
+            columns = meta_table.get('columns')
+            columns.append(self.compose_column_metadata(column_name=self.pipeline.source_name_column,
+                                                        ordinal_position=len(columns) + 1,
+                                                        is_nullable='YES',
+                                                        data_type=self.get_text_data_type(),
+                                                        character_maximum_length=None,
+                                                        numeric_precision=None,
+                                                        numeric_scale=None,
+                                                        primary_key=None))
+
+        self.f_handler.make_dirs(self.pipeline.output_object_metadata_dpath.format(object_name=object_name))
+        self.save_table_metadata(meta_table)
+
+    def get_text_data_type(self):
+        """ Returns a text data type of the source connector, which is mapped to the target.
+        """
+        type_mapping = TypeMapping(self.pipeline).get_type_mapping()
+        for data_type in ('text', 'character varying', 'string', 'STRING'):
+            if data_type in type_mapping:
+                return data_type
+
+        return 'string'
 
     def compose_column_metadata(self, column_name, ordinal_position, is_nullable, data_type, character_maximum_length, numeric_precision, numeric_scale, primary_key):
 
@@ -170,6 +235,13 @@ class ObjectMetadata():
         return_val = value if str(value).lower() != 'nan' else None
         return return_val
 
+    def __to_int_or_none(self, value):
+        """ Size estimates come as int, Decimal, float or str depending on the connector. """
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return None
+
     def get_data_object(self, object_name):
         return DataObject(self.pipeline, object_name)
 
@@ -0,0 +1,142 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import datetime
+
+from petaly.utils.file_handler import FileHandler
+from petaly.core.exceptions import ConfigError
+
+
+class ObjectScheduler():
+    """ ObjectScheduler orders data objects, so the largest objects start first.
+    With parallel workers, a large object started last would otherwise set the total runtime.
+    The optional priority and deadline of an object_spec come before the size: objects of a higher priority class start first,
+    and within a class, objects with an earlier deadline.
+    """
+    priority_classes = {'high': 0, 'normal': 1, 'low': 2}
+    default_priority = 'normal'
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.f_handler = FileHandler()
+        # the schedule is parsed once per run by the pipeline and shared by the schedulers of all workers
+        self.object_schedule = pipeline.object_schedule if pipeline is not None else {}
+
+    @classmethod
+    def compose_object_schedule(cls, pipeline, now=None):
+        """ Returns the priority class and the deadline as timestamp of each object in data_objects_spec.
+        Objects without an object_spec have the default priority and no deadline.
+        """
+        object_schedule = {}
+        now = now if now is not None else datetime.datetime.now()
+        data_objects_spec = (pipeline.data_objects_spec or {}).get('data_objects_spec') or []
+
+        for object_spec in data_objects_spec:
+            if object_spec is None:
+                continue
+
+            object_spec = object_spec.get('object_spec')
+            object_name = object_spec.get('object_name')
+            priority = str(object_spec.get('priority') or cls.default_priority).strip().lower()
+
+            if priority not in cls.priority_classes:
+                raise ConfigError(f"The priority: {priority} of object {object_name} in {pipeline.pipeline_fpath} isn't valid. Choose between {', '.join(cls.priority_classes.keys())}.")
+
+            object_schedule.update({object_name: {'priority': priority,
+                                                  'deadline': cls.parse_deadline(pipeline, object_spec.get('deadline'), object_name, now)}})
+
+        return object_schedule
+
+    @classmethod
+    def parse_deadline(cls, pipeline, deadline, object_name, now):
+        """ Returns the deadline as timestamp, or None. A time of day HH:MM is on the day the run started,
+        e.g. 06:00 of a run started at 07:00 passed already and is missed. A date and time is specified as YYYY-MM-DD HH:MM.
+        """
+        if deadline is None or str(deadline).strip() == '':
+            return None
+
+        deadline = str(deadline).strip()
+
+        try:
+            if len(deadline) <= 5:
+                deadline_time = datetime.datetime.strptime(deadline, '%H:%M').time()
+                deadline_datetime = datetime.datetime.combine(now.date(), deadline_time)
+            else:
+                deadline_datetime = datetime.datetime.strptime(deadline, '%Y-%m-%d %H:%M')
+        except ValueError:
+            raise ConfigError(f"The deadline: {deadline} of object {object_name} in {pipeline.pipeline_fpath} isn't valid. Specify a time HH:MM or a date and time YYYY-MM-DD HH:MM.")
+
+        return deadline_datetime.timestamp()
+
+    def get_deadline(self, object_name):
+        return (self.object_schedule.get(object_name) or {}).get('deadline')
+
+    def get_priority_key(self, object_name):
+        """ Returns the key to sort objects by priority class and deadline, objects without a deadline come last in their class. """
+        object_schedule = self.object_schedule.get(object_name) or {}
+        priority = self.priority_classes.get(object_schedule.get('priority') or self.default_priority)
+        deadline = object_schedule.get('deadline')
+        return (priority, deadline if deadline is not None else float('inf'))
+
+    def order_by_priority(self, object_list):
+        """ Order objects by priority class and deadline. Objects of the same class and deadline keep their order. """
+        ordered_list = sorted(object_list, key=self.get_priority_key)
+
+        if ordered_list != list(object_list):
+            logger.debug(f"Objects ordered by priority and deadline: {ordered_list}")
+
+        return ordered_list
+
+    def order_by_size(self, object_list, object_size_dict):
+        """ Order objects by estimated_bytes, then by estimated_rows, largest first.
+        Objects without an estimate keep their order and are placed at the end. Priority classes and deadlines are ordered first.
+
+        :param object_list: list of object names
+        :param object_size_dict: {object_name: {'estimated_rows': int, 'estimated_bytes': int}}
+        :return: ordered list of object names
+        """
+        sized_objects = []
+        unsized_objects = []
+
+        for object_name in object_list:
+            object_size = object_size_dict.get(object_name) or {}
+            if object_size.get('estimated_bytes') is None and object_size.get('estimated_rows') is None:
+                unsized_objects.append(object_name)
+            else:
+                sized_objects.append(object_name)
+
+        def size_key(object_name):
+            object_size = object_size_dict.get(object_name)
+            return (object_size.get('estimated_bytes') or 0, object_size.get('estimated_rows') or 0)
+
+        ordered_list = sorted(sized_objects, key=size_key, reverse=True) + unsized_objects
+
+        if len(sized_objects) > 0:
+            logger.debug(f"Objects ordered by estimated size, largest first: {ordered_list}")
+
+        return self.order_by_priority(ordered_list)
+
+    def order_by_staged_size(self, object_list):
+        """ Order objects by the size of their extracted files in the output directory, largest first.
+        """
+        object_size_dict = {}
+
+        for object_name in object_list:
+            output_data_object_dir = self.pipeline.extracted_object_data_dpath.format(object_name=object_name)
+            object_size_dict.update({object_name: {'estimated_bytes': self.f_handler.get_dir_size(output_data_object_dir)}})
+
+        return self.order_by_size(object_list, object_size_dict)
@@ -15,12 +15,28 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import copy
 import os
 import sys
 
 from petaly.utils.file_handler import FileHandler
+from petaly.core.run_manifest import RunManifest
+from petaly.core.staging_budget import StagingBudget
+from petaly.core.deadline_monitor import DeadlineMonitor
+from petaly.core.object_scheduler import ObjectScheduler
+from petaly.core.watermark_store import WatermarkStore
+from petaly.core.change_detector import ChangeDetector
+from petaly.core.concurrency_tuner import ConcurrencyTuner
+from petaly.core.retry_policy import RetryPolicy
+from petaly.core.object_metadata import ObjectMetadata
+from petaly.core.exceptions import ConfigError, PipelineNotFoundError
 
 class Pipeline:
+    # parsed pipeline.yaml files, keyed by path and reused as long as the file is unchanged, e.g. by the runs of serve
+    config_cache = {}
+    # the upper limit of parallel objects with max_parallel_objects: auto, if max_auto_parallel_objects isn't specified
+    default_max_auto_parallel_objects = 8
+
     def __init__(self, pipeline_name, main_config):
         logger.debug("Load main ConfigHandler")
 
@@ -31,17 +47,14 @@ class Pipeline:
         self.data_dname = 'data'
         self.metadata_dname = 'metadata'
         self.object_metadata_fname = 'object_meta.json'
+        self.object_fingerprint_fname = 'object_fingerprint.json'
+        self.sources_dname = 'sources'
 
         self.pipeline_type_mapping_fpath = os.path.join(self.pipeline_dpath, self.m_conf.type_mapping_fname)
         self.pipeline_extract_type_transformer_fpath = os.path.join(self.pipeline_dpath, self.m_conf.extractor_type_transformer_fname)
 
         self.output_pipeline_dpath = os.path.join(self.m_conf.output_base_dpath, pipeline_name)
-        self.output_object_data_dpath = os.path.join(self.output_pipeline_dpath, '{object_name}', self.data_dname)
-        self.output_object_metadata_dpath = os.path.join(self.output_pipeline_dpath, '{object_name}', self.metadata_dname)
-        self.output_object_metadata_fpath = os.path.join(self.output_object_metadata_dpath, self.object_metadata_fname)
-        self.output_extract_to_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.extract_to_stmt_fname )
-        self.output_load_from_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.load_from_stmt_fname)
-        self.output_create_table_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.create_table_stmt_fname)
+        self.compose_output_object_paths(os.path.join(self.output_pipeline_dpath, '{object_name}'))
 
         self.pipeline_name = pipeline_name
 
@@ -52,19 +65,34 @@ class Pipeline:
         pipeline_dict = pipeline_all_obj[0]
 
         if pipeline_dict == None:
-            logger.warning(f"The pipeline: {pipeline_name} does not exists under: {self.pipeline_fpath}")
-            sys.exit()
+            raise PipelineNotFoundError(f"The pipeline: {pipeline_name} does not exists under: {self.pipeline_fpath}")
 
         pipeline_attr = pipeline_dict.get('pipeline').get('pipeline_attributes')
-        self.source_attr = pipeline_dict.get('pipeline').get('source_attributes')
-        self.check_pipeline_outdated_arguments(self.source_attr)
+        # source_attributes is a list, if several sources with the same schema are loaded into one target
+        source_attributes = pipeline_dict.get('pipeline').get('source_attributes')
+        self.source_attr_list = source_attributes if isinstance(source_attributes, list) else [source_attributes]
+        for source_attr in self.source_attr_list:
+            self.check_pipeline_outdated_arguments(source_attr)
+
+        if len(set([source_attr.get('connector_type') for source_attr in self.source_attr_list])) > 1:
+            raise ConfigError(f"All source_attributes of the pipeline {pipeline_name} must have the same connector_type.")
 
-        self.target_attr = pipeline_dict.get('pipeline').get('target_attributes')
-        self.check_pipeline_outdated_arguments(self.target_attr)
+        self.source_attr = self.source_attr_list[0]
+        # set for each source of a pipeline with several sources, see get_source_pipelines
+        self.source_name = None
+
+        # target_attributes is a list, if the extracted data is loaded into several targets
+        target_attributes = pipeline_dict.get('pipeline').get('target_attributes')
+        self.target_attr_list = target_attributes if isinstance(target_attributes, list) else [target_attributes]
+        for target_attr in self.target_attr_list:
+            self.check_pipeline_outdated_arguments(target_attr)
+
+        self.target_attr = self.target_attr_list[0]
+        # set for each target of a pipeline with several targets, see get_target_pipelines
+        self.target_name = None
 
         if pipeline_attr.get('pipeline_name') != pipeline_name:
-            logger.warning(f"The pass parameter for pipeline_name: {pipeline_name} does not match the pipeline_name {pipeline_attr.get('pipeline_name')} defined in the corresponding file:  {self.pipeline_fpath}")
-            sys.exit()
+            raise ConfigError(f"The pass parameter for pipeline_name: {pipeline_name} does not match the pipeline_name {pipeline_attr.get('pipeline_name')} defined in the corresponding file:  {self.pipeline_fpath}")
 
         # PIPELINE ATTRIBUTE
         self.is_enabled = True if str(pipeline_attr.get('is_enabled')).lower() == 'true' else False
@@ -79,17 +107,39 @@ class Pipeline:
         self.data_attributes = pipeline_dict.get('pipeline').get('data_attributes')
         self.data_objects_spec_mode = self.data_attributes.get('data_objects_spec_mode')
         self.object_default_settings = self.get_object_default_settings()
+        # with max_parallel_objects: auto, the number of objects processed at the same time is adapted, see ConcurrencyTuner
+        self.auto_parallel_objects = str(self.data_attributes.get('max_parallel_objects')).strip().lower() == 'auto'
+        self.max_parallel_objects = self.get_max_parallel_objects()
+        # retries of a failed object, the retries of a single file are set by max_retries in source_attributes and target_attributes
+        self.object_retry_policy = RetryPolicy.from_attributes(self.data_attributes, 'max_object_retries', default_max_retries=0)
+        # set by run, if the objects are shared with other nodes by shard or work-stealing
+        self.object_assignment = None
+        self.overlap_extract_load = True if str(self.data_attributes.get('overlap_extract_load')).lower() == 'true' else False
+        # optional column, which records the source of each row, if the pipeline has several sources
+        self.source_name_column = self.data_attributes.get('source_name_column')
+        # optional limit of the staged data and deletion of loaded objects, shared by the pipelines of each source and target
+        self.staging_budget = StagingBudget.from_pipeline(self)
+        # optional skip of the objects, whose source is unchanged since the last successful run
+        self.change_detector = ChangeDetector.from_pipeline(self)
+        # set by run --resume, to skip objects completed by the previous run
+        self.resume = False
+        self.run_manifest = RunManifest(self)
+        # high-water marks of the objects with load_mode: incremental
+        self.watermark_store = WatermarkStore(self)
+        # set by run --every, to keep the state of the pipeline between the iterations, see MicroBatch
+        self.micro_batch = None
+        # set by petaly.run, to collect the result of each object, see RunResult
+        self.run_result = None
 
         # load second yaml document
         self.data_objects_spec = pipeline_all_obj[1]
         if self.data_objects_spec is None:
-            logger.warning(
+            raise ConfigError(
                 f"The pipeline: {pipeline_name} wasn't specify properly. It is missing following definition\n\n"
                 f"---\n"
                 f"data_objects_spec: []\n\n"
                 f"It is recommended to reconfigure the pipeline using\n"
                 f"python -m petaly init pipeline -p {pipeline_name}")
-            sys.exit()
 
         self.data_objects = []
         if len(self.data_objects_spec) > 0:
@@ -97,9 +147,140 @@ class Pipeline:
                 if obj is not None:
                     self.data_objects.append(obj.get('object_spec').get('object_name'))
 
+        # the priority class and deadline of each object, parsed once per run, see ObjectScheduler
+        self.object_schedule = ObjectScheduler.compose_object_schedule(self)
+        # warns early, if an object with a deadline in its object_spec is projected to miss it
+        self.deadline_monitor = DeadlineMonitor.from_pipeline(self)
+
+    def compose_output_object_paths(self, output_object_dpath):
+        """ Compose the paths of the data and metadata of each object in the output directory.
+        """
+        self.output_object_dpath = output_object_dpath
+        self.output_object_data_dpath = os.path.join(self.output_object_dpath, self.data_dname)
+        # the data directory written by the extractor. A pipeline with several targets loads from a linked copy per target
+        self.extracted_object_data_dpath = self.output_object_data_dpath
+        self.output_object_metadata_dpath = os.path.join(self.output_object_dpath, self.metadata_dname)
+        self.output_object_metadata_fpath = os.path.join(self.output_object_metadata_dpath, self.object_metadata_fname)
+        self.output_extract_to_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.extract_to_stmt_fname )
+        self.output_load_from_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.load_from_stmt_fname)
+        self.output_create_table_stmt_fpath = os.path.join(self.output_object_metadata_dpath, self.m_conf.create_table_stmt_fname)
+
+    def get_source_pipelines(self):
+        """ Returns a pipeline for each source, which shares the settings with this pipeline.
+        With several sources, each source extracts into its own directory output_object_dpath/sources/source_name
+        and keeps its own run manifest. The extracted files are combined by combine_sources_data before load.
+        """
+        if len(self.source_attr_list) == 1:
+            return [self]
+
+        source_pipelines = []
+        for i, source_attr in enumerate(self.source_attr_list):
+            source_pipeline = copy.copy(self)
+            source_pipeline.source_name = str(source_attr.get('source_name') or f"source_{i+1}")
+            source_pipeline.source_attr = source_attr
+            source_pipeline.source_connector_id = source_attr.get('connector_type')
+            source_pipeline.compose_output_object_paths(os.path.join(self.output_pipeline_dpath, '{object_name}', self.sources_dname, source_pipeline.source_name))
+            source_pipeline.run_manifest = RunManifest(source_pipeline)
+            source_pipelines.append(source_pipeline)
+
+        return source_pipelines
+
+    def combine_sources_data(self, object_name, source_pipelines):
+        """ Link the extracted files of all sources into the data directory of the object, so they are loaded in a single pass.
+        The metadata of the first source is used for the object. With source_name_column, it gets an additional column for the source name.
+        """
+        output_data_object_dpath = self.output_object_data_dpath.format(object_name=object_name)
+        output_metadata_object_dpath = self.output_object_metadata_dpath.format(object_name=object_name)
+        self.f_handler.remove_dir(output_data_object_dpath)
+        self.f_handler.remove_dir(output_metadata_object_dpath)
+
+        for source_pipeline in source_pipelines:
+            self.f_handler.link_dir_files(source_pipeline.extracted_object_data_dpath.format(object_name=object_name),
+                                          output_data_object_dpath,
+                                          file_prefix=source_pipeline.source_name + '_')
+
+        ObjectMetadata(self).combine_sources_metadata(object_name, source_pipelines)
+
+    def get_result_collector(self):
+        """ Returns a function, which adds the result of an object processed by this pipeline to the RunResult, the StagingBudget
+        and the DeadlineMonitor, or None.
+        """
+        if self.run_result is None and self.staging_budget is None and self.deadline_monitor is None:
+            return None
+
+        def collect_result(result):
+            if self.run_result is not None:
+                self.run_result.add_object_result(self, result)
+            if self.staging_budget is not None:
+                self.staging_budget.add_result(result)
+            if self.deadline_monitor is not None:
+                self.deadline_monitor.add_result(result)
+
+        return collect_result
+
+    def get_concurrency_tuner(self, phase, endpoint_attr):
+        """ Returns a ConcurrencyTuner for the endpoint, if max_parallel_objects is auto, or None.
+        """
+        if not self.auto_parallel_objects:
+            return None
+
+        return ConcurrencyTuner(self, phase, endpoint_attr, self.max_parallel_objects)
+
+    def get_target_names(self):
+        """ Returns the names of the targets, or [None] if the pipeline has a single target. """
+        return [target_pipeline.target_name for target_pipeline in self.get_target_pipelines()]
+
+    def get_target_pipelines(self):
+        """ Returns a pipeline for each target, which shares the extracted data and the settings with this pipeline.
+        With several targets, each target loads from its own data directory and writes its own statement files,
+        so a loader that compresses files before upload doesn't change the files of the other targets.
+        """
+        if len(self.target_attr_list) == 1:
+            return [self]
+
+        target_pipelines = []
+        for i, target_attr in enumerate(self.target_attr_list):
+            target_name = f"target_{i+1}"
+
+            target_pipeline = copy.copy(self)
+            target_pipeline.target_name = target_name
+            target_pipeline.target_attr = target_attr
+            target_pipeline.target_connector_id = target_attr.get('connector_type')
+            target_pipeline.output_object_data_dpath = os.path.join(self.output_pipeline_dpath, '{object_name}', f"{self.data_dname}_{target_name}")
+            target_pipeline.output_load_from_stmt_fpath = os.path.join(self.output_object_metadata_dpath, f"{target_name}_{self.m_conf.load_from_stmt_fname}")
+            target_pipeline.output_create_table_stmt_fpath = os.path.join(self.output_object_metadata_dpath, f"{target_name}_{self.m_conf.create_table_stmt_fname}")
+            target_pipelines.append(target_pipeline)
+
+        return target_pipelines
+
+    def prepare_target_data(self, object_name):
+        """ Link the extracted files of the object into the data directory of the target, if the pipeline has several targets.
+        """
+        if self.output_object_data_dpath == self.extracted_object_data_dpath:
+            return
+
+        self.f_handler.link_dir_files(self.extracted_object_data_dpath.format(object_name=object_name),
+                                      self.output_object_data_dpath.format(object_name=object_name))
+
     def get_pipeline_entire_config(self):
-        pipeline_all_obj = self.f_handler.load_yaml_all(self.pipeline_fpath)
-        return pipeline_all_obj
+        """ Returns the parsed pipeline.yaml. The file is parsed again only if it has changed since the last call.
+        """
+        try:
+            file_stat = os.stat(self.pipeline_fpath)
+            file_version = (file_stat.st_mtime_ns, file_stat.st_size)
+        except OSError:
+            raise PipelineNotFoundError(f"The pipeline: {self.pipeline_name} does not exists under: {self.pipeline_fpath}")
+
+        cached_config = Pipeline.config_cache.get(self.pipeline_fpath)
+
+        if cached_config is None or cached_config[0] != file_version:
+            pipeline_all_obj = self.f_handler.load_yaml_all(self.pipeline_fpath)
+            Pipeline.config_cache.update({self.pipeline_fpath: (file_version, pipeline_all_obj)})
+        else:
+            pipeline_all_obj = cached_config[1]
+
+        # the caller may modify the config, e.g. cleanup removes objects from it
+        return copy.deepcopy(pipeline_all_obj)
 
     def get_object_default_settings(self):
         """
@@ -133,6 +314,25 @@ class Pipeline:
 
         return object_default_settings
 
+    def get_max_parallel_objects(self):
+        """ Returns the number of objects processed at the same time. The default is 1, one object after another.
+        """
+        max_parallel_objects = self.data_attributes.get('max_parallel_objects')
+
+        if max_parallel_objects is None:
+            return 1
+
+        if self.auto_parallel_objects:
+            max_parallel_objects = self.data_attributes.get('max_auto_parallel_objects') or self.default_max_auto_parallel_objects
+
+        try:
+            max_parallel_objects = int(max_parallel_objects)
+        except ValueError:
+            logger.warning(f"The parameter max_parallel_objects: {max_parallel_objects} in {self.pipeline_fpath} is not an integer. Objects will be processed one after another.")
+            return 1
+
+        return max(1, max_parallel_objects)
+
     def check_pipeline_outdated_arguments(self, dict_to_check):
         """ Check if one of pass dict include an outdated parameters. In case it has output the log message.
 
@@ -155,4 +355,4 @@ class Pipeline:
                     logger.info(item_message)
 
                 if item_value.get('action').lower() == 'exit':
-                    sys.exit()
+                    raise ConfigError(item_message)
@@ -0,0 +1,122 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import time
+
+from petaly.core.connection_budget import ConnectionBudget
+
+
+class RateLimiter():
+    """ RateLimiter caps the rows/sec and bytes/sec extracted from one source, set by max_rows_per_second and max_mb_per_second in source_attributes.
+    It's a token bucket shared by all workers and pipelines in the process that extract from the same endpoint.
+    The bucket holds the tokens of one second, so short bursts are allowed and the throughput stays smooth.
+    The time a worker waits for tokens is counted as throttled time of the object processed by the current thread.
+    """
+    limiters = {}
+    limiters_lock = threading.Lock()
+    thread_stats = threading.local()
+
+    def __init__(self, endpoint_key, rows_per_second, bytes_per_second):
+        self.endpoint_key = endpoint_key
+        self.rows_per_second = rows_per_second
+        self.bytes_per_second = bytes_per_second
+        self.row_tokens = rows_per_second or 0
+        self.byte_tokens = bytes_per_second or 0
+        self.refilled_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def get_limiter(cls, endpoint_attr):
+        """ Returns the limiter of the endpoint, or None if neither max_rows_per_second nor max_mb_per_second is specified.
+        """
+        try:
+            rows_per_second = cls.to_positive_number(endpoint_attr.get('max_rows_per_second'))
+            mb_per_second = cls.to_positive_number(endpoint_attr.get('max_mb_per_second'))
+        except ValueError:
+            logger.warning(f"The parameter max_rows_per_second or max_mb_per_second of {endpoint_attr.get('connector_type')} is not a number. The extraction is not throttled.")
+            return None
+
+        if rows_per_second is None and mb_per_second is None:
+            return None
+
+        bytes_per_second = mb_per_second * 1024 * 1024 if mb_per_second is not None else None
+        endpoint_key = ConnectionBudget.compose_endpoint_key(endpoint_attr)
+
+        with cls.limiters_lock:
+            limiter = cls.limiters.get(endpoint_key)
+
+            # pipelines with the same endpoint may specify different limits, the last one is used
+            if limiter is None or (limiter.rows_per_second, limiter.bytes_per_second) != (rows_per_second, bytes_per_second):
+                limiter = RateLimiter(endpoint_key, rows_per_second, bytes_per_second)
+                cls.limiters.update({endpoint_key: limiter})
+
+        return limiter
+
+    @classmethod
+    def to_positive_number(cls, value):
+        if value is None or str(value).strip() == '':
+            return None
+        value = float(value)
+        return value if value > 0 else None
+
+    def get_batch_rows(self):
+        """ Returns how many rows a row-by-row extraction reads before it asks for tokens, about a tenth of a second. """
+        if self.rows_per_second is None:
+            return 1000
+        return max(1, min(1000, int(self.rows_per_second / 10)))
+
+    def consume(self, rows=0, nbytes=0):
+        """ Take the tokens of the extracted rows and bytes, and wait if the bucket is empty.
+        Tokens can be borrowed, so the next worker waits until the debt is refilled.
+        """
+        with self.lock:
+            now = time.monotonic()
+            elapsed = now - self.refilled_at
+            self.refilled_at = now
+            wait_time = 0
+
+            if self.rows_per_second is not None:
+                self.row_tokens = min(self.rows_per_second, self.row_tokens + elapsed * self.rows_per_second) - rows
+                wait_time = max(wait_time, -self.row_tokens / self.rows_per_second)
+
+            if self.bytes_per_second is not None:
+                self.byte_tokens = min(self.bytes_per_second, self.byte_tokens + elapsed * self.bytes_per_second) - nbytes
+                wait_time = max(wait_time, -self.byte_tokens / self.bytes_per_second)
+
+        if wait_time > 0:
+            time.sleep(wait_time)
+            self.record_throttle_time(wait_time)
+
+    @classmethod
+    def start_stats(cls):
+        """ Start counting the throttled time of the current thread. Returns the previous counter, which is restored by stop_stats. """
+        previous_stats = getattr(cls.thread_stats, 'throttle_time', None)
+        cls.thread_stats.throttle_time = 0
+        return previous_stats
+
+    @classmethod
+    def stop_stats(cls, previous_stats):
+        """ Returns the throttled time counted since start_stats. """
+        throttle_time = getattr(cls.thread_stats, 'throttle_time', None) or 0
+        cls.thread_stats.throttle_time = previous_stats
+        return throttle_time
+
+    @classmethod
+    def record_throttle_time(cls, throttle_time):
+        if getattr(cls.thread_stats, 'throttle_time', None) is not None:
+            cls.thread_stats.throttle_time += throttle_time
@@ -0,0 +1,104 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import random
+import threading
+import time
+
+from petaly.core.exceptions import ConfigError
+
+
+class RetryPolicy():
+    """ RetryPolicy runs a function again after a transient error, waiting with exponential backoff and jitter between the attempts.
+    Connectors retry a single file upload or COPY with max_retries of source_attributes or target_attributes,
+    the ObjectExecutor retries a whole object with max_object_retries of data_attributes.
+    The retries and the time wasted by failed attempts and backoff are counted for the object processed by the current thread.
+    """
+    default_max_retries = 3
+    default_backoff_seconds = 1
+    max_backoff_seconds = 60
+    thread_stats = threading.local()
+
+    def __init__(self, max_retries=None, backoff_seconds=None):
+        self.max_retries = self.default_max_retries if max_retries is None else max(0, int(max_retries))
+        self.backoff_seconds = self.default_backoff_seconds if backoff_seconds is None else max(0, float(backoff_seconds))
+
+    @classmethod
+    def from_attributes(cls, attributes, max_retries_key='max_retries', default_max_retries=None):
+        """ Returns the policy of source_attributes, target_attributes or data_attributes.
+        """
+        max_retries = attributes.get(max_retries_key)
+        backoff_seconds = attributes.get('retry_backoff_seconds')
+
+        try:
+            max_retries = int(max_retries) if max_retries is not None else default_max_retries
+            backoff_seconds = float(backoff_seconds) if backoff_seconds is not None else None
+        except ValueError:
+            logger.warning(f"The parameter {max_retries_key}: {max_retries} or retry_backoff_seconds: {backoff_seconds} is not a number. The default retries are used.")
+            max_retries, backoff_seconds = default_max_retries, None
+
+        return RetryPolicy(max_retries, backoff_seconds)
+
+    def run(self, func, description, retry_on=(Exception,), on_retry=None):
+        """ Call func and return its result. After an error of the retry_on types, func is called again up to max_retries times.
+        A ConfigError isn't retried, as it fails again. The optional on_retry function is called before each retry, e.g. to reconnect.
+        """
+        attempt = 0
+
+        while True:
+            start_time = time.time()
+            try:
+                return func()
+
+            except retry_on as err:
+                if isinstance(err, ConfigError) or attempt >= self.max_retries:
+                    raise
+
+                attempt += 1
+                delay = self.compute_delay(attempt)
+                logger.warning(f"{description} failed, retry {attempt} of {self.max_retries} in {round(delay, 1)}s: {err}")
+                time.sleep(delay)
+
+                if on_retry is not None:
+                    on_retry()
+
+                self.record_retry(time.time() - start_time)
+
+    def compute_delay(self, attempt):
+        """ The delay doubles with each attempt. Half of it is random, so workers failing at the same time don't retry at the same time. """
+        delay = min(self.max_backoff_seconds, self.backoff_seconds * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @classmethod
+    def start_stats(cls):
+        """ Start counting the retries of the current thread. Returns the previous counter, which is restored by stop_stats. """
+        previous_stats = getattr(cls.thread_stats, 'stats', None)
+        cls.thread_stats.stats = {'retries': 0, 'retry_time': 0}
+        return previous_stats
+
+    @classmethod
+    def stop_stats(cls, previous_stats):
+        """ Returns the retries and the wasted time counted since start_stats. """
+        stats = getattr(cls.thread_stats, 'stats', None) or {'retries': 0, 'retry_time': 0}
+        cls.thread_stats.stats = previous_stats
+        return stats
+
+    @classmethod
+    def record_retry(cls, wasted_time):
+        stats = getattr(cls.thread_stats, 'stats', None)
+        if stats is not None:
+            stats.update({'retries': stats.get('retries') + 1, 'retry_time': stats.get('retry_time') + wasted_time})
@@ -0,0 +1,289 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import json
+import os
+import threading
+import time
+
+
+class RunManifest():
+    """ RunManifest records the progress of each object of a pipeline run in a manifest file in the pipeline output directory.
+    An object passes the phases extracted, uploaded (only loaders that stage files in a bucket first) and loaded.
+    With run --resume, completed objects are skipped and intact staged files are loaded without extracting them again.
+    Each change of an object is appended to a journal file next to the manifest, the journal is merged into the manifest once it has more entries than objects.
+    """
+    phase_order = ['extracted', 'uploaded', 'loaded']
+    min_journal_entries = 100
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.manifest_fpath = os.path.join(pipeline.output_pipeline_dpath, self.get_manifest_fname(pipeline.object_assignment, pipeline.source_name))
+        self.journal_fpath = os.path.splitext(self.manifest_fpath)[0] + '.journal'
+        self.journal_entries = 0
+        self.lock = threading.Lock()
+        self.manifest = self.read_manifest()
+
+    def get_manifest_fname(self, object_assignment, source_name=None):
+        """ Each shard or work-stealing node keeps its own manifest, as several nodes write to the same output directory.
+        Each source of a pipeline with several sources keeps its own manifest of the extracted objects too.
+        """
+        manifest_fname = '.manifest'
+
+        if source_name is not None:
+            manifest_fname += f".{source_name}"
+
+        if object_assignment is not None:
+            if object_assignment.work_stealing:
+                owner = object_assignment.owner.replace(':', '_')
+                manifest_fname += f".{object_assignment.run_id}.{owner}"
+            else:
+                manifest_fname += f".shard_{object_assignment.shard_index}_of_{object_assignment.shard_count}"
+
+        return manifest_fname + '.json'
+
+    def read_manifest(self):
+        if not os.path.isfile(self.manifest_fpath):
+            return None
+
+        try:
+            with open(self.manifest_fpath, 'r', encoding='utf-8') as manifest_file:
+                manifest = json.load(manifest_file)
+        except (OSError, ValueError) as err:
+            logger.warning(f"The run manifest {self.manifest_fpath} can't be read and is ignored: {err}")
+            return None
+
+        if os.path.isfile(self.journal_fpath):
+            with open(self.journal_fpath, 'r', encoding='utf-8') as journal_file:
+                for line in journal_file:
+                    try:
+                        journal_entry = json.loads(line)
+                    except ValueError:
+                        # the last entry of an interrupted run can be incomplete
+                        continue
+                    manifest.get('objects').update({journal_entry.get('object_name'): journal_entry.get('object_entry')})
+                    self.journal_entries += 1
+
+        return manifest
+
+    def exists(self):
+        return self.manifest is not None
+
+    def start(self):
+        """ Start a new manifest for a fresh run. """
+        with self.lock:
+            self.manifest = {'pipeline_name': self.pipeline.pipeline_name,
+                             'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                             'objects': {}}
+            self.save_manifest()
+
+    def save_manifest(self):
+        """ Write the manifest to a temporary file and replace it, so an interrupted run never leaves a broken manifest.
+        The journal is merged into the manifest and removed.
+        """
+        os.makedirs(os.path.dirname(self.manifest_fpath), exist_ok=True)
+        tmp_fpath = f"{self.manifest_fpath}.{os.getpid()}.tmp"
+
+        with open(tmp_fpath, 'w', encoding='utf-8') as manifest_file:
+            json.dump(self.manifest, manifest_file, indent=2)
+
+        os.replace(tmp_fpath, self.manifest_fpath)
+
+        if os.path.isfile(self.journal_fpath):
+            os.remove(self.journal_fpath)
+        self.journal_entries = 0
+
+    def save_object_entry(self, object_name):
+        """ Append the entry of the object to the journal, so a change doesn't rewrite the whole manifest. Called with self.lock held. """
+        if not os.path.isfile(self.manifest_fpath) or self.journal_entries >= max(self.min_journal_entries, len(self.manifest.get('objects'))):
+            self.save_manifest()
+            return
+
+        with open(self.journal_fpath, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(json.dumps({'object_name': object_name, 'object_entry': self.manifest.get('objects').get(object_name)}) + '\n')
+
+        self.journal_entries += 1
+
+    def set_phase(self, object_name, phase, checksum_dpath=None, target_name=None, duration=None, watermark=None, fingerprint=None):
+        """ Record the phase of the object. With checksum_dpath, the signatures, rows and bytes of the staged files are recorded too.
+        The phases uploaded and loaded are recorded per target, as a pipeline can load into several targets.
+        The optional duration of extract and load is used by explain to estimate the duration of the next run.
+        The optional watermark of an incremental extraction holds the low and high mark of the extracted rows, see WatermarkStore.
+        The optional fingerprint holds the change signals of the source at extraction, see ChangeDetector.
+        """
+        updated_at = time.strftime('%Y-%m-%d %H:%M:%S')
+        file_stats = self.compute_file_stats(checksum_dpath) if checksum_dpath is not None else {}
+
+        with self.lock:
+            if self.manifest is None:
+                self.manifest = {'pipeline_name': self.pipeline.pipeline_name,
+                                 'started_at': updated_at,
+                                 'objects': {}}
+
+            if phase == 'extracted':
+                # a new extraction replaces the progress of the previous extraction
+                object_entry = {'phase': phase, 'updated_at': updated_at, 'files': file_stats.get('files'),
+                                'rows': file_stats.get('rows'), 'bytes': file_stats.get('bytes'), 'duration': duration, 'targets': {}}
+                if watermark is not None:
+                    object_entry.update({'watermark': watermark})
+                if fingerprint is not None:
+                    object_entry.update({'fingerprint': fingerprint})
+            else:
+                object_entry = self.manifest.get('objects').get(object_name, {'phase': None, 'files': None, 'targets': {}})
+                object_entry.update({'updated_at': updated_at})
+                object_entry.get('targets').update({self.get_target_key(target_name): phase})
+                if phase == 'loaded' and duration is not None:
+                    object_entry.setdefault('load_durations', {}).update({self.get_target_key(target_name): duration})
+
+            self.manifest.get('objects').update({object_name: object_entry})
+            self.save_object_entry(object_name)
+
+        logger.debug(f"Run manifest: object {object_name} {phase}" + (f" into {target_name}" if target_name is not None else ''))
+
+    def add_loaded_batch(self, object_name, batch_name, target_name=None):
+        """ Record a file of the object as loaded and committed into the target, see DBLoader.load_batches.
+        The loaded files are reset by the next extraction of the object.
+        """
+        with self.lock:
+            if self.manifest is None:
+                self.manifest = {'pipeline_name': self.pipeline.pipeline_name,
+                                 'started_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+                                 'objects': {}}
+
+            object_entry = self.manifest.get('objects').setdefault(object_name, {'phase': None, 'files': None, 'targets': {}})
+            object_entry.setdefault('batches', {}).setdefault(self.get_target_key(target_name), []).append(batch_name)
+            self.save_object_entry(object_name)
+
+    def get_loaded_batches(self, object_name, target_name=None):
+        """ Returns the files of the object loaded into the target since its last extraction. """
+        return list(self.get_object_entry(object_name).get('batches', {}).get(self.get_target_key(target_name), []))
+
+    def get_target_key(self, target_name):
+        return target_name if target_name is not None else 'target'
+
+    def get_object_entry(self, object_name):
+        with self.lock:
+            if self.manifest is None:
+                return {}
+            return self.manifest.get('objects', {}).get(object_name, {})
+
+    def has_reached(self, object_name, phase, target_name=None):
+        """ Returns True if the object has passed the phase in a previous run.
+        The phases uploaded and loaded are checked for the given target, or for all targets of the pipeline if target_name is None.
+        """
+        object_entry = self.get_object_entry(object_name)
+
+        if phase == 'extracted':
+            return object_entry.get('phase') == 'extracted' or len(object_entry.get('targets', {})) > 0
+
+        target_names = [target_name] if target_name is not None else self.pipeline.get_target_names()
+
+        for name in target_names:
+            target_phase = object_entry.get('targets', {}).get(self.get_target_key(name))
+            if target_phase not in self.phase_order or self.phase_order.index(target_phase) < self.phase_order.index(phase):
+                return False
+
+        return True
+
+    def is_loaded(self, object_name, target_name=None):
+        return self.has_reached(object_name, 'loaded', target_name)
+
+    def is_uploaded(self, object_name, target_name=None):
+        return self.has_reached(object_name, 'uploaded', target_name)
+
+    def is_extract_reusable(self, object_name):
+        """ The staged files can be reused, if the object was extracted and uploaded, or its staged files are unchanged. """
+        if self.is_uploaded(object_name):
+            return True
+
+        if not self.has_reached(object_name, 'extracted'):
+            return False
+
+        recorded_files = self.get_object_entry(object_name).get('files')
+
+        extracted_object_data_dpath = self.pipeline.extracted_object_data_dpath.format(object_name=object_name)
+        if recorded_files is None or recorded_files != self.compute_file_stats(extracted_object_data_dpath).get('files'):
+            logger.info(f"Resume: the staged files of object {object_name} changed since extraction and are extracted again")
+            return False
+
+        return True
+
+    def prepare_extract(self, object_list, resume, on_object_extracted=None):
+        """ Start a new manifest, or on resume return only the objects that have to be extracted again.
+        Reused objects which aren't loaded yet are passed to on_object_extracted right away.
+        """
+        if not resume:
+            self.start()
+            return object_list
+
+        extract_list, reusable_list = self.split_reusable_objects(object_list)
+
+        if on_object_extracted is not None:
+            for object_name in self.filter_unloaded_objects(reusable_list):
+                on_object_extracted(object_name)
+
+        return extract_list
+
+    def split_reusable_objects(self, object_list):
+        """ Returns the objects to extract and the objects whose staged files are reused by resume. """
+        reusable_list = [object_name for object_name in object_list if self.is_extract_reusable(object_name)]
+        extract_list = [object_name for object_name in object_list if object_name not in reusable_list]
+
+        if len(reusable_list) > 0:
+            logger.info(f"Resume: {len(reusable_list)} of {len(object_list)} objects reuse the staged files of the previous run")
+
+        return extract_list, reusable_list
+
+    def filter_unloaded_objects(self, object_list, target_name=None):
+        """ Returns the objects that weren't loaded into the target, or into all targets if target_name is None, by the previous run. """
+        unloaded_list = [object_name for object_name in object_list if not self.is_loaded(object_name, target_name)]
+
+        if len(unloaded_list) < len(object_list):
+            target_message = f" into {target_name}" if target_name is not None else ''
+            logger.info(f"Resume: {len(object_list) - len(unloaded_list)} of {len(object_list)} objects were already loaded{target_message} and are skipped")
+
+        return unloaded_list
+
+    def compute_file_stats(self, dpath):
+        """ Returns the signature of each file in the directory, keyed by the relative file path, and their total bytes and rows.
+        The signature is the size and modification time of the file, so a staged file changed after extraction isn't reused by resume.
+        The rows are counted in the csv files, they are None if the directory has other files.
+        """
+        signature_dict = {}
+        total_bytes = 0
+        total_rows = 0
+        has_header = str(self.pipeline.object_default_settings.get('header')).lower() == 'true'
+
+        if not os.path.isdir(dpath):
+            return {'files': signature_dict, 'rows': None, 'bytes': 0}
+
+        for root, dirs, files in os.walk(dpath):
+            for fname in files:
+                fpath = os.path.join(root, fname)
+                file_stat = os.stat(fpath)
+
+                signature_dict.update({os.path.relpath(fpath, dpath): f"{file_stat.st_size}:{file_stat.st_mtime_ns}"})
+                total_bytes += file_stat.st_size
+
+                if total_rows is not None and fname.endswith('.csv'):
+                    with open(fpath, 'rb') as data_file:
+                        file_lines = sum(chunk.count(b'\n') for chunk in iter(lambda: data_file.read(1024 * 1024), b''))
+                    total_rows += max(0, file_lines - 1) if has_header else file_lines
+                else:
+                    total_rows = None
+
+        return {'files': signature_dict, 'rows': total_rows, 'bytes': total_bytes}
@@ -0,0 +1,169 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import threading
+import time
+
+
+class ObjectResult():
+    """ The result of one object of a run: status, extracted rows and bytes, and the time spent in extract and load.
+    The rows and bytes are taken from the run manifest, the rows are None for other file formats than csv.
+    """
+
+    def __init__(self, object_name):
+        self.object_name = object_name
+        self.status = None
+        self.rows = None
+        self.bytes = None
+        self.extract_duration = 0
+        self.load_duration = 0
+        # the retries of the object and its files, and the time wasted by failed attempts
+        self.retries = 0
+        self.retry_time = 0
+        # the time the extraction waited for the rate limit of the source
+        self.throttle_time = 0
+        self.error = None
+        # the status of each phase, e.g. {'extract': 'completed', 'load target_1': 'failed'}
+        self.phases = {}
+
+    def to_dict(self):
+        return {'object_name': self.object_name,
+                'status': self.status,
+                'rows': self.rows,
+                'bytes': self.bytes,
+                'extract_duration': round(self.extract_duration, 2),
+                'load_duration': round(self.load_duration, 2),
+                'retries': self.retries,
+                'retry_time': round(self.retry_time, 2),
+                'throttle_time': round(self.throttle_time, 2),
+                'error': self.error}
+
+
+class RunResult():
+    """ RunResult collects the result of each object of a pipeline run, returned by petaly.run.
+    The extract and load executors pass the result of each object to add_object_result.
+    """
+
+    def __init__(self, pipeline_name):
+        self.pipeline_name = pipeline_name
+        self.status = 'running'
+        self.error = None
+        self.start_time = time.time()
+        self.duration = None
+        self.objects = {}
+        self.lock = threading.Lock()
+
+    def add_object_result(self, pipeline, result):
+        """ Add the result of an extract or load executor. The pipeline is the source or target pipeline that processed the object.
+        """
+        object_name = result.get('object_name')
+        phase = result.get('phase')
+        phase_name = phase if pipeline.target_name is None or phase != 'load' else f"{phase} {pipeline.target_name}"
+
+        staged_rows, staged_bytes = None, None
+        if result.get('status') == 'completed':
+            staged_rows, staged_bytes = self.get_staged_data(pipeline, object_name)
+
+        with self.lock:
+            object_result = self.objects.setdefault(object_name, ObjectResult(object_name))
+
+            if phase == 'extract':
+                object_result.extract_duration += result.get('duration')
+            else:
+                object_result.load_duration += result.get('duration')
+
+            object_result.retries += result.get('retries') or 0
+            object_result.retry_time += result.get('retry_time') or 0
+            object_result.throttle_time += result.get('throttle_time') or 0
+
+            # several sources add the rows and bytes of each source
+            if phase == 'extract':
+                if staged_bytes is not None:
+                    object_result.bytes = (object_result.bytes or 0) + staged_bytes
+                if staged_rows is not None:
+                    object_result.rows = (object_result.rows or 0) + staged_rows
+
+            # a load only run takes them from the manifest of the previous extraction
+            elif object_result.bytes is None and object_result.rows is None:
+                object_result.bytes, object_result.rows = staged_bytes, staged_rows
+
+            if result.get('error') is not None:
+                object_result.error = result.get('error')
+
+            phase_status = object_result.phases.get(phase_name)
+            if phase_status != 'failed':
+                object_result.phases.update({phase_name: result.get('status')})
+
+            object_result.status = self.compose_object_status(object_result.phases)
+
+    def compose_object_status(self, phases):
+        statuses = list(phases.values())
+
+        if 'failed' in statuses:
+            return 'failed'
+        if all(status == 'skipped' for status in statuses):
+            return 'skipped'
+        return 'completed'
+
+    def get_staged_data(self, pipeline, object_name):
+        """ Returns the rows and bytes of the staged files of the object, recorded by the run manifest at extraction.
+        """
+        object_entry = pipeline.run_manifest.get_object_entry(object_name)
+        return object_entry.get('rows'), object_entry.get('bytes')
+
+    def finish(self, error=None):
+        self.duration = round(time.time() - self.start_time, 2)
+
+        if error is not None:
+            self.error = str(error) if str(error) != '' else error.__class__.__name__
+
+        self.status = 'failed' if self.error is not None or len(self.get_failed_objects()) > 0 else 'completed'
+
+    def get_failed_objects(self):
+        return [object_name for object_name, object_result in self.objects.items() if object_result.status == 'failed']
+
+    @property
+    def rows(self):
+        return sum(object_result.rows or 0 for object_result in self.objects.values())
+
+    @property
+    def bytes(self):
+        return sum(object_result.bytes or 0 for object_result in self.objects.values())
+
+    @property
+    def retries(self):
+        return sum(object_result.retries for object_result in self.objects.values())
+
+    @property
+    def retry_time(self):
+        return round(sum(object_result.retry_time for object_result in self.objects.values()), 2)
+
+    @property
+    def throttle_time(self):
+        return round(sum(object_result.throttle_time for object_result in self.objects.values()), 2)
+
+    def to_dict(self):
+        return {'pipeline_name': self.pipeline_name,
+                'status': self.status,
+                'duration': self.duration,
+                'rows': self.rows,
+                'bytes': self.bytes,
+                'retries': self.retries,
+                'retry_time': self.retry_time,
+                'throttle_time': self.throttle_time,
+                'error': self.error,
+                'objects': [object_result.to_dict() for object_result in self.objects.values()]}
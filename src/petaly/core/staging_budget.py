@@ -0,0 +1,140 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import os
+import threading
+import time
+
+from petaly.core.exceptions import ExtractError
+
+
+class StagingBudget():
+    """ StagingBudget accounts the bytes staged in the output directory of a pipeline, set by max_staging_mb and delete_staged_data in data_attributes.
+    An object is accounted with its disk usage once it's extracted. Before the next object is extracted, the worker pauses while
+    the staged bytes exceed max_staging_mb, until loaded objects free space. With delete_staged_data, the staged data of an object
+    is deleted as soon as it's loaded into all targets. Its metadata is kept.
+    If nothing can free space, because the load doesn't overlap the extraction or delete_staged_data isn't set, the extraction fails right away.
+    """
+    # the pause is checked again after this time, in case a load ended without freeing space
+    poll_seconds = 5
+
+    def __init__(self, pipeline, max_staging_bytes, delete_staged_data):
+        self.pipeline = pipeline
+        self.max_staging_bytes = max_staging_bytes
+        self.delete_staged_data = delete_staged_data
+        # set by run, if the objects are loaded while the next objects are still extracting
+        self.overlapped = False
+        self.staged_objects = {}
+        self.failed_objects = set()
+        self.condition = threading.Condition()
+        # several targets may complete the object at the same time
+        self.release_lock = threading.Lock()
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        """ Returns the budget of the pipeline, or None if neither max_staging_mb nor delete_staged_data is specified.
+        """
+        max_staging_mb = pipeline.data_attributes.get('max_staging_mb')
+        delete_staged_data = str(pipeline.data_attributes.get('delete_staged_data')).lower() == 'true'
+
+        try:
+            max_staging_bytes = int(float(max_staging_mb) * 1024 * 1024) if max_staging_mb is not None else None
+        except ValueError:
+            logger.warning(f"The parameter max_staging_mb: {max_staging_mb} in {pipeline.pipeline_fpath} is not a number. The staged data isn't limited.")
+            max_staging_bytes = None
+
+        if max_staging_bytes is None and not delete_staged_data:
+            return None
+
+        return StagingBudget(pipeline, max_staging_bytes, delete_staged_data)
+
+    def get_staged_bytes(self):
+        with self.condition:
+            return sum(self.staged_objects.values())
+
+    def can_free_space(self):
+        """ Space is freed only by deleting loaded objects, while the load runs at the same time as the extraction. """
+        if not (self.delete_staged_data and self.overlapped):
+            return False
+
+        return len([object_name for object_name in self.staged_objects if object_name not in self.failed_objects]) > 0
+
+    def wait_for_space(self, object_name):
+        """ Called before an object is extracted. Pause while the staged bytes exceed max_staging_mb.
+        """
+        if self.max_staging_bytes is None:
+            return
+
+        start_wait_time = time.time()
+        paused = False
+
+        with self.condition:
+            while sum(self.staged_objects.values()) >= self.max_staging_bytes:
+                staged_mb = round(sum(self.staged_objects.values()) / 1024 / 1024, 2)
+
+                if not self.can_free_space():
+                    raise ExtractError(f"The staged data of pipeline {self.pipeline.pipeline_name} reached {staged_mb} MB of max_staging_mb: {round(self.max_staging_bytes / 1024 / 1024, 2)}. "
+                                       f"The object {object_name} isn't extracted. To free space while the extraction runs, set overlap_extract_load and delete_staged_data to true.")
+
+                if not paused:
+                    logger.info(f"Extract object: {object_name} paused, the staged data of {staged_mb} MB reached max_staging_mb: {round(self.max_staging_bytes / 1024 / 1024, 2)}")
+                    paused = True
+
+                self.condition.wait(timeout=self.poll_seconds)
+
+        if paused:
+            logger.info(f"Extract object: {object_name} resumed after {round(time.time() - start_wait_time, 2)}s")
+
+    def add_object(self, object_name):
+        """ Account the disk usage of an extracted object, with several sources the object is measured again after each source.
+        """
+        object_dpath = os.path.join(self.pipeline.output_pipeline_dpath, object_name)
+        object_bytes = self.pipeline.f_handler.get_disk_usage(object_dpath)
+
+        with self.condition:
+            self.staged_objects.update({object_name: object_bytes})
+            self.failed_objects.discard(object_name)
+
+    def release_object(self, object_name):
+        """ Called after an object is loaded into a target. Once it's loaded into all targets, its staged data is deleted with delete_staged_data.
+        """
+        if not self.delete_staged_data or not self.pipeline.run_manifest.is_loaded(object_name):
+            return
+
+        object_dpath = os.path.join(self.pipeline.output_pipeline_dpath, object_name)
+
+        with self.release_lock:
+            for dir_name in self.pipeline.f_handler.get_all_dir_names(object_dpath):
+                # the metadata is kept, the data directories of the targets and the sources are deleted
+                if dir_name != self.pipeline.metadata_dname:
+                    self.pipeline.f_handler.remove_dir(os.path.join(object_dpath, dir_name))
+
+        with self.condition:
+            released_bytes = self.staged_objects.pop(object_name, 0)
+            self.condition.notify_all()
+
+        logger.debug(f"The staged data of object {object_name} was deleted, {round(released_bytes / 1024 / 1024, 2)} MB freed")
+
+    def add_result(self, result):
+        """ Result collector of the executors. The staged data of an object that failed to load isn't deleted, so it can't free space.
+        """
+        if result.get('phase') != 'load' or result.get('status') != 'failed':
+            return
+
+        with self.condition:
+            self.failed_objects.add(result.get('object_name'))
+            self.condition.notify_all()
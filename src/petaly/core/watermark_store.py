@@ -0,0 +1,114 @@
+# Copyright © 2024-2025 Pavel Rabaev
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+logger = logging.getLogger(__name__)
+
+import decimal
+import json
+import os
+import threading
+import time
+
+from petaly.core.exceptions import LoadError
+from petaly.utils.utils import lock_file
+
+
+class WatermarkStore():
+    """ WatermarkStore keeps the high-water mark of each object extracted incrementally, the maximum of its column_for_incremental_load.
+    The extraction reads the rows above the stored mark up to the current maximum, and records both in the run manifest.
+    The new mark is stored only once the object is loaded into all targets, so a failed run extracts the same rows again.
+    The marks are kept in the output directory next to the pipeline directories, which are cleaned up by each run.
+    """
+    state_fname = '.watermarks.json'
+    state_lock = threading.Lock()
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.state_fpath = os.path.join(pipeline.m_conf.output_base_dpath, self.state_fname)
+
+    def get_state_key(self, source_name=None):
+        return self.pipeline.pipeline_name if source_name is None else f"{self.pipeline.pipeline_name}:{source_name}"
+
+    def get_watermark(self, object_name, source_name=None):
+        """ Returns the stored mark of the object as {'value': str, 'is_number': bool}, or None before the first load. """
+        with self.state_lock:
+            state = self.read_state()
+
+        return (state.get(self.get_state_key(source_name)) or {}).get(object_name)
+
+    @classmethod
+    def compose_watermark(cls, value):
+        """ Returns a value of the database as a mark, numbers are compared without quotes. """
+        if value is None:
+            return None
+
+        is_number = isinstance(value, (int, float, decimal.Decimal)) and not isinstance(value, bool)
+        return {'value': str(value), 'is_number': is_number}
+
+    @classmethod
+    def compose_literal(cls, watermark):
+        """ Returns the mark as SQL literal. """
+        if watermark.get('is_number'):
+            return watermark.get('value')
+
+        return "'" + watermark.get('value').replace("'", "''") + "'"
+
+    def commit_loaded_object(self, object_name):
+        """ Store the high-water mark of the extracted rows, once the object is loaded into all targets.
+        With several sources, each source keeps its own mark.
+        """
+        if not self.pipeline.run_manifest.is_loaded(object_name):
+            return
+
+        for source_pipeline in self.pipeline.get_source_pipelines():
+            extract_window = source_pipeline.run_manifest.get_object_entry(object_name).get('watermark')
+
+            if extract_window is None or extract_window.get('high') is None:
+                continue
+
+            self.save_watermark(object_name, extract_window.get('high'), source_pipeline.source_name)
+            logger.info(f"Object {object_name} loaded incrementally up to {extract_window.get('high').get('value')}")
+
+    def save_watermark(self, object_name, watermark, source_name=None):
+        """ Store the mark of the object. The state file is read again and updated under a file lock,
+        so the marks recorded by other processes at the same time, e.g. nodes sharing the output directory, are kept.
+        An unreadable state file isn't overwritten, as the marks of all other objects would be lost.
+        """
+        try:
+            with self.state_lock, lock_file(self.state_fpath):
+                state = self.read_state(raise_error=True)
+                state_key = self.get_state_key(source_name)
+                state.setdefault(state_key, {}).update({object_name: dict(watermark, updated_at=time.strftime('%Y-%m-%d %H:%M:%S'))})
+
+                tmp_fpath = f"{self.state_fpath}.{os.getpid()}.tmp"
+                with open(tmp_fpath, 'w', encoding='utf-8') as state_file:
+                    json.dump(state, state_file, indent=2)
+                os.replace(tmp_fpath, self.state_fpath)
+        except OSError as err:
+            logger.warning(f"The high-water mark of object {object_name} can't be recorded in {self.state_fpath}, the next run extracts the rows again: {err}")
+
+    def read_state(self, raise_error=False):
+        """ Returns the marks of all pipelines. An unreadable file is ignored by the reads, with raise_error a LoadError is raised instead. """
+        if not os.path.isfile(self.state_fpath):
+            return {}
+
+        try:
+            with open(self.state_fpath, 'r', encoding='utf-8') as state_file:
+                return json.load(state_file)
+        except (OSError, ValueError) as err:
+            if raise_error:
+                raise LoadError(f"The high-water marks {self.state_fpath} can't be read, so they aren't updated. Repair the file, or delete it to reload all objects in full: {err}") from err
+            logger.warning(f"The high-water marks {self.state_fpath} can't be read and are ignored: {err}")
+            return {}
@@ -16,12 +16,12 @@ import logging
 logger = logging.getLogger(__name__)
 
 import os
-import sys
 from rich.console import Console
 
 from configparser import ConfigParser, ExtendedInterpolation
 from petaly.utils.file_handler import FileHandler
 from petaly.sysconfig.load_class import load_class_obj
+from petaly.core.exceptions import ConfigError
 
 
 class MainConfig:
@@ -39,6 +39,8 @@ class MainConfig:
         self.extractor_type_transformer_fname = 'extractor_type_transformer.json'
         self.type_mapping_fname = '{source_connector_id}.json'
         self.metadata_sql_fname = 'metadata.sql'
+        self.object_size_sql_fname = 'object_size.sql'
+        self.object_fingerprint_sql_fname = 'object_fingerprint.sql'
         self.extract_to_stmt_fname = 'extract_to_stmt.sql'
         self.load_from_stmt_fname = 'load_from_stmt.sql'
         self.create_table_stmt_fname = 'create_table_stmt.sql'
@@ -66,8 +68,11 @@ class MainConfig:
                                             "output_dir_path": None
                                          }
         self.global_settings = {
-                                        "logging_mode": "INFO"
+                                        "logging_mode": "INFO",
+                                        "max_parallel_pipelines": 1
                                         }
+        # optional settings keep their default value, if they aren't specified in petaly.ini
+        self.optional_global_settings = ("max_parallel_pipelines",)
 
 
     def set_main_config_fpath(self, config_file_path, init_main_config=False):
@@ -82,13 +87,11 @@ class MainConfig:
             if self.env_config_dpath:
                 config_file_path = os.path.join(self.env_config_dpath, config_file_path)
             else:
-                self.console.print(self.missing_main_config_file_message())
-                sys.exit()
+                raise ConfigError(self.missing_main_config_file_message())
 
         # 3. exit, if file hasn't *.ini file extension
         if self.f_handler.check_file_extension(config_file_path, '.ini') is False:
-            self.console.print(self.missing_main_config_file_message())
-            sys.exit()
+            raise ConfigError(self.missing_main_config_file_message())
 
         # 4. If the configuration file or directory does not exist, create it.
         if self.f_handler.is_file(config_file_path) is False:
@@ -153,8 +156,7 @@ class MainConfig:
                 self.logs_base_dpath = conf_parser.get(section_name,'logs_dir_path')
                 self.output_base_dpath = conf_parser.get(section_name,'output_dir_path')
         else:
-            self.console.print(f"Check petaly config file: {self.main_config_fpath}")
-            sys.exit()
+            raise ConfigError(f"Check petaly config file: {self.main_config_fpath}")
 
     def set_global_settings(self):
 
@@ -172,7 +174,12 @@ class MainConfig:
                             self.global_settings['logging_mode'] = value
                         else:
                             self.console.print(f"The option logging_mode supports INFO or DEBUG mode only. Check logging_mode under section global_settings in petaly.ini.")
-                else:
+                    elif key == 'max_parallel_pipelines':
+                        if value.isdigit() and int(value) > 0:
+                            self.global_settings['max_parallel_pipelines'] = int(value)
+                        else:
+                            self.console.print(f"The option max_parallel_pipelines supports a positive integer only. Check max_parallel_pipelines under section global_settings in petaly.ini.")
+                elif key not in self.optional_global_settings:
                     self.console.print(f"The option {key} is not specified under section global_settings in petaly.ini.")
 
     def missing_main_config_file_message(self):
@@ -185,8 +192,7 @@ class MainConfig:
         platform_config = platforms_cl_config.get(platform_id)
 
         if platform_config is None:
-            logger.warning(f"The platform {platform_id} in class_config.json is not specified")
-            sys.exit()
+            raise ConfigError(f"The platform {platform_id} in class_config.json is not specified")
 
         return platform_config
 
@@ -198,21 +204,46 @@ class MainConfig:
         return platform_type_list
 
     def set_extractor_paths(self, connector_id):
-        connector_dpath = self.get_connector_dpath(connector_id)
-        self.connector_metadata_sql_fpath = os.path.join(connector_dpath, self.metadata_sql_fname)
-        self.connector_extract_to_stmt_fpath = os.path.join(connector_dpath, 'config', self.extract_to_stmt_fname)
+        self.connector_metadata_sql_fpath, self.connector_extract_to_stmt_fpath = self.get_extractor_paths(connector_id)
         return True
 
+    def get_extractor_paths(self, connector_id):
+        """ Returns the metadata sql and extract_to statement paths of the connector.
+        Unlike set_extractor_paths it doesn't change the main config, so it's safe for pipelines running at the same time.
+        """
+        connector_dpath = self.get_connector_dpath(connector_id)
+        connector_metadata_sql_fpath = os.path.join(connector_dpath, self.metadata_sql_fname)
+        connector_extract_to_stmt_fpath = os.path.join(connector_dpath, 'config', self.extract_to_stmt_fname)
+        return connector_metadata_sql_fpath, connector_extract_to_stmt_fpath
+
     def get_available_connectors(self):
         connector_type = (self.f_handler.load_json(self.class_sysconfig_fpath).get("connectors").keys())
         return connector_type
 
     def set_loader_paths(self, connector_id):
+        self.connector_load_from_stmt_fpath, self.connector_create_table_stmt_fpath = self.get_loader_paths(connector_id)
+        return True
+
+    def get_object_size_sql_fpath(self, connector_id):
+        """ Returns the path of the query estimating rows and bytes of each object. Not every connector has one.
+        """
         connector_dpath = self.get_connector_dpath(connector_id)
-        self.connector_load_from_stmt_fpath = os.path.join(connector_dpath, 'config', self.load_from_stmt_fname)
-        self.connector_create_table_stmt_fpath = os.path.join(connector_dpath, 'config', self.create_table_stmt_fname)
+        return os.path.join(connector_dpath, self.object_size_sql_fname)
 
-        return True
+    def get_object_fingerprint_sql_fpath(self, connector_id):
+        """ Returns the path of the query returning the change signals of each object. Not every connector has one.
+        """
+        connector_dpath = self.get_connector_dpath(connector_id)
+        return os.path.join(connector_dpath, self.object_fingerprint_sql_fname)
+
+    def get_loader_paths(self, connector_id):
+        """ Returns the load_from and create_table statement paths of the connector.
+        Unlike set_loader_paths it doesn't change the main config, so it's safe for pipelines running at the same time.
+        """
+        connector_dpath = self.get_connector_dpath(connector_id)
+        connector_load_from_stmt_fpath = os.path.join(connector_dpath, 'config', self.load_from_stmt_fname)
+        connector_create_table_stmt_fpath = os.path.join(connector_dpath, 'config', self.create_table_stmt_fname)
+        return connector_load_from_stmt_fpath, connector_create_table_stmt_fpath
 
     def get_connector_dpath(self, connector_id):
         """ The connector_id_dpath has a dot as path delimiter in class_config.json, e.g. connector_id_dpath: "connectors.mysql".
@@ -229,8 +260,7 @@ class MainConfig:
         connector_class_config = connectors_cl_config.get(connector_id)
 
         if not connector_class_config:
-            logger.warning(f"The connector_id {connector_id} in class_config.json is not specified")
-            sys.exit()
+            raise ConfigError(f"The connector_id {connector_id} in class_config.json is not specified")
 
         return connector_class_config
 
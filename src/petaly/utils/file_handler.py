@@ -18,7 +18,6 @@ logger = logging.getLogger(__name__)
 import os
 import re
 import pathlib
-import sys
 
 import yaml
 from yaml import SafeDumper, Dumper
@@ -27,6 +26,7 @@ import shutil
 import ast
 import gzip
 from datetime import datetime
+from petaly.core.exceptions import ConfigError
 
 
 class IndentDumper(yaml.Dumper):
@@ -72,8 +72,7 @@ class FileHandler:
                 obj = list(yaml_data)
                 return obj
         except Exception as e:
-            logger.error(e)
-            sys.exit()
+            raise ConfigError(str(e)) from e
 
     def load_yaml(self, file_fpath):
 
@@ -85,8 +84,7 @@ class FileHandler:
                 obj = yaml.safe_load(f)
                 return obj
         except Exception as e:
-            logger.error(e)
-            sys.exit()
+            raise ConfigError(str(e)) from e
             #return {}
 
 
@@ -326,6 +324,40 @@ class FileHandler:
         if files_are_not_exist:
             logger.debug('Directory has no files')
 
+    def get_dir_size(self, path_to_dir):
+        """ Returns the size in bytes of all files in the directory and its subdirectories, or 0 if it doesn't exist.
+        """
+        dir_size = 0
+        for root, dirs, files in os.walk(path_to_dir):
+            for file_name in files:
+                file_fpath = os.path.join(root, file_name)
+                if not os.path.islink(file_fpath):
+                    dir_size += os.path.getsize(file_fpath)
+
+        return dir_size
+
+    def get_disk_usage(self, path_to_dir):
+        """ Returns the bytes the directory occupies on disk. Unlike get_dir_size, files hard linked several times, e.g. by link_dir_files, are counted once.
+        """
+        disk_usage = 0
+        counted_files = set()
+        for root, dirs, files in os.walk(path_to_dir):
+            for file_name in files:
+                file_stat = os.lstat(os.path.join(root, file_name))
+                file_id = (file_stat.st_dev, file_stat.st_ino)
+                if file_id not in counted_files:
+                    counted_files.add(file_id)
+                    disk_usage += file_stat.st_size
+
+        return disk_usage
+
+    def remove_dir(self, path_to_dir):
+        """ This function removes the directory path_to_dir including all files and subfolders.
+        """
+        if os.path.isdir(path_to_dir):
+            shutil.rmtree(path_to_dir)
+            logger.debug(f"The directory {path_to_dir} was removed")
+
     def deprecated_copy_file_without_comments(self, path_to_file, path_to_target_file, comment_sign='#'):
         """ This function copy templates file without comments to the specified pipeline
         """
@@ -410,6 +442,25 @@ class FileHandler:
         for gz_fpath in gz_file_list:
             self.gunzip_file(gz_fpath, cleanup_file)
 
+    def link_dir_files(self, src_dpath, dest_dpath, file_prefix=None):
+        """ Link the files of src_dpath into dest_dpath with hard links. Files are copied, if a hard link isn't possible.
+        Without file_prefix, dest_dpath is recreated. With file_prefix, the files are added with the prefix in their names.
+        """
+        if file_prefix is None and os.path.isdir(dest_dpath):
+            shutil.rmtree(dest_dpath)
+        os.makedirs(dest_dpath, exist_ok=True)
+
+        for file_name in os.listdir(src_dpath):
+            src_fpath = os.path.join(src_dpath, file_name)
+            if not os.path.isfile(src_fpath):
+                continue
+
+            dest_fpath = os.path.join(dest_dpath, (file_prefix or '') + file_name)
+            try:
+                os.link(src_fpath, dest_fpath)
+            except OSError:
+                shutil.copy2(src_fpath, dest_fpath)
+
     def gzip_csv_files(self, gz_dpath, cleanup_file=True):
         gz_file_list = self.get_specific_files(gz_dpath, '*.csv')
         for gz_fpath in gz_file_list:
@@ -15,6 +15,9 @@
 import logging
 logger = logging.getLogger(__name__)
 
+import os
+from contextlib import contextmanager
+
 
 def measure_time(func):
     """This decorator return the execution time for the decorated function."""
@@ -32,6 +35,30 @@ def measure_time(func):
 
     return wrapper
 
+def compose_batch_fpath(data_fpath, batch_number):
+    """ Returns the path of a batch file of an extraction split by load_batch_size, e.g. table1_00001.csv """
+    root, ext = os.path.splitext(data_fpath)
+    return f"{root}_{batch_number:05d}{ext}"
+
+@contextmanager
+def lock_file(fpath):
+    """ Hold an exclusive lock on the file fpath.lock, so a read-modify-write of fpath by several processes, e.g. nodes sharing the output directory, doesn't lose updates.
+    Without fcntl, e.g. on Windows, only the threads of the process are synchronized by the caller.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(fpath), exist_ok=True)
+    with open(f"{fpath}.lock", 'a') as lock_fd:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+
 class FormatDict(dict):
     """ With help of this class the function str.format_map() will ignore a key which wasn't specified in the parameter section
 
@@ -0,0 +1,73 @@
+import os
+import unittest
+
+from petaly.core.exceptions import ConnectorError
+from petaly.connectors.postgres.psql_connector import PsqlConnector
+
+
+def compose_endpoint_attr():
+    """ The test database is set with PETALY_TEST_PSQL_HOST, _PORT, _USER, _PASSWORD and _DATABASE.
+    It requires wal_level = logical and the output plugin wal2json.
+    """
+    return {'connector_type': 'postgres',
+            'database_host': os.getenv('PETALY_TEST_PSQL_HOST', 'localhost'),
+            'database_port': os.getenv('PETALY_TEST_PSQL_PORT', '5432'),
+            'database_user': os.getenv('PETALY_TEST_PSQL_USER', 'postgres'),
+            'database_password': os.getenv('PETALY_TEST_PSQL_PASSWORD', 'postgres'),
+            'database_name': os.getenv('PETALY_TEST_PSQL_DATABASE', 'postgres')}
+
+
+class TestPsqlChangeCapture(unittest.TestCase):
+    slot_name = 'petaly_integration_test'
+    table_name = 'petaly_cdc_stocks'
+
+    def setUp(self):
+        try:
+            self.connector = PsqlConnector(compose_endpoint_attr())
+        except ConnectorError as err:
+            self.skipTest(f"No Postgres database is reachable: {err}")
+
+        self.execute(f"DROP TABLE IF EXISTS public.{self.table_name}")
+        self.execute(f"CREATE TABLE public.{self.table_name} (id INTEGER PRIMARY KEY, price NUMERIC(10,2))")
+        self.execute(f"ALTER TABLE public.{self.table_name} REPLICA IDENTITY FULL")
+
+        try:
+            self.start_position = self.connector.get_change_position(self.slot_name)
+        except ConnectorError as err:
+            self.execute(f"DROP TABLE IF EXISTS public.{self.table_name}")
+            self.connector.close()
+            self.skipTest(f"The database has no logical replication with wal2json: {err}")
+
+    def tearDown(self):
+        self.execute("SELECT pg_drop_replication_slot(slot_name) FROM pg_replication_slots WHERE slot_name = %s", (self.slot_name,))
+        self.execute(f"DROP TABLE IF EXISTS public.{self.table_name}")
+        self.connector.close()
+
+    def execute(self, sql, params=None):
+        self.connector.conn.execute(sql, params)
+        self.connector.conn.commit()
+
+    def read_changes(self, start_position, end_position):
+        return list(self.connector.read_changes(self.slot_name, start_position, end_position, 'public', [self.table_name]))
+
+    def test_changes_are_peeked_until_start_position_moves(self):
+        self.execute(f"INSERT INTO public.{self.table_name} VALUES (1, 10.50), (2, 20)")
+        self.execute(f"UPDATE public.{self.table_name} SET price = 11 WHERE id = 1")
+        self.execute(f"DELETE FROM public.{self.table_name} WHERE id = 2")
+        end_position = self.connector.get_change_position(self.slot_name)
+
+        changes = self.read_changes(self.start_position, end_position)
+
+        self.assertEqual([(change.get('op'), change.get('row').get('id') or change.get('old_row').get('id')) for change in changes],
+                         [('I', 1), ('I', 2), ('U', 1), ('D', 2)])
+        self.assertEqual(changes[0].get('row').get('price'), '10.50')
+
+        # a failed load reads the same changes again
+        self.assertEqual(self.read_changes(self.start_position, end_position), changes)
+
+        # the next run starts at the end position stored after the load
+        self.assertEqual(self.read_changes(end_position, end_position), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.change_capture import ChangeCapture
+from petaly.core.exceptions import ConfigError, ExtractError
+from petaly.core.watermark_store import WatermarkStore
+from petaly.connectors.postgres.psql_connector import PsqlConnector
+
+
+class RunManifest():
+
+    def __init__(self):
+        self.object_entries = {}
+        self.loaded_objects = set()
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+    def is_loaded(self, object_name, target_name=None):
+        return object_name in self.loaded_objects
+
+
+class Extractor():
+    """ An extractor of a source, whose change stream is a list of changes with the WAL positions of Postgres. """
+
+    def __init__(self, changes, high_position, load_modes=None):
+        self.changes = changes
+        self.high_position = high_position
+        self.load_modes = load_modes or {}
+        self.read_calls = []
+        self.change_files = {}
+        self.object_meta_dict = {'stocks': {'source_object_name': 'stocks',
+                                            'columns': [{'column_name': 'id', 'primary_key': 'id'},
+                                                        {'column_name': 'price', 'primary_key': None}]}}
+
+    def get_data_object(self, object_name):
+        return SimpleNamespace(load_mode=self.load_modes.get(object_name, 'cdc'))
+
+    def get_change_position(self):
+        return self.high_position
+
+    def read_changes(self, start_position, end_position, table_names):
+        self.read_calls.append((start_position, end_position, table_names))
+        return [change for change in self.changes if self.parse_change_position(change.get('position')) <= self.parse_change_position(end_position)]
+
+    def parse_change_position(self, position):
+        return PsqlConnector.parse_lsn(position)
+
+    def write_change_file(self, data_fpath, header, rows, extractor_obj_conf):
+        self.change_files.update({data_fpath: (header, rows)})
+
+
+def compose_change(position, op, row, old_row=None):
+    return {'table': 'stocks', 'position': position, 'op': op, 'row': row, 'old_row': old_row or {}}
+
+
+class TestChangeCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(pipeline_name='p_test', pipeline_fpath='pipeline.yaml', source_name=None,
+                                        m_conf=SimpleNamespace(output_base_dpath=self.temp_dir.name),
+                                        run_manifest=RunManifest())
+        self.pipeline.get_source_pipelines = lambda: [self.pipeline]
+        self.pipeline.watermark_store = WatermarkStore(self.pipeline)
+        self.pipeline.watermark_store.save_watermark('stocks', {'value': '0/10', 'is_number': False})
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def get_rows(self, change_capture):
+        return change_capture.object_changes.get('stocks').get('rows')
+
+    def test_collapse_to_last_change_per_primary_key(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([compose_change('0/20', 'I', {'id': 1, 'price': 10}),
+                               compose_change('0/30', 'U', {'id': 1, 'price': 11}),
+                               compose_change('0/30', 'I', {'id': 2, 'price': 20}),
+                               compose_change('0/38', 'U', {'id': 1, 'price': 12}),
+                               compose_change('0/40', 'D', {}, {'id': 2})], '0/40')
+
+        change_capture.capture(extractor, ['stocks'])
+
+        self.assertEqual(self.get_rows(change_capture), {('1',): ('U', [1, 12]), ('2',): ('D', [2, None])})
+        self.assertEqual(change_capture.get_change_window('stocks'), {'low': {'value': '0/10', 'is_number': False},
+                                                                      'high': {'value': '0/40', 'is_number': False}})
+
+    def test_update_of_primary_key_deletes_old_key(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([compose_change('0/20', 'U', {'id': 3, 'price': 10}, {'id': 1, 'price': 10})], '0/20')
+
+        change_capture.capture(extractor, ['stocks'])
+
+        self.assertEqual(self.get_rows(change_capture), {('1',): ('D', [1, None]), ('3',): ('U', [3, 10])})
+
+    def test_change_without_all_columns(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([compose_change('0/20', 'U', {'id': 1})], '0/20')
+
+        with self.assertRaises(ExtractError):
+            change_capture.capture(extractor, ['stocks'])
+
+    def test_object_without_position_is_extracted_in_full(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([compose_change('0/20', 'I', {'id': 1, 'price': 10})], '0/20', load_modes={'options': 'full'})
+        extractor.object_meta_dict.update({'trades': extractor.object_meta_dict.get('stocks')})
+
+        change_capture.capture(extractor, ['stocks', 'trades', 'options'])
+
+        self.assertTrue(change_capture.has_changes('stocks'))
+        # the initial snapshot of trades starts at the current position of the source
+        self.assertFalse(change_capture.has_changes('trades'))
+        self.assertEqual(change_capture.get_change_window('trades'), {'low': None, 'high': {'value': '0/20', 'is_number': False}})
+        self.assertIsNone(change_capture.get_change_window('options'))
+
+    def test_source_without_primary_key(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([], '0/20')
+        extractor.object_meta_dict.get('stocks').get('columns')[0].update({'primary_key': None})
+
+        with self.assertRaises(ConfigError):
+            change_capture.capture(extractor, ['stocks'])
+
+    def test_stage_changes_with_petaly_op(self):
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor([compose_change('0/20', 'I', {'id': 1, 'price': 10}),
+                               compose_change('0/20', 'U', {'id': 2, 'price': 20}),
+                               compose_change('0/20', 'D', {}, {'id': 3})], '0/20')
+        change_capture.capture(extractor, ['stocks'])
+
+        change_capture.write_changes(extractor, {'object_name': 'stocks', 'output_object_fpath': '/output/stocks.csv',
+                                                 'load_batch_size': 2, 'object_settings': {'header': True}})
+
+        self.assertEqual(extractor.change_files, {'/output/stocks_00001.csv': (['id', 'price', 'petaly_op'], [[1, 10, 'I'], [2, 20, 'U']]),
+                                                  '/output/stocks_00002.csv': (['id', 'price', 'petaly_op'], [[3, None, 'D']])})
+
+    def test_failed_load_replays_changes(self):
+        changes = [compose_change('0/20', 'I', {'id': 1, 'price': 10}),
+                   compose_change('0/30', 'I', {'id': 2, 'price': 20})]
+
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor(changes, '0/30')
+        change_capture.capture(extractor, ['stocks'])
+        self.pipeline.run_manifest.object_entries.update({'stocks': {'watermark': change_capture.get_change_window('stocks')}})
+
+        # the load failed, the stored position isn't moved
+        self.pipeline.watermark_store.commit_loaded_object('stocks')
+        self.assertEqual(self.pipeline.watermark_store.get_watermark('stocks').get('value'), '0/10')
+
+        # the next run reads the same changes again, with the changes added since
+        changes.append(compose_change('0/40', 'D', {}, {'id': 2}))
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor(changes, '0/40')
+        change_capture.capture(extractor, ['stocks'])
+
+        self.assertEqual(extractor.read_calls, [('0/10', '0/40', ['stocks'])])
+        self.assertEqual(self.get_rows(change_capture), {('1',): ('I', [1, 10]), ('2',): ('D', [2, None])})
+
+        # once loaded into all targets, the position of the run is stored and its changes aren't read again
+        self.pipeline.run_manifest.object_entries.update({'stocks': {'watermark': change_capture.get_change_window('stocks')}})
+        self.pipeline.run_manifest.loaded_objects.add('stocks')
+        self.pipeline.watermark_store.commit_loaded_object('stocks')
+
+        change_capture = ChangeCapture(self.pipeline)
+        extractor = Extractor(changes, '0/40')
+        change_capture.capture(extractor, ['stocks'])
+
+        self.assertEqual(extractor.read_calls, [('0/40', '0/40', ['stocks'])])
+        self.assertEqual(self.get_rows(change_capture), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
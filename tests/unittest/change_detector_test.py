@@ -0,0 +1,130 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.change_detector import ChangeDetector
+from petaly.core.db_extractor import DBExtractor
+from petaly.core.run_manifest import RunManifest
+from petaly.utils.file_handler import FileHandler
+
+
+class MetaQueryStarted(Exception):
+    """ Stops the extraction after the cleanup of the output directory. """
+
+
+class Extractor(DBExtractor):
+    """ An extractor without a database, which stops before the meta query. """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+        self.f_handler = pipeline.f_handler
+
+    def compose_meta_query(self):
+        raise MetaQueryStarted()
+
+    def extract_to(self, extractor_obj_conf):
+        pass
+
+    def get_query_result(self, meta_query):
+        pass
+
+    def compose_extract_to_stmt(self, extract_to_stmt, extract_config):
+        pass
+
+
+class TestChangeDetector(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(pipeline_name='p_test',
+                                        source_connector_id='postgres',
+                                        output_pipeline_dpath=self.temp_dir.name,
+                                        output_object_data_dpath=os.path.join(self.temp_dir.name, '{object_name}', 'data'),
+                                        output_object_metadata_dpath=os.path.join(self.temp_dir.name, '{object_name}', 'metadata'),
+                                        object_fingerprint_fname='object_fingerprint.json',
+                                        object_assignment=None,
+                                        resume=False,
+                                        object_default_settings={'header': True},
+                                        source_name=None,
+                                        f_handler=FileHandler(),
+                                        get_target_names=lambda: ['target_1', 'target_2'])
+        self.pipeline.run_manifest = RunManifest(self.pipeline)
+        self.change_detector = ChangeDetector(self.pipeline)
+        self.pipeline.change_detector = self.change_detector
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def stage_object(self, object_name):
+        data_dpath = self.pipeline.output_object_data_dpath.format(object_name=object_name)
+        os.makedirs(data_dpath, exist_ok=True)
+        with open(os.path.join(data_dpath, f"{object_name}.csv"), 'w') as data_file:
+            data_file.write('id,price\n1,10\n')
+        return data_dpath
+
+    def run_extract(self, fingerprint_dict):
+        """ Read the stored fingerprints as the extraction does at its start, and set the fingerprints of the source. """
+        self.change_detector.read_stored_fingerprints()
+        self.change_detector.set_source_fingerprints(fingerprint_dict)
+
+    def test_compose_fingerprint(self):
+        self.assertEqual(ChangeDetector.compose_fingerprint({'n_tup_ins': 10, 'n_tup_upd': 2}), {'n_tup_ins': '10', 'n_tup_upd': '2'})
+        # without a signal the change of the object can't be detected
+        self.assertIsNone(ChangeDetector.compose_fingerprint({'n_tup_ins': 10, 'n_tup_upd': None}))
+        self.assertIsNone(ChangeDetector.compose_fingerprint({}))
+
+    def test_unchanged_object_is_skipped(self):
+        self.change_detector.save_fingerprint('stocks', {'n_tup_ins': '10'})
+        self.run_extract({'stocks': {'n_tup_ins': 10}})
+        data_dpath = self.stage_object('stocks')
+
+        with self.assertLogs('petaly.core.change_detector', level='INFO') as logs:
+            self.assertTrue(self.change_detector.skip_unchanged_object('stocks'))
+
+        self.assertIn('Object stocks is unchanged since the last run and skipped', logs.output[0])
+        # the staged data isn't loaded, the fingerprint is kept for the next run
+        self.assertFalse(os.path.isdir(data_dpath))
+        self.assertEqual(self.pipeline.f_handler.load_json(self.change_detector.get_fingerprint_fpath('stocks')).get('fingerprint'), {'n_tup_ins': '10'})
+
+    def test_changed_object_is_extracted(self):
+        self.change_detector.save_fingerprint('stocks', {'n_tup_ins': '10'})
+        self.run_extract({'stocks': {'n_tup_ins': 11}, 'trades': {'n_tup_ins': 5}, 'v_prices': {'n_tup_ins': None}})
+
+        self.assertFalse(self.change_detector.skip_unchanged_object('stocks'))
+        # no fingerprint of the last run
+        self.assertFalse(self.change_detector.skip_unchanged_object('trades'))
+        # no fingerprint of the source, e.g. a view
+        self.assertFalse(self.change_detector.skip_unchanged_object('v_prices'))
+        self.assertFalse(self.change_detector.skip_unchanged_object('orders'))
+
+    def test_fingerprint_committed_after_all_targets_loaded(self):
+        self.run_extract({'stocks': {'n_tup_ins': 10}})
+        run_manifest = self.pipeline.run_manifest
+        run_manifest.start()
+        run_manifest.set_phase('stocks', 'extracted', self.stage_object('stocks'), fingerprint=self.change_detector.get_source_fingerprint('stocks'))
+        fingerprint_fpath = self.change_detector.get_fingerprint_fpath('stocks')
+
+        run_manifest.set_phase('stocks', 'loaded', target_name='target_1')
+        self.change_detector.commit_loaded_object('stocks')
+        # target_2 hasn't the rows yet, the next run extracts the object again
+        self.assertFalse(os.path.isfile(fingerprint_fpath))
+
+        run_manifest.set_phase('stocks', 'loaded', target_name='target_2')
+        self.change_detector.commit_loaded_object('stocks')
+        self.assertEqual(self.pipeline.f_handler.load_json(fingerprint_fpath).get('fingerprint'), {'n_tup_ins': '10'})
+
+    def test_fingerprints_read_before_cleanup(self):
+        self.change_detector.save_fingerprint('stocks', {'n_tup_ins': '10'})
+        self.stage_object('stocks')
+
+        with self.assertRaises(MetaQueryStarted):
+            Extractor(self.pipeline).extract_data()
+
+        # the output directory is cleaned up, but the fingerprints of the last run are kept in memory
+        self.assertEqual(os.listdir(self.temp_dir.name), [])
+        self.assertEqual(self.change_detector.stored_fingerprints, {'stocks': {'n_tup_ins': '10'}})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import http.client
+import json
+import os
+import socket
+import stat
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from petaly.cli import cli_server as cli_server_module
+from petaly.cli.cli_server import CliServer
+from petaly.core.connection_pool import ConnectionPool
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """ HTTP connection on a Unix socket, like curl --unix-socket. """
+
+    def __init__(self, socket_fpath):
+        super().__init__('localhost', timeout=10)
+        self.socket_fpath = socket_fpath
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_fpath)
+
+
+class MainCtl():
+    """ Runs the pipelines without a workspace. A pipeline named failed_* fails. """
+
+    def __init__(self, main_config):
+        self.run_calls = []
+        self.started = threading.Event()
+        self.finish = threading.Event()
+        self.finish.set()
+
+    def run_pipelines(self, pipeline_name_list, run_endpoint=None, object_name_list=None, resume=False):
+        self.run_calls.append((pipeline_name_list, run_endpoint, object_name_list, resume))
+        self.started.set()
+        self.finish.wait(10)
+        return [{'object_name': pipeline_name, 'status': 'failed' if pipeline_name.startswith('failed_') else 'completed', 'duration': 1.5,
+                 'error': 'Run of pipeline failed' if pipeline_name.startswith('failed_') else None} for pipeline_name in pipeline_name_list]
+
+
+class TestCliServer(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        with mock.patch.object(cli_server_module, 'MainCtl', MainCtl):
+            self.cli_server = CliServer(None, lambda: ['p_stocks', 'p_trades', 'failed_options'])
+        self.main_ctl = self.cli_server.main_ctl
+
+    def tearDown(self):
+        ConnectionPool.close_all()
+        ConnectionPool.enabled = False
+        self.temp_dir.cleanup()
+
+    def test_serve_enables_connection_pool(self):
+        self.assertTrue(ConnectionPool.enabled)
+
+    def test_run(self):
+        self.assertEqual(self.cli_server.run({'pipeline_name': 'p_stocks,p_trades', 'run_endpoint': 'source', 'resume': True}),
+                         (200, {'results': [{'pipeline_name': 'p_stocks', 'status': 'completed', 'duration': 1.5, 'error': None},
+                                            {'pipeline_name': 'p_trades', 'status': 'completed', 'duration': 1.5, 'error': None}]}))
+        self.cli_server.run({'pipeline_name': ['p_stocks'], 'object_name': ['stocks', 'options']})
+
+        self.assertEqual(self.main_ctl.run_calls, [(['p_stocks', 'p_trades'], 'source', None, True), (['p_stocks'], None, 'stocks,options', False)])
+        self.assertEqual(self.cli_server.get_health().get('runs'), 2)
+
+    def test_failed_run(self):
+        status_code, body = self.cli_server.run({'pipeline_name': ['p_stocks', 'failed_options']})
+
+        self.assertEqual(status_code, 500)
+        self.assertEqual([result.get('status') for result in body.get('results')], ['completed', 'failed'])
+        # the pipeline can run again
+        self.assertEqual(self.cli_server.get_health().get('running_pipelines'), [])
+
+    def test_invalid_run_request(self):
+        self.assertEqual(self.cli_server.run({})[0], 400)
+        self.assertEqual(self.cli_server.run({'pipeline_name': 'p_stocks,p_missing'}), (404, {'error': 'Unknown pipelines: p_missing'}))
+        self.assertEqual(self.cli_server.run({'pipeline_name': 'p_stocks', 'run_endpoint': 'both'})[0], 400)
+        self.assertEqual(self.cli_server.run({'pipeline_name': 'p_stocks,p_trades', 'object_name': 'stocks'})[0], 400)
+        self.assertEqual(self.main_ctl.run_calls, [])
+
+    def test_running_pipeline_is_not_started_again(self):
+        self.main_ctl.finish.clear()
+        run_thread = threading.Thread(target=self.cli_server.run, args=({'pipeline_name': 'p_stocks'},))
+        run_thread.start()
+        self.main_ctl.started.wait(10)
+
+        self.assertEqual(self.cli_server.get_health().get('running_pipelines'), ['p_stocks'])
+        self.assertEqual(self.cli_server.run({'pipeline_name': 'p_trades,p_stocks'}), (409, {'error': 'Pipelines are still running: p_stocks'}))
+
+        self.main_ctl.finish.set()
+        run_thread.join(10)
+        self.assertEqual(len(self.main_ctl.run_calls), 1)
+
+    def test_serve_binds_localhost(self):
+        with mock.patch.object(cli_server_module, 'ThreadingHTTPServer') as http_server_class, mock.patch.object(cli_server_module.signal, 'signal'):
+            self.cli_server.serve(port=8765)
+
+        self.assertEqual(http_server_class.call_args.args[0], ('127.0.0.1', 8765))
+        http_server_class.return_value.serve_forever.assert_called_once_with()
+
+    def test_serve_on_unix_socket(self):
+        socket_fpath = os.path.join(self.temp_dir.name, 'petaly.sock')
+
+        with mock.patch.object(cli_server_module.signal, 'signal') as set_signal_handler:
+            serve_thread = threading.Thread(target=self.cli_server.serve, kwargs={'socket_fpath': socket_fpath})
+            serve_thread.start()
+
+            try:
+                for i in range(100):
+                    if set_signal_handler.called:
+                        break
+                    serve_thread.join(0.05)
+
+                # the socket is accessible by the owner only
+                self.assertEqual(stat.S_IMODE(os.stat(socket_fpath).st_mode), 0o600)
+
+                self.assertEqual(self.request(socket_fpath, 'GET', '/health')[1].get('status'), 'ok')
+                self.assertEqual(self.request(socket_fpath, 'GET', '/pipelines'), (200, {'pipelines': ['p_stocks', 'p_trades', 'failed_options']}))
+                self.assertEqual(self.request(socket_fpath, 'POST', '/run', '{"pipeline_name": "p_stocks"}')[0], 200)
+                self.assertEqual(self.request(socket_fpath, 'POST', '/run', '{"pipeline_name": ')[0], 400)
+                self.assertEqual(self.request(socket_fpath, 'POST', '/stop')[0], 404)
+                self.assertEqual(self.request(socket_fpath, 'GET', '/runs')[0], 404)
+            finally:
+                # SIGTERM stops the server
+                set_signal_handler.call_args.args[1](None, None)
+                serve_thread.join(10)
+
+        self.assertEqual(self.main_ctl.run_calls, [(['p_stocks'], None, None, False)])
+        self.assertFalse(os.path.exists(socket_fpath))
+
+    def request(self, socket_fpath, method, path, body=None):
+        conn = UnixHTTPConnection(socket_fpath)
+        try:
+            conn.request(method, path, body=body)
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
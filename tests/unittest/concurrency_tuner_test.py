@@ -0,0 +1,97 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.concurrency_tuner import ConcurrencyTuner
+
+
+class RunManifest():
+
+    def __init__(self):
+        self.object_entries = {}
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+
+class FileHandler():
+
+    def get_dir_size(self, dpath):
+        # the staged data is deleted after the load
+        return 0
+
+
+class TestConcurrencyTuner(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(m_conf=SimpleNamespace(output_base_dpath=self.temp_dir.name),
+                                        run_manifest=RunManifest(),
+                                        f_handler=FileHandler(),
+                                        extracted_object_data_dpath=os.path.join(self.temp_dir.name, '{object_name}'))
+        self.endpoint_attr = {'connector_type': 'postgres', 'database_host': 'tuner-test'}
+        self.object_count = 0
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def complete_window(self, tuner, window_bytes, window_seconds=1.0, duration=1.0):
+        """ Complete as many objects as the tuner allows, with window_bytes in window_seconds. """
+        tuner.window_start_time = time.time() - window_seconds
+        limit = tuner.get_limit()
+
+        for i in range(limit):
+            self.object_count += 1
+            object_name = f"object_{self.object_count}"
+            self.pipeline.run_manifest.object_entries.update({object_name: {'bytes': window_bytes // limit, 'rows': 10}})
+            tuner.add_result({'object_name': object_name, 'duration': duration})
+
+        return tuner.get_limit()
+
+    def test_limit_grows_while_throughput_improves(self):
+        tuner = ConcurrencyTuner(self.pipeline, 'load', self.endpoint_attr, max_workers=4)
+        self.assertEqual(tuner.get_limit(), 1)
+
+        # the bytes are taken from the manifest, as the staged data is deleted already
+        self.assertEqual(self.complete_window(tuner, 10 * 1024 * 1024), 2)
+        self.assertEqual(self.complete_window(tuner, 20 * 1024 * 1024), 3)
+        # the throughput improved by less than 10%, the previous setting is kept
+        self.assertEqual(self.complete_window(tuner, 21 * 1024 * 1024), 2)
+        self.assertTrue(tuner.settled)
+        self.assertEqual(self.complete_window(tuner, 40 * 1024 * 1024), 2)
+
+    def test_limit_is_reduced_if_response_time_degrades(self):
+        tuner = ConcurrencyTuner(self.pipeline, 'extract', self.endpoint_attr, max_workers=4)
+
+        self.assertEqual(self.complete_window(tuner, 10 * 1024 * 1024, duration=1.0), 2)
+        # the objects take twice as long per MB
+        self.assertEqual(self.complete_window(tuner, 20 * 1024 * 1024, duration=4.0), 1)
+
+    def test_limit_is_capped_by_max_workers(self):
+        tuner = ConcurrencyTuner(self.pipeline, 'extract', self.endpoint_attr, max_workers=2)
+
+        self.assertEqual(self.complete_window(tuner, 10 * 1024 * 1024), 2)
+        self.assertEqual(self.complete_window(tuner, 40 * 1024 * 1024), 2)
+
+    def test_finish_keeps_settings_of_other_processes(self):
+        tuner = ConcurrencyTuner(self.pipeline, 'extract', self.endpoint_attr, max_workers=4)
+        self.complete_window(tuner, 10 * 1024 * 1024)
+
+        # another node recorded its setting after this tuner has read the state
+        with open(tuner.state_fpath, 'w') as state_file:
+            json.dump({'load:mysql/other-host': {'max_parallel_objects': 3}}, state_file)
+
+        tuner.finish()
+
+        state = tuner.read_state()
+        self.assertEqual(state.get('load:mysql/other-host').get('max_parallel_objects'), 3)
+        self.assertEqual(state.get(tuner.state_key).get('max_parallel_objects'), 2)
+        # the next run starts from the recorded setting
+        self.assertEqual(ConcurrencyTuner(self.pipeline, 'extract', self.endpoint_attr, max_workers=4).get_limit(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
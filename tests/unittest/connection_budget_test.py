@@ -0,0 +1,86 @@
+import threading
+import time
+import unittest
+
+from petaly.core.connection_budget import ConnectionBudget
+from petaly.core.object_executor import ObjectExecutor
+
+
+class Worker():
+
+    def close_connection(self):
+        pass
+
+
+class TestConnectionBudget(unittest.TestCase):
+
+    def wait_for_queue(self, budget, queue_length):
+        for i in range(100):
+            with budget.condition:
+                if len(budget.waiting_queue) == queue_length:
+                    return
+            time.sleep(0.01)
+        self.fail(f"The waiting queue didn't reach {queue_length} entries")
+
+    def test_get_budget(self):
+        endpoint_attr = {'connector_type': 'postgres', 'database_host': 'budget-test', 'database_name': 'db'}
+
+        self.assertIsNone(ConnectionBudget.get_budget(endpoint_attr))
+        self.assertIsNone(ConnectionBudget.get_budget({**endpoint_attr, 'max_connections': 'many'}))
+
+        budget = ConnectionBudget.get_budget({**endpoint_attr, 'max_connections': 4})
+        # pipelines with the same endpoint share the budget with the lowest limit
+        self.assertIs(ConnectionBudget.get_budget({**endpoint_attr, 'max_connections': '2', 'database_password': 'secret'}), budget)
+        self.assertEqual(budget.max_connections, 2)
+        self.assertIsNot(ConnectionBudget.get_budget({**endpoint_attr, 'database_name': 'other', 'max_connections': 4}), budget)
+
+    def test_acquire_in_fifo_order(self):
+        budget = ConnectionBudget('fifo-test', 1)
+        budget.acquire()
+        acquired_order = []
+
+        def acquire_and_release(name):
+            budget.acquire()
+            acquired_order.append(name)
+            budget.release()
+
+        threads = []
+        for i, name in enumerate(['first', 'second', 'third']):
+            thread = threading.Thread(target=acquire_and_release, args=(name,))
+            thread.start()
+            threads.append(thread)
+            self.wait_for_queue(budget, i + 1)
+
+        budget.release()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(acquired_order, ['first', 'second', 'third'])
+        self.assertEqual(budget.connections_in_use, 0)
+
+    def test_acquire_abort(self):
+        budget = ConnectionBudget('abort-test', 1)
+        budget.acquire()
+
+        self.assertFalse(budget.acquire(abort=lambda: True))
+        self.assertEqual(len(budget.waiting_queue), 0)
+
+    def test_executor_without_free_slot_does_not_deadlock(self):
+        # the main worker holds the only slot, the other workers of the pool share it instead of waiting for a new connection
+        budget = ConnectionBudget('deadlock-test', 1)
+        budget.acquire()
+
+        executor = ObjectExecutor(phase='extract', object_func=lambda worker, object_name: time.sleep(0.01), max_workers=3,
+                                  create_worker=Worker, connection_budget=budget)
+        results = []
+        run_thread = threading.Thread(target=lambda: results.extend(executor.run(['a', 'b', 'c', 'd', 'e'], main_worker=Worker())))
+        run_thread.start()
+        run_thread.join(10)
+
+        self.assertFalse(run_thread.is_alive())
+        self.assertEqual([result.get('status') for result in results], ['completed'] * 5)
+        self.assertEqual(budget.connections_in_use, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
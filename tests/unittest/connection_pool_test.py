@@ -0,0 +1,118 @@
+import time
+import unittest
+
+from petaly.core.connection_pool import ConnectionPool
+
+
+class Connection():
+
+    def __init__(self, alive=True, reset_error=None):
+        self.alive = alive
+        self.reset_error = reset_error
+        self.reset_count = 0
+        self.closed = False
+
+    def reset(self):
+        if self.reset_error is not None:
+            raise self.reset_error
+        self.reset_count += 1
+
+    def close(self):
+        self.closed = True
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.endpoint_attr = {'connector_type': 'postgres', 'database_host': 'pool-test', 'database_name': 'db', 'database_user': 'petaly'}
+        self.opened_connections = []
+
+    def tearDown(self):
+        ConnectionPool.close_all()
+        ConnectionPool.enabled = False
+        ConnectionPool.max_idle_seconds = 300
+
+    def connect(self):
+        conn = Connection()
+        self.opened_connections.append(conn)
+        return conn
+
+    def acquire(self, endpoint_attr=None):
+        return ConnectionPool.acquire(endpoint_attr or self.endpoint_attr, self.connect, lambda conn: conn.alive)
+
+    def release(self, conn, endpoint_attr=None):
+        ConnectionPool.release(endpoint_attr or self.endpoint_attr, conn, lambda conn: conn.close(), lambda conn: conn.reset())
+
+    def test_disabled_pool_closes_connection(self):
+        conn = self.acquire()
+        self.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertIsNot(self.acquire(), conn)
+        self.assertEqual(len(self.opened_connections), 2)
+
+    def test_released_connection_is_reused(self):
+        ConnectionPool.enable()
+        conn = self.acquire()
+        self.release(conn)
+
+        self.assertIs(self.acquire(), conn)
+        # the open transaction is rolled back before the connection is reused
+        self.assertEqual((conn.reset_count, conn.closed, len(self.opened_connections)), (1, False, 1))
+
+        # another user or database of the same host gets its own connection
+        self.assertIsNot(self.acquire({**self.endpoint_attr, 'database_user': 'admin'}), conn)
+        self.assertIsNot(self.acquire({**self.endpoint_attr, 'database_name': 'other'}), conn)
+
+    def test_connection_in_use_is_not_shared(self):
+        ConnectionPool.enable()
+        conn = self.acquire()
+
+        self.assertIsNot(self.acquire(), conn)
+        self.assertEqual(len(self.opened_connections), 2)
+
+    def test_broken_connection_is_closed(self):
+        ConnectionPool.enable()
+        conn = self.acquire()
+        self.release(conn)
+        conn.alive = False
+
+        new_conn = self.acquire()
+        self.assertIsNot(new_conn, conn)
+        self.assertTrue(conn.closed)
+
+        # a failing check counts as a broken connection
+        self.release(new_conn)
+        self.assertIsNot(ConnectionPool.acquire(self.endpoint_attr, self.connect, lambda conn: 1 / 0), new_conn)
+        self.assertTrue(new_conn.closed)
+
+    def test_failed_reset_closes_connection(self):
+        ConnectionPool.enable()
+        conn = Connection(reset_error=RuntimeError('server closed the connection unexpectedly'))
+        self.release(conn)
+
+        self.assertTrue(conn.closed)
+        self.assertEqual(ConnectionPool.idle_connections, {})
+
+    def test_expired_connection_is_closed(self):
+        ConnectionPool.enable(max_idle_seconds=60)
+        conn = self.acquire()
+        ConnectionPool.idle_connections.update({ConnectionPool.compose_pool_key(self.endpoint_attr): [(conn, time.time() - 61)]})
+
+        self.assertIsNot(self.acquire(), conn)
+        self.assertTrue(conn.closed)
+
+    def test_close_all(self):
+        ConnectionPool.enable()
+        connections = [self.acquire(), self.acquire({**self.endpoint_attr, 'database_host': 'pool-test-2'})]
+        self.release(connections[0])
+        self.release(connections[1], {**self.endpoint_attr, 'database_host': 'pool-test-2'})
+
+        ConnectionPool.close_all()
+
+        self.assertTrue(all(conn.closed for conn in connections))
+        self.assertEqual(ConnectionPool.idle_connections, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
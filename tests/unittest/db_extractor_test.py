@@ -0,0 +1,84 @@
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.db_extractor import DBExtractor
+
+
+class WatermarkStore():
+
+    def __init__(self, watermarks=None):
+        self.watermarks = watermarks or {}
+
+    def get_watermark(self, object_name, source_name=None):
+        return self.watermarks.get(object_name)
+
+
+class Extractor(DBExtractor):
+    """ An extractor without a database, which returns the maximum of the source column as high_watermark. """
+
+    def __init__(self, pipeline, high_watermark):
+        self.pipeline = pipeline
+        self.db_connector = SimpleNamespace(metaquery_quote='"')
+        self.high_watermark = high_watermark
+        self.queries = []
+
+    def get_object_size_result(self, query):
+        self.queries.append(query)
+        return [{'high_watermark': self.high_watermark}]
+
+    def extract_to(self, extractor_obj_conf):
+        pass
+
+    def get_query_result(self, meta_query):
+        pass
+
+    def compose_extract_to_stmt(self, extract_to_stmt, extract_config):
+        pass
+
+
+class TestDBExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor_obj_conf = {'object_name': 'stocks', 'source_schema_name': 'public', 'source_object_name': 'stocks'}
+        self.data_object = SimpleNamespace(column_for_incremental_load='id', has_incremental_extract=lambda: True)
+
+    def compose_extractor(self, watermarks, high_watermark):
+        pipeline = SimpleNamespace(source_name=None, watermark_store=WatermarkStore(watermarks))
+        return Extractor(pipeline, high_watermark)
+
+    def test_full_load_has_no_window(self):
+        extractor = self.compose_extractor({}, 100)
+        data_object = SimpleNamespace(has_incremental_extract=lambda: False)
+
+        self.assertEqual(extractor.compose_incremental_window(data_object, self.extractor_obj_conf), {'where_clause': '', 'watermark': None})
+        self.assertEqual(extractor.queries, [])
+
+    def test_first_run_extracts_up_to_maximum(self):
+        extractor = self.compose_extractor({}, 100)
+
+        window = extractor.compose_incremental_window(self.data_object, self.extractor_obj_conf)
+
+        self.assertEqual(extractor.queries, ['SELECT MAX("id") AS high_watermark FROM public.stocks'])
+        # rows added during the extraction are left for the next run
+        self.assertEqual(window.get('where_clause'), 'WHERE "id" <= 100')
+        self.assertEqual(window.get('watermark'), {'low': None, 'high': {'value': '100', 'is_number': True}})
+
+    def test_rows_above_stored_watermark(self):
+        extractor = self.compose_extractor({'stocks': {'value': '2026-10-01', 'is_number': False, 'updated_at': '2026-10-01 06:00:00'}}, '2026-10-18')
+
+        window = extractor.compose_incremental_window(self.data_object, self.extractor_obj_conf)
+
+        self.assertEqual(window.get('where_clause'), "WHERE \"id\" > '2026-10-01' AND \"id\" <= '2026-10-18'")
+        self.assertEqual(window.get('watermark').get('low'), {'value': '2026-10-01', 'is_number': False})
+
+    def test_empty_table_keeps_watermark(self):
+        extractor = self.compose_extractor({'stocks': {'value': '100', 'is_number': True}}, None)
+
+        window = extractor.compose_incremental_window(self.data_object, self.extractor_obj_conf)
+
+        self.assertEqual(window.get('where_clause'), 'WHERE "id" > 100')
+        self.assertEqual(window.get('watermark').get('high'), {'value': '100', 'is_number': True})
+
+
+if __name__ == '__main__':
+    unittest.main()
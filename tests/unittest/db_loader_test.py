@@ -0,0 +1,114 @@
+import importlib
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.composer import Composer
+from petaly.connectors.mysql.mysql_loader import MysqlLoader
+from petaly.connectors.postgres.psql_loader import PsqlLoader
+
+
+def get_loader_class(module_name, class_name):
+    """ Returns the loader class, the Redshift and BigQuery loaders require the packages of their cloud. """
+    try:
+        return getattr(importlib.import_module(module_name), class_name)
+    except ImportError as err:
+        raise unittest.SkipTest(f"The loader {class_name} can't be imported: {err}")
+
+
+def compose_loader(loader_class):
+    """ Returns a loader without a connection to the database, which composes the statements only. """
+    loader = loader_class.__new__(loader_class)
+    loader.db_connector = SimpleNamespace(metaquery_quote='')
+    return loader
+
+
+class FileHandler():
+
+    def load_file(self, fpath):
+        return 'CREATE TABLE {schema_table_name} ({column_datatype_list});'
+
+
+class TestDBLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.column_names = ['id', 'region', 'price']
+        self.primary_key_columns = ['id', 'region']
+
+    def test_compose_merge_stmt_postgres(self):
+        merge_stmt = compose_loader(PsqlLoader).compose_merge_stmt('public.stocks', 'public.stocks_petaly_staging', self.column_names, self.primary_key_columns)
+
+        self.assertEqual(merge_stmt, "INSERT INTO public.stocks (id, region, price)\n"
+                                     "SELECT id, region, price FROM public.stocks_petaly_staging\n"
+                                     "ON CONFLICT (id, region)\n"
+                                     "DO UPDATE SET price = EXCLUDED.price;")
+
+    def test_compose_merge_stmt_mysql(self):
+        loader = compose_loader(MysqlLoader)
+
+        self.assertEqual(loader.compose_merge_stmt('stocks', 'stocks_petaly_staging', self.column_names, self.primary_key_columns),
+                         "INSERT INTO stocks (id, region, price)\n"
+                         "SELECT id, region, price FROM stocks_petaly_staging AS s\n"
+                         "ON DUPLICATE KEY UPDATE price = s.price;")
+        self.assertEqual(loader.compose_delete_stmt('stocks', 'stocks_petaly_staging', ['id']),
+                         "DELETE t FROM stocks AS t\n"
+                         "JOIN stocks_petaly_staging AS s ON t.id = s.id\n"
+                         "WHERE s.petaly_op = 'D';")
+
+    def test_compose_merge_stmt_redshift(self):
+        loader = compose_loader(get_loader_class('petaly.connectors.aws.redshift.rs_loader', 'RSLoader'))
+
+        self.assertEqual(loader.compose_merge_stmt('public.stocks', 'public.stocks_petaly_staging', self.column_names, self.primary_key_columns),
+                         "MERGE INTO public.stocks AS t\n"
+                         "USING public.stocks_petaly_staging AS s\n"
+                         "ON t.id = s.id AND t.region = s.region\n"
+                         "WHEN MATCHED THEN UPDATE SET price = s.price\n"
+                         "WHEN NOT MATCHED THEN INSERT (id, region, price) VALUES (s.id, s.region, s.price);")
+        self.assertEqual(loader.compose_delete_stmt('public.stocks', 'public.stocks_petaly_staging', ['id']),
+                         "DELETE FROM public.stocks\n"
+                         "USING public.stocks_petaly_staging AS s\n"
+                         "WHERE s.petaly_op = 'D' AND public.stocks.id = s.id;")
+
+    def test_compose_merge_stmt_bigquery(self):
+        loader = compose_loader(get_loader_class('petaly.connectors.gcp.bigquery.bq_loader', 'BQLoader'))
+
+        # a table of key columns only sets the key again
+        self.assertEqual(loader.compose_merge_stmt('project.dataset.stocks', 'project.dataset.stocks_petaly_staging', ['id'], ['id']),
+                         "MERGE INTO project.dataset.stocks AS t\n"
+                         "USING project.dataset.stocks_petaly_staging AS s\n"
+                         "ON t.id = s.id\n"
+                         "WHEN MATCHED THEN UPDATE SET id = s.id\n"
+                         "WHEN NOT MATCHED THEN INSERT (id) VALUES (s.id);")
+        self.assertEqual(loader.compose_primary_key_constraint(['id']), "PRIMARY KEY (id) NOT ENFORCED")
+
+    def test_cdc_staging_table_is_nullable(self):
+        loader = compose_loader(PsqlLoader)
+        loader.db_connector = SimpleNamespace(metaquery_quote='"')
+        loader.pipeline = SimpleNamespace(target_attr={'database_schema': 'public'},
+                                          source_connector_id='postgres',
+                                          target_connector_id='postgres',
+                                          output_create_table_stmt_fpath='/output/{object_name}/metadata/create_table_stmt.sql')
+        loader.m_conf = SimpleNamespace(create_table_stmt_fname='create_table_stmt.sql')
+        loader.f_handler = FileHandler()
+        loader.composer = Composer()
+        loader.type_mapping = SimpleNamespace(get_type_mapping=lambda: {'integer': 'INTEGER', 'text': 'TEXT'})
+        loader.connector_create_table_stmt_fpath = 'create_table_stmt.sql'
+
+        # a quoted column name, which contains NOT NULL, is kept
+        table_metadata = {'columns': [{'column_name': 'id', 'data_type': 'integer', 'is_nullable': 'NO', 'primary_key': 'id'},
+                                      {'column_name': 'price', 'data_type': 'integer', 'is_nullable': 'NO', 'primary_key': None},
+                                      {'column_name': 'is NOT NULL', 'data_type': 'text', 'is_nullable': 'YES', 'primary_key': None}]}
+        data_object = SimpleNamespace(object_name='stocks', destination_object_name=None, load_mode='cdc')
+
+        table_ddl_dict = loader.compose_table_ddl(data_object, table_metadata)
+        merge_ddl = loader.compose_merge_ddl(data_object, table_ddl_dict, table_metadata)
+
+        self.assertEqual(merge_ddl.get('destination_ddl_dict').get('column_datatype_list'),
+                         '"id" INTEGER NOT NULL,\n"price" INTEGER NOT NULL,\n"is NOT NULL" TEXT,\nPRIMARY KEY ("id")')
+        staging_ddl_dict = merge_ddl.get('table_ddl_dict')
+        self.assertEqual(staging_ddl_dict.get('table_name'), 'stocks_petaly_staging')
+        self.assertEqual(staging_ddl_dict.get('column_datatype_list'), '"id" INTEGER,\n"price" INTEGER,\n"is NOT NULL" TEXT,\npetaly_op VARCHAR(1)')
+        self.assertEqual(staging_ddl_dict.get('apply_deletes'), True)
+
+
+if __name__ == '__main__':
+    unittest.main()
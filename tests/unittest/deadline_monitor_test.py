@@ -0,0 +1,75 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.deadline_monitor import DeadlineMonitor
+from petaly.core.object_scheduler import ObjectScheduler
+
+
+class RunManifest():
+
+    def __init__(self):
+        self.object_entries = {}
+        self.loaded_objects = set()
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+    def has_reached(self, object_name, state):
+        return object_name in self.object_entries
+
+    def is_loaded(self, object_name, target_name=None):
+        return object_name in self.loaded_objects
+
+
+class TestDeadlineMonitor(unittest.TestCase):
+
+    def setUp(self):
+        self.pipeline = SimpleNamespace(data_objects=['stocks', 'options', 'trades'],
+                                        resume=False,
+                                        run_manifest=RunManifest(),
+                                        get_target_names=lambda: [None],
+                                        object_schedule={'stocks': {'priority': 'normal', 'deadline': time.time() - 3600},
+                                                         'options': {'priority': 'normal', 'deadline': time.time() + 3600},
+                                                         'trades': {'priority': 'normal', 'deadline': None}})
+
+    def test_from_pipeline(self):
+        self.assertIsInstance(DeadlineMonitor.from_pipeline(self.pipeline), DeadlineMonitor)
+
+        self.pipeline.object_schedule = {'trades': {'priority': 'normal', 'deadline': None}}
+        self.assertIsNone(DeadlineMonitor.from_pipeline(self.pipeline))
+
+    def test_passed_deadline_is_missed_at_start(self):
+        monitor = DeadlineMonitor(self.pipeline, ObjectScheduler(self.pipeline))
+
+        with self.assertLogs('petaly.core.deadline_monitor', level='WARNING') as logs:
+            monitor.start()
+
+        self.assertEqual(monitor.warned_objects, {'stocks'})
+        self.assertIn('Object stocks missed its deadline', logs.output[0])
+
+    def test_object_loaded_by_resumed_run_isnt_missed(self):
+        self.pipeline.resume = True
+        self.pipeline.run_manifest.loaded_objects.add('stocks')
+        monitor = DeadlineMonitor(self.pipeline, ObjectScheduler(self.pipeline))
+
+        monitor.start()
+
+        self.assertEqual(monitor.warned_objects, set())
+
+    def test_projected_to_miss_deadline(self):
+        monitor = DeadlineMonitor(self.pipeline, ObjectScheduler(self.pipeline))
+        monitor.start()
+        # 1 MB in an hour, the remaining 2 GB can't land within the next hour
+        monitor.start_time = time.time() - 3600
+        self.pipeline.run_manifest.object_entries.update({'trades': {'bytes': 1024 * 1024}, 'options': {'bytes': 1024 * 1024 * 1024}})
+
+        with self.assertLogs('petaly.core.deadline_monitor', level='WARNING') as logs:
+            monitor.add_result({'object_name': 'trades', 'phase': 'extract', 'status': 'completed'})
+
+        self.assertEqual(monitor.warned_objects, {'stocks', 'options'})
+        self.assertIn('Object options is projected to miss its deadline', logs.output[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
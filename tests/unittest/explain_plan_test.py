@@ -0,0 +1,146 @@
+import io
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from rich.console import Console
+
+from petaly.cli import cli as cli_module
+from petaly.cli.cli import Cli
+from petaly.core.db_extractor import DBExtractor
+from petaly.core.exceptions import ConfigError
+from petaly.core.explain_plan import ExplainPlan
+
+
+class Extractor(DBExtractor):
+    """ An extractor without a database, which returns the objects and sizes given by its source pipeline. """
+
+    def __init__(self, pipeline):
+        self.pipeline = pipeline
+
+    def explain_objects(self):
+        return self.pipeline.object_list, self.pipeline.object_size_dict
+
+    def close_connection(self):
+        pass
+
+    def extract_to(self, extractor_obj_conf):
+        pass
+
+    def get_query_result(self, meta_query):
+        pass
+
+    def compose_extract_to_stmt(self, extract_to_stmt, extract_config):
+        pass
+
+
+def compose_source_pipeline(object_list, object_size_dict, manifest=None):
+    return SimpleNamespace(source_connector_id='postgres', object_list=object_list, object_size_dict=object_size_dict,
+                           run_manifest=SimpleNamespace(manifest=manifest))
+
+
+def compose_pipeline(source_pipelines, max_parallel_objects=2, manifest=None, extractor_class=Extractor):
+    pipeline = SimpleNamespace(pipeline_name='p_test', max_parallel_objects=max_parallel_objects,
+                               m_conf=SimpleNamespace(get_extractor_class=lambda connector_id: extractor_class),
+                               run_manifest=SimpleNamespace(manifest=manifest))
+    pipeline.get_source_pipelines = lambda: source_pipelines
+    return pipeline
+
+
+class TestExplainPlan(unittest.TestCase):
+
+    def setUp(self):
+        self.object_size_dict = {'stocks': {'estimated_rows': 1000, 'estimated_bytes': 100000},
+                                 'trades': {'estimated_rows': 500, 'estimated_bytes': 40000},
+                                 # never analyzed, the database returns a negative estimate
+                                 'options': {'estimated_rows': -1, 'estimated_bytes': None}}
+        # the previous run extracted 800 rows of stocks in 6s and loaded them in 2s, 100 rows per second and 50 bytes per row
+        self.source_manifest = {'objects': {'stocks': {'phase': 'extracted', 'rows': 800, 'bytes': 40000, 'duration': 6}}}
+        self.target_manifest = {'objects': {'stocks': {'load_durations': {'target_1': 1, 'target_2': 2}}}}
+
+    def test_compose_plan(self):
+        source_pipeline = compose_source_pipeline(['stocks', 'trades', 'options'], self.object_size_dict, self.source_manifest)
+        plan = ExplainPlan(compose_pipeline([source_pipeline], manifest=self.target_manifest)).compose_plan()
+
+        self.assertEqual([object_plan.get('object_name') for object_plan in plan.get('objects')], ['stocks', 'trades', 'options'])
+        self.assertEqual(plan.get('objects')[0], {'object_name': 'stocks', 'estimated_rows': 1000, 'estimated_bytes': 100000,
+                                                  'staging_bytes': 50000, 'expected_duration': 10.0, 'measured': True})
+        # an object without a previous run is estimated by the average throughput of the measured objects
+        self.assertEqual(plan.get('objects')[1], {'object_name': 'trades', 'estimated_rows': 500, 'estimated_bytes': 40000,
+                                                  'staging_bytes': 25000, 'expected_duration': 5.0, 'measured': False})
+        self.assertEqual(plan.get('objects')[2], {'object_name': 'options', 'estimated_rows': None, 'estimated_bytes': None,
+                                                  'staging_bytes': None, 'expected_duration': None, 'measured': False})
+
+        self.assertEqual((plan.get('pipeline_name'), plan.get('max_parallel_objects')), ('p_test', 2))
+        self.assertEqual((plan.get('estimated_rows'), plan.get('estimated_bytes'), plan.get('staging_bytes')), (1500, 140000, 75000))
+        # stocks and trades run at the same time
+        self.assertEqual(plan.get('expected_duration'), 10.0)
+
+    def test_expected_duration_of_sequential_run(self):
+        source_pipeline = compose_source_pipeline(['stocks', 'trades', 'options'], self.object_size_dict, self.source_manifest)
+        plan = ExplainPlan(compose_pipeline([source_pipeline], max_parallel_objects=1, manifest=self.target_manifest)).compose_plan()
+
+        self.assertEqual(plan.get('expected_duration'), 15.0)
+
+    def test_first_run_has_no_duration(self):
+        source_pipeline = compose_source_pipeline(['stocks', 'trades'], self.object_size_dict)
+        plan = ExplainPlan(compose_pipeline([source_pipeline])).compose_plan()
+
+        self.assertEqual([object_plan.get('expected_duration') for object_plan in plan.get('objects')], [None, None])
+        self.assertEqual([object_plan.get('staging_bytes') for object_plan in plan.get('objects')], [100000, 40000])
+        self.assertIsNone(plan.get('expected_duration'))
+
+    def test_sizes_of_several_sources_add_up(self):
+        source_pipelines = [compose_source_pipeline(['stocks', 'trades'], {'stocks': {'estimated_rows': 100, 'estimated_bytes': 1000},
+                                                                           'trades': {'estimated_rows': 10, 'estimated_bytes': None}}),
+                            compose_source_pipeline(['trades', 'stocks'], {'stocks': {'estimated_rows': 50, 'estimated_bytes': 500},
+                                                                           'trades': {'estimated_rows': 20, 'estimated_bytes': 200}})]
+        plan = ExplainPlan(compose_pipeline(source_pipelines)).compose_plan()
+
+        # the order of extraction is the order of the first source
+        self.assertEqual([(object_plan.get('object_name'), object_plan.get('estimated_rows'), object_plan.get('estimated_bytes')) for object_plan in plan.get('objects')],
+                         [('stocks', 150, 1500), ('trades', 30, 200)])
+
+    def test_file_source_is_not_supported(self):
+        source_pipeline = compose_source_pipeline([], {})
+        source_pipeline.source_connector_id = 'csv'
+
+        with self.assertRaises(ConfigError):
+            ExplainPlan(compose_pipeline([source_pipeline], extractor_class=object)).compose_plan()
+
+
+class TestExplainCli(unittest.TestCase):
+
+    def setUp(self):
+        self.cli = Cli()
+        self.cli.m_conf = SimpleNamespace(set_main_config_fpath=lambda config_fpath: None, set_workspace_dpaths=lambda: None, set_global_settings=lambda: None)
+        self.output = io.StringIO()
+        self.cli.console = Console(file=self.output, width=200)
+
+    def test_explain_requires_single_pipeline(self):
+        for argv in (['explain'], ['explain', '-p', 'p_stocks,p_trades']):
+            with mock.patch.object(cli_module, 'MainCtl') as main_ctl_class:
+                with self.assertRaises(SystemExit):
+                    self.cli.explain_p(self.cli.parser.parse_args(argv))
+
+            main_ctl_class.assert_not_called()
+
+        self.assertIn('Provide a single pipeline name with -p to explain the pipeline.', self.output.getvalue())
+
+    def test_explain_pipeline(self):
+        plan = {'pipeline_name': 'p_stocks', 'max_parallel_objects': 2,
+                'objects': [{'object_name': 'stocks', 'estimated_rows': 1000, 'estimated_bytes': 100000, 'staging_bytes': 50000, 'expected_duration': 10.0}],
+                'estimated_rows': 1000, 'estimated_bytes': 100000, 'staging_bytes': 50000, 'expected_duration': 10.0}
+
+        with mock.patch.object(cli_module, 'MainCtl') as main_ctl_class:
+            main_ctl_class.return_value.explain_pipeline.return_value = plan
+            self.cli.explain_p(self.cli.parser.parse_args(['explain', '-p', 'p_stocks', '-o', 'stocks,trades']))
+
+        main_ctl_class.return_value.explain_pipeline.assert_called_once_with('p_stocks', 'stocks,trades')
+        self.assertIn('Explain pipeline p_stocks', self.output.getvalue())
+        self.assertIn('97.7 KB', self.output.getvalue())
+        self.assertIn('Total: 1 objects', self.output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
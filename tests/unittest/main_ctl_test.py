@@ -0,0 +1,169 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from petaly.api import load_config
+from petaly.connectors.csv.csv_loader import CsvLoader
+from petaly.core.main_ctl import MainCtl
+from petaly.core.pipeline import Pipeline
+from petaly.core.run_manifest import RunManifest
+
+
+PIPELINE_YAML = """pipeline:
+  pipeline_attributes:
+    pipeline_name: {pipeline_name}
+    is_enabled: true
+  source_attributes:
+{source_attributes}
+  target_attributes:
+{target_attributes}
+  data_attributes:
+    data_objects_spec_mode: only
+    max_parallel_objects: 2
+    object_default_settings:
+      header: true
+      columns_delimiter: ","
+      columns_quote: none
+---
+data_objects_spec:
+{objects}
+"""
+
+OBJECT_SPEC = """- object_spec:
+    object_name: {object_name}
+    object_source_dir: {workspace_dpath}/source
+    file_names:
+    - {object_name}.csv
+"""
+
+SOURCE_ATTRIBUTES = """    connector_type: csv"""
+
+TARGET_ATTRIBUTES = """    connector_type: csv
+    destination_dir: {destination_dpath}"""
+
+
+class TestMainCtl(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.workspace_dpath = self.temp_dir.name
+        os.makedirs(os.path.join(self.workspace_dpath, 'source'))
+
+        config_fpath = os.path.join(self.workspace_dpath, 'petaly.ini')
+        with open(config_fpath, 'w') as config_file:
+            config_file.write(f"[workspace_config]\n"
+                              f"pipeline_dir_path={self.workspace_dpath}/pipelines\n"
+                              f"logs_dir_path={self.workspace_dpath}/logs\n"
+                              f"output_dir_path={self.workspace_dpath}/output\n"
+                              f"[global_settings]\n"
+                              f"logging_mode=INFO\n")
+
+        self.main_ctl = MainCtl(load_config(config_fpath), configure_logging=False)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_pipeline(self, pipeline_name, object_names, source_attributes=SOURCE_ATTRIBUTES, target_dpaths=None):
+        """ Create a csv pipeline. With several target_dpaths, target_attributes is a list of csv targets. """
+        pipeline_dpath = os.path.join(self.workspace_dpath, 'pipelines', pipeline_name)
+        os.makedirs(pipeline_dpath)
+        objects = ''.join(OBJECT_SPEC.format(object_name=object_name, workspace_dpath=self.workspace_dpath) for object_name in object_names)
+
+        if target_dpaths is None:
+            target_attributes = TARGET_ATTRIBUTES.format(destination_dpath=os.path.join(self.workspace_dpath, 'destination'))
+        else:
+            target_attributes = '\n'.join(TARGET_ATTRIBUTES.format(destination_dpath=target_dpath).replace('    connector_type', '  - connector_type') for target_dpath in target_dpaths)
+
+        with open(os.path.join(pipeline_dpath, 'pipeline.yaml'), 'w') as pipeline_file:
+            pipeline_file.write(PIPELINE_YAML.format(pipeline_name=pipeline_name, workspace_dpath=self.workspace_dpath, objects=objects,
+                                                     source_attributes=source_attributes, target_attributes=target_attributes))
+
+    def read_run_manifest(self, pipeline_name):
+        pipeline = Pipeline(pipeline_name, self.main_ctl.m_conf)
+        return RunManifest(pipeline)
+
+    def read_destination_file(self, *path_parts):
+        with open(os.path.join(*path_parts), 'r') as destination_file:
+            return destination_file.read()
+
+    def create_source_file(self, object_name):
+        with open(os.path.join(self.workspace_dpath, 'source', f"{object_name}.csv"), 'w') as source_file:
+            source_file.write("id,name\n1,a\n2,b\n")
+
+    def test_run_pipelines_with_failed_object(self):
+        self.create_source_file('stocks')
+        self.create_source_file('options')
+        self.create_pipeline('p_completed', ['stocks'])
+        # the source file of the object missing doesn't exist, its extraction fails
+        self.create_pipeline('p_failed', ['options', 'missing'])
+
+        results = self.main_ctl.run_pipelines(['p_completed', 'p_failed'])
+        statuses = {result.get('object_name'): result.get('status') for result in results}
+
+        self.assertEqual(statuses, {'p_completed': 'completed', 'p_failed': 'failed'})
+        self.assertIn('missing', [result for result in results if result.get('object_name') == 'p_failed'][0].get('error'))
+
+        # the other objects of the failed pipeline are still loaded
+        self.assertTrue(os.path.isfile(os.path.join(self.workspace_dpath, 'destination', 'p_failed', 'options', 'options.csv')))
+
+    def test_load_into_several_targets(self):
+        self.create_source_file('stocks')
+        target_dpaths = [os.path.join(self.workspace_dpath, 'destination_1'), os.path.join(self.workspace_dpath, 'destination_2')]
+        self.create_pipeline('p_fan_out', ['stocks'], target_dpaths=target_dpaths)
+
+        run_result = self.main_ctl.run_pipeline_with_result('p_fan_out')
+
+        self.assertEqual(run_result.status, 'completed')
+        self.assertEqual(run_result.objects.get('stocks').phases, {'extract': 'completed', 'load target_1': 'completed', 'load target_2': 'completed'})
+        for target_dpath in target_dpaths:
+            self.assertEqual(self.read_destination_file(target_dpath, 'p_fan_out', 'stocks', 'stocks.csv'), "id,name\n1,a\n2,b\n")
+
+    def test_failed_target_keeps_other_targets(self):
+        self.create_source_file('stocks')
+        # the destination of target_2 can't be created, as its parent is a file
+        blocked_fpath = os.path.join(self.workspace_dpath, 'blocked')
+        with open(blocked_fpath, 'w') as blocked_file:
+            blocked_file.write('')
+        target_dpaths = [os.path.join(self.workspace_dpath, 'destination_1'), os.path.join(blocked_fpath, 'destination_2')]
+        self.create_pipeline('p_fan_out', ['stocks'], target_dpaths=target_dpaths)
+
+        run_result = self.main_ctl.run_pipeline_with_result('p_fan_out')
+
+        self.assertEqual(run_result.objects.get('stocks').status, 'failed')
+        self.assertEqual(run_result.objects.get('stocks').phases, {'extract': 'completed', 'load target_1': 'completed', 'load target_2': 'failed'})
+        self.assertTrue(os.path.isfile(os.path.join(target_dpaths[0], 'p_fan_out', 'stocks', 'stocks.csv')))
+
+        # the object is loaded into target_1 only, so it isn't loaded for the pipeline
+        run_manifest = self.read_run_manifest('p_fan_out')
+        self.assertTrue(run_manifest.is_loaded('stocks', 'target_1'))
+        self.assertFalse(run_manifest.is_loaded('stocks', 'target_2'))
+        self.assertFalse(run_manifest.is_loaded('stocks'))
+
+        # a resumed run loads the object into target_2 only
+        os.remove(blocked_fpath)
+        os.remove(os.path.join(target_dpaths[0], 'p_fan_out', 'stocks', 'stocks.csv'))
+        self.assertEqual(self.main_ctl.run_pipeline_with_result('p_fan_out', resume=True).status, 'completed')
+
+        self.assertFalse(os.path.isfile(os.path.join(target_dpaths[0], 'p_fan_out', 'stocks', 'stocks.csv')))
+        self.assertEqual(self.read_destination_file(target_dpaths[1], 'p_fan_out', 'stocks', 'stocks.csv'), "id,name\n1,a\n2,b\n")
+        self.assertTrue(self.read_run_manifest('p_fan_out').is_loaded('stocks'))
+
+    def test_combine_several_sources(self):
+        self.create_source_file('stocks')
+        source_attributes = "  - connector_type: csv\n    source_name: eu\n  - connector_type: csv\n    source_name: us"
+        self.create_pipeline('p_fan_in', ['stocks'], source_attributes=source_attributes)
+
+        with mock.patch.object(CsvLoader, 'load_from', autospec=True, side_effect=CsvLoader.load_from) as load_from:
+            run_result = self.main_ctl.run_pipeline_with_result('p_fan_in')
+
+        # the rows of both sources are added up and loaded in a single pass
+        self.assertEqual(run_result.status, 'completed')
+        self.assertEqual((run_result.objects.get('stocks').rows, run_result.objects.get('stocks').phases), (4, {'extract': 'completed', 'load': 'completed'}))
+        self.assertEqual(load_from.call_count, 1)
+        self.assertEqual(sorted(os.listdir(os.path.join(self.workspace_dpath, 'destination', 'p_fan_in', 'stocks'))), ['eu_stocks.csv', 'us_stocks.csv'])
+        self.assertEqual(self.read_destination_file(self.workspace_dpath, 'destination', 'p_fan_in', 'stocks', 'us_stocks.csv'), "id,name\n1,a\n2,b\n")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.micro_batch import MicroBatch
+
+
+class TestMicroBatch(unittest.TestCase):
+
+    def test_parse_interval(self):
+        self.assertEqual(MicroBatch.parse_interval('60'), 60)
+        self.assertEqual(MicroBatch.parse_interval(90), 90)
+        self.assertEqual(MicroBatch.parse_interval('45s'), 45)
+        self.assertEqual(MicroBatch.parse_interval('5m'), 300)
+        self.assertEqual(MicroBatch.parse_interval(' 1h '), 3600)
+        self.assertEqual(MicroBatch.parse_interval('0.5m'), 30)
+
+    def test_parse_invalid_interval(self):
+        for interval in ['0', '0m', '-5', '5d', 'm', '', None, '1h30m']:
+            self.assertIsNone(MicroBatch.parse_interval(interval), interval)
+
+    def test_take_destination_schema(self):
+        micro_batch = MicroBatch('p_test', 60)
+        pipeline = SimpleNamespace(target_name=None)
+        table_ddl_dict = {'schema_name': 'public', 'table_name': 'stocks', 'column_datatype_list': 'id INTEGER', 'primary_key': None}
+
+        self.assertFalse(micro_batch.take_destination_schema(pipeline, 'stocks', table_ddl_dict))
+
+        micro_batch.record_destination_schema(pipeline, 'stocks', table_ddl_dict)
+        self.assertTrue(micro_batch.take_destination_schema(pipeline, 'stocks', table_ddl_dict))
+        # the schema is recorded again only after a successful load
+        self.assertFalse(micro_batch.take_destination_schema(pipeline, 'stocks', table_ddl_dict))
+
+        micro_batch.record_destination_schema(pipeline, 'stocks', table_ddl_dict)
+        self.assertFalse(micro_batch.take_destination_schema(pipeline, 'stocks', {**table_ddl_dict, 'column_datatype_list': 'id BIGINT'}))
+
+
+if __name__ == '__main__':
+    unittest.main()
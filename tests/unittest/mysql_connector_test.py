@@ -0,0 +1,169 @@
+import csv
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import mysql.connector
+
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import ConnectorError
+from petaly.core.object_executor import ObjectExecutor
+from petaly.core.retry_policy import RetryPolicy
+from petaly.core.watermark_store import WatermarkStore
+from petaly.connectors.mysql.mysql_connector import MysqlConnector
+from petaly.connectors.mysql.mysql_extractor import MysqlExtractor
+from petaly.utils.utils import compose_batch_fpath
+
+
+class Cursor():
+    """ A dictionary cursor, which returns the rows without a database. The optional error is raised after the rows, e.g. a dropped connection. """
+
+    def __init__(self, rows, error=None):
+        self.rows = list(rows)
+        self.error = error
+
+    def execute(self, stmt):
+        pass
+
+    def fetchone(self):
+        if len(self.rows) == 0 and self.error is not None:
+            raise self.error
+        return self.rows.pop(0) if len(self.rows) > 0 else None
+
+    def close(self):
+        pass
+
+
+class RunManifest():
+
+    def __init__(self):
+        self.object_entries = {}
+
+    def set_phase(self, object_name, phase, checksum_dpath=None, target_name=None, duration=None, watermark=None, fingerprint=None):
+        self.object_entries.update({object_name: {'phase': phase, 'watermark': watermark}})
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+    def is_loaded(self, object_name, target_name=None):
+        return self.get_object_entry(object_name).get('phase') == 'loaded'
+
+
+class TestMysqlConnector(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_fpath = os.path.join(self.temp_dir.name, 'stocks.csv')
+        self.extract_options = {'delimiter': ',', 'quotechar': '"', 'escapechar': None, 'quoting': csv.QUOTE_MINIMAL,
+                                'lineterminator': '\n', 'header': True, 'cleanup_linebreak_in_fields': False}
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def compose_connector(self, rows):
+        with mock.patch.object(ConnectionPool, 'acquire', return_value=None):
+            connector = MysqlConnector({'connector_type': 'mysql', 'database_host': 'mysql-test', 'database_name': 'test'})
+        connector.get_cursor = lambda: Cursor(rows)
+        return connector
+
+    def read_files(self):
+        file_contents = {}
+        for fname in sorted(os.listdir(self.temp_dir.name)):
+            with open(os.path.join(self.temp_dir.name, fname), 'r') as data_file:
+                file_contents.update({fname: data_file.read()})
+        return file_contents
+
+    def test_compose_batch_fpath(self):
+        self.assertEqual(compose_batch_fpath('/output/stocks/data/stocks.csv', 12), '/output/stocks/data/stocks_00012.csv')
+
+    def test_parse_binlog_position(self):
+        self.assertEqual(MysqlConnector.parse_binlog_position('mysql-bin.000009:1570'), (9, 1570))
+
+        # a rotated binary log starts again at a low position
+        self.assertLess(MysqlConnector.parse_binlog_position('mysql-bin.000009:98765'), MysqlConnector.parse_binlog_position('mysql-bin.000010:4'))
+        # the number of the file can get more digits than the name had, which a text comparison orders wrongly
+        self.assertLess(MysqlConnector.parse_binlog_position('mysql-bin.999999:4'), MysqlConnector.parse_binlog_position('mysql-bin.1000000:4'))
+        # a log name with dots
+        self.assertEqual(MysqlConnector.parse_binlog_position('host.example.com-bin.000003:4'), (3, 4))
+
+    def test_extract_to_single_file(self):
+        connector = self.compose_connector([{'id': 1, 'price': 10}, {'id': 2, 'price': 20}])
+
+        connector.extract_to_fetchone('SELECT * FROM stocks', self.data_fpath, dict(self.extract_options, load_batch_size=None))
+
+        self.assertEqual(self.read_files(), {'stocks.csv': 'id,price\n1,10\n2,20\n'})
+
+    def test_extract_to_batches_with_header(self):
+        connector = self.compose_connector([{'id': i, 'price': i * 10} for i in range(1, 6)])
+
+        connector.extract_to_fetchone('SELECT * FROM stocks', self.data_fpath, dict(self.extract_options, load_batch_size=2))
+
+        # the header is repeated in each file, so each file is loaded on its own
+        self.assertEqual(self.read_files(), {'stocks_00001.csv': 'id,price\n1,10\n2,20\n',
+                                             'stocks_00002.csv': 'id,price\n3,30\n4,40\n',
+                                             'stocks_00003.csv': 'id,price\n5,50\n'})
+
+    def test_extract_to_exact_batches(self):
+        connector = self.compose_connector([{'id': i, 'price': i * 10} for i in range(1, 5)])
+
+        connector.extract_to_fetchone('SELECT * FROM stocks', self.data_fpath, dict(self.extract_options, header=False, load_batch_size=2))
+
+        # no empty file follows the last full batch
+        self.assertEqual(self.read_files(), {'stocks_00001.csv': '1,10\n2,20\n',
+                                             'stocks_00002.csv': '3,30\n4,40\n'})
+
+    def test_failed_extract_raises(self):
+        connector = self.compose_connector([{'id': 1, 'price': 10}])
+        connector.get_cursor = lambda: Cursor([{'id': 1, 'price': 10}], mysql.connector.errors.OperationalError('Lost connection to MySQL server during query'))
+
+        with self.assertRaises(ConnectorError):
+            connector.extract_to_fetchone('SELECT * FROM stocks', self.data_fpath, dict(self.extract_options, load_batch_size=None))
+
+    def test_failed_extract_is_retried(self):
+        connector = self.compose_connector([])
+        cursors = [Cursor([{'id': 1, 'price': 10}], mysql.connector.errors.OperationalError('Lost connection to MySQL server during query')),
+                   Cursor([{'id': 1, 'price': 10}, {'id': 2, 'price': 20}])]
+        connector.get_cursor = lambda: cursors.pop(0)
+
+        def extract_object(worker, object_name):
+            connector.extract_to_fetchone('SELECT * FROM stocks', self.data_fpath, dict(self.extract_options, load_batch_size=None))
+
+        executor = ObjectExecutor(phase='extract', object_func=extract_object, retry_policy=RetryPolicy(max_retries=2, backoff_seconds=0))
+        results = executor.run(['stocks'])
+
+        self.assertEqual((results[0].get('status'), results[0].get('retries')), ('completed', 1))
+        self.assertEqual(self.read_files(), {'stocks.csv': 'id,price\n1,10\n2,20\n'})
+
+    def test_failed_extract_keeps_watermark(self):
+        connector = self.compose_connector([])
+        connector.get_cursor = lambda: Cursor([{'id': 101, 'price': 10}], mysql.connector.errors.OperationalError('Lost connection to MySQL server during query'))
+
+        pipeline = SimpleNamespace(pipeline_name='p_test', source_name=None, object_assignment=None, resume=False, change_detector=None, staging_budget=None,
+                                   m_conf=SimpleNamespace(output_base_dpath=self.temp_dir.name), run_manifest=RunManifest())
+        pipeline.get_source_pipelines = lambda: [pipeline]
+        watermark_store = WatermarkStore(pipeline)
+        watermark_store.save_watermark('stocks', {'value': '100', 'is_number': True})
+
+        extractor = MysqlExtractor.__new__(MysqlExtractor)
+        extractor.pipeline = pipeline
+        extractor.db_connector = connector
+        extractor.change_capture = SimpleNamespace(has_changes=lambda object_name: False)
+        extractor.get_extractor_obj_conf = lambda object_name: {'output_object_fpath': self.data_fpath, 'extract_to_stmt': 'SELECT * FROM stocks WHERE id > 100',
+                                                                 'object_settings': {'columns_delimiter': ',', 'columns_quote': 'double', 'header': True},
+                                                                 'watermark': {'low': {'value': '100', 'is_number': True}, 'high': {'value': '200', 'is_number': True}}}
+
+        executor = ObjectExecutor(phase='extract', object_func=lambda worker, object_name: extractor.extract_object(object_name),
+                                  isolate_failures=True, retry_policy=RetryPolicy(max_retries=0, backoff_seconds=0))
+        results = executor.run(['stocks'])
+
+        # the partial extraction isn't recorded, so the mark stays at the rows loaded before
+        self.assertEqual(results[0].get('status'), 'failed')
+        self.assertEqual(pipeline.run_manifest.get_object_entry('stocks'), {})
+        watermark_store.commit_loaded_object('stocks')
+        self.assertEqual(watermark_store.get_watermark('stocks').get('value'), '100')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import csv
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.change_capture import ChangeCapture
+from petaly.connectors.mysql.mysql_extractor import MysqlExtractor
+
+
+class WatermarkStore():
+
+    def __init__(self, watermarks):
+        self.watermarks = watermarks
+
+    def get_watermark(self, object_name, source_name=None):
+        value = self.watermarks.get(object_name)
+        return {'value': value, 'is_number': False} if value is not None else None
+
+
+class Extractor(MysqlExtractor):
+    """ A MySQL extractor, whose binary log is a list of row events, without a database. """
+
+    def __init__(self, pipeline, events, high_position):
+        self.pipeline = pipeline
+        self.events = events
+        self.high_position = high_position
+        self.read_calls = []
+        self.object_meta_dict = {object_name: {'source_object_name': object_name,
+                                               'columns': [{'column_name': 'id', 'primary_key': 'id'}, {'column_name': 'price', 'primary_key': None}]}
+                                 for object_name in ('stocks', 'options')}
+
+    def get_data_object(self, object_name):
+        return SimpleNamespace(load_mode='cdc')
+
+    def get_change_position(self):
+        return self.high_position
+
+    def read_changes(self, start_position, end_position, table_names):
+        self.read_calls.append(start_position)
+        return [event for event in self.events if self.parse_change_position(event.get('position')) >= self.parse_change_position(start_position)]
+
+
+def compose_event(table, position, row_id):
+    return {'table': table, 'position': position, 'op': 'I', 'row': {'id': row_id, 'price': row_id * 10}, 'old_row': {}}
+
+
+class TestMysqlExtractor(unittest.TestCase):
+
+    def setUp(self):
+        self.extractor = MysqlExtractor.__new__(MysqlExtractor)
+
+    def test_format_change_value(self):
+        self.assertEqual(self.extractor.format_change_value({'red', 'blue'}), 'blue,red')
+        self.assertEqual(self.extractor.format_change_value(set()), '')
+        self.assertEqual(self.extractor.format_change_value({'size': 1, 'tags': ['a']}), '{"size": 1, "tags": ["a"]}')
+        self.assertEqual(self.extractor.format_change_value([1, 2]), '[1, 2]')
+        self.assertEqual(self.extractor.format_change_value('Zürich'.encode('utf-8')), 'Zürich')
+        self.assertEqual(self.extractor.format_change_value(b'\xff'), '�')
+        self.assertEqual(self.extractor.format_change_value(10), 10)
+        self.assertIsNone(self.extractor.format_change_value(None))
+
+    def test_write_change_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            data_fpath = os.path.join(temp_dir, 'stocks.csv')
+            extractor_obj_conf = {'object_settings': {'columns_delimiter': ',', 'columns_quote': 'double', 'header': True}}
+
+            self.extractor.write_change_file(data_fpath, ['id', 'tags', 'attributes', 'petaly_op'],
+                                             [[1, {'b', 'a'}, {'size': 1}, 'I'], [2, None, None, 'D']], extractor_obj_conf)
+
+            with open(data_fpath, 'r') as data_file:
+                self.assertEqual(list(csv.reader(data_file, escapechar='\\')), [['id', 'tags', 'attributes', 'petaly_op'],
+                                                                               ['1', 'a,b', '{"size": 1}', 'I'],
+                                                                               ['2', '', '', 'D']])
+
+    def test_capture_skips_events_loaded_by_each_object(self):
+        pipeline = SimpleNamespace(pipeline_fpath='pipeline.yaml', source_name=None,
+                                   watermark_store=WatermarkStore({'stocks': 'mysql-bin.000009:500', 'options': 'mysql-bin.000010:200'}))
+        events = [compose_event('stocks', 'mysql-bin.000009:500', 1),
+                  compose_event('stocks', 'mysql-bin.000009:900', 2),
+                  compose_event('options', 'mysql-bin.000009:900', 3),
+                  compose_event('options', 'mysql-bin.000010:200', 4),
+                  compose_event('stocks', 'mysql-bin.000010:300', 5),
+                  compose_event('options', 'mysql-bin.000010:300', 6)]
+        extractor = Extractor(pipeline, events, 'mysql-bin.000010:300')
+        change_capture = ChangeCapture(pipeline)
+
+        change_capture.capture(extractor, ['stocks', 'options'])
+
+        # the log is read from the oldest stored position, across the rotation of the log file
+        self.assertEqual(extractor.read_calls, ['mysql-bin.000009:500'])
+        # the events at or below the stored position of each object are skipped
+        self.assertEqual(list(change_capture.object_changes.get('stocks').get('rows').keys()), [('2',), ('5',)])
+        self.assertEqual(list(change_capture.object_changes.get('options').get('rows').keys()), [('6',)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import os
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.exceptions import ConfigError
+from petaly.core.object_assignment import ObjectAssignment
+
+
+class RunManifest():
+
+    def __init__(self, loaded_objects):
+        self.loaded_objects = loaded_objects
+
+    def is_loaded(self, object_name):
+        return object_name in self.loaded_objects
+
+
+class TestObjectAssignment(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(pipeline_name='p_test', output_pipeline_dpath=self.temp_dir.name, run_manifest=RunManifest([]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def create_node(self, owner):
+        node = ObjectAssignment.from_run_id('run_1')
+        node.owner = owner
+        return node
+
+    def test_from_shard_arg(self):
+        object_assignment = ObjectAssignment.from_shard_arg('2/4')
+        self.assertEqual((object_assignment.shard_index, object_assignment.shard_count), (2, 4))
+
+        for shard_arg in ['0/4', '5/4', '1', 'a/b']:
+            with self.assertRaises(ConfigError):
+                ObjectAssignment.from_shard_arg(shard_arg)
+
+    def test_shards_assign_each_object_once(self):
+        object_list = [f"object_{i}" for i in range(50)]
+        shards = [ObjectAssignment.from_shard_arg(f"{i}/3") for i in range(1, 4)]
+
+        assigned_lists = [shard.filter_objects(self.pipeline, object_list) for shard in shards]
+
+        self.assertEqual(sorted(sum(assigned_lists, [])), sorted(object_list))
+        self.assertTrue(all(len(assigned_list) > 0 for assigned_list in assigned_lists))
+        # the assignment is stable across nodes and runs
+        self.assertEqual(ObjectAssignment.from_shard_arg('1/3').filter_objects(self.pipeline, object_list), assigned_lists[0])
+        self.assertEqual(shards[0].filter_processed_objects(self.pipeline, object_list), assigned_lists[0])
+
+    def test_claim_once(self):
+        node_1 = self.create_node('host_1:1')
+        node_2 = self.create_node('host_2:2')
+
+        self.assertTrue(node_1.claim(self.pipeline, 'stocks'))
+        self.assertFalse(node_2.claim(self.pipeline, 'stocks'))
+        # a retry of the object on the same node
+        self.assertTrue(node_1.claim(self.pipeline, 'stocks'))
+
+        self.assertEqual(node_1.filter_processed_objects(self.pipeline, ['stocks']), ['stocks'])
+        self.assertEqual(node_2.filter_processed_objects(self.pipeline, ['stocks']), [])
+
+    def test_expired_lease_is_taken_over(self):
+        node_1 = self.create_node('host_1:1')
+        node_2 = self.create_node('host_2:2')
+        node_1.claim(self.pipeline, 'stocks')
+
+        # node_1 stopped and didn't renew its lease
+        generation, lease_fpath = node_1.get_latest_lease(os.path.join(self.temp_dir.name, '.leases', 'run_1'), 'stocks')
+        expired_time = time.time() - ObjectAssignment.lease_timeout_seconds - 1
+        os.utime(lease_fpath, (expired_time, expired_time))
+
+        self.assertTrue(node_2.claim(self.pipeline, 'stocks'))
+        self.assertFalse(self.create_node('host_3:3').claim(self.pipeline, 'stocks'))
+        self.assertEqual(node_2.get_latest_lease(os.path.join(self.temp_dir.name, '.leases', 'run_1'), 'stocks')[0], generation + 1)
+
+    def test_release_objects(self):
+        node_1 = self.create_node('host_1:1')
+        node_1.claim(self.pipeline, 'loaded')
+        node_1.claim(self.pipeline, 'failed')
+
+        self.pipeline.run_manifest = RunManifest(['loaded'])
+        node_1.release_objects(self.pipeline)
+        self.assertEqual(node_1.active_leases, {})
+
+        # a failed object is claimed again right away, a loaded object never
+        node_2 = self.create_node('host_2:2')
+        self.assertTrue(node_2.claim(self.pipeline, 'failed'))
+        self.assertFalse(node_2.claim(self.pipeline, 'loaded'))
+
+    def test_object_names_with_dots(self):
+        node_1 = self.create_node('host_1:1')
+        node_1.claim(self.pipeline, 'stocks.2024')
+
+        self.assertTrue(node_1.claim(self.pipeline, 'stocks'))
+        self.assertFalse(self.create_node('host_2:2').claim(self.pipeline, 'stocks.2024'))
+
+
+if __name__ == '__main__':
+    unittest.main()
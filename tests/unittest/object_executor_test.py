@@ -0,0 +1,145 @@
+import threading
+import unittest
+
+from petaly.core.object_executor import ObjectExecutor
+
+
+class Worker():
+
+    def __init__(self):
+        self.closed = False
+
+    def close_connection(self):
+        self.closed = True
+
+
+class TestObjectExecutor(unittest.TestCase):
+
+    def test_failed_object_is_isolated(self):
+        def object_func(worker, object_name):
+            if object_name == 'broken':
+                raise ValueError('broken object')
+
+        executor = ObjectExecutor(phase='extract', object_func=object_func, max_workers=2, create_worker=Worker)
+        results = executor.run(['first', 'broken', 'last'])
+
+        self.assertEqual([result.get('object_name') for result in results], ['first', 'broken', 'last'])
+        self.assertEqual([result.get('status') for result in results], ['completed', 'failed', 'completed'])
+        self.assertEqual(results[1].get('error'), 'broken object')
+        self.assertEqual(executor.get_failed_objects(results), ['broken'])
+
+    def test_single_worker_raises(self):
+        def object_func(worker, object_name):
+            raise ValueError('broken object')
+
+        executor = ObjectExecutor(phase='extract', object_func=object_func)
+
+        with self.assertRaises(ValueError):
+            executor.run(['broken'])
+
+    def test_parallel_objects_use_own_workers(self):
+        object_workers = {}
+        lock = threading.Lock()
+        barrier = threading.Barrier(3, timeout=5)
+
+        def object_func(worker, object_name):
+            with lock:
+                object_workers.update({object_name: worker})
+            # all objects are processed at the same time, so none of them can share a worker
+            barrier.wait()
+
+        created_workers = []
+
+        def create_worker():
+            worker = Worker()
+            created_workers.append(worker)
+            return worker
+
+        main_worker = Worker()
+        executor = ObjectExecutor(phase='extract', object_func=object_func, max_workers=3, create_worker=create_worker)
+        results = executor.run(['a', 'b', 'c'], main_worker=main_worker)
+
+        self.assertEqual([result.get('status') for result in results], ['completed'] * 3)
+        self.assertEqual(len(set(id(worker) for worker in object_workers.values())), 3)
+        self.assertIn(main_worker, object_workers.values())
+
+        # the created workers are closed, the main worker is closed by its owner
+        self.assertEqual(len(created_workers), 2)
+        self.assertTrue(all(worker.closed for worker in created_workers))
+        self.assertFalse(main_worker.closed)
+
+    def test_on_completed_skips_failed_objects(self):
+        def object_func(worker, object_name):
+            if object_name == 'broken':
+                raise ValueError('broken object')
+            if object_name == 'claimed':
+                return ObjectExecutor.SKIPPED
+
+        completed_objects = []
+        executor = ObjectExecutor(phase='extract', object_func=object_func, max_workers=2, create_worker=Worker)
+        results = executor.run(['done', 'broken', 'claimed'], on_completed=completed_objects.append)
+
+        self.assertEqual(completed_objects, ['done'])
+        self.assertEqual([result.get('status') for result in results], ['completed', 'failed', ObjectExecutor.SKIPPED])
+
+    def test_start_submit_finish(self):
+        processed_objects = []
+        lock = threading.Lock()
+
+        def object_func(worker, object_name):
+            if object_name == 'broken':
+                raise ValueError('broken object')
+            with lock:
+                processed_objects.append(object_name)
+
+        executor = ObjectExecutor(phase='load', object_func=object_func, max_workers=2, create_worker=Worker)
+        executor.start(main_worker=Worker())
+
+        # objects are submitted by another thread, e.g. the extractor
+        submit_thread = threading.Thread(target=lambda: [executor.submit(object_name) for object_name in ['a', 'broken', 'b', 'c']])
+        submit_thread.start()
+        submit_thread.join()
+
+        results = executor.finish()
+
+        self.assertEqual([result.get('object_name') for result in results], ['a', 'broken', 'b', 'c'])
+        self.assertEqual([result.get('status') for result in results], ['completed', 'failed', 'completed', 'completed'])
+        self.assertEqual(sorted(processed_objects), ['a', 'b', 'c'])
+
+    def test_free_worker_takes_most_urgent_object(self):
+        processed_objects = []
+        started = threading.Event()
+        release = threading.Event()
+
+        def object_func(worker, object_name):
+            processed_objects.append(object_name)
+            if object_name == 'running':
+                started.set()
+                # a running object isn't interrupted, the other objects are queued meanwhile
+                release.wait(5)
+
+        object_schedule = {'running': (1, 0), 'low': (2, 0), 'late': (1, 200), 'early': (1, 100), 'urgent': (0, 300)}
+        executor = ObjectExecutor(phase='load', object_func=object_func, max_workers=1, create_worker=Worker, priority_key=object_schedule.get)
+        executor.start()
+
+        executor.submit('running')
+        self.assertTrue(started.wait(5))
+        for object_name in ['low', 'late', 'early', 'urgent']:
+            executor.submit(object_name)
+        release.set()
+
+        results = executor.finish()
+
+        self.assertEqual(processed_objects, ['running', 'urgent', 'early', 'late', 'low'])
+        # the results are returned in submit order
+        self.assertEqual([result.get('object_name') for result in results], ['running', 'low', 'late', 'early', 'urgent'])
+
+    def test_finish_without_submitted_objects(self):
+        executor = ObjectExecutor(phase='load', object_func=lambda worker, object_name: None, max_workers=3, create_worker=Worker)
+        executor.start()
+
+        self.assertEqual(executor.finish(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import datetime
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.exceptions import ConfigError
+from petaly.core.object_scheduler import ObjectScheduler
+
+
+class TestObjectScheduler(unittest.TestCase):
+
+    def test_order_by_size(self):
+        scheduler = ObjectScheduler(pipeline=None)
+        object_size_dict = {'small': {'estimated_rows': 10, 'estimated_bytes': 100},
+                            'large': {'estimated_rows': 1000, 'estimated_bytes': 10000},
+                            'unknown': {'estimated_rows': None, 'estimated_bytes': None}}
+
+        ordered_list = scheduler.order_by_size(['unknown', 'small', 'missing', 'large'], object_size_dict)
+        self.assertEqual(ordered_list, ['large', 'small', 'unknown', 'missing'])
+
+    def test_order_by_priority(self):
+        scheduler = ObjectScheduler(pipeline=None)
+        scheduler.object_schedule = {'late': {'priority': 'normal', 'deadline': 200},
+                                     'early': {'priority': 'normal', 'deadline': 100},
+                                     'urgent': {'priority': 'high', 'deadline': None},
+                                     'later': {'priority': 'low', 'deadline': 50}}
+
+        ordered_list = scheduler.order_by_priority(['later', 'default', 'late', 'early', 'urgent'])
+        self.assertEqual(ordered_list, ['urgent', 'early', 'late', 'default', 'later'])
+
+    def test_compose_object_schedule(self):
+        pipeline = SimpleNamespace(pipeline_fpath='pipeline.yaml',
+                                   data_objects_spec={'data_objects_spec': [{'object_spec': {'object_name': 'stocks', 'priority': 'High', 'deadline': '06:00'}},
+                                                                            {'object_spec': {'object_name': 'options', 'deadline': '2026-10-19 08:30'}},
+                                                                            None]})
+        now = datetime.datetime(2026, 10, 18, 7, 0)
+
+        object_schedule = ObjectScheduler.compose_object_schedule(pipeline, now)
+
+        # a time of day passed already is on the day of the run and so missed, not moved to the next day
+        self.assertEqual(object_schedule.get('stocks'), {'priority': 'high', 'deadline': datetime.datetime(2026, 10, 18, 6, 0).timestamp()})
+        self.assertEqual(object_schedule.get('options'), {'priority': 'normal', 'deadline': datetime.datetime(2026, 10, 19, 8, 30).timestamp()})
+
+        # the schedulers of the workers share the schedule parsed once by the pipeline
+        pipeline.object_schedule = object_schedule
+        self.assertIs(ObjectScheduler(pipeline).object_schedule, object_schedule)
+
+    def test_invalid_schedule(self):
+        for object_spec in [{'object_name': 'stocks', 'priority': 'urgent'}, {'object_name': 'stocks', 'deadline': '6 am'}]:
+            pipeline = SimpleNamespace(pipeline_fpath='pipeline.yaml', data_objects_spec={'data_objects_spec': [{'object_spec': object_spec}]})
+            with self.assertRaises(ConfigError):
+                ObjectScheduler.compose_object_schedule(pipeline)
+
+
+if __name__ == '__main__':
+    unittest.main()
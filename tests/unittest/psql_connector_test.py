@@ -0,0 +1,184 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import psycopg
+
+from petaly.core.connection_pool import ConnectionPool
+from petaly.core.exceptions import ConnectorError
+from petaly.connectors.postgres.psql_connector import PsqlConnector
+
+
+class Copy():
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def __iter__(self):
+        for row in self.rows:
+            # a row can be the error of a dropped connection
+            if isinstance(row, Exception):
+                raise row
+            yield row
+
+
+class Cursor():
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.sql = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    def copy(self, stmt):
+        return Copy(self.conn.rows)
+
+    def execute(self, sql, params=None):
+        self.sql = sql
+        self.conn.statements.append((sql, params))
+
+    def fetchone(self):
+        # the confirmed position of the replication slot, or None if the slot doesn't exist
+        return {'lsn': self.conn.slot_lsn} if self.conn.slot_lsn is not None else None
+
+    def __iter__(self):
+        # the result of pg_logical_slot_peek_changes, decoded by wal2json
+        return iter(self.conn.peek_records)
+
+
+class Connection():
+    """ A connection, whose COPY yields the rows and whose replication slot returns the peek_records without a database. """
+
+    def __init__(self, rows=None, slot_lsn=None, peek_records=None):
+        self.rows = rows or []
+        self.slot_lsn = slot_lsn
+        self.peek_records = peek_records or []
+        self.statements = []
+        self.broken = False
+        self.rolled_back = False
+
+    def cursor(self, name=None):
+        return Cursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+class TestPsqlConnector(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_fpath = os.path.join(self.temp_dir.name, 'stocks.csv')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def compose_connector(self, rows=None, slot_lsn=None, peek_records=None):
+        with mock.patch.object(ConnectionPool, 'acquire', return_value=Connection(rows, slot_lsn, peek_records)):
+            return PsqlConnector({'connector_type': 'postgres', 'database_host': 'psql-test'})
+
+    def read_files(self):
+        file_contents = {}
+        for fname in sorted(os.listdir(self.temp_dir.name)):
+            with open(os.path.join(self.temp_dir.name, fname), 'rb') as data_file:
+                file_contents.update({fname: data_file.read()})
+        return file_contents
+
+    def test_extract_to_single_file(self):
+        connector = self.compose_connector([b'id,price\n', b'1,10\n', b'2,20\n'])
+
+        connector.extract_to('COPY stocks TO STDOUT', self.data_fpath, header=True)
+
+        self.assertEqual(self.read_files(), {'stocks.csv': b'id,price\n1,10\n2,20\n'})
+
+    def test_extract_to_batches_with_header(self):
+        connector = self.compose_connector([b'id,price\n', b'1,10\n', b'2,20\n', b'3,30\n', b'4,40\n', b'5,50\n'])
+
+        connector.extract_to('COPY stocks TO STDOUT', self.data_fpath, load_batch_size=2, header=True)
+
+        # the header is repeated in each file, so each file is loaded on its own
+        self.assertEqual(self.read_files(), {'stocks_00001.csv': b'id,price\n1,10\n2,20\n',
+                                             'stocks_00002.csv': b'id,price\n3,30\n4,40\n',
+                                             'stocks_00003.csv': b'id,price\n5,50\n'})
+
+    def test_extract_to_batches_without_rows(self):
+        connector = self.compose_connector([])
+
+        connector.extract_to('COPY stocks TO STDOUT', self.data_fpath, load_batch_size=2)
+
+        self.assertEqual(self.read_files(), {'stocks_00001.csv': b''})
+
+    def test_failed_extract_raises(self):
+        connector = self.compose_connector([b'id,price\n', b'1,10\n', psycopg.OperationalError('server closed the connection unexpectedly')])
+
+        # the object fails instead of being recorded as extracted with a partial file
+        with self.assertRaises(ConnectorError):
+            connector.extract_to('COPY stocks TO STDOUT', self.data_fpath, header=True)
+        self.assertTrue(connector.conn.rolled_back)
+
+    def test_parse_lsn(self):
+        self.assertEqual(PsqlConnector.parse_lsn('0/16B3748'), 0x16B3748)
+        self.assertGreater(PsqlConnector.parse_lsn('1/0'), PsqlConnector.parse_lsn('0/FFFFFFFF'))
+
+    def test_read_changes_of_committed_transactions(self):
+        peek_records = [{'lsn': '0/20', 'data': json.dumps({'action': 'B'})},
+                        {'lsn': '0/21', 'data': json.dumps({'action': 'I', 'table': 'stocks', 'columns': [{'name': 'id', 'value': 1}, {'name': 'price', 'value': 10.50}]})},
+                        {'lsn': '0/22', 'data': json.dumps({'action': 'U', 'table': 'stocks', 'columns': [{'name': 'id', 'value': 2}, {'name': 'price', 'value': 20}],
+                                                            'identity': [{'name': 'id', 'value': 2}]})},
+                        {'lsn': '0/28', 'data': json.dumps({'action': 'C'})},
+                        {'lsn': '0/30', 'data': json.dumps({'action': 'B'})},
+                        {'lsn': '0/31', 'data': json.dumps({'action': 'D', 'table': 'stocks', 'identity': [{'name': 'id', 'value': 1}]})},
+                        {'lsn': '0/38', 'data': json.dumps({'action': 'C'})}]
+        connector = self.compose_connector(slot_lsn='0/10', peek_records=peek_records)
+
+        changes = list(connector.read_changes('petaly_p_test', '0/10', '0/40', 'public', ['stocks']))
+
+        # each change has the position of its commit, numbers keep their precision
+        self.assertEqual(changes, [{'table': 'stocks', 'op': 'I', 'row': {'id': 1, 'price': '10.5'}, 'old_row': {}, 'position': '0/28'},
+                                   {'table': 'stocks', 'op': 'U', 'row': {'id': 2, 'price': 20}, 'old_row': {'id': 2}, 'position': '0/28'},
+                                   {'table': 'stocks', 'op': 'D', 'row': {}, 'old_row': {'id': 1}, 'position': '0/38'}])
+
+        # the changes are peeked, not consumed, up to the end position
+        peek_sql, peek_params = connector.conn.statements[-1]
+        self.assertIn('pg_logical_slot_peek_changes', peek_sql)
+        self.assertEqual(peek_params, ('petaly_p_test', '0/40', 'public.stocks'))
+
+    def test_read_changes_advances_slot_to_start_position(self):
+        connector = self.compose_connector(slot_lsn='0/10')
+
+        list(connector.read_changes('petaly_p_test', '0/20', '0/40', 'public', ['stocks']))
+
+        # the slot is moved to the position stored after the last successful load, the changes after it are read again
+        self.assertIn(('SELECT pg_replication_slot_advance(%s, %s::pg_lsn)', ('petaly_p_test', '0/20')), connector.conn.statements)
+
+    def test_read_changes_never_moves_slot_backwards(self):
+        connector = self.compose_connector(slot_lsn='0/30')
+
+        list(connector.read_changes('petaly_p_test', '0/20', '0/40', 'public', ['stocks']))
+
+        self.assertFalse(any('pg_replication_slot_advance' in sql for sql, params in connector.conn.statements))
+
+    def test_read_changes_without_slot(self):
+        connector = self.compose_connector()
+
+        with self.assertRaises(ConnectorError):
+            list(connector.read_changes('petaly_p_test', '0/20', '0/40', 'public', ['stocks']))
+
+
+if __name__ == '__main__':
+    unittest.main()
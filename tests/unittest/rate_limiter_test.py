@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+
+from petaly.core.rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_get_limiter(self):
+        endpoint_attr = {'connector_type': 'postgres', 'database_host': 'limiter-test'}
+
+        self.assertIsNone(RateLimiter.get_limiter(endpoint_attr))
+        self.assertIsNone(RateLimiter.get_limiter({**endpoint_attr, 'max_rows_per_second': 'fast'}))
+        self.assertIsNone(RateLimiter.get_limiter({**endpoint_attr, 'max_rows_per_second': 0}))
+
+        limiter = RateLimiter.get_limiter({**endpoint_attr, 'max_rows_per_second': 1000, 'max_mb_per_second': '2'})
+        self.assertEqual((limiter.rows_per_second, limiter.bytes_per_second), (1000, 2 * 1024 * 1024))
+        # the workers and pipelines of the same endpoint share the limiter
+        self.assertIs(RateLimiter.get_limiter({**endpoint_attr, 'max_rows_per_second': '1000', 'max_mb_per_second': 2}), limiter)
+
+    def test_get_batch_rows(self):
+        self.assertEqual(RateLimiter('batch-test', 50, None).get_batch_rows(), 5)
+        self.assertEqual(RateLimiter('batch-test', 5, None).get_batch_rows(), 1)
+        self.assertEqual(RateLimiter('batch-test', 100000, None).get_batch_rows(), 1000)
+        self.assertEqual(RateLimiter('batch-test', None, 1024).get_batch_rows(), 1000)
+
+    @mock.patch('petaly.core.rate_limiter.time.sleep')
+    def test_consume_waits_for_borrowed_tokens(self, sleep):
+        limiter = RateLimiter('consume-test', 100, None)
+
+        # the bucket holds the tokens of one second
+        limiter.consume(rows=100)
+        sleep.assert_not_called()
+
+        previous_stats = RateLimiter.start_stats()
+        limiter.consume(rows=50)
+        throttle_time = RateLimiter.stop_stats(previous_stats)
+
+        wait_time = sleep.call_args[0][0]
+        self.assertAlmostEqual(wait_time, 0.5, delta=0.05)
+        self.assertEqual(throttle_time, wait_time)
+
+    @mock.patch('petaly.core.rate_limiter.time.sleep')
+    def test_consume_waits_for_the_lower_limit(self, sleep):
+        limiter = RateLimiter('bytes-test', 1000, 1024)
+
+        limiter.consume(rows=10, nbytes=1024 + 2048)
+
+        self.assertAlmostEqual(sleep.call_args[0][0], 2, delta=0.05)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from petaly.core.exceptions import ConfigError
+from petaly.core.retry_policy import RetryPolicy
+
+
+class FailingFunc():
+
+    def __init__(self, errors, result='done'):
+        self.errors = list(errors)
+        self.result = result
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if len(self.errors) > 0:
+            raise self.errors.pop(0)
+        return self.result
+
+
+class TestRetryPolicy(unittest.TestCase):
+
+    def test_retry_until_success(self):
+        retry_policy = RetryPolicy(max_retries=3, backoff_seconds=0)
+        func = FailingFunc([OSError('connection reset'), OSError('connection reset')])
+        reconnects = []
+
+        previous_stats = RetryPolicy.start_stats()
+        self.assertEqual(retry_policy.run(func, 'Load file', on_retry=lambda: reconnects.append(True)), 'done')
+        stats = RetryPolicy.stop_stats(previous_stats)
+
+        self.assertEqual(func.calls, 3)
+        self.assertEqual(len(reconnects), 2)
+        self.assertEqual(stats.get('retries'), 2)
+
+    def test_retries_exhausted(self):
+        retry_policy = RetryPolicy(max_retries=2, backoff_seconds=0)
+        func = FailingFunc([OSError('1'), OSError('2'), OSError('3'), OSError('4')])
+
+        with self.assertRaises(OSError):
+            retry_policy.run(func, 'Load file')
+        self.assertEqual(func.calls, 3)
+
+    def test_retry_on_filter(self):
+        retry_policy = RetryPolicy(max_retries=3, backoff_seconds=0)
+
+        func = FailingFunc([KeyError('not transient')])
+        with self.assertRaises(KeyError):
+            retry_policy.run(func, 'Load file', retry_on=(OSError,))
+        self.assertEqual(func.calls, 1)
+
+        # a config error fails again, so it isn't retried
+        func = FailingFunc([ConfigError('wrong setting')])
+        with self.assertRaises(ConfigError):
+            retry_policy.run(func, 'Load file')
+        self.assertEqual(func.calls, 1)
+
+    def test_exponential_backoff_with_jitter(self):
+        retry_policy = RetryPolicy(max_retries=10, backoff_seconds=1)
+
+        for attempt, (min_delay, max_delay) in {1: (0.5, 1), 2: (1, 2), 3: (2, 4), 10: (30, 60)}.items():
+            for i in range(20):
+                delay = retry_policy.compute_delay(attempt)
+                self.assertGreaterEqual(delay, min_delay)
+                self.assertLessEqual(delay, max_delay)
+
+    def test_from_attributes(self):
+        retry_policy = RetryPolicy.from_attributes({'max_object_retries': '2', 'retry_backoff_seconds': '0.5'}, 'max_object_retries', default_max_retries=0)
+        self.assertEqual((retry_policy.max_retries, retry_policy.backoff_seconds), (2, 0.5))
+
+        self.assertEqual(RetryPolicy.from_attributes({}, 'max_object_retries', default_max_retries=0).max_retries, 0)
+        self.assertEqual(RetryPolicy.from_attributes({}).max_retries, RetryPolicy.default_max_retries)
+        self.assertEqual(RetryPolicy.from_attributes({'max_retries': 'often'}).max_retries, RetryPolicy.default_max_retries)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.run_manifest import RunManifest
+
+
+class TestRunManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(pipeline_name='p_test',
+                                        output_pipeline_dpath=self.temp_dir.name,
+                                        extracted_object_data_dpath=os.path.join(self.temp_dir.name, '{object_name}', 'data'),
+                                        object_assignment=None,
+                                        source_name=None,
+                                        object_default_settings={'header': True},
+                                        get_target_names=lambda: ['target_1', 'target_2'])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def stage_object(self, object_name, content='id,name\n1,a\n2,b\n'):
+        data_dpath = self.pipeline.extracted_object_data_dpath.format(object_name=object_name)
+        os.makedirs(data_dpath, exist_ok=True)
+        with open(os.path.join(data_dpath, f"{object_name}.csv"), 'w') as data_file:
+            data_file.write(content)
+        return data_dpath
+
+    def test_extracted_object_stats(self):
+        run_manifest = RunManifest(self.pipeline)
+        run_manifest.start()
+        run_manifest.set_phase('stocks', 'extracted', self.stage_object('stocks'), duration=1.5)
+
+        object_entry = run_manifest.get_object_entry('stocks')
+        self.assertEqual(object_entry.get('rows'), 2)
+        self.assertEqual(object_entry.get('bytes'), len('id,name\n1,a\n2,b\n'))
+        self.assertEqual(list(object_entry.get('files').keys()), ['stocks.csv'])
+
+    def test_resume_decisions(self):
+        run_manifest = RunManifest(self.pipeline)
+        self.assertEqual(run_manifest.prepare_extract(['loaded', 'staged', 'changed', 'new'], resume=False), ['loaded', 'staged', 'changed', 'new'])
+
+        for object_name in ['loaded', 'staged', 'changed']:
+            run_manifest.set_phase(object_name, 'extracted', self.stage_object(object_name))
+        run_manifest.set_phase('loaded', 'loaded', target_name='target_1')
+        run_manifest.set_phase('loaded', 'loaded', target_name='target_2')
+        run_manifest.set_phase('staged', 'loaded', target_name='target_1')
+        self.stage_object('changed', 'id,name\n1,a\n')
+
+        # the interrupted run is continued by a new process
+        resumed_manifest = RunManifest(self.pipeline)
+        reused_objects = []
+        extract_list = resumed_manifest.prepare_extract(['loaded', 'staged', 'changed', 'new'], resume=True, on_object_extracted=reused_objects.append)
+
+        self.assertEqual(extract_list, ['changed', 'new'])
+        # the object loaded into one of two targets is loaded again from its staged files
+        self.assertEqual(reused_objects, ['staged'])
+        self.assertEqual(resumed_manifest.filter_unloaded_objects(['loaded', 'staged'], 'target_1'), [])
+        self.assertEqual(resumed_manifest.filter_unloaded_objects(['loaded', 'staged'], 'target_2'), ['staged'])
+
+    def test_journal_is_merged(self):
+        run_manifest = RunManifest(self.pipeline)
+        run_manifest.start()
+        run_manifest.set_phase('stocks', 'extracted', self.stage_object('stocks'))
+        run_manifest.add_loaded_batch('stocks', 'stocks_00001.csv', 'target_1')
+
+        # the changes are appended to the journal, not written to the manifest
+        self.assertTrue(os.path.isfile(run_manifest.journal_fpath))
+        self.assertEqual(RunManifest(self.pipeline).get_loaded_batches('stocks', 'target_1'), ['stocks_00001.csv'])
+
+        for i in range(RunManifest.min_journal_entries):
+            run_manifest.set_phase(f"object_{i}", 'extracted')
+
+        self.assertLess(run_manifest.journal_entries, RunManifest.min_journal_entries)
+        self.assertEqual(len(RunManifest(self.pipeline).manifest.get('objects')), RunManifest.min_journal_entries + 1)
+
+    def test_incomplete_journal_entry_is_ignored(self):
+        run_manifest = RunManifest(self.pipeline)
+        run_manifest.start()
+        run_manifest.set_phase('stocks', 'extracted')
+
+        with open(run_manifest.journal_fpath, 'a') as journal_file:
+            journal_file.write('{"object_name": "options", "object_en')
+
+        self.assertEqual(list(RunManifest(self.pipeline).manifest.get('objects').keys()), ['stocks'])
+
+
+if __name__ == '__main__':
+    unittest.main()
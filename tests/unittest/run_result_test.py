@@ -0,0 +1,61 @@
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.run_result import RunResult
+
+
+class RunManifest():
+
+    def __init__(self, object_entries):
+        self.object_entries = object_entries
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+
+class TestRunResult(unittest.TestCase):
+
+    def compose_result(self, object_name, phase, status='completed', duration=1.0, error=None):
+        return {'object_name': object_name, 'phase': phase, 'status': status, 'duration': duration,
+                'retries': 0, 'retry_time': 0, 'throttle_time': 0, 'error': error}
+
+    def test_rows_and_bytes_of_several_sources(self):
+        run_result = RunResult('p_test')
+        source_1 = SimpleNamespace(target_name=None, run_manifest=RunManifest({'stocks': {'rows': 10, 'bytes': 100}}))
+        source_2 = SimpleNamespace(target_name=None, run_manifest=RunManifest({'stocks': {'rows': 5, 'bytes': 50}}))
+        # the staged data is deleted after the load, the counts are kept by the manifest
+        target = SimpleNamespace(target_name=None, run_manifest=RunManifest({'stocks': {'rows': 15, 'bytes': 150}}))
+
+        run_result.add_object_result(source_1, self.compose_result('stocks', 'extract'))
+        run_result.add_object_result(source_2, self.compose_result('stocks', 'extract'))
+        run_result.add_object_result(target, self.compose_result('stocks', 'load'))
+        run_result.finish()
+
+        self.assertEqual((run_result.rows, run_result.bytes), (15, 150))
+        self.assertEqual(run_result.status, 'completed')
+
+    def test_load_only_run(self):
+        run_result = RunResult('p_test')
+        target = SimpleNamespace(target_name=None, run_manifest=RunManifest({'stocks': {'rows': 15, 'bytes': 150}}))
+
+        run_result.add_object_result(target, self.compose_result('stocks', 'load'))
+
+        self.assertEqual((run_result.rows, run_result.bytes), (15, 150))
+
+    def test_failed_target(self):
+        run_result = RunResult('p_test')
+        run_manifest = RunManifest({'stocks': {'rows': 15, 'bytes': 150}})
+        source = SimpleNamespace(target_name=None, run_manifest=run_manifest)
+
+        run_result.add_object_result(source, self.compose_result('stocks', 'extract'))
+        run_result.add_object_result(SimpleNamespace(target_name='target_1', run_manifest=run_manifest), self.compose_result('stocks', 'load'))
+        run_result.add_object_result(SimpleNamespace(target_name='target_2', run_manifest=run_manifest), self.compose_result('stocks', 'load', 'failed', error='connection lost'))
+        run_result.finish()
+
+        self.assertEqual(run_result.get_failed_objects(), ['stocks'])
+        self.assertEqual(run_result.status, 'failed')
+        self.assertEqual(run_result.objects.get('stocks').phases, {'extract': 'completed', 'load target_1': 'completed', 'load target_2': 'failed'})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.exceptions import ExtractError
+from petaly.core.staging_budget import StagingBudget
+from petaly.utils.file_handler import FileHandler
+
+
+class RunManifest():
+
+    def __init__(self):
+        self.loaded_objects = set()
+
+    def is_loaded(self, object_name):
+        return object_name in self.loaded_objects
+
+
+class TestStagingBudget(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.pipeline = SimpleNamespace(pipeline_name='p_test',
+                                        pipeline_fpath='pipeline.yaml',
+                                        data_attributes={'max_staging_mb': 0.001, 'delete_staged_data': True},
+                                        output_pipeline_dpath=self.temp_dir.name,
+                                        metadata_dname='metadata',
+                                        f_handler=FileHandler(),
+                                        run_manifest=RunManifest())
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def stage_object(self, object_name, nbytes):
+        for dir_name in ['data', 'metadata']:
+            os.makedirs(os.path.join(self.temp_dir.name, object_name, dir_name))
+        with open(os.path.join(self.temp_dir.name, object_name, 'data', f"{object_name}.csv"), 'w') as data_file:
+            data_file.write('x' * nbytes)
+
+    def test_from_pipeline(self):
+        staging_budget = StagingBudget.from_pipeline(self.pipeline)
+        self.assertEqual((staging_budget.max_staging_bytes, staging_budget.delete_staged_data), (1048, True))
+
+        self.pipeline.data_attributes = {}
+        self.assertIsNone(StagingBudget.from_pipeline(self.pipeline))
+
+        self.pipeline.data_attributes = {'max_staging_mb': 'much'}
+        self.assertIsNone(StagingBudget.from_pipeline(self.pipeline))
+
+    def test_budget_exceeded_without_overlapped_load(self):
+        staging_budget = StagingBudget.from_pipeline(self.pipeline)
+        self.stage_object('stocks', 2000)
+        staging_budget.add_object('stocks')
+
+        self.assertEqual(staging_budget.get_staged_bytes(), 2000)
+        # nothing frees space while the extraction runs
+        with self.assertRaises(ExtractError):
+            staging_budget.wait_for_space('options')
+
+    def test_wait_until_loaded_object_is_released(self):
+        staging_budget = StagingBudget.from_pipeline(self.pipeline)
+        staging_budget.overlapped = True
+        self.stage_object('stocks', 2000)
+        staging_budget.add_object('stocks')
+
+        waiting_thread = threading.Thread(target=staging_budget.wait_for_space, args=('options',))
+        waiting_thread.start()
+        time.sleep(0.2)
+        self.assertTrue(waiting_thread.is_alive())
+
+        # the object isn't deleted before it's loaded into all targets
+        staging_budget.release_object('stocks')
+        self.assertEqual(staging_budget.get_staged_bytes(), 2000)
+
+        self.pipeline.run_manifest.loaded_objects.add('stocks')
+        staging_budget.release_object('stocks')
+        waiting_thread.join(5)
+
+        self.assertFalse(waiting_thread.is_alive())
+        self.assertEqual(staging_budget.get_staged_bytes(), 0)
+        # the metadata of the object is kept
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir.name, 'stocks')), ['metadata'])
+
+    def test_failed_load_cannot_free_space(self):
+        staging_budget = StagingBudget.from_pipeline(self.pipeline)
+        staging_budget.overlapped = True
+        self.stage_object('stocks', 2000)
+        staging_budget.add_object('stocks')
+
+        staging_budget.add_result({'object_name': 'stocks', 'phase': 'load', 'status': 'failed'})
+
+        with self.assertRaises(ExtractError):
+            staging_budget.wait_for_space('options')
+
+
+if __name__ == '__main__':
+    unittest.main()
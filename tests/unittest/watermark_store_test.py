@@ -0,0 +1,123 @@
+import decimal
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from petaly.core.exceptions import LoadError
+from petaly.core.watermark_store import WatermarkStore
+
+
+class RunManifest():
+
+    def __init__(self, object_entries=None, loaded_objects=()):
+        self.object_entries = object_entries or {}
+        self.loaded_objects = set(loaded_objects)
+
+    def get_object_entry(self, object_name):
+        return self.object_entries.get(object_name, {})
+
+    def is_loaded(self, object_name, target_name=None):
+        return object_name in self.loaded_objects
+
+
+def compose_pipeline(output_base_dpath, pipeline_name='p_test'):
+    return SimpleNamespace(pipeline_name=pipeline_name, m_conf=SimpleNamespace(output_base_dpath=output_base_dpath))
+
+
+def save_watermarks(output_base_dpath, pipeline_name, object_count):
+    watermark_store = WatermarkStore(compose_pipeline(output_base_dpath, pipeline_name))
+    for i in range(object_count):
+        watermark_store.save_watermark(f"object_{i}", {'value': str(i), 'is_number': True})
+
+
+class TestWatermarkStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_compose_watermark(self):
+        self.assertIsNone(WatermarkStore.compose_watermark(None))
+        self.assertEqual(WatermarkStore.compose_watermark(decimal.Decimal('10.5')), {'value': '10.5', 'is_number': True})
+        self.assertEqual(WatermarkStore.compose_watermark(True), {'value': 'True', 'is_number': False})
+
+        self.assertEqual(WatermarkStore.compose_literal({'value': '10.5', 'is_number': True}), '10.5')
+        self.assertEqual(WatermarkStore.compose_literal({'value': "O'Brien", 'is_number': False}), "'O''Brien'")
+
+    def test_save_and_get_watermark(self):
+        watermark_store = WatermarkStore(compose_pipeline(self.temp_dir.name))
+        self.assertIsNone(watermark_store.get_watermark('stocks'))
+
+        watermark_store.save_watermark('stocks', {'value': '100', 'is_number': True})
+        watermark_store.save_watermark('stocks', {'value': '2026-10-18', 'is_number': False}, source_name='eu')
+
+        self.assertEqual(watermark_store.get_watermark('stocks').get('value'), '100')
+        # each source of the pipeline keeps its own mark
+        self.assertEqual(watermark_store.get_watermark('stocks', 'eu').get('value'), '2026-10-18')
+
+    def test_save_keeps_marks_of_other_processes(self):
+        watermark_store = WatermarkStore(compose_pipeline(self.temp_dir.name))
+        watermark_store.save_watermark('stocks', {'value': '100', 'is_number': True})
+
+        # another node recorded its mark in the meantime
+        with open(watermark_store.state_fpath, 'r') as state_file:
+            state = json.load(state_file)
+        state.update({'p_other': {'options': {'value': '7', 'is_number': True}}})
+        with open(watermark_store.state_fpath, 'w') as state_file:
+            json.dump(state, state_file)
+
+        watermark_store.save_watermark('trades', {'value': '5', 'is_number': True})
+
+        self.assertEqual(WatermarkStore(compose_pipeline(self.temp_dir.name, 'p_other')).get_watermark('options').get('value'), '7')
+        self.assertEqual(watermark_store.get_watermark('stocks').get('value'), '100')
+
+    def test_save_keeps_corrupt_state_file(self):
+        watermark_store = WatermarkStore(compose_pipeline(self.temp_dir.name))
+        with open(watermark_store.state_fpath, 'w') as state_file:
+            state_file.write('{"p_test": {"stocks": ')
+
+        # the reads ignore the file, but an update would replace the marks of all objects
+        self.assertIsNone(watermark_store.get_watermark('stocks'))
+        with self.assertRaises(LoadError):
+            watermark_store.save_watermark('trades', {'value': '5', 'is_number': True})
+
+        with open(watermark_store.state_fpath, 'r') as state_file:
+            self.assertEqual(state_file.read(), '{"p_test": {"stocks": ')
+
+    def test_concurrent_processes_dont_lose_updates(self):
+        processes = [multiprocessing.get_context('fork').Process(target=save_watermarks, args=(self.temp_dir.name, f"p_{i}", 20)) for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(30)
+
+        with open(os.path.join(self.temp_dir.name, WatermarkStore.state_fname), 'r') as state_file:
+            state = json.load(state_file)
+
+        self.assertEqual(sorted(state.keys()), ['p_0', 'p_1', 'p_2', 'p_3'])
+        self.assertTrue(all(len(state.get(state_key)) == 20 for state_key in state))
+
+    def test_commit_loaded_object(self):
+        pipeline = compose_pipeline(self.temp_dir.name)
+        source_pipeline = SimpleNamespace(source_name=None,
+                                          run_manifest=RunManifest({'stocks': {'watermark': {'low': None, 'high': {'value': '100', 'is_number': True}}}}))
+        pipeline.get_source_pipelines = lambda: [source_pipeline]
+        pipeline.run_manifest = RunManifest()
+        watermark_store = WatermarkStore(pipeline)
+
+        # a failed load keeps the previous mark, so the next run extracts the same rows again
+        watermark_store.commit_loaded_object('stocks')
+        self.assertIsNone(watermark_store.get_watermark('stocks'))
+
+        pipeline.run_manifest.loaded_objects.add('stocks')
+        watermark_store.commit_loaded_object('stocks')
+        self.assertEqual(watermark_store.get_watermark('stocks').get('value'), '100')
+
+
+if __name__ == '__main__':
+    unittest.main()